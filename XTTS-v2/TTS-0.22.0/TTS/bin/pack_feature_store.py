@@ -0,0 +1,144 @@
+#!/usr/bin/env python3
+# -*- coding: utf-8 -*-
+
+import argparse
+
+import numpy as np
+import torch
+from tqdm import tqdm
+
+from TTS.config import load_config
+from TTS.tts.datasets import load_tts_samples
+from TTS.tts.datasets.feature_store import FeatureStoreWriter, audio_settings, tokenizer_settings
+from TTS.tts.utils.text.tokenizer import TTSTokenizer
+from TTS.utils.audio import AudioProcessor
+from TTS.utils.audio.numpy_transforms import compute_energy
+
+FEATURES = ("wav", "mel", "token_ids", "pitch", "energy")
+
+
+class FeatureDataset(torch.utils.data.Dataset):
+    """Compute the features of the samples in the data loader workers."""
+
+    def __init__(self, samples, ap, tokenizer, features):
+        self.samples = samples
+        self.ap = ap
+        self.tokenizer = tokenizer
+        self.features = features
+
+    def __len__(self):
+        return len(self.samples)
+
+    def __getitem__(self, idx):
+        item = self.samples[idx]
+        wav = np.asarray(self.ap.load_wav(item["audio_file"]), dtype=np.float32)
+        features = {}
+        if "wav" in self.features:
+            features["wav"] = wav
+        if "mel" in self.features:
+            features["mel"] = self.ap.melspectrogram(wav).astype(np.float32)
+        if "token_ids" in self.features:
+            token_ids = self.tokenizer.text_to_ids(item["text"], language=item["language"])
+            features["token_ids"] = np.asarray(token_ids, dtype=np.int32)
+        if "pitch" in self.features:
+            features["pitch"] = self.ap.compute_f0(wav).astype(np.float32)
+        if "energy" in self.features:
+            energy = compute_energy(
+                wav, fft_size=self.ap.fft_size, hop_length=self.ap.hop_length, win_length=self.ap.win_length
+            )
+            features["energy"] = energy.astype(np.float32)
+        return item["audio_unique_name"], features
+
+    @staticmethod
+    def collate_fn(batch):
+        return batch
+
+
+class NonzeroStats:
+    """Running mean and std of the non-zero values, as `F0Dataset.compute_pitch_stats()` computes them."""
+
+    def __init__(self):
+        self.count = 0
+        self.sum = 0.0
+        self.square_sum = 0.0
+
+    def update(self, values):
+        nonzeros = values[values != 0.0].astype(np.float64)
+        self.count += len(nonzeros)
+        self.sum += nonzeros.sum()
+        self.square_sum += (nonzeros**2).sum()
+
+    def to_dict(self):
+        mean = self.sum / max(self.count, 1)
+        return {"mean": mean, "std": float(np.sqrt(max(self.square_sum / max(self.count, 1) - mean**2, 0.0)))}
+
+
+def main():
+    """Pack the waveforms and the features of a dataset into a memory-mapped feature store."""
+    parser = argparse.ArgumentParser(
+        description="""Pack the waveforms, mel spectrograms, token IDs, pitch and energy of the train and eval
+        samples into a few large shard files, read by `TTSDataset` when `feature_store_path` is set in the config.
+
+        Example runs:
+
+        python TTS/bin/pack_feature_store.py config.json /data/ljspeech_features --num_workers 8
+        python TTS/bin/pack_feature_store.py config.json /data/ljspeech_features --features wav mel token_ids
+        """,
+        formatter_class=argparse.RawTextHelpFormatter,
+    )
+    parser.add_argument("config_path", type=str, help="TTS config file path to define the dataset and the features.")
+    parser.add_argument("out_path", type=str, help="Output folder of the feature store.")
+    parser.add_argument(
+        "--features",
+        nargs="+",
+        choices=FEATURES,
+        default=None,
+        help="Features to pack. Defaults to wav, mel, token_ids and pitch and energy if the config computes them.",
+    )
+    parser.add_argument("--shard_size_mb", type=int, default=1024, help="Maximum size of a shard file in MB.")
+    parser.add_argument("--num_workers", type=int, default=0, help="Number of workers computing the features.")
+    args, overrides = parser.parse_known_args()
+
+    config = load_config(args.config_path)
+    config.parse_known_args(overrides, relaxed_parser=True)
+
+    features = args.features
+    if features is None:
+        features = ["wav", "mel", "token_ids"]
+        if config.get("compute_f0", False):
+            features.append("pitch")
+        if config.get("compute_energy", False):
+            features.append("energy")
+
+    ap = AudioProcessor(**config.audio.to_dict())
+    tokenizer, config = TTSTokenizer.init_from_config(config)
+
+    train_samples, eval_samples = load_tts_samples(
+        config.datasets,
+        eval_split=True,
+        eval_split_max_size=config.eval_split_max_size,
+        eval_split_size=config.eval_split_size,
+    )
+    samples = train_samples + eval_samples
+    print(f" > There are {len(samples)} files.")
+
+    dataset = FeatureDataset(samples, ap, tokenizer, features)
+    loader = torch.utils.data.DataLoader(
+        dataset, batch_size=1, shuffle=False, num_workers=args.num_workers, collate_fn=dataset.collate_fn
+    )
+    metadata = {"audio": audio_settings(ap), "tokenizer": tokenizer_settings(tokenizer)}
+    stats = {name: NonzeroStats() for name in ("pitch", "energy") if name in features}
+    writer = FeatureStoreWriter(args.out_path, shard_size=args.shard_size_mb << 20, metadata=metadata)
+    with writer:
+        for batch in tqdm(loader):
+            for key, sample_features in batch:
+                for name, sample_stats in stats.items():
+                    sample_stats.update(sample_features[name])
+                writer.add(key, **sample_features)
+        for name, sample_stats in stats.items():
+            writer.metadata[f"{name}_stats"] = sample_stats.to_dict()
+    print(f" > {', '.join(features)} of {len(writer.keys)} samples saved to {args.out_path}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,246 @@
+#!/usr/bin/env python
+"""Asyncio TTS server with dynamic batching over one or more model replicas.
+
+`TTS/server/server.py` synthesizes one request at a time behind a global lock. This server queues the requests
+of `/api/tts` and `/process` into a `DynamicBatcher`, which dispatches them in batches to `--num_replicas`
+synthesizers running in their own threads. A request can carry a deadline (`timeout` in seconds), after which it
+is answered with 504 if its synthesis has not started, and it is dropped from the queue if the client
+disconnects. The audio is returned as a chunked WAV response.
+
+Example:
+    python TTS/server/async_server.py --model_name tts_models/en/ljspeech/tacotron2-DDC --num_replicas 2
+"""
+
+import argparse
+import asyncio
+import io
+import sys
+from contextlib import asynccontextmanager
+from pathlib import Path
+from urllib.parse import parse_qs
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import JSONResponse, PlainTextResponse, StreamingResponse
+
+from TTS.server.batcher import DynamicBatcher, RequestExpired, SynthesizerReplica
+from TTS.server.utils import style_wav_uri_to_dict
+from TTS.utils.manage import ModelManager
+from TTS.utils.synthesizer import Synthesizer
+
+
+def create_argparser():
+    def convert_boolean(x):
+        return x.lower() in ["true", "1", "yes"]
+
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument(
+        "--list_models",
+        type=convert_boolean,
+        nargs="?",
+        const=True,
+        default=False,
+        help="list available pre-trained tts and vocoder models.",
+    )
+    parser.add_argument(
+        "--model_name",
+        type=str,
+        default="tts_models/en/ljspeech/tacotron2-DDC",
+        help="Name of one of the pre-trained tts models in format <language>/<dataset>/<model_name>",
+    )
+    parser.add_argument("--vocoder_name", type=str, default=None, help="name of one of the released vocoder models.")
+    parser.add_argument("--config_path", default=None, type=str, help="Path to model config file.")
+    parser.add_argument("--model_path", type=str, default=None, help="Path to model file.")
+    parser.add_argument("--vocoder_path", type=str, default=None, help="Path to vocoder model file.")
+    parser.add_argument("--vocoder_config_path", type=str, default=None, help="Path to vocoder model config file.")
+    parser.add_argument("--speakers_file_path", type=str, default=None, help="JSON file for multi-speaker model.")
+    parser.add_argument("--host", type=str, default="0.0.0.0", help="host to listen on.")
+    parser.add_argument("--port", type=int, default=5002, help="port to listen on.")
+    parser.add_argument("--use_cuda", type=convert_boolean, default=False, help="true to use CUDA.")
+    parser.add_argument("--num_replicas", type=int, default=1, help="Number of model replicas.")
+    parser.add_argument("--max_batch_size", type=int, default=8, help="Maximum number of requests in a batch.")
+    parser.add_argument(
+        "--max_wait_ms", type=float, default=10.0, help="Time to wait for more requests once a batch is started."
+    )
+    parser.add_argument(
+        "--max_queue_size", type=int, default=0, help="Maximum number of queued requests, 0 for no limit."
+    )
+    parser.add_argument(
+        "--request_timeout",
+        type=float,
+        default=0,
+        help="Default deadline in seconds of a request to start its synthesis, 0 for none.",
+    )
+    parser.add_argument(
+        "--decode_batch_size",
+        type=int,
+        default=0,
+        help="XTTS only: decode the GPT codes of the requests of a batch together, up to this size. 0 to disable.",
+    )
+    parser.add_argument("--chunk_size", type=int, default=1 << 16, help="Size in bytes of the response chunks.")
+    return parser
+
+
+def resolve_model_paths(args):
+    """Return the model, config, speakers file, vocoder and vocoder config paths, as `server.py` does."""
+    manager = ModelManager(Path(__file__).parent / "../.models.json")
+    model_path = config_path = speakers_file_path = vocoder_path = vocoder_config_path = None
+    if args.model_name is not None and not args.model_path:
+        model_path, config_path, model_item = manager.download_model(args.model_name)
+        args.vocoder_name = model_item["default_vocoder"] if args.vocoder_name is None else args.vocoder_name
+    if args.vocoder_name is not None and not args.vocoder_path:
+        vocoder_path, vocoder_config_path, _ = manager.download_model(args.vocoder_name)
+    if args.model_path is not None:
+        model_path = args.model_path
+        config_path = args.config_path
+        speakers_file_path = args.speakers_file_path
+    if args.vocoder_path is not None:
+        vocoder_path = args.vocoder_path
+        vocoder_config_path = args.vocoder_config_path
+    return model_path, config_path, speakers_file_path, vocoder_path, vocoder_config_path
+
+
+def load_synthesizer(args, model_paths):
+    model_path, config_path, speakers_file_path, vocoder_path, vocoder_config_path = model_paths
+    synthesizer = Synthesizer(
+        tts_checkpoint=model_path,
+        tts_config_path=config_path,
+        tts_speakers_file=speakers_file_path,
+        tts_languages_file=None,
+        vocoder_checkpoint=vocoder_path,
+        vocoder_config=vocoder_config_path,
+        encoder_checkpoint="",
+        encoder_config="",
+        use_cuda=args.use_cuda,
+    )
+    if args.decode_batch_size > 0 and hasattr(synthesizer.tts_model, "enable_decode_scheduler"):
+        synthesizer.tts_model.enable_decode_scheduler(max_batch_size=args.decode_batch_size)
+    return synthesizer
+
+
+def wav_chunks(synthesizer, wav, chunk_size):
+    """Encode the waveform as WAV and yield it in `chunk_size` bytes chunks."""
+    out = io.BytesIO()
+    synthesizer.save_wav(wav, out)
+    data = out.getbuffer()
+    for start in range(0, len(data), chunk_size):
+        yield bytes(data[start : start + chunk_size])
+
+
+async def request_values(request):
+    """Merge the query parameters and the url-encoded form of a POST, like `flask.request.values`."""
+    values = dict(request.query_params)
+    if request.method == "POST":
+        body = (await request.body()).decode("utf-8")
+        values.update({name: value[0] for name, value in parse_qs(body).items()})
+    return values
+
+
+def create_app(args, synthesizers):
+    replicas = [SynthesizerReplica(synthesizer, max_batch_size=args.max_batch_size) for synthesizer in synthesizers]
+    batcher = DynamicBatcher(
+        replicas,
+        max_batch_size=args.max_batch_size,
+        max_wait=args.max_wait_ms / 1000,
+        max_queue_size=args.max_queue_size,
+    )
+
+    @asynccontextmanager
+    async def lifespan(_app):
+        await batcher.start()
+        yield
+        await batcher.shutdown()
+
+    app = FastAPI(lifespan=lifespan)
+
+    async def synthesize(request, text, timeout, **tts_kwargs):
+        """Synthesize through the batcher and cancel the request if the client disconnects while it waits."""
+        task = asyncio.ensure_future(batcher.synthesize(text, timeout=timeout, **tts_kwargs))
+        while True:
+            done, _ = await asyncio.wait({task}, timeout=0.1)
+            if done:
+                break
+            if await request.is_disconnected():
+                task.cancel()
+                break
+        try:
+            wav = await task
+        except asyncio.CancelledError:
+            return PlainTextResponse("Client disconnected.", status_code=499)
+        except RequestExpired:
+            return PlainTextResponse("The request deadline passed before its synthesis.", status_code=504)
+        except asyncio.QueueFull:
+            return PlainTextResponse("Too many queued requests.", status_code=503)
+        return StreamingResponse(wav_chunks(synthesizers[0], wav, args.chunk_size), media_type="audio/wav")
+
+    def request_timeout(request, values):
+        timeout = request.headers.get("timeout") or values.get("timeout")
+        return float(timeout) if timeout else args.request_timeout or None
+
+    @app.api_route("/api/tts", methods=["GET", "POST"])
+    async def tts(request: Request):
+        values = await request_values(request)
+        text = request.headers.get("text") or values.get("text", "")
+        speaker_idx = request.headers.get("speaker-id") or values.get("speaker_id", "")
+        language_idx = request.headers.get("language-id") or values.get("language_id", "")
+        style_wav = request.headers.get("style-wav") or values.get("style_wav", "")
+        style_wav = style_wav_uri_to_dict(style_wav)
+        print(f" > Model input: {text}")
+        print(f" > Speaker Idx: {speaker_idx}")
+        print(f" > Language Idx: {language_idx}")
+        return await synthesize(
+            request,
+            text,
+            request_timeout(request, values),
+            speaker_name=speaker_idx,
+            language_name=language_idx,
+            style_wav=style_wav,
+        )
+
+    # Basic MaryTTS compatibility layer
+
+    def model_details():
+        # NOTE: We currently assume there is only one model active at the same time
+        if args.model_name is not None:
+            return args.model_name.split("/")
+        return ["", "en", "", "default"]
+
+    @app.get("/locales", response_class=PlainTextResponse)
+    async def mary_tts_api_locales():
+        """MaryTTS-compatible /locales endpoint"""
+        return f"{model_details()[1]}\n"
+
+    @app.get("/voices", response_class=PlainTextResponse)
+    async def mary_tts_api_voices():
+        """MaryTTS-compatible /voices endpoint"""
+        details = model_details()
+        return f"{details[3]} {details[1]} u\n"
+
+    @app.api_route("/process", methods=["GET", "POST"])
+    async def mary_tts_api_process(request: Request):
+        """MaryTTS-compatible /process endpoint"""
+        values = await request_values(request)
+        # NOTE: we ignore param. LOCALE and VOICE for now since we have only one active model
+        text = values.get("INPUT_TEXT", "")
+        print(f" > Model input: {text}")
+        return await synthesize(request, text, request_timeout(request, values))
+
+    @app.get("/stats")
+    async def stats():
+        return JSONResponse(batcher.stats())
+
+    return app
+
+
+def main():
+    args = create_argparser().parse_args()
+    if args.list_models:
+        ModelManager(Path(__file__).parent / "../.models.json").list_models()
+        sys.exit()
+    model_paths = resolve_model_paths(args)
+    synthesizers = [load_synthesizer(args, model_paths) for _ in range(max(1, args.num_replicas))]
+    uvicorn.run(create_app(args, synthesizers), host=args.host, port=args.port)
+
+
+if __name__ == "__main__":
+    main()
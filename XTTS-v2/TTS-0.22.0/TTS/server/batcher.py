@@ -0,0 +1,216 @@
+import asyncio
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+
+
+class RequestExpired(Exception):
+    """The deadline of a synthesis request passed before its synthesis started."""
+
+
+class SynthesisRequest:
+    """A queued `Synthesizer.tts()` call with its deadline and cancellation flag.
+
+    Args:
+        text (str): Input text.
+        deadline (float, optional): `time.monotonic()` time after which the request is dropped if its synthesis
+            has not started yet. Defaults to None.
+        **tts_kwargs: Other arguments of `Synthesizer.tts()`.
+    """
+
+    def __init__(self, text, deadline=None, **tts_kwargs):
+        self.text = text
+        self.deadline = deadline
+        self.tts_kwargs = tts_kwargs
+        self.enqueue_time = time.monotonic()
+        self.future = asyncio.get_running_loop().create_future()
+        # checked by the replica threads, so a cancelled request is not synthesized
+        self.cancel_event = threading.Event()
+
+    @property
+    def expired(self):
+        return self.deadline is not None and time.monotonic() > self.deadline
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+
+class SynthesizerReplica:
+    """A `Synthesizer` running batches of requests in its own thread pool.
+
+    The requests of a batch are synthesized one after the other. If the model decodes the GPT codes of
+    concurrent calls in a running batch (`Xtts.enable_decode_scheduler()`), they run concurrently in
+    `max_batch_size` threads instead, so their decoding is batched on the model.
+
+    Args:
+        synthesizer (Synthesizer): Loaded synthesizer, used by this replica only.
+        max_batch_size (int, optional): Maximum number of requests of a batch. Defaults to 8.
+    """
+
+    def __init__(self, synthesizer, max_batch_size=8):
+        self.synthesizer = synthesizer
+        self.concurrent = getattr(synthesizer.tts_model, "decode_scheduler", None) is not None
+        self.executor = ThreadPoolExecutor(max_workers=1, thread_name_prefix="tts-replica")
+        self._batch_executor = None
+        if self.concurrent:
+            self._batch_executor = ThreadPoolExecutor(max_workers=max_batch_size, thread_name_prefix="tts-batch")
+
+    @property
+    def sample_rate(self):
+        return self.synthesizer.output_sample_rate
+
+    def _synthesize(self, request):
+        # the request may have waited for the other requests of its batch
+        if request.cancelled:
+            return None
+        if request.expired:
+            return RequestExpired()
+        try:
+            return self.synthesizer.tts(request.text, **request.tts_kwargs)
+        except Exception as e:  # pylint: disable=broad-except
+            return e
+
+    def synthesize_batch(self, requests, on_result):
+        """Synthesize the requests and call `on_result(request, result)` as soon as each of them is done.
+
+        The result is the waveform, an exception or None if the request was cancelled.
+        """
+        if self._batch_executor is not None and len(requests) > 1:
+            futures = {self._batch_executor.submit(self._synthesize, request): request for request in requests}
+            # in completion order, a short request is not held back by a longer one submitted before it
+            for future in as_completed(futures):
+                on_result(futures[future], future.result())
+            return
+        for request in requests:
+            on_result(request, self._synthesize(request))
+
+    def shutdown(self):
+        self.executor.shutdown(wait=False)
+        if self._batch_executor is not None:
+            self._batch_executor.shutdown(wait=False)
+
+
+class DynamicBatcher:
+    """Queue of synthesis requests dispatched in batches to one or more model replicas.
+
+    Every replica has a dispatch task that waits for a request, then collects the requests arriving within
+    `max_wait` seconds, up to `max_batch_size`, and runs them on the replica thread. Every request is answered
+    as soon as its own synthesis is done. A free replica takes the next batch, so the replicas synthesize in
+    parallel. The requests whose deadline passed or that were
+    cancelled while queued are dropped before the dispatch.
+
+    Args:
+        replicas (List[SynthesizerReplica]): Model replicas.
+        max_batch_size (int, optional): Maximum number of requests in a batch. Defaults to 8.
+        max_wait (float, optional): Time in seconds to wait for more requests once the first one of a batch
+            arrived. Defaults to 0.01.
+        max_queue_size (int, optional): Maximum number of queued requests, 0 for no limit. Defaults to 0.
+    """
+
+    def __init__(self, replicas, max_batch_size=8, max_wait=0.01, max_queue_size=0):
+        self.replicas = replicas
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_wait = max_wait
+        self.max_queue_size = max_queue_size
+        self._queue = None
+        self._tasks = []
+        self._stats = {"requests": 0, "batches": 0, "batched_requests": 0, "expired": 0, "cancelled": 0}
+
+    async def start(self):
+        self._queue = asyncio.Queue(maxsize=self.max_queue_size)
+        self._tasks = [asyncio.create_task(self._dispatch(replica)) for replica in self.replicas]
+        return self
+
+    async def shutdown(self):
+        for task in self._tasks:
+            task.cancel()
+        await asyncio.gather(*self._tasks, return_exceptions=True)
+        for replica in self.replicas:
+            replica.shutdown()
+
+    @property
+    def sample_rate(self):
+        return self.replicas[0].sample_rate
+
+    @property
+    def queue_size(self):
+        return self._queue.qsize()
+
+    def stats(self):
+        stats = dict(self._stats)
+        stats["queue_size"] = self.queue_size
+        stats["mean_batch_size"] = stats["batched_requests"] / max(stats["batches"], 1)
+        return stats
+
+    async def synthesize(self, text, timeout=None, **tts_kwargs):
+        """Queue a request and wait for its waveform.
+
+        Raises `RequestExpired` if the synthesis did not start within `timeout` seconds and `asyncio.QueueFull`
+        if the queue is full. If the caller is cancelled, e.g. because the client disconnected, the request is
+        dropped unless its synthesis already started.
+        """
+        deadline = time.monotonic() + timeout if timeout else None
+        request = SynthesisRequest(text, deadline=deadline, **tts_kwargs)
+        self._queue.put_nowait(request)
+        self._stats["requests"] += 1
+        try:
+            return await request.future
+        except asyncio.CancelledError:
+            request.cancel()
+            raise
+
+    def _is_dropped(self, request):
+        if request.cancelled or request.future.cancelled():
+            self._stats["cancelled"] += 1
+            return True
+        if request.expired:
+            self._stats["expired"] += 1
+            request.future.set_exception(RequestExpired())
+            return True
+        return False
+
+    async def _next_batch(self):
+        batch = []
+        request = await self._queue.get()
+        deadline = time.monotonic() + self.max_wait
+        while True:
+            if not self._is_dropped(request):
+                batch.append(request)
+            if len(batch) >= self.max_batch_size:
+                break
+            # poll instead of `wait_for(queue.get())`, which can lose an item when it times out
+            while self._queue.empty() and time.monotonic() < deadline:
+                await asyncio.sleep(min(0.001, self.max_wait))
+            if self._queue.empty():
+                break
+            request = self._queue.get_nowait()
+        return batch
+
+    async def _dispatch(self, replica):
+        loop = asyncio.get_running_loop()
+
+        def on_result(request, result):
+            loop.call_soon_threadsafe(self._set_result, request, result)
+
+        while True:
+            batch = await self._next_batch()
+            if not batch:
+                continue
+            self._stats["batches"] += 1
+            self._stats["batched_requests"] += len(batch)
+            await loop.run_in_executor(replica.executor, replica.synthesize_batch, batch, on_result)
+
+    @staticmethod
+    def _set_result(request, result):
+        if request.future.done():
+            return
+        if result is None:
+            request.future.cancel()
+        elif isinstance(result, BaseException):
+            request.future.set_exception(result)
+        else:
+            request.future.set_result(result)
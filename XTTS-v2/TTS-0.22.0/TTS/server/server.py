@@ -1,17 +1,17 @@
 #!flask/bin/python
 import argparse
 import io
-import json
 import os
 import sys
 from pathlib import Path
 from threading import Lock
-from typing import Union
 from urllib.parse import parse_qs
 
-from flask import Flask, render_template, render_template_string, request, send_file
+from flask import Flask, Response, render_template, render_template_string, request, send_file
 
 from TTS.config import load_config
+from TTS.server.utils import style_wav_uri_to_dict
+from TTS.utils.audio.streaming import STREAM_FORMATS, StreamingAudioEncoder
 from TTS.utils.manage import ModelManager
 from TTS.utils.synthesizer import Synthesizer
 
@@ -128,25 +128,6 @@ use_gst = synthesizer.tts_config.get("use_gst", False)
 app = Flask(__name__)
 
 
-def style_wav_uri_to_dict(style_wav: str) -> Union[str, dict]:
-    """Transform an uri style_wav, in either a string (path to wav file to be use for style transfer)
-    or a dict (gst tokens/values to be use for styling)
-
-    Args:
-        style_wav (str): uri
-
-    Returns:
-        Union[str, dict]: path to file (str) or gst style (dict)
-    """
-    if style_wav:
-        if os.path.isfile(style_wav) and style_wav.endswith(".wav"):
-            return style_wav  # style_wav is a .wav file located on the server
-
-        style_wav = json.loads(style_wav)
-        return style_wav  # style_wav is a gst dictionary with {token1_id : token1_weigth, ...}
-    return None
-
-
 @app.route("/")
 def index():
     return render_template(
@@ -188,18 +169,43 @@ def details():
 lock = Lock()
 
 
+def synthesize_stream(text, encoder, **tts_kwargs):
+    """Yield the encoded audio of every sentence of the text as soon as it is synthesized."""
+    with lock:
+        yield encoder.header()
+        for chunk in synthesizer.tts_chunks(text, **tts_kwargs):
+            data = encoder.encode(chunk)
+            if data:
+                yield data
+        yield encoder.close()
+
+
 @app.route("/api/tts", methods=["GET", "POST"])
 def tts():
+    text = request.headers.get("text") or request.values.get("text", "")
+    speaker_idx = request.headers.get("speaker-id") or request.values.get("speaker_id", "")
+    language_idx = request.headers.get("language-id") or request.values.get("language_id", "")
+    style_wav = request.headers.get("style-wav") or request.values.get("style_wav", "")
+    style_wav = style_wav_uri_to_dict(style_wav)
+    stream = request.headers.get("stream") or request.values.get("stream", "false")
+    stream = stream.lower() in ["true", "1", "yes"]
+    audio_format = request.headers.get("audio-format") or request.values.get("format", "wav")
+    if audio_format not in STREAM_FORMATS:
+        return f"Unknown audio format {audio_format}, use one of {list(STREAM_FORMATS)}.", 400
+
+    print(f" > Model input: {text}")
+    print(f" > Speaker Idx: {speaker_idx}")
+    print(f" > Language Idx: {language_idx}")
+    if stream or audio_format != "wav":
+        # every sentence is encoded and sent once it is synthesized, in chunked transfer encoding
+        encoder = StreamingAudioEncoder(synthesizer.output_sample_rate, audio_format)
+        chunks = synthesize_stream(
+            text, encoder, speaker_name=speaker_idx, language_name=language_idx, style_wav=style_wav
+        )
+        if stream:
+            return Response(chunks, mimetype=encoder.mimetype)
+        return send_file(io.BytesIO(b"".join(chunks)), mimetype=encoder.mimetype)
     with lock:
-        text = request.headers.get("text") or request.values.get("text", "")
-        speaker_idx = request.headers.get("speaker-id") or request.values.get("speaker_id", "")
-        language_idx = request.headers.get("language-id") or request.values.get("language_id", "")
-        style_wav = request.headers.get("style-wav") or request.values.get("style_wav", "")
-        style_wav = style_wav_uri_to_dict(style_wav)
-
-        print(f" > Model input: {text}")
-        print(f" > Speaker Idx: {speaker_idx}")
-        print(f" > Language Idx: {language_idx}")
         wavs = synthesizer.tts(text, speaker_name=speaker_idx, language_name=language_idx, style_wav=style_wav)
         out = io.BytesIO()
         synthesizer.save_wav(wavs, out)
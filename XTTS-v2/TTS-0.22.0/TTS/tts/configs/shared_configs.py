@@ -226,6 +226,10 @@ class BaseTTSConfig(BaseTrainingConfig):
         precompute_num_workers (int):
             Number of workers to precompute features. Defaults to 0.
 
+        feature_store_path (str):
+            Path to a feature store packed by `TTS/bin/pack_feature_store.py` to read the waveforms and the features
+            of the samples from. Defaults to None.
+
         use_noise_augment (bool):
             Augment the input audio with random noise.
 
@@ -318,6 +322,7 @@ class BaseTTSConfig(BaseTrainingConfig):
     compute_energy: bool = False
     compute_linear_spec: bool = False
     precompute_num_workers: int = 0
+    feature_store_path: str = None
     use_noise_augment: bool = False
     start_by_longest: bool = False
     shuffle: bool = False
@@ -9,6 +9,7 @@ import torch
 import tqdm
 from torch.utils.data import Dataset
 
+from TTS.tts.datasets.feature_store import FeatureStore, audio_settings, tokenizer_settings
 from TTS.tts.utils.data import prepare_data, prepare_stop_target, prepare_tensor
 from TTS.utils.audio import AudioProcessor
 from TTS.utils.audio.numpy_transforms import compute_energy as calculate_energy
@@ -62,6 +63,7 @@ class TTSDataset(Dataset):
         max_audio_len: int = float("inf"),
         phoneme_cache_path: str = None,
         precompute_num_workers: int = 0,
+        feature_store_path: str = None,
         speaker_id_mapping: Dict = None,
         d_vector_mapping: Dict = None,
         language_id_mapping: Dict = None,
@@ -117,6 +119,10 @@ class TTSDataset(Dataset):
 
             precompute_num_workers (int): Number of workers to precompute features. Defaults to 0.
 
+            feature_store_path (str): Path to a feature store packed by `TTS/bin/pack_feature_store.py`. The
+                waveforms, mel spectrograms, token IDs, pitch and energy of the samples in the store are read from
+                its memory-mapped shards instead of being loaded and computed. Defaults to None.
+
             speaker_id_mapping (dict): Mapping of speaker names to IDs used to compute embedding vectors by the
                 embedding layer. Defaults to None.
 
@@ -155,18 +161,37 @@ class TTSDataset(Dataset):
         self.pitch_computed = False
         self.tokenizer = tokenizer
 
+        self.feature_store = None
+        if feature_store_path is not None:
+            self.feature_store = FeatureStore(feature_store_path)
+            if self.ap is not None:
+                self.feature_store.check_settings("audio", audio_settings(self.ap))
+            self.feature_store.check_settings("tokenizer", tokenizer_settings(self.tokenizer))
+
         if self.tokenizer.use_phonemes:
             self.phoneme_dataset = PhonemeDataset(
-                self.samples, self.tokenizer, phoneme_cache_path, precompute_num_workers=precompute_num_workers
+                self.samples,
+                self.tokenizer,
+                phoneme_cache_path,
+                precompute_num_workers=precompute_num_workers,
+                feature_store=self.feature_store,
             )
 
         if compute_f0:
             self.f0_dataset = F0Dataset(
-                self.samples, self.ap, cache_path=f0_cache_path, precompute_num_workers=precompute_num_workers
+                self.samples,
+                self.ap,
+                cache_path=f0_cache_path,
+                precompute_num_workers=precompute_num_workers,
+                feature_store=self.feature_store,
             )
         if compute_energy:
             self.energy_dataset = EnergyDataset(
-                self.samples, self.ap, cache_path=energy_cache_path, precompute_num_workers=precompute_num_workers
+                self.samples,
+                self.ap,
+                cache_path=energy_cache_path,
+                precompute_num_workers=precompute_num_workers,
+                feature_store=self.feature_store,
             )
         if self.verbose:
             self.print_logs()
@@ -213,6 +238,12 @@ class TTSDataset(Dataset):
         assert waveform.size > 0
         return waveform
 
+    def get_stored(self, feature, item):
+        """Return the feature of the sample from the feature store or None if it is not stored."""
+        if self.feature_store is None or not self.feature_store.has(feature, item["audio_unique_name"]):
+            return None
+        return self.feature_store.get(feature, item["audio_unique_name"])
+
     def get_phonemes(self, idx, text):
         out_dict = self.phoneme_dataset[idx]
         assert text == out_dict["text"], f"{text} != {out_dict['text']}"
@@ -236,6 +267,9 @@ class TTSDataset(Dataset):
         return np.load(attn_file)
 
     def get_token_ids(self, idx, text):
+        token_ids = self.get_stored("token_ids", self.samples[idx])
+        if token_ids is not None:
+            return token_ids
         if self.tokenizer.use_phonemes:
             token_ids = self.get_phonemes(idx, text)["token_ids"]
         else:
@@ -247,7 +281,14 @@ class TTSDataset(Dataset):
 
         raw_text = item["text"]
 
-        wav = np.asarray(self.load_wav(item["audio_file"]), dtype=np.float32)
+        wav = self.get_stored("wav", item)
+        if wav is None:
+            wav = np.asarray(self.load_wav(item["audio_file"]), dtype=np.float32)
+
+        # the stored mel spectrogram is computed from the waveform without noise
+        mel = None
+        if not self.use_noise_augment:
+            mel = self.get_stored("mel", item)
 
         # apply noise for augmentation
         if self.use_noise_augment:
@@ -280,6 +321,7 @@ class TTSDataset(Dataset):
             "raw_text": raw_text,
             "token_ids": token_ids,
             "wav": wav,
+            "mel": mel,
             "pitch": f0,
             "energy": energy,
             "attn": attn,
@@ -438,8 +480,11 @@ class TTSDataset(Dataset):
                 speaker_ids = [self.speaker_id_mapping[sn] for sn in batch["speaker_name"]]
             else:
                 speaker_ids = None
-            # compute features
-            mel = [self.ap.melspectrogram(w).astype("float32") for w in batch["wav"]]
+            # compute features, unless they are read from the feature store
+            mel = [
+                self.ap.melspectrogram(w).astype("float32") if m is None else m
+                for w, m in zip(batch["wav"], batch.get("mel", [None] * len(batch["wav"])))
+            ]
 
             mel_lengths = [m.shape[1] for m in mel]
 
@@ -581,6 +626,9 @@ class PhonemeDataset(Dataset):
 
         precompute_num_workers (int):
             Number of workers used for pre-computing the phonemes. Defaults to 0.
+
+        feature_store (FeatureStore):
+            Feature store to read the token IDs from. If it has them, it skips the pre-computation. Defaults to None.
     """
 
     def __init__(
@@ -589,17 +637,26 @@ class PhonemeDataset(Dataset):
         tokenizer: "TTSTokenizer",
         cache_path: str,
         precompute_num_workers=0,
+        feature_store: FeatureStore = None,
     ):
         self.samples = samples
         self.tokenizer = tokenizer
         self.cache_path = cache_path
+        if feature_store is not None and "token_ids" not in feature_store.features:
+            feature_store = None
+        self.feature_store = feature_store
         if cache_path is not None and not os.path.exists(cache_path):
             os.makedirs(cache_path)
-            self.precompute(precompute_num_workers)
+            # with a feature store, only the samples missing from it are computed and cached on the fly
+            if self.feature_store is None:
+                self.precompute(precompute_num_workers)
 
     def __getitem__(self, index):
         item = self.samples[index]
-        ids = self.compute_or_load(string2filename(item["audio_unique_name"]), item["text"], item["language"])
+        if self.feature_store is not None and self.feature_store.has("token_ids", item["audio_unique_name"]):
+            ids = self.feature_store.get("token_ids", item["audio_unique_name"])
+        else:
+            ids = self.compute_or_load(string2filename(item["audio_unique_name"]), item["text"], item["language"])
         ph_hat = self.tokenizer.ids_to_text(ids)
         return {"text": item["text"], "ph_hat": ph_hat, "token_ids": ids, "token_ids_len": len(ids)}
 
@@ -680,6 +737,10 @@ class F0Dataset:
 
         normalize_f0 (bool):
             Whether to normalize F0 values by mean and std. Defaults to True.
+
+        feature_store (FeatureStore):
+            Feature store to read the F0 values and their mean and std from. If it has them, it skips the
+            pre-computation. Defaults to None.
     """
 
     def __init__(
@@ -691,6 +752,7 @@ class F0Dataset:
         cache_path: str = None,
         precompute_num_workers=0,
         normalize_f0=True,
+        feature_store: FeatureStore = None,
     ):
         self.samples = samples
         self.ap = ap
@@ -700,15 +762,23 @@ class F0Dataset:
         self.pad_id = 0.0
         self.mean = None
         self.std = None
+        if feature_store is not None and "pitch" not in feature_store.features:
+            feature_store = None
+        self.feature_store = feature_store
         if cache_path is not None and not os.path.exists(cache_path):
             os.makedirs(cache_path)
-            self.precompute(precompute_num_workers)
+            # with a feature store, only the samples missing from it are computed and cached on the fly
+            if self.feature_store is None:
+                self.precompute(precompute_num_workers)
         if normalize_f0:
             self.load_stats(cache_path)
 
     def __getitem__(self, idx):
         item = self.samples[idx]
-        f0 = self.compute_or_load(item["audio_file"], string2filename(item["audio_unique_name"]))
+        if self.feature_store is not None and self.feature_store.has("pitch", item["audio_unique_name"]):
+            f0 = self.feature_store.get("pitch", item["audio_unique_name"])
+        else:
+            f0 = self.compute_or_load(item["audio_file"], string2filename(item["audio_unique_name"]))
         if self.normalize_f0:
             assert self.mean is not None and self.std is not None, " [!] Mean and STD is not available"
             f0 = self.normalize(f0)
@@ -763,10 +833,13 @@ class F0Dataset:
         return mean, std
 
     def load_stats(self, cache_path):
-        stats_path = os.path.join(cache_path, "pitch_stats.npy")
-        stats = np.load(stats_path, allow_pickle=True).item()
-        self.mean = stats["mean"].astype(np.float32)
-        self.std = stats["std"].astype(np.float32)
+        if self.feature_store is not None:
+            stats = self.feature_store.metadata["pitch_stats"]
+        else:
+            stats_path = os.path.join(cache_path, "pitch_stats.npy")
+            stats = np.load(stats_path, allow_pickle=True).item()
+        self.mean = np.float32(stats["mean"])
+        self.std = np.float32(stats["std"])
 
     def normalize(self, pitch):
         zero_idxs = np.where(pitch == 0.0)[0]
@@ -832,6 +905,10 @@ class EnergyDataset:
 
         normalize_Energy (bool):
             Whether to normalize Energy values by mean and std. Defaults to True.
+
+        feature_store (FeatureStore):
+            Feature store to read the Energy values and their mean and std from. If it has them, it skips the
+            pre-computation. Defaults to None.
     """
 
     def __init__(
@@ -842,6 +919,7 @@ class EnergyDataset:
         cache_path: str = None,
         precompute_num_workers=0,
         normalize_energy=True,
+        feature_store: FeatureStore = None,
     ):
         self.samples = samples
         self.ap = ap
@@ -851,15 +929,23 @@ class EnergyDataset:
         self.pad_id = 0.0
         self.mean = None
         self.std = None
+        if feature_store is not None and "energy" not in feature_store.features:
+            feature_store = None
+        self.feature_store = feature_store
         if cache_path is not None and not os.path.exists(cache_path):
             os.makedirs(cache_path)
-            self.precompute(precompute_num_workers)
+            # with a feature store, only the samples missing from it are computed and cached on the fly
+            if self.feature_store is None:
+                self.precompute(precompute_num_workers)
         if normalize_energy:
             self.load_stats(cache_path)
 
     def __getitem__(self, idx):
         item = self.samples[idx]
-        energy = self.compute_or_load(item["audio_file"], string2filename(item["audio_unique_name"]))
+        if self.feature_store is not None and self.feature_store.has("energy", item["audio_unique_name"]):
+            energy = self.feature_store.get("energy", item["audio_unique_name"])
+        else:
+            energy = self.compute_or_load(item["audio_file"], string2filename(item["audio_unique_name"]))
         if self.normalize_energy:
             assert self.mean is not None and self.std is not None, " [!] Mean and STD is not available"
             energy = self.normalize(energy)
@@ -915,10 +1001,13 @@ class EnergyDataset:
         return mean, std
 
     def load_stats(self, cache_path):
-        stats_path = os.path.join(cache_path, "energy_stats.npy")
-        stats = np.load(stats_path, allow_pickle=True).item()
-        self.mean = stats["mean"].astype(np.float32)
-        self.std = stats["std"].astype(np.float32)
+        if self.feature_store is not None:
+            stats = self.feature_store.metadata["energy_stats"]
+        else:
+            stats_path = os.path.join(cache_path, "energy_stats.npy")
+            stats = np.load(stats_path, allow_pickle=True).item()
+        self.mean = np.float32(stats["mean"])
+        self.std = np.float32(stats["std"])
 
     def normalize(self, energy):
         zero_idxs = np.where(energy == 0.0)[0]
@@ -0,0 +1,213 @@
+import json
+import os
+from typing import Dict, List
+
+import numpy as np
+
+INDEX_FILE = "index.json"
+OFFSETS_FILE = "offsets.npz"
+
+# `AudioProcessor` attributes the stored waveforms and features depend on
+AUDIO_SETTINGS = (
+    "sample_rate",
+    "resample",
+    "do_trim_silence",
+    "trim_db",
+    "do_sound_norm",
+    "do_rms_norm",
+    "db_level",
+    "fft_size",
+    "hop_length",
+    "win_length",
+    "num_mels",
+    "mel_fmin",
+    "mel_fmax",
+    "preemphasis",
+    "ref_level_db",
+    "min_level_db",
+    "power",
+    "log_func",
+    "spec_gain",
+    "signal_norm",
+    "symmetric_norm",
+    "max_norm",
+    "clip_norm",
+    "stats_path",
+    "pitch_fmin",
+    "pitch_fmax",
+)
+
+
+def audio_settings(ap: "AudioProcessor") -> Dict:
+    """Return the settings of an `AudioProcessor` that the stored waveforms and features depend on."""
+    return {name: getattr(ap, name, None) for name in AUDIO_SETTINGS}
+
+
+def tokenizer_settings(tokenizer: "TTSTokenizer") -> Dict:
+    """Return the settings of a `TTSTokenizer` that the stored token IDs depend on."""
+    return {
+        "use_phonemes": tokenizer.use_phonemes,
+        "phonemizer": tokenizer.phonemizer.name() if tokenizer.phonemizer is not None else None,
+        "add_blank": tokenizer.add_blank,
+        "use_eos_bos": tokenizer.use_eos_bos,
+        "vocab": list(tokenizer.characters.vocab),
+    }
+
+
+class FeatureStoreWriter:
+    """Pack per-sample arrays into a few large shard files per feature, with an offset index.
+
+    Every feature is written to `<feature>_<shard>.bin` files of raw array bytes, starting a new shard when the
+    current one would exceed `shard_size` bytes. The dtype of each feature is fixed by its first array. The index
+    is written by `close()`: `index.json` has the keys, the dtypes, the shard files and the metadata, and
+    `offsets.npz` the shard, byte offset and shape of every array.
+
+    Args:
+        path (str): Output folder.
+        shard_size (int, optional): Maximum size of a shard file in bytes. Defaults to 1GB.
+        metadata (Dict, optional): JSON serializable metadata stored with the index. Defaults to None.
+    """
+
+    def __init__(self, path: str, shard_size: int = 1 << 30, metadata: Dict = None):
+        self.path = path
+        self.shard_size = shard_size
+        self.metadata = dict(metadata or {})
+        self.keys = []
+        self._key_set = set()
+        self._features = {}
+        os.makedirs(path, exist_ok=True)
+
+    def add(self, key: str, **features: np.ndarray):
+        """Append the arrays of a sample, e.g. `writer.add("sample_1", wav=wav, mel=mel)`."""
+        if key in self._key_set:
+            raise ValueError(f" [!] Duplicate key {key} in the feature store.")
+        idx = len(self.keys)
+        self.keys.append(key)
+        self._key_set.add(key)
+        for name, array in features.items():
+            self._write(name, idx, np.ascontiguousarray(array))
+
+    def _write(self, name, idx, array):
+        if name not in self._features:
+            self._features[name] = {"dtype": array.dtype.str, "shards": [], "file": None, "size": 0, "rows": {}}
+        feature = self._features[name]
+        if array.dtype.str != feature["dtype"]:
+            array = array.astype(feature["dtype"])
+        if feature["file"] is None or (feature["size"] > 0 and feature["size"] + array.nbytes > self.shard_size):
+            if feature["file"] is not None:
+                feature["file"].close()
+            feature["shards"].append(f"{name}_{len(feature['shards']):04d}.bin")
+            feature["file"] = open(os.path.join(self.path, feature["shards"][-1]), "wb")
+            feature["size"] = 0
+        feature["rows"][idx] = (len(feature["shards"]) - 1, feature["size"], array.shape)
+        feature["file"].write(array.tobytes())
+        feature["size"] += array.nbytes
+
+    def close(self):
+        """Close the shards and write the index."""
+        offsets = {}
+        features = {}
+        num_keys = len(self.keys)
+        for name, feature in self._features.items():
+            if feature["file"] is not None:
+                feature["file"].close()
+            ndim = max(len(shape) for _, _, shape in feature["rows"].values())
+            # samples without the feature have shard -1
+            shard = np.full(num_keys, -1, dtype=np.int32)
+            offset = np.zeros(num_keys, dtype=np.int64)
+            shape = np.zeros((num_keys, ndim), dtype=np.int64)
+            for idx, (row_shard, row_offset, row_shape) in feature["rows"].items():
+                shard[idx] = row_shard
+                offset[idx] = row_offset
+                shape[idx, : len(row_shape)] = row_shape
+            offsets.update({f"{name}_shard": shard, f"{name}_offset": offset, f"{name}_shape": shape})
+            features[name] = {"dtype": feature["dtype"], "ndim": ndim, "shards": feature["shards"]}
+        np.savez(os.path.join(self.path, OFFSETS_FILE), **offsets)
+        with open(os.path.join(self.path, INDEX_FILE), "w", encoding="utf-8") as f:
+            json.dump({"keys": self.keys, "features": features, "metadata": self.metadata}, f)
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *args):
+        self.close()
+
+
+class FeatureStore:
+    """Read-only view of a folder written by `FeatureStoreWriter`.
+
+    The shard files are memory-mapped on first use in each process, and `get()` returns a read-only array over the
+    mapped bytes without copying them, so the data loader workers share the page cache instead of decoding files.
+
+    Args:
+        path (str): Folder of the feature store.
+
+    Example:
+        >>> store = FeatureStore("/data/ljspeech_features")
+        >>> mel = store.get("mel", item["audio_unique_name"])
+    """
+
+    def __init__(self, path: str):
+        self.path = path
+        with open(os.path.join(path, INDEX_FILE), "r", encoding="utf-8") as f:
+            index = json.load(f)
+        self.keys = index["keys"]
+        self.metadata = index["metadata"]
+        self._features = index["features"]
+        self._key_to_idx = {key: idx for idx, key in enumerate(self.keys)}
+        with np.load(os.path.join(path, OFFSETS_FILE)) as offsets:
+            self._offsets = {name: offsets[name] for name in offsets.files}
+        self._shards = {}
+
+    @property
+    def features(self) -> List[str]:
+        return list(self._features)
+
+    def __len__(self):
+        return len(self.keys)
+
+    def __contains__(self, key):
+        return key in self._key_to_idx
+
+    def has(self, feature: str, key: str) -> bool:
+        """Whether the feature of the sample is stored."""
+        idx = self._key_to_idx.get(key)
+        return idx is not None and feature in self._features and self._offsets[f"{feature}_shard"][idx] >= 0
+
+    def shape(self, feature: str, key: str) -> tuple:
+        idx = self._key_to_idx[key]
+        return tuple(self._offsets[f"{feature}_shape"][idx, : self._features[feature]["ndim"]])
+
+    def _shard(self, feature, shard):
+        if (feature, shard) not in self._shards:
+            file_path = os.path.join(self.path, self._features[feature]["shards"][shard])
+            self._shards[(feature, shard)] = np.memmap(file_path, dtype=np.uint8, mode="r")
+        return self._shards[(feature, shard)]
+
+    def get(self, feature: str, key: str) -> np.ndarray:
+        """Return the stored array of a sample as a read-only view of the shard."""
+        if not self.has(feature, key):
+            raise KeyError(f" [!] {feature} of {key} is not in the feature store {self.path}.")
+        idx = self._key_to_idx[key]
+        shape = self.shape(feature, key)
+        data = self._shard(feature, self._offsets[f"{feature}_shard"][idx])
+        return np.frombuffer(
+            data,
+            dtype=self._features[feature]["dtype"],
+            count=int(np.prod(shape)),
+            offset=int(self._offsets[f"{feature}_offset"][idx]),
+        ).reshape(shape)
+
+    def check_settings(self, name: str, settings: Dict):
+        """Raise a `ValueError` if the settings the store was packed with differ from the given ones."""
+        stored = self.metadata.get(name)
+        # round trip through JSON to compare the same types
+        if stored is not None and stored != json.loads(json.dumps(settings)):
+            diff = [k for k in settings if stored.get(k) != json.loads(json.dumps(settings[k]))]
+            raise ValueError(f" [!] The feature store {self.path} was packed with different {name} settings: {diff}")
+
+    def __getstate__(self):
+        # do not pickle the memory maps to the data loader workers, they map the shards again
+        state = self.__dict__.copy()
+        state["_shards"] = {}
+        return state
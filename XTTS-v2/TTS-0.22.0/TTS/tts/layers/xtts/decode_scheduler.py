@@ -0,0 +1,310 @@
+import queue
+import threading
+from concurrent.futures import Future
+
+import torch
+import torch.nn.functional as F
+
+
+class DecodeRequest:
+    """A sequence decoded by `GPTDecodeScheduler` with its own conditioning and sampling settings."""
+
+    def __init__(
+        self,
+        cond_latents,
+        text_tokens,
+        temperature=0.75,
+        top_k=50,
+        top_p=0.85,
+        repetition_penalty=10.0,
+        do_sample=True,
+        max_new_tokens=None,
+    ):
+        if temperature <= 0:
+            raise ValueError(f" ❗ `temperature` must be strictly positive, got {temperature}")
+        self.cond_latents = cond_latents
+        self.text_tokens = text_tokens
+        self.temperature = temperature
+        self.top_k = top_k
+        self.top_p = top_p
+        self.repetition_penalty = repetition_penalty
+        self.do_sample = do_sample
+        self.max_new_tokens = max_new_tokens
+        self.future = Future()
+        self.codes = []
+
+
+class GPTDecodeScheduler:
+    """Iteration level (continuous) batching of the XTTS GPT decoding.
+
+    `GPT.generate` decodes the requests one at a time, so concurrent requests wait for each other and every
+    decode step is a batch 1 matmul. The scheduler keeps a running batch of sequences from different requests
+    and runs a single transformer step for all of them. Between the steps it admits the waiting requests and
+    retires the finished ones, so a short request never waits for a long one to finish.
+
+    Every admitted request runs its own prefill (conditioning latents, text and `start_audio_token`) and its
+    KV cache is left padded to the length of the running batch. The GPT has no absolute position embeddings
+    (`wpe` is null and the mel positions are added to the inputs), so left padding is masked out by the
+    attention mask without changing the result. The sampling settings (temperature, top-k, top-p, repetition
+    penalty, greedy decoding) are applied per sequence and follow the HuggingFace `generate` logits processors,
+    so a greedy request decodes the same codes as `GPT.generate(do_sample=False)`.
+
+    The model is only called from the thread that runs `step()`: either the background worker started by
+    `start()` or the caller of `run_until_complete()`.
+
+    Args:
+        gpt (GPT): XTTS GPT with `init_gpt_for_inference()` called.
+        max_batch_size (int, optional): Maximum number of sequences decoded together. Defaults to 8.
+    """
+
+    def __init__(self, gpt, max_batch_size=8):
+        self.gpt = gpt
+        self.max_batch_size = max(1, max_batch_size)
+        self._requests = queue.Queue()
+        self._rows = []
+        self._past = None
+        self._attention_mask = None
+        self._seen_tokens = None
+        self._stopped = threading.Event()
+        self._worker = None
+        self._steps = 0
+        self._decoded_tokens = 0
+
+    @property
+    def device(self):
+        return next(self.gpt.parameters()).device
+
+    def submit(self, cond_latents, text_tokens, **sampling_kwargs):
+        """Queue a request and return a `concurrent.futures.Future` with its codes.
+
+        Args:
+            cond_latents (Tensor): Conditioning latents of shape `(1, T_cond, C)`.
+            text_tokens (Tensor): Text tokens of shape `(1, T_text)`.
+            **sampling_kwargs: `temperature`, `top_k`, `top_p`, `repetition_penalty`, `do_sample` and
+                `max_new_tokens` (defaults to `gpt.max_gen_mel_tokens`).
+
+        Returns:
+            Future resolving to a `(1, T_codes)` LongTensor of mel codes, ending with `stop_audio_token` unless
+            the sequence hit `max_new_tokens`, as returned by `GPT.generate`.
+        """
+        request = DecodeRequest(cond_latents, text_tokens, **sampling_kwargs)
+        self._requests.put(request)
+        return request.future
+
+    def generate(self, cond_latents, text_tokens, timeout=None, **sampling_kwargs):
+        """Blocking version of `submit()`. Requires the worker started by `start()`."""
+        return self.submit(cond_latents, text_tokens, **sampling_kwargs).result(timeout=timeout)
+
+    def start(self):
+        """Start the background worker that decodes the submitted requests."""
+        if self._worker is None:
+            self._worker = threading.Thread(target=self._run, name="gpt-decode-scheduler", daemon=True)
+            self._worker.start()
+        return self
+
+    def shutdown(self):
+        self._stopped.set()
+        # wake up the worker if it is waiting for requests
+        self._requests.put(None)
+
+    def stats(self):
+        """Number of running and waiting sequences and the average decode batch size so far."""
+        return {
+            "active": len(self._rows),
+            "pending": self._requests.qsize(),
+            "steps": self._steps,
+            "avg_batch_size": self._decoded_tokens / self._steps if self._steps else 0.0,
+        }
+
+    def _run(self):
+        with torch.inference_mode():
+            while not self._stopped.is_set():
+                try:
+                    if not self._rows:
+                        # idle: block until a request arrives
+                        request = self._requests.get()
+                        if request is None:
+                            continue
+                        self._admit(request)
+                    self.step()
+                except Exception as e:  # pylint: disable=broad-except
+                    # a failed step leaves the batch in an unknown state, fail the running sequences
+                    self._fail_running(e)
+
+    def _fail_running(self, error):
+        for row in self._rows:
+            row.future.set_exception(error)
+        self._rows = []
+        self._past = self._attention_mask = self._seen_tokens = None
+
+    def run_until_complete(self):
+        """Decode in the calling thread until all the submitted requests are finished."""
+        with torch.inference_mode():
+            while self._rows or not self._requests.empty():
+                self.step()
+
+    def step(self):
+        """Admit waiting requests up to `max_batch_size`, then run one decode step for the running batch."""
+        while len(self._rows) < self.max_batch_size:
+            try:
+                request = self._requests.get_nowait()
+            except queue.Empty:
+                break
+            if request is not None:
+                self._admit(request)
+        if self._rows:
+            self._decode_step()
+
+    def _admit(self, request):
+        if not request.future.set_running_or_notify_cancel():
+            return
+        try:
+            logits, past = self._prefill(request)
+            seen_tokens = torch.zeros(1, logits.shape[-1], dtype=torch.bool, device=logits.device)
+            # `GPT.generate` feeds placeholder ids (1) for the prefix, the repetition penalty sees them too
+            seen_tokens[:, 1] = True
+            seen_tokens[:, self.gpt.start_audio_token] = True
+            tokens = self._sample(logits, seen_tokens, [request])
+            seen_tokens.scatter_(1, tokens.unsqueeze(1), True)
+            if self._append_tokens([request], tokens)[0]:
+                return
+            self._merge(request, past, seen_tokens)
+        except Exception as e:  # pylint: disable=broad-except
+            # `_merge()` only updates the running batch once all the new tensors are built, so it stays consistent
+            if not request.future.done():
+                request.future.set_exception(e)
+
+    def _prefill(self, request):
+        gpt = self.gpt
+        text_inputs = request.text_tokens.to(self.device)
+        text_inputs = F.pad(text_inputs, (0, 1), value=gpt.stop_text_token)
+        text_inputs = F.pad(text_inputs, (1, 0), value=gpt.start_text_token)
+        text_emb = gpt.text_embedding(text_inputs) + gpt.text_pos_embedding(text_inputs)
+        start_tokens = torch.full((1, 1), gpt.start_audio_token, dtype=torch.long, device=self.device)
+        mel_emb = gpt.mel_embedding(start_tokens) + gpt.mel_pos_embedding(start_tokens)
+        cond_latents = request.cond_latents.to(device=self.device, dtype=mel_emb.dtype)
+        emb = torch.cat([cond_latents, text_emb, mel_emb], dim=1)
+        outputs = gpt.gpt(inputs_embeds=emb, use_cache=True, return_dict=True)
+        return self._logits(outputs.last_hidden_state[:, -1]), outputs.past_key_values
+
+    def _logits(self, hidden_states):
+        return self.gpt.mel_head(self.gpt.final_norm(hidden_states))
+
+    def _merge(self, request, past, seen_tokens):
+        """Add a prefilled sequence to the running batch, left padding the shorter KV caches."""
+        length = past[0][0].shape[2]
+        mask = torch.ones(1, length, dtype=torch.long, device=self.device)
+        if not self._rows:
+            self._past = [list(layer_past) for layer_past in past]
+            self._attention_mask = mask
+            self._seen_tokens = seen_tokens
+            self._rows = [request]
+            return
+
+        batch_length = self._attention_mask.shape[1]
+        new_length = max(length, batch_length)
+        new_past = [
+            [
+                torch.cat([_left_pad(batch_state, new_length, dim=2), _left_pad(state, new_length, dim=2)], dim=0)
+                for batch_state, state in zip(batch_layer, layer_past)
+            ]
+            for batch_layer, layer_past in zip(self._past, past)
+        ]
+        new_attention_mask = torch.cat(
+            [_left_pad(self._attention_mask, new_length, dim=1), _left_pad(mask, new_length, dim=1)], dim=0
+        )
+        new_seen_tokens = torch.cat([self._seen_tokens, seen_tokens], dim=0)
+        # build everything first, a failure (e.g. out of memory) must not leave a half merged batch
+        self._past, self._attention_mask, self._seen_tokens = new_past, new_attention_mask, new_seen_tokens
+        self._rows.append(request)
+
+    def _decode_step(self):
+        gpt = self.gpt
+        last_tokens = torch.tensor([row.codes[-1] for row in self._rows], device=self.device)
+        # the n-th generated code is at mel position n, the start token is at position 0
+        positions = torch.tensor([len(row.codes) for row in self._rows], device=self.device)
+        emb = gpt.mel_embedding(last_tokens) + gpt.mel_pos_embedding.emb(positions)
+        self._attention_mask = F.pad(self._attention_mask, (0, 1), value=1)
+        outputs = gpt.gpt(
+            inputs_embeds=emb.unsqueeze(1),
+            past_key_values=tuple(tuple(layer_past) for layer_past in self._past),
+            attention_mask=self._attention_mask,
+            use_cache=True,
+            return_dict=True,
+        )
+        self._past = [list(layer_past) for layer_past in outputs.past_key_values]
+        tokens = self._sample(self._logits(outputs.last_hidden_state[:, -1]), self._seen_tokens, self._rows)
+        self._seen_tokens.scatter_(1, tokens.unsqueeze(1), True)
+        self._steps += 1
+        self._decoded_tokens += len(self._rows)
+
+        finished = self._append_tokens(self._rows, tokens)
+        if any(finished):
+            self._retire(finished)
+
+    def _append_tokens(self, rows, tokens):
+        """Append the sampled tokens and resolve the finished sequences. Returns the finished flags."""
+        finished = []
+        for row, token in zip(rows, tokens.tolist()):
+            row.codes.append(token)
+            max_new_tokens = row.max_new_tokens or self.gpt.max_gen_mel_tokens
+            done = token == self.gpt.stop_audio_token or len(row.codes) >= max_new_tokens
+            if done:
+                row.future.set_result(torch.tensor([row.codes], dtype=torch.long))
+            finished.append(done)
+        return finished
+
+    def _retire(self, finished):
+        keep = [idx for idx, done in enumerate(finished) if not done]
+        self._rows = [self._rows[idx] for idx in keep]
+        if not self._rows:
+            self._past = self._attention_mask = self._seen_tokens = None
+            return
+        keep = torch.tensor(keep, device=self.device)
+        attention_mask = self._attention_mask.index_select(0, keep)
+        # drop the leading columns that are padding for all the remaining sequences
+        offset = int((attention_mask.sum(dim=0) > 0).int().argmax())
+        self._attention_mask = attention_mask[:, offset:]
+        self._past = [[state.index_select(0, keep)[:, :, offset:] for state in layer_past] for layer_past in self._past]
+        self._seen_tokens = self._seen_tokens.index_select(0, keep)
+
+    def _sample(self, logits, seen_tokens, rows):
+        """Pick the next token of each row like the HuggingFace logits processors and warpers do."""
+        logits = logits.float()
+        device = logits.device
+        penalty = torch.tensor([row.repetition_penalty for row in rows], device=device).unsqueeze(1)
+        penalized = torch.where(logits < 0, logits * penalty, logits / penalty)
+        logits = torch.where(seen_tokens, penalized, logits)
+        greedy_tokens = logits.argmax(dim=-1)
+        do_sample = torch.tensor([row.do_sample for row in rows], device=device)
+        if not do_sample.any():
+            return greedy_tokens
+
+        temperature = torch.tensor([row.temperature for row in rows], device=device).unsqueeze(1)
+        logits = logits / temperature
+
+        vocab_size = logits.shape[-1]
+        top_k = torch.tensor([min(row.top_k or vocab_size, vocab_size) for row in rows], device=device)
+        top_values = torch.topk(logits, int(top_k.max()), dim=-1).values
+        kth_values = top_values.gather(1, (top_k - 1).unsqueeze(1))
+        logits = logits.masked_fill(logits < kth_values, -float("inf"))
+
+        top_p = torch.tensor([row.top_p if row.top_p is not None else 1.0 for row in rows], device=device)
+        sorted_logits, sorted_indices = torch.sort(logits, descending=False)
+        cumulative_probs = sorted_logits.softmax(dim=-1).cumsum(dim=-1)
+        sorted_to_remove = (cumulative_probs <= (1 - top_p).unsqueeze(1)) & (top_p < 1.0).unsqueeze(1)
+        sorted_to_remove[:, -1] = False
+        to_remove = sorted_to_remove.scatter(1, sorted_indices, sorted_to_remove)
+        logits = logits.masked_fill(to_remove, -float("inf"))
+
+        sampled_tokens = torch.multinomial(logits.softmax(dim=-1), num_samples=1).squeeze(1)
+        return torch.where(do_sample, sampled_tokens, greedy_tokens)
+
+
+def _left_pad(tensor, length, dim):
+    pad_len = length - tensor.shape[dim]
+    if pad_len == 0:
+        return tensor
+    pad_shape = list(tensor.shape)
+    pad_shape[dim] = pad_len
+    return torch.cat([tensor.new_zeros(pad_shape), tensor], dim=dim)
@@ -7,7 +7,7 @@ import random
 import torch
 import torch.nn as nn
 import torch.nn.functional as F
-from transformers import GPT2Config
+from transformers import GPT2Config, LogitsProcessor
 
 from TTS.tts.layers.xtts.gpt_inference import GPT2InferenceModel
 from TTS.tts.layers.xtts.latent_encoder import ConditioningEncoder
@@ -18,6 +18,28 @@ def null_position_embeddings(range, dim):
     return torch.zeros((range.shape[0], range.shape[1], dim), device=range.device)
 
 
+class PerSequenceTemperatureLogitsWarper(LogitsProcessor):
+    """Temperature scaling with a separate temperature for each sequence of the batch.
+
+    HuggingFace `generate` only accepts a scalar temperature. This processor lets a single batched
+    `generate` call sample several variations of the same input with different temperatures.
+
+    Args:
+        temperatures (List[float]): One temperature per input sequence. Sequences expanded by
+            `num_return_sequences` share the temperature of their source row.
+    """
+
+    def __init__(self, temperatures):
+        self.temperatures = torch.tensor(temperatures, dtype=torch.float)
+        if torch.any(self.temperatures <= 0):
+            raise ValueError(f" ❗ `temperatures` must be strictly positive, got {temperatures}")
+
+    def __call__(self, input_ids, scores):
+        temperatures = self.temperatures.to(device=scores.device, dtype=scores.dtype)
+        temperatures = temperatures.repeat_interleave(scores.shape[0] // temperatures.shape[0])
+        return scores / temperatures.unsqueeze(1)
+
+
 class LearnedPositionEmbeddings(nn.Module):
     def __init__(self, seq_len, model_dim, init=0.02, relative=False):
         super().__init__()
@@ -195,7 +217,7 @@ class GPT(nn.Module):
             "heads": list(self.text_head.parameters()) + list(self.mel_head.parameters()),
         }
 
-    def init_gpt_for_inference(self, kv_cache=True, use_deepspeed=False):
+    def init_gpt_for_inference(self, kv_cache=True, use_deepspeed=False, static_kv_cache=False):
         seq_length = self.max_prompt_tokens + self.max_mel_tokens + self.max_text_tokens + 1
         gpt_config = GPT2Config(
             vocab_size=self.max_mel_tokens,
@@ -215,6 +237,8 @@ class GPT(nn.Module):
             self.final_norm,
             self.mel_head,
             kv_cache=kv_cache,
+            # DeepSpeed replaces the transformer blocks the static cache forward relies on
+            static_kv_cache=static_kv_cache and not use_deepspeed,
         )
         self.gpt.wte = self.mel_embedding
 
@@ -458,6 +482,23 @@ class GPT(nn.Module):
         attn_mask_cond = None
         attn_mask_text = None
         attn_mask_mel = None
+        if return_latent and (text_lengths < max_text_len).any():
+            # batched inference over texts of different lengths: mask the text padding, but not the stop token
+            attn_mask_text = torch.ones(
+                text_inputs.shape[0],
+                text_inputs.shape[1],
+                dtype=torch.bool,
+                device=text_inputs.device,
+            )
+            for idx, l in enumerate(text_lengths):
+                text_inputs[idx, l + 1] = self.stop_text_token
+                attn_mask_text[idx, l + 2 :] = 0.0
+            attn_mask_mel = torch.ones(
+                audio_codes.shape[0],
+                audio_codes.shape[1],
+                dtype=torch.bool,
+                device=audio_codes.device,
+            )
         if not return_latent:
             attn_mask_cond = torch.ones(
                 cond_mels.shape[0],
@@ -580,13 +621,54 @@ class GPT(nn.Module):
         gpt_inputs[:, -1] = self.start_audio_token
         return gpt_inputs
 
+    def compute_batch_embeddings(self, cond_latents, text_inputs, text_lengths):
+        """Prefix embeddings of a batch of texts of different lengths, left padded to the longest one.
+
+        Each row gets the `cond_latents` and its own text with start and stop tokens and text positions. The
+        prefixes are left padded, so the mel codes of all the rows start at the same step. The GPT has no
+        absolute position embeddings, so the padding only has to be masked by the returned attention mask.
+
+        Returns:
+            The fake `generate()` inputs and their attention mask, both of shape `(B, T_prefix + 1)`.
+        """
+        batch_size = text_inputs.shape[0]
+        cond_latents = cond_latents.expand(batch_size, -1, -1)
+        prefixes = []
+        for idx in range(batch_size):
+            row_inputs = text_inputs[idx : idx + 1, : text_lengths[idx]]
+            row_inputs = F.pad(row_inputs, (0, 1), value=self.stop_text_token)
+            row_inputs = F.pad(row_inputs, (1, 0), value=self.start_text_token)
+            emb = self.text_embedding(row_inputs) + self.text_pos_embedding(row_inputs)
+            prefixes.append(torch.cat([cond_latents[idx : idx + 1], emb], dim=1))
+        prefix_len = max(prefix.shape[1] for prefix in prefixes)
+        attention_mask = torch.ones(batch_size, prefix_len + 1, dtype=torch.long, device=text_inputs.device)
+        for idx, prefix in enumerate(prefixes):
+            attention_mask[idx, : prefix_len - prefix.shape[1]] = 0
+        emb = torch.cat([F.pad(prefix, (0, 0, prefix_len - prefix.shape[1], 0)) for prefix in prefixes], dim=0)
+        self.gpt_inference.store_prefix_emb(emb)
+        gpt_inputs = torch.full(
+            (batch_size, prefix_len + 1), fill_value=1, dtype=torch.long, device=text_inputs.device
+        )
+        gpt_inputs[:, -1] = self.start_audio_token
+        return gpt_inputs, attention_mask
+
     def generate(
         self,
         cond_latents,
         text_inputs,
+        text_lengths=None,
         **hf_generate_kwargs,
     ):
-        gpt_inputs = self.compute_embeddings(cond_latents, text_inputs)
+        """Generate the mel codes of `text_inputs`.
+
+        If `text_lengths` is given, the rows of `text_inputs` are right padded texts that are decoded as a
+        single batch, see `compute_batch_embeddings()`. Finished rows are padded with `stop_audio_token`.
+        """
+        if text_lengths is None:
+            gpt_inputs = self.compute_embeddings(cond_latents, text_inputs)
+        else:
+            gpt_inputs, attention_mask = self.compute_batch_embeddings(cond_latents, text_inputs, text_lengths)
+            hf_generate_kwargs["attention_mask"] = attention_mask
         gen = self.gpt_inference.generate(
             gpt_inputs,
             bos_token_id=self.start_audio_token,
@@ -5,11 +5,13 @@ from torch import nn
 from transformers import GPT2PreTrainedModel
 from transformers.modeling_outputs import CausalLMOutputWithCrossAttentions
 
+from TTS.tts.layers.xtts.static_kv_cache import StaticKVCache, gpt2_forward_with_static_cache
+
 
 class GPT2InferenceModel(GPT2PreTrainedModel):
     """Override GPT2LMHeadModel to allow for prefix conditioning."""
 
-    def __init__(self, config, gpt, pos_emb, embeddings, norm, linear, kv_cache):
+    def __init__(self, config, gpt, pos_emb, embeddings, norm, linear, kv_cache, static_kv_cache=False):
         super().__init__(config)
         self.transformer = gpt
         self.pos_embedding = pos_emb
@@ -17,6 +19,17 @@ class GPT2InferenceModel(GPT2PreTrainedModel):
         self.final_norm = norm
         self.lm_head = nn.Sequential(norm, linear)
         self.kv_cache = kv_cache
+        # preallocated `StaticKVCache` reused across requests, created on the first generation
+        self.static_kv_cache = static_kv_cache
+        self.static_cache = None
+
+    def _get_static_cache(self, batch_size, emb):
+        if self.static_cache is None or not self.static_cache.fits(batch_size, emb.device, emb.dtype):
+            self.static_cache = StaticKVCache.for_transformer(
+                self.transformer, self.config.n_positions, max_batch_size=batch_size
+            )
+        self.static_cache.reset(batch_size)
+        return self.static_cache
 
     def store_prefix_emb(self, prefix_emb):
         self.cached_prefix_emb = prefix_emb
@@ -94,6 +107,24 @@ class GPT2InferenceModel(GPT2PreTrainedModel):
             emb = emb + self.pos_embedding.get_fixed_embedding(
                 attention_mask.shape[1] - (prefix_len + 1), attention_mask.device
             )
+        # the static cache has no padding mask, batches of left padded prefixes keep the HuggingFace cache
+        use_static_cache = isinstance(past_key_values, StaticKVCache) or (
+            past_key_values is None
+            and self.kv_cache
+            and self.static_kv_cache
+            and not output_attentions
+            and not output_hidden_states
+            and (attention_mask is None or bool(attention_mask.all()))
+        )
+        if use_static_cache:
+            # the cache object is passed around by `generate()` as `past_key_values`
+            cache = past_key_values if past_key_values is not None else self._get_static_cache(emb.shape[0], emb)
+            hidden_states = gpt2_forward_with_static_cache(self.transformer, emb, cache)
+            lm_logits = self.lm_head(hidden_states)
+            if not return_dict:
+                return (lm_logits, cache)
+            return CausalLMOutputWithCrossAttentions(loss=None, logits=lm_logits, past_key_values=cache)
+
         transformer_outputs = self.transformer(
             inputs_embeds=emb,
             past_key_values=past_key_values,
@@ -130,6 +161,9 @@ class GPT2InferenceModel(GPT2PreTrainedModel):
         :meth:`~transformers.PreTrainedModel.beam_search` or :meth:`~transformers.PreTrainedModel.beam_sample` is
         called. This is required to match :obj:`past_key_values` with the correct beam_idx at every generation step.
         """
+        if isinstance(past, StaticKVCache):
+            past.reorder(beam_idx)
+            return past
         return tuple(
             tuple(past_state.index_select(0, beam_idx.to(past_state.device)) for past_state in layer_past)
             for layer_past in past
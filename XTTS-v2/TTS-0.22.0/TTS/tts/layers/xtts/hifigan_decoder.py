@@ -684,7 +684,18 @@ class HifiDecoder(torch.nn.Module):
             x: [B, C, T]
             Tensor: [B, 1, T]
         """
+        z = self.latents_to_features(latents)
+        o = self.waveform_decoder(z, g=g)
+        return o
 
+    def latents_to_features(self, latents):
+        """Upsample the GPT latents to the frame rate of the waveform decoder, which outputs
+        `output_hop_length` samples per frame.
+
+        Shapes:
+            latents: [B, T, C]
+            Tensor: [B, C, T']
+        """
         z = torch.nn.functional.interpolate(
             latents.transpose(1, 2),
             scale_factor=[self.ar_mel_length_compression / self.output_hop_length],
@@ -697,8 +708,7 @@ class HifiDecoder(torch.nn.Module):
                 scale_factor=[self.output_sample_rate / self.input_sample_rate],
                 mode="linear",
             ).squeeze(0)
-        o = self.waveform_decoder(z, g=g)
-        return o
+        return z
 
     @torch.no_grad()
     def inference(self, c, g):
@@ -0,0 +1,153 @@
+import hashlib
+import os
+import threading
+
+import torch
+from torch import nn
+from torch.nn.utils import parametrize
+from torch.nn.utils.fusion import fuse_conv_bn_eval
+
+from TTS.tts.layers.xtts.hifigan_decoder import SEBasicBlock
+
+COMPILE_BACKENDS = ("torchscript", "compile")
+
+
+def remove_weight_norm(module):
+    """Fold the weight norm parametrizations of `module` and its submodules into plain weights.
+
+    Unlike `HifiganGenerator.remove_weight_norm()`, the layers that have no weight norm are skipped, so the
+    function can be applied to the XTTS decoder, whose pre and post convolutions have none, and applied twice.
+
+    Returns:
+        The number of folded parametrizations.
+    """
+    num_removed = 0
+    for submodule in module.modules():
+        if parametrize.is_parametrized(submodule, "weight"):
+            parametrize.remove_parametrizations(submodule, "weight")
+            num_removed += 1
+    return num_removed
+
+
+def _fuse_bn_into_next_conv(bn, conv):
+    """Fold a batch norm into the 1x1 convolution that follows it."""
+    scale = bn.weight / torch.sqrt(bn.running_var + bn.eps)
+    shift = bn.bias - bn.running_mean * scale
+    fused = nn.Conv1d(conv.in_channels, conv.out_channels, 1, bias=True).to(conv.weight)
+    fused.weight.copy_(conv.weight * scale.view(1, -1, 1))
+    bias = conv.bias if conv.bias is not None else torch.zeros_like(fused.bias)
+    fused.bias.copy_(bias + conv.weight[:, :, 0] @ shift)
+    return fused
+
+
+@torch.no_grad()
+def fuse_conv_bn(speaker_encoder):
+    """Fold the batch norms of a `ResNetSpeakerEncoder` in evaluation mode into the adjacent convolutions.
+
+    The batch norms that directly follow a convolution are folded into its weights, and the one of the attention
+    pooling, which follows a ReLU, into the next 1x1 convolution. The batch norms that follow a ReLU and precede a
+    padded convolution can't be folded exactly and are kept.
+
+    Returns:
+        The number of folded batch norms.
+    """
+    if speaker_encoder.training:
+        raise RuntimeError(" ❗ Batch norms can only be fused in evaluation mode.")
+    num_fused = 0
+    for module in speaker_encoder.modules():
+        if isinstance(module, SEBasicBlock) and isinstance(module.bn2, nn.BatchNorm2d):
+            module.conv2 = fuse_conv_bn_eval(module.conv2, module.bn2)
+            module.bn2 = nn.Identity()
+            num_fused += 1
+        if isinstance(module, SEBasicBlock) and module.downsample is not None:
+            conv, bn = module.downsample
+            if isinstance(bn, nn.BatchNorm2d):
+                module.downsample = nn.Sequential(fuse_conv_bn_eval(conv, bn), nn.Identity())
+                num_fused += 1
+    attention = speaker_encoder.attention
+    if isinstance(attention[2], nn.BatchNorm1d):
+        attention[3] = _fuse_bn_into_next_conv(attention[2], attention[3])
+        attention[2] = nn.Identity()
+        num_fused += 1
+    return num_fused
+
+
+def module_fingerprint(module):
+    """Hash of the parameters and buffers of a module, with the torch version, used to key compiled artifacts."""
+    hash_func = hashlib.sha256(torch.__version__.encode("utf-8"))
+    for name, tensor in module.state_dict().items():
+        hash_func.update(f"{name}|{tuple(tensor.shape)}|{tensor.dtype}|{tensor.device.type}".encode("utf-8"))
+        hash_func.update(tensor.detach().cpu().contiguous().reshape(-1).view(torch.uint8).numpy().tobytes())
+    return hash_func.hexdigest()
+
+
+def trace_waveform_decoder(hifigan_decoder, speaker_embedding_dim=512, cache_dir=None):
+    """Trace the HiFi-GAN generator of a `HifiDecoder` with TorchScript.
+
+    The generator is a stack of convolutions without shape dependent control flow, so a single trace serves all
+    the input lengths. If `cache_dir` is set, the traced module is saved there, keyed by the fingerprint of the
+    weights, and loaded instead of traced on the following startups.
+
+    Returns:
+        The traced module, a drop-in replacement of `hifigan_decoder.waveform_decoder`.
+    """
+    waveform_decoder = hifigan_decoder.waveform_decoder
+    param = next(waveform_decoder.parameters())
+    path = None
+    if cache_dir is not None:
+        os.makedirs(cache_dir, exist_ok=True)
+        path = os.path.join(cache_dir, f"hifigan_{module_fingerprint(waveform_decoder)}.pt")
+        if os.path.exists(path):
+            return torch.jit.load(path, map_location=param.device)
+
+    # same input shapes as `HifiDecoder.forward()` for a single sequence
+    latents = torch.randn(1, 32, hifigan_decoder.waveform_decoder.conv_pre.in_channels, device=param.device)
+    features = hifigan_decoder.latents_to_features(latents.to(param.dtype))
+    g = torch.randn(1, speaker_embedding_dim, 1, device=param.device, dtype=param.dtype)
+    with torch.no_grad():
+        traced = torch.jit.trace(waveform_decoder, (features, g), check_trace=False)
+    if path is not None:
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        torch.jit.save(traced, tmp_path)
+        os.replace(tmp_path, path)
+    return traced
+
+
+def optimize_for_inference(model, compile_backend=None, cache_dir=None):
+    """Optimize the submodules of an `Xtts` model in evaluation mode for inference.
+
+    - folds the weight norm of the HiFi-GAN generator;
+    - fuses the convolutions and batch norms of the speaker encoder;
+    - with `compile_backend="torchscript"`, replaces the HiFi-GAN generator by a TorchScript trace, saved in
+      `cache_dir`;
+    - with `compile_backend="compile"`, wraps the HiFi-GAN generator and the conditioning perceiver in
+      `torch.compile` with dynamic shapes, so the sequence lengths don't trigger recompilations. `cache_dir`
+      becomes the inductor cache directory, which keeps the compiled kernels between startups. It is read once
+      per process, so it only applies if nothing was compiled before.
+
+    The model must be on its inference device, since the traced and compiled modules are specialized to it.
+
+    Args:
+        model (Xtts): The model to optimize in place.
+        compile_backend (str, optional): None, "torchscript" or "compile". Defaults to None.
+        cache_dir (str, optional): Directory of the compiled artifacts. Defaults to None.
+    """
+    if compile_backend is not None and compile_backend not in COMPILE_BACKENDS:
+        raise ValueError(f" ❗ Unknown compile backend {compile_backend}, expected one of {COMPILE_BACKENDS}.")
+    hifigan_decoder = model.hifigan_decoder
+    hifigan_decoder.eval()
+    remove_weight_norm(hifigan_decoder.waveform_decoder)
+    fuse_conv_bn(hifigan_decoder.speaker_encoder)
+
+    if compile_backend == "torchscript" and not isinstance(hifigan_decoder.waveform_decoder, torch.jit.ScriptModule):
+        hifigan_decoder.waveform_decoder = trace_waveform_decoder(
+            hifigan_decoder, speaker_embedding_dim=model.args.d_vector_dim, cache_dir=cache_dir
+        )
+    elif compile_backend == "compile" and not hasattr(hifigan_decoder.waveform_decoder, "_orig_mod"):
+        if cache_dir is not None:
+            os.makedirs(cache_dir, exist_ok=True)
+            os.environ["TORCHINDUCTOR_CACHE_DIR"] = os.path.abspath(cache_dir)
+        hifigan_decoder.waveform_decoder = torch.compile(hifigan_decoder.waveform_decoder, dynamic=True)
+        if model.gpt.use_perceiver_resampler:
+            model.gpt.conditioning_perceiver = torch.compile(model.gpt.conditioning_perceiver, dynamic=True)
+    return model
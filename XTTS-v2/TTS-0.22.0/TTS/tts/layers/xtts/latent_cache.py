@@ -0,0 +1,127 @@
+import hashlib
+import os
+import threading
+from collections import OrderedDict
+
+import torch
+
+
+def hash_audio_files(audio_paths, chunk_size=1 << 20):
+    """Compute a content hash of the given reference audio files.
+
+    The hash depends on the bytes of the files and their order, not on their paths, so the same reference
+    uploaded twice under different names maps to the same key.
+    """
+    hash_func = hashlib.sha256()
+    for audio_path in audio_paths:
+        with open(audio_path, "rb") as f:
+            for chunk in iter(lambda: f.read(chunk_size), b""):
+                hash_func.update(chunk)
+        hash_func.update(b"\0")
+    return hash_func.hexdigest()
+
+
+class SpeakerLatentCache:
+    """Two tier cache of XTTS speaker conditioning `(gpt_cond_latent, speaker_embedding)`.
+
+    Entries are keyed by the content hash of the reference audio and the conditioning settings. The first tier
+    is an in-memory LRU, the second one keeps the latents as `.pt` files in `cache_dir` and evicts the least
+    recently used files once `max_disk_items` is exceeded. The cache is thread safe, so a single instance can be
+    shared by several model replicas.
+
+    Args:
+        cache_dir (str, optional): Directory of the on-disk tier. If None, only the in-memory tier is used.
+            Defaults to None.
+        max_memory_items (int, optional): Maximum number of entries kept in memory. Defaults to 64.
+        max_disk_items (int, optional): Maximum number of entries kept on disk. Defaults to 1024.
+        namespace (str, optional): Extra string mixed in the keys, e.g. the checkpoint name, so latents computed
+            by different models never collide. Defaults to "".
+    """
+
+    def __init__(self, cache_dir=None, max_memory_items=64, max_disk_items=1024, namespace=""):
+        self.cache_dir = cache_dir
+        self.max_memory_items = max_memory_items
+        self.max_disk_items = max_disk_items
+        self.namespace = namespace
+        self._memory = OrderedDict()
+        self._lock = threading.Lock()
+        if self.cache_dir is not None:
+            os.makedirs(self.cache_dir, exist_ok=True)
+
+    def make_key(self, audio_paths, **settings):
+        """Build the cache key for the given reference files and conditioning settings."""
+        settings_str = ",".join(f"{name}={settings[name]}" for name in sorted(settings))
+        key_str = f"{self.namespace}|{hash_audio_files(audio_paths)}|{settings_str}"
+        return hashlib.sha256(key_str.encode("utf-8")).hexdigest()
+
+    def _disk_path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.pt")
+
+    def get(self, key):
+        """Return the cached `(gpt_cond_latent, speaker_embedding)` on CPU or None."""
+        with self._lock:
+            if key in self._memory:
+                self._memory.move_to_end(key)
+                return self._memory[key]
+
+        if self.cache_dir is None:
+            return None
+        path = self._disk_path(key)
+        try:
+            state = torch.load(path, map_location=torch.device("cpu"))
+            # refresh the access time used for the LRU eviction
+            os.utime(path)
+        except (FileNotFoundError, EOFError, RuntimeError):
+            return None
+        latents = (state["gpt_cond_latent"], state["speaker_embedding"])
+        self._put_memory(key, latents)
+        return latents
+
+    def put(self, key, gpt_cond_latent, speaker_embedding):
+        """Store the latents in both tiers."""
+        latents = (gpt_cond_latent.detach().cpu(), speaker_embedding.detach().cpu())
+        self._put_memory(key, latents)
+        if self.cache_dir is None:
+            return
+        path = self._disk_path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        torch.save({"gpt_cond_latent": latents[0], "speaker_embedding": latents[1]}, tmp_path)
+        os.replace(tmp_path, path)
+        self._evict_disk()
+
+    def _put_memory(self, key, latents):
+        with self._lock:
+            self._memory[key] = latents
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_memory_items:
+                self._memory.popitem(last=False)
+
+    def _evict_disk(self):
+        with self._lock:
+            entries = []
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(".pt"):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    entries.append((os.path.getmtime(path), path))
+                except FileNotFoundError:
+                    continue
+            if len(entries) <= self.max_disk_items:
+                return
+            entries.sort()
+            for _, path in entries[: len(entries) - self.max_disk_items]:
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+
+    def clear(self):
+        """Remove all the entries from both tiers."""
+        with self._lock:
+            self._memory.clear()
+            if self.cache_dir is None:
+                return
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(".pt"):
+                    os.remove(os.path.join(self.cache_dir, name))
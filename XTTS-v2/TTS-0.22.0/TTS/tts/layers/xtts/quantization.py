@@ -0,0 +1,53 @@
+import torch
+import torch.ao.nn.quantized.dynamic as nnqd
+from torch import nn
+from torch.ao.quantization import default_dynamic_qconfig, quantize_dynamic
+from transformers.pytorch_utils import Conv1D
+
+QUANTIZATION_MODES = ("dynamic_int8",)
+
+
+def conv1d_to_linear(module):
+    """Replace the HuggingFace `Conv1D` layers of the GPT-2 blocks by equivalent `nn.Linear` layers.
+
+    `Conv1D` is a linear layer with transposed weights, which `quantize_dynamic` does not recognize.
+    """
+    for name, child in module.named_children():
+        if isinstance(child, Conv1D):
+            in_features, out_features = child.weight.shape
+            linear = nn.Linear(in_features, out_features).to(child.weight)
+            with torch.no_grad():
+                linear.weight.copy_(child.weight.t())
+                linear.bias.copy_(child.bias)
+            setattr(module, name, linear)
+        else:
+            conv1d_to_linear(child)
+    return module
+
+
+def quantize_gpt(gpt, mode="dynamic_int8"):
+    """Quantize the GPT-2 blocks and the mel head of an XTTS `GPT` in place for CPU inference.
+
+    With `dynamic_int8`, the weights of the linear layers are stored in int8 and the activations are quantized on
+    the fly, per batch. The embeddings, layer norms and the conditioning encoders stay in float32. Dynamic
+    quantization only runs on CPU.
+
+    `GPT.init_gpt_for_inference()` must be called again afterwards, so the inference model uses the new layers.
+
+    Args:
+        gpt (GPT): The model to quantize.
+        mode (str, optional): Quantization mode, one of `QUANTIZATION_MODES`. Defaults to "dynamic_int8".
+    """
+    if mode not in QUANTIZATION_MODES:
+        raise ValueError(f" ❗ Unknown quantization mode {mode}, expected one of {QUANTIZATION_MODES}.")
+    if next(gpt.parameters()).device.type != "cpu":
+        raise RuntimeError(" ❗ Dynamic quantization is only supported on CPU.")
+    conv1d_to_linear(gpt.gpt)
+    quantize_dynamic(
+        gpt,
+        {"gpt": default_dynamic_qconfig, "mel_head": default_dynamic_qconfig},
+        mapping={nn.Linear: nnqd.Linear},
+        dtype=torch.qint8,
+        inplace=True,
+    )
+    return gpt
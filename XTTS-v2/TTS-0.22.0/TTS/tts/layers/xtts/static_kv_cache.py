@@ -0,0 +1,147 @@
+import torch
+import torch.nn.functional as F
+
+
+class StaticKVCache:
+    """Preallocated, fixed capacity key/value cache for the XTTS GPT-2 transformer.
+
+    The HuggingFace `past_key_values` tuples are re-concatenated at every decode step, so generating `n` tokens
+    copies O(n²) key/value memory and reallocates the cache each step. This cache allocates the key and value
+    buffers once, for `max_batch_size` slots of `max_length` positions, and the decode steps write the new
+    keys and values in place. Each slot keeps its own length, so the slots of a batch may hold sequences of
+    different lengths, and the buffers are reused by the following requests after `reset()`.
+
+    Args:
+        num_layers (int): Number of transformer blocks.
+        num_heads (int): Number of attention heads.
+        head_dim (int): Dimension of each attention head.
+        max_length (int): Maximum number of positions of a slot.
+        max_batch_size (int, optional): Number of slots. Defaults to 1.
+        device (torch.device, optional): Device of the buffers. Defaults to None.
+        dtype (torch.dtype, optional): Data type of the buffers. Defaults to torch.float32.
+    """
+
+    def __init__(
+        self, num_layers, num_heads, head_dim, max_length, max_batch_size=1, device=None, dtype=torch.float32
+    ):
+        self.max_length = max_length
+        self.max_batch_size = max_batch_size
+        shape = (num_layers, max_batch_size, num_heads, max_length, head_dim)
+        self.keys = torch.zeros(shape, device=device, dtype=dtype)
+        self.values = torch.zeros(shape, device=device, dtype=dtype)
+        # kept on the CPU, so reading the lengths never waits for the device
+        self.lengths = torch.zeros(max_batch_size, dtype=torch.long)
+        self.batch_size = 0
+
+    @classmethod
+    def for_transformer(cls, transformer, max_length, max_batch_size=1):
+        """Build a cache that fits the blocks of a HuggingFace `GPT2Model`."""
+        config = transformer.config
+        param = next(transformer.parameters())
+        return cls(
+            config.n_layer,
+            config.n_head,
+            config.n_embd // config.n_head,
+            max_length,
+            max_batch_size=max_batch_size,
+            device=param.device,
+            dtype=param.dtype,
+        )
+
+    def fits(self, batch_size, device, dtype):
+        """Whether the cache can be reused for a batch, in the current inference mode."""
+        # buffers created under `torch.inference_mode()` can't be updated in place outside of it
+        return (
+            batch_size <= self.max_batch_size
+            and self.keys.device == device
+            and self.keys.dtype == dtype
+            and self.keys.is_inference() == torch.is_inference_mode_enabled()
+        )
+
+    def reset(self, batch_size):
+        """Start new sequences in the first `batch_size` slots. The buffers are not cleared, only the lengths."""
+        if batch_size > self.max_batch_size:
+            raise ValueError(f" ❗ Batch size {batch_size} exceeds the cache capacity of {self.max_batch_size} slots.")
+        self.batch_size = batch_size
+        self.lengths.zero_()
+
+    def update(self, layer_idx, key, value):
+        """Write the keys and values of new positions and return the cached ones up to the longest slot.
+
+        Args:
+            layer_idx (int): Index of the transformer block.
+            key (Tensor): Keys of the new positions, of shape `(B, H, T, D)`.
+            value (Tensor): Values of the new positions, of shape `(B, H, T, D)`.
+
+        Returns:
+            Keys and values of shape `(B, H, S, D)`, where `S` is the longest slot length after the update.
+            Positions past the length of a slot are stale and must be masked, see `attention_mask()`.
+        """
+        batch_size, _, new_len, _ = key.shape
+        lengths = self.lengths[:batch_size]
+        if new_len == 1:
+            # decode step: each slot writes at its own length
+            slots = torch.arange(batch_size, device=key.device)
+            positions = lengths.to(key.device)
+            self.keys[layer_idx, slots, :, positions] = key[:, :, 0]
+            self.values[layer_idx, slots, :, positions] = value[:, :, 0]
+        else:
+            # prefill: the slots start at the same length
+            start = int(lengths[0])
+            self.keys[layer_idx, :batch_size, :, start : start + new_len] = key
+            self.values[layer_idx, :batch_size, :, start : start + new_len] = value
+        seq_len = int(lengths.max()) + new_len
+        return self.keys[layer_idx, :batch_size, :, :seq_len], self.values[layer_idx, :batch_size, :, :seq_len]
+
+    def attention_mask(self, new_len):
+        """Boolean `(B, 1, T, S)` mask of the cached positions each of the `new_len` new positions attends to."""
+        lengths = self.lengths[: self.batch_size]
+        seq_len = int(lengths.max()) + new_len
+        key_positions = torch.arange(seq_len)
+        query_positions = lengths.unsqueeze(1) + torch.arange(new_len).unsqueeze(0)
+        mask = key_positions.view(1, 1, 1, -1) <= query_positions.view(-1, 1, new_len, 1)
+        return mask.to(self.keys.device)
+
+    def advance(self, new_len):
+        self.lengths[: self.batch_size] += new_len
+
+    def reorder(self, beam_idx):
+        """Reorder the slots in place, for beam search."""
+        self.keys[:, : self.batch_size] = self.keys[:, beam_idx.to(self.keys.device)]
+        self.values[:, : self.batch_size] = self.values[:, beam_idx.to(self.keys.device)]
+        self.lengths[: self.batch_size] = self.lengths[beam_idx.cpu()]
+
+
+def gpt2_forward_with_static_cache(transformer, inputs_embeds, cache):
+    """Run a HuggingFace `GPT2Model` on `inputs_embeds` with keys and values stored in a `StaticKVCache`.
+
+    Mirrors `GPT2Model.forward` in evaluation mode for the XTTS transformer, which has no absolute position
+    embeddings, but attends over the preallocated cache instead of concatenating `past_key_values`.
+
+    Args:
+        transformer (GPT2Model): The GPT-2 transformer.
+        inputs_embeds (Tensor): Embeddings of the new positions, of shape `(B, T, C)`.
+        cache (StaticKVCache): Cache holding the previous positions of the `B` first slots.
+
+    Returns:
+        Hidden states of the new positions after the final layer norm, of shape `(B, T, C)`.
+    """
+    batch_size, new_len, _ = inputs_embeds.shape
+    if int(cache.lengths[:batch_size].max()) + new_len > cache.max_length:
+        raise ValueError(f" ❗ Sequence length exceeds the static KV cache capacity of {cache.max_length}.")
+    attn_mask = cache.attention_mask(new_len)
+    hidden_states = inputs_embeds
+    for layer_idx, block in enumerate(transformer.h):
+        attn = block.attn
+        residual = hidden_states
+        query, key, value = attn.c_attn(block.ln_1(hidden_states)).split(attn.split_size, dim=2)
+        query = attn._split_heads(query, attn.num_heads, attn.head_dim)  # pylint: disable=protected-access
+        key = attn._split_heads(key, attn.num_heads, attn.head_dim)  # pylint: disable=protected-access
+        value = attn._split_heads(value, attn.num_heads, attn.head_dim)  # pylint: disable=protected-access
+        key, value = cache.update(layer_idx, key, value)
+        attn_output = F.scaled_dot_product_attention(query, key, value, attn_mask=attn_mask)
+        attn_output = attn._merge_heads(attn_output, attn.num_heads, attn.head_dim)  # pylint: disable=protected-access
+        hidden_states = attn.c_proj(attn_output) + residual
+        hidden_states = hidden_states + block.mlp(block.ln_2(hidden_states))
+    cache.advance(new_len)
+    return transformer.ln_f(hidden_states)
@@ -0,0 +1,68 @@
+import torch
+
+
+class StreamingVocoder:
+    """Incremental HiFi-GAN decoding of the GPT latents of a streamed sentence.
+
+    `Xtts.inference_stream()` used to vocode all the latents generated so far for every chunk, so the vocoder
+    cost of a sentence grew quadratically with its length. The waveform decoder is a stack of convolutions with
+    a bounded receptive field, so the new samples of a chunk only depend on the last frames of its input. This
+    decoder upsamples all the latents to the decoder frame rate, which is cheap, but only runs the waveform
+    decoder on the frames of the new samples plus `context_frames` frames of left context. The chunks and their
+    crossfade match `Xtts.handle_chunks()` on the full waveform.
+
+    Args:
+        hifigan_decoder (HifiDecoder): The XTTS vocoder.
+        speaker_embedding (Tensor): Speaker embedding of shape `(1, C, 1)`.
+        overlap_len (int, optional): Number of samples crossfaded between two chunks. Defaults to 1024.
+        context_frames (int, optional): Decoder frames of left context vocoded before the new samples. The
+            XTTS v2 decoder has a receptive field of about 12 frames on each side. `None` vocodes all the latents
+            for every chunk. Defaults to 32.
+    """
+
+    def __init__(self, hifigan_decoder, speaker_embedding, overlap_len=1024, context_frames=32):
+        self.hifigan_decoder = hifigan_decoder
+        self.speaker_embedding = speaker_embedding
+        self.overlap_len = overlap_len
+        self.context_frames = context_frames
+        # length of the waveform of all the latents of the previous chunk, `None` before the first chunk
+        self.wav_len = None
+        self.wav_overlap = None
+
+    def __call__(self, latents):
+        """Vocode the samples added by the new latents.
+
+        Args:
+            latents (Tensor): All the latents generated so far, of shape `(1, T, C)`.
+
+        Returns:
+            The new waveform chunk, of shape `(T',)`.
+        """
+        features = self.hifigan_decoder.latents_to_features(latents)
+        hop_length = self.hifigan_decoder.output_hop_length
+        # first sample of the chunk in the full waveform
+        start = 0 if self.wav_len is None else max(self.wav_len - self.overlap_len, 0)
+        start_frame = 0
+        if self.context_frames is not None:
+            start_frame = min(max(start // hop_length - self.context_frames, 0), features.shape[-1] - 1)
+        wav = self.hifigan_decoder.waveform_decoder(features[..., start_frame:], g=self.speaker_embedding).squeeze()
+        # `wav` holds the samples of the full waveform from `offset` on
+        offset = start_frame * hop_length
+        wav_len = offset + wav.shape[0]
+
+        wav_chunk = wav[start - offset : wav_len - offset - self.overlap_len]
+        if self.wav_overlap is not None:
+            if self.overlap_len > len(wav_chunk):
+                # the last chunk is shorter than the overlap, pass it on as is
+                self.wav_len = wav_len
+                self.wav_overlap = None
+                return wav[start - offset :]
+            # cross fade the overlap section
+            fade_in = wav_chunk[: self.overlap_len] * torch.linspace(0.0, 1.0, self.overlap_len).to(wav.device)
+            wav_chunk[: self.overlap_len] = self.wav_overlap * torch.linspace(1.0, 0.0, self.overlap_len).to(
+                wav.device
+            )
+            wav_chunk[: self.overlap_len] += fade_in
+        self.wav_overlap = wav[-self.overlap_len :]
+        self.wav_len = wav_len
+        return wav_chunk
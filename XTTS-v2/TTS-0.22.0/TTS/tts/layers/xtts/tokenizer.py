@@ -1,6 +1,9 @@
+import functools
 import os
 import re
 import textwrap
+import threading
+from collections import OrderedDict
 from functools import cached_property
 
 import pypinyin
@@ -32,14 +35,25 @@ def get_spacy_lang(lang):
         return English()
 
 
+@functools.lru_cache(maxsize=None)
+def get_sentencizer(lang):
+    """Return the spaCy pipeline with a sentencizer of a language, built once, and the lock guarding it.
+
+    The spaCy vocabulary is updated by the pipeline calls, so the calls from several threads are serialized.
+    """
+    nlp = get_spacy_lang(lang)
+    nlp.add_pipe("sentencizer")
+    return nlp, threading.Lock()
+
+
 def split_sentence(text, lang, text_split_length=250):
     """Preprocess the input text"""
     text_splits = []
     if text_split_length is not None and len(text) >= text_split_length:
         text_splits.append("")
-        nlp = get_spacy_lang(lang)
-        nlp.add_pipe("sentencizer")
-        doc = nlp(text)
+        nlp, lock = get_sentencizer(lang)
+        with lock:
+            doc = nlp(text)
         for sentence in doc.sents:
             if len(text_splits[-1]) + len(str(sentence)) <= text_split_length:
                 # if the last sentence + the current sentence is less than the text_split_length
@@ -70,6 +84,14 @@ def split_sentence(text, lang, text_split_length=250):
 
 _whitespace_re = re.compile(r"\s+")
 
+
+def _any_regex(regex_replacements):
+    """Compile a regex matching wherever one of the regexes of a `(regex, replacement)` chain matches.
+
+    If it does not match a text, no regex of the chain does, so the whole chain can be skipped.
+    """
+    return re.compile("|".join(f"(?:{regex.pattern})" for regex, _ in regex_replacements), re.IGNORECASE)
+
 # List of (regular expression, replacement) pairs for abbreviations:
 _abbreviations = {
     "en": [
@@ -232,9 +254,14 @@ _abbreviations = {
 }
 
 
+_abbreviations_any = {lang: _any_regex(regexes) for lang, regexes in _abbreviations.items()}
+
+
 def expand_abbreviations_multilingual(text, lang="en"):
+    if not _abbreviations_any[lang].search(text):
+        return text
     for regex, replacement in _abbreviations[lang]:
-        text = re.sub(regex, replacement, text)
+        text = regex.sub(replacement, text)
     return text
 
 
@@ -428,9 +455,19 @@ _symbols_multilingual = {
 }
 
 
+_symbols_multilingual_any = {lang: _any_regex(regexes) for lang, regexes in _symbols_multilingual.items()}
+
+
 def expand_symbols_multilingual(text, lang="en"):
+    if not _symbols_multilingual_any[lang].search(text):
+        # same as the loop below when no symbol matches
+        for _ in _symbols_multilingual[lang]:
+            if "  " not in text:
+                break
+            text = text.replace("  ", " ")
+        return text.strip()
     for regex, replacement in _symbols_multilingual[lang]:
-        text = re.sub(regex, replacement, text)
+        text = regex.sub(replacement, text)
         text = text.replace("  ", " ")  # Ensure there are no double spaces
     return text.strip()
 
@@ -452,6 +489,7 @@ _ordinal_re = {
     "ko": re.compile(r"([0-9]+)(번째|번|차|째)"),
 }
 _number_re = re.compile(r"[0-9]+")
+_digit_re = re.compile(r"\d")
 _currency_re = {
     "USD": re.compile(r"((\$[0-9\.\,]*[0-9]+)|([0-9\.\,]*[0-9]+\$))"),
     "GBP": re.compile(r"((£[0-9\.\,]*[0-9]+)|([0-9\.\,]*[0-9]+£))"),
@@ -519,10 +557,16 @@ def _expand_number(m, lang="en"):
     return num2words(int(m.group(0)), lang=lang if lang != "cs" else "cz")
 
 
+@functools.lru_cache(maxsize=None)
+def _get_zh_num2words():
+    return zh_num2words()
+
+
 def expand_numbers_multilingual(text, lang="en"):
     if lang == "zh":
-        text = zh_num2words()(text)
-    else:
+        text = _get_zh_num2words()(text)
+    elif _digit_re.search(text):
+        # all the regexes below need a digit
         if lang in ["en", "ru"]:
             text = re.sub(_comma_number_re, _remove_commas, text)
         else:
@@ -590,10 +634,21 @@ DEFAULT_VOCAB_FILE = os.path.join(os.path.dirname(os.path.realpath(__file__)), "
 
 
 class VoiceBpeTokenizer:
-    def __init__(self, vocab_file=None):
+    """XTTS BPE tokenizer with the text cleaners of each language.
+
+    Args:
+        vocab_file (str, optional): Path to the tokenizer json file. Defaults to None.
+        cache_size (int, optional): Number of `(lang, text) -> token ids` results kept by `encode()`, so the
+            repeated texts skip the cleaners and the BPE. 0 disables the cache. Defaults to 1024.
+    """
+
+    def __init__(self, vocab_file=None, cache_size=1024):
         self.tokenizer = None
         if vocab_file is not None:
             self.tokenizer = Tokenizer.from_file(vocab_file)
+        self.cache_size = cache_size
+        self._encode_cache = OrderedDict()
+        self._encode_cache_lock = threading.Lock()
         self.char_limits = {
             "en": 250,
             "de": 253,
@@ -646,11 +701,41 @@ class VoiceBpeTokenizer:
     def encode(self, txt, lang):
         lang = lang.split("-")[0]  # remove the region
         self.check_input_length(txt, lang)
+        key = (lang, txt)
+        with self._encode_cache_lock:
+            ids = self._encode_cache.get(key)
+            if ids is not None:
+                self._encode_cache.move_to_end(key)
+                return list(ids)
+
         txt = self.preprocess_text(txt, lang)
         lang = "zh-cn" if lang == "zh" else lang
         txt = f"[{lang}]{txt}"
         txt = txt.replace(" ", "[SPACE]")
-        return self.tokenizer.encode(txt).ids
+        ids = self.tokenizer.encode(txt).ids
+
+        if self.cache_size > 0:
+            with self._encode_cache_lock:
+                self._encode_cache[key] = tuple(ids)
+                while len(self._encode_cache) > self.cache_size:
+                    self._encode_cache.popitem(last=False)
+        return ids
+
+    def clear_cache(self):
+        """Drop the cached `encode()` results."""
+        with self._encode_cache_lock:
+            self._encode_cache.clear()
+
+    def __getstate__(self):
+        # the lock can't be pickled, e.g. by the data loader workers
+        state = self.__dict__.copy()
+        state["_encode_cache"] = OrderedDict()
+        del state["_encode_cache_lock"]
+        return state
+
+    def __setstate__(self, state):
+        self.__dict__.update(state)
+        self._encode_cache_lock = threading.Lock()
 
     def decode(self, seq):
         if isinstance(seq, torch.Tensor):
@@ -23,17 +23,17 @@ def key_samples_by_col(samples, col):
     return samples_by_col
 
 
-def get_prompt_slice(gt_path, max_sample_length, min_sample_length, sample_rate, is_eval=False):
-    rel_clip = load_audio(gt_path, sample_rate)
+def sample_slice_bounds(num_samples, max_sample_length, min_sample_length, is_eval=False):
+    """Draw the start and end samples of a conditioning slice of a clip of `num_samples` samples."""
     # if eval uses a middle size sample when it is possible to be more reproducible
     if is_eval:
         sample_length = int((min_sample_length + max_sample_length) / 2)
     else:
         sample_length = random.randint(min_sample_length, max_sample_length)
-    gap = rel_clip.shape[-1] - sample_length
+    gap = num_samples - sample_length
     if gap < 0:
-        sample_length = rel_clip.shape[-1] // 2
-    gap = rel_clip.shape[-1] - sample_length
+        sample_length = num_samples // 2
+    gap = num_samples - sample_length
 
     # if eval start always from the position 0 to be more reproducible
     if is_eval:
@@ -42,15 +42,37 @@ def get_prompt_slice(gt_path, max_sample_length, min_sample_length, sample_rate,
         rand_start = random.randint(0, gap)
 
     rand_end = rand_start + sample_length
+    return rand_start, rand_end
+
+
+def get_prompt_slice(gt_path, max_sample_length, min_sample_length, sample_rate, is_eval=False):
+    rel_clip = load_audio(gt_path, sample_rate)
+    rand_start, rand_end = sample_slice_bounds(rel_clip.shape[-1], max_sample_length, min_sample_length, is_eval)
     rel_clip = rel_clip[:, rand_start:rand_end]
     rel_clip = F.pad(rel_clip, pad=(0, max_sample_length - rel_clip.shape[-1]))
     cond_idxs = [rand_start, rand_end]
     return rel_clip, rel_clip.shape[-1], cond_idxs
 
 
+def get_prompt_mel_slice(cond_mel, num_samples, max_sample_length, min_sample_length, hop_length, is_eval=False):
+    """`get_prompt_slice()` on the cached conditioning mel spectrogram `[n_mel, T_mel]` of the whole clip.
+
+    The slice is drawn as in `get_prompt_slice()` and its bounds are rounded down to the mel frames. The frames are
+    returned unpadded, `GPTTrainer.format_batch_on_device()` pads them with the mel of silence.
+    """
+    rand_start, rand_end = sample_slice_bounds(num_samples, max_sample_length, min_sample_length, is_eval)
+    start = rand_start // hop_length
+    end = min(rand_end // hop_length, cond_mel.shape[-1])
+    cond_idxs = [start * hop_length, end * hop_length]
+    return cond_mel[:, start:end], max_sample_length, cond_idxs
+
+
 class XTTSDataset(torch.utils.data.Dataset):
-    def __init__(self, config, samples, tokenizer, sample_rate, is_eval=False):
+    def __init__(self, config, samples, tokenizer, sample_rate, is_eval=False, dvae_cache=None):
         self.config = config
+        # `DVAECodeCache` of the clips, the cached items are returned with their DVAE codes and conditioning mel
+        # spectrogram instead of their waveform and conditioning clip
+        self.dvae_cache = dvae_cache
         model_args = config.model_args
         self.failed_samples = set()
         self.debug_failures = model_args.debug_loading_failures
@@ -81,14 +103,14 @@ class XTTSDataset(torch.utils.data.Dataset):
         new_samples = []
         for sample in self.samples:
             try:
-                tseq, _, wav, _, _, _ = self.load_item(sample)
+                item = self.load_item(sample)
             except:
                 continue
             # Basically, this audio file is nonexistent or too long to be supported by the dataset.
             if (
-                wav is None
-                or (self.max_wav_len is not None and wav.shape[-1] > self.max_wav_len)
-                or (self.max_text_len is not None and tseq.shape[0] > self.max_text_len)
+                item["wav_length"] is None
+                or (self.max_wav_len is not None and item["wav_length"] > self.max_wav_len)
+                or (self.max_text_len is not None and item["text"].shape[0] > self.max_text_len)
             ):
                 continue
             new_samples.append(sample)
@@ -107,33 +129,63 @@ class XTTSDataset(torch.utils.data.Dataset):
         text = str(sample["text"])
         tseq = self.get_text(text, sample["language"])
         audiopath = sample["audio_file"]
-        wav = load_audio(audiopath, self.sample_rate)
+        entry = self.dvae_cache.load(audiopath) if self.dvae_cache is not None else {}
+        if entry:
+            # the DVAE codes are cached, skip the audio decoding
+            wav, codes, wav_length = None, entry["codes"].long(), entry["num_samples"]
+        else:
+            wav, codes = load_audio(audiopath, self.sample_rate), None
+            wav_length = wav.shape[-1] if wav is not None else None
         if text is None or len(text.strip()) == 0:
             raise ValueError
-        if wav is None or wav.shape[-1] < (0.5 * self.sample_rate):
+        if wav_length is None or wav_length < (0.5 * self.sample_rate):
             # Ultra short clips are also useless (and can cause problems within some models).
             raise ValueError
 
         if self.use_masking_gt_prompt_approach:
             # get a slice from GT to condition the model
-            cond, _, cond_idxs = get_prompt_slice(
-                audiopath, self.max_conditioning_length, self.min_conditioning_length, self.sample_rate, self.is_eval
-            )
-            # if use masking do not use cond_len
-            cond_len = torch.nan
+            ref_sample = audiopath
         else:
             ref_sample = (
                 sample["reference_path"]
                 if "reference_path" in sample and sample["reference_path"] is not None
                 else audiopath
             )
-            cond, cond_len, _ = get_prompt_slice(
+        if ref_sample != audiopath and self.dvae_cache is not None:
+            entry = self.dvae_cache.load(ref_sample)
+        if entry:
+            cond = None
+            cond_mel, cond_len, cond_idxs = get_prompt_mel_slice(
+                entry["cond_mel"],
+                entry["num_samples"],
+                self.max_conditioning_length,
+                self.min_conditioning_length,
+                self.dvae_cache.cond_hop_length,
+                self.is_eval,
+            )
+        else:
+            cond_mel = None
+            cond, cond_len, cond_idxs = get_prompt_slice(
                 ref_sample, self.max_conditioning_length, self.min_conditioning_length, self.sample_rate, self.is_eval
             )
+        if self.use_masking_gt_prompt_approach:
+            # if use masking do not use cond_len
+            cond_len = torch.nan
+        else:
             # if do not use masking use cond_len
             cond_idxs = torch.nan
 
-        return tseq, audiopath, wav, cond, cond_len, cond_idxs
+        return {
+            "text": tseq,
+            "audiopath": audiopath,
+            "wav": wav,
+            "wav_length": wav_length,
+            "audio_codes": codes,
+            "cond": cond,
+            "cond_mel": cond_mel,
+            "cond_len": cond_len,
+            "cond_idxs": cond_idxs,
+        }
 
     def __getitem__(self, index):
         if self.is_eval:
@@ -157,24 +209,31 @@ class XTTSDataset(torch.utils.data.Dataset):
 
         # try to load the sample, if fails added it to the failed samples list
         try:
-            tseq, audiopath, wav, cond, cond_len, cond_idxs = self.load_item(sample)
+            item = self.load_item(sample)
         except:
             if self.debug_failures:
                 print(f"error loading {sample['audio_file']} {sys.exc_info()}")
             self.failed_samples.add(sample_id)
             return self[1]
 
+        tseq, wav_length, cond, cond_len, cond_idxs = (
+            item["text"],
+            item["wav_length"],
+            item["cond"],
+            item["cond_len"],
+            item["cond_idxs"],
+        )
         # check if the audio and text size limits and if it out of the limits, added it failed_samples
         if (
-            wav is None
-            or (self.max_wav_len is not None and wav.shape[-1] > self.max_wav_len)
+            wav_length is None
+            or (self.max_wav_len is not None and wav_length > self.max_wav_len)
             or (self.max_text_len is not None and tseq.shape[0] > self.max_text_len)
         ):
             # Basically, this audio file is nonexistent or too long to be supported by the dataset.
             # It's hard to handle this situation properly. Best bet is to return the a random valid token and skew the dataset somewhat as a result.
-            if self.debug_failures and wav is not None and tseq is not None:
+            if self.debug_failures and wav_length is not None and tseq is not None:
                 print(
-                    f"error loading {sample['audio_file']}: ranges are out of bounds; {wav.shape[-1]}, {tseq.shape[0]}"
+                    f"error loading {sample['audio_file']}: ranges are out of bounds; {wav_length}, {tseq.shape[0]}"
                 )
             self.failed_samples.add(sample_id)
             return self[1]
@@ -183,15 +242,18 @@ class XTTSDataset(torch.utils.data.Dataset):
             # 'real_text': text,
             "text": tseq,
             "text_lengths": torch.tensor(tseq.shape[0], dtype=torch.long),
-            "wav": wav,
-            "wav_lengths": torch.tensor(wav.shape[-1], dtype=torch.long),
-            "filenames": audiopath,
-            "conditioning": cond.unsqueeze(1),
+            "wav": item["wav"],
+            "wav_lengths": torch.tensor(wav_length, dtype=torch.long),
+            "filenames": item["audiopath"],
+            "conditioning": cond.unsqueeze(1) if cond is not None else None,
             "cond_lens": torch.tensor(cond_len, dtype=torch.long)
             if cond_len is not torch.nan
             else torch.tensor([cond_len]),
             "cond_idxs": torch.tensor(cond_idxs) if cond_idxs is not torch.nan else torch.tensor([cond_idxs]),
         }
+        if self.dvae_cache is not None:
+            res["audio_codes"] = item["audio_codes"]
+            res["cond_mel"] = item["cond_mel"]
         return res
 
     def __len__(self):
@@ -205,6 +267,9 @@ class XTTSDataset(torch.utils.data.Dataset):
 
         batch = {k: [dic[k] for dic in batch] for k in batch[0]}
 
+        if self.dvae_cache is not None:
+            self.collate_cached_features(batch)
+
         # stack for features that already have the same shape
         batch["wav_lengths"] = torch.stack(batch["wav_lengths"])
         batch["text_lengths"] = torch.stack(batch["text_lengths"])
@@ -219,7 +284,8 @@ class XTTSDataset(torch.utils.data.Dataset):
             batch["cond_lens"] = None
 
         max_text_len = batch["text_lengths"].max()
-        max_wav_len = batch["wav_lengths"].max()
+        # only the items without cached DVAE codes have a waveform
+        max_wav_len = max([wav.shape[-1] for wav in batch["wav"] if wav is not None], default=0)
 
         # create padding tensors
         text_padded = torch.IntTensor(B, max_text_len)
@@ -232,8 +298,37 @@ class XTTSDataset(torch.utils.data.Dataset):
             text = batch["text"][i]
             text_padded[i, : batch["text_lengths"][i]] = torch.IntTensor(text)
             wav = batch["wav"][i]
-            wav_padded[i, :, : batch["wav_lengths"][i]] = torch.FloatTensor(wav)
+            if wav is not None:
+                wav_padded[i, :, : batch["wav_lengths"][i]] = torch.FloatTensor(wav)
 
         batch["wav"] = wav_padded
         batch["padded_text"] = text_padded
         return batch
+
+    def collate_cached_features(self, batch):
+        """Pad the cached DVAE codes and conditioning mel spectrograms of the batch.
+
+        `codes_cached` and `cond_cached` flag the items read from the DVAE cache. Their padded codes and mel frames
+        are in `cached_audio_codes` and `cached_cond_mels` and their conditioning clip is replaced by zeros, the
+        other items are processed by `GPTTrainer.format_batch_on_device()` as without cache.
+        """
+        B = len(batch["text"])
+        codes = batch.pop("audio_codes")
+        cond_mels = batch.pop("cond_mel")
+        batch["codes_cached"] = torch.tensor([item_codes is not None for item_codes in codes])
+        batch["cond_cached"] = torch.tensor([cond_mel is not None for cond_mel in cond_mels])
+
+        codes_lengths = [item_codes.shape[-1] if item_codes is not None else 0 for item_codes in codes]
+        batch["cached_audio_codes"] = torch.zeros(B, max(codes_lengths), dtype=torch.long)
+        for i, item_codes in enumerate(codes):
+            if item_codes is not None:
+                batch["cached_audio_codes"][i, : codes_lengths[i]] = item_codes
+
+        n_mel = max([cond_mel.shape[0] for cond_mel in cond_mels if cond_mel is not None], default=0)
+        cond_mel_lengths = [cond_mel.shape[-1] if cond_mel is not None else 0 for cond_mel in cond_mels]
+        batch["cached_cond_mels"] = torch.zeros(B, 1, n_mel, max(cond_mel_lengths))
+        batch["cached_cond_mel_lengths"] = torch.tensor(cond_mel_lengths, dtype=torch.long)
+        for i, cond_mel in enumerate(cond_mels):
+            if cond_mel is not None:
+                batch["cached_cond_mels"][i, 0, :, : cond_mel_lengths[i]] = cond_mel
+                batch["conditioning"][i] = torch.zeros(1, 1, self.max_conditioning_length)
@@ -0,0 +1,98 @@
+import hashlib
+import json
+import os
+
+import torch
+import torch.utils.data
+
+from TTS.tts.models.xtts import load_audio
+
+
+def clip_key(audio_path):
+    """Key of an audio file: hash of its absolute path, size and modification time.
+
+    The key changes when the file is rewritten, and it is computed from `os.stat()` alone, so looking up a clip
+    does not read the audio.
+    """
+    stat = os.stat(audio_path)
+    key_str = f"{os.path.abspath(audio_path)}|{stat.st_size}|{stat.st_mtime_ns}"
+    return hashlib.sha256(key_str.encode("utf-8")).hexdigest()
+
+
+class DVAECodeCache:
+    """On-disk cache of the DVAE codes and the conditioning mel spectrogram of the XTTS GPT training clips.
+
+    Every entry is a `.pt` file with the DVAE codes of the whole clip (`codes`), the style encoder mel spectrogram
+    of the whole clip (`cond_mel`) and its length in samples at the training sample rate (`num_samples`). The
+    entries are stored in a sub folder named after the hash of `settings`, so the codes computed with another DVAE
+    checkpoint, mel normalization or sample rate are never reused. Files are written atomically, so the data
+    loader workers and several training processes can share a cache folder.
+
+    Args:
+        cache_dir (str): Root folder of the cache.
+        settings (Dict): JSON serializable settings the cached values depend on. `cond_hop_length` is required to
+            slice the cached conditioning mel spectrograms.
+    """
+
+    def __init__(self, cache_dir, settings):
+        self.settings = settings
+        self.cond_hop_length = settings["cond_hop_length"]
+        settings_hash = hashlib.sha256(json.dumps(settings, sort_keys=True).encode("utf-8")).hexdigest()[:16]
+        self.cache_dir = os.path.join(cache_dir, settings_hash)
+        os.makedirs(self.cache_dir, exist_ok=True)
+        settings_file = os.path.join(self.cache_dir, "settings.json")
+        if not os.path.exists(settings_file):
+            with open(settings_file, "w", encoding="utf-8") as f:
+                json.dump(settings, f, indent=2, sort_keys=True)
+
+    def entry_path(self, audio_path):
+        key = clip_key(audio_path)
+        return os.path.join(self.cache_dir, key[:2], f"{key}.pt")
+
+    def load(self, audio_path):
+        """Return the cached entry of the clip as a dict, empty if the clip is not cached."""
+        try:
+            return torch.load(self.entry_path(audio_path), map_location=torch.device("cpu"))
+        except (FileNotFoundError, EOFError, RuntimeError):
+            return {}
+
+    def save(self, audio_path, codes, cond_mel, num_samples):
+        """Store the DVAE codes `[T_codes]` and the conditioning mel spectrogram `[n_mel, T_mel]` of the clip."""
+        path = self.entry_path(audio_path)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        entry = {
+            "codes": codes.detach().to("cpu", torch.int16 if codes.max() < 2**15 else torch.int32),
+            "cond_mel": cond_mel.detach().float().cpu(),
+            "num_samples": int(num_samples),
+        }
+        tmp_path = f"{path}.{os.getpid()}.tmp"
+        torch.save(entry, tmp_path)
+        os.replace(tmp_path, path)
+
+    def __contains__(self, audio_path):
+        return os.path.exists(self.entry_path(audio_path))
+
+
+class AudioFileDataset(torch.utils.data.Dataset):
+    """Load audio files in the data loader workers for `GPTTrainer.precompute_dvae_cache()`."""
+
+    def __init__(self, audio_paths, sample_rate):
+        self.audio_paths = audio_paths
+        self.sample_rate = sample_rate
+
+    def __len__(self):
+        return len(self.audio_paths)
+
+    def __getitem__(self, idx):
+        audio_path = self.audio_paths[idx]
+        try:
+            wav = load_audio(audio_path, self.sample_rate)
+        except Exception as e:  # pylint: disable=broad-except
+            # unreadable clips are skipped, `XTTSDataset` ignores them as well
+            print(f" [!] Failed to load {audio_path}: {e}")
+            wav = None
+        return audio_path, wav
+
+    @staticmethod
+    def collate_fn(batch):
+        return batch
@@ -1,3 +1,5 @@
+import math
+import os
 from dataclasses import dataclass, field
 from typing import Dict, List, Tuple, Union
 
@@ -7,6 +9,7 @@ import torchaudio
 from coqpit import Coqpit
 from torch.nn import functional as F
 from torch.utils.data import DataLoader
+from tqdm import tqdm
 from trainer.torch import DistributedSampler
 from trainer.trainer_utils import get_optimizer, get_scheduler
 
@@ -16,9 +19,11 @@ from TTS.tts.layers.tortoise.arch_utils import TorchMelSpectrogram
 from TTS.tts.layers.xtts.dvae import DiscreteVAE
 from TTS.tts.layers.xtts.tokenizer import VoiceBpeTokenizer
 from TTS.tts.layers.xtts.trainer.dataset import XTTSDataset
+from TTS.tts.layers.xtts.trainer.dvae_cache import AudioFileDataset, DVAECodeCache
 from TTS.tts.models.base_tts import BaseTTS
 from TTS.tts.models.xtts import Xtts, XttsArgs, XttsAudioConfig
 from TTS.utils.io import load_fsspec
+from TTS.utils.synthesis_cache import hash_tensors
 
 
 @dataclass
@@ -49,6 +54,7 @@ class GPTArgs(XttsArgs):
     tokenizer_file: str = ""
     mel_norm_file: str = "https://coqui.gateway.scarf.sh/v0.14.0_models/mel_norms.pth"
     dvae_checkpoint: str = ""
+    dvae_cache_path: str = ""  # if defined the DVAE codes and conditioning mels of the clips are cached in this folder
     xtts_checkpoint: str = ""
     gpt_checkpoint: str = ""  # if defined it will replace the gpt weights on xtts model
     vocoder: str = ""  # overide vocoder key on the config to avoid json write issues
@@ -195,6 +201,12 @@ class GPTTrainer(BaseTTS):
             mel_norm_file=self.args.mel_norm_file, sampling_rate=config.audio.dvae_sample_rate
         )
 
+        # DVAE codes and conditioning mels cache, written through by `format_batch_on_device()`
+        self.dvae_cache = None
+        self.dvae_silence_code = None
+        if self.args.dvae_cache_path:
+            self.dvae_cache = DVAECodeCache(self.args.dvae_cache_path, self.get_dvae_cache_settings())
+
     @property
     def device(self):
         return next(self.parameters()).device
@@ -261,21 +273,37 @@ class GPTTrainer(BaseTTS):
         batch["wav_lengths"] = batch["wav_lengths"]
         batch["text_inputs"] = batch["padded_text"]
         batch["cond_idxs"] = batch["cond_idxs"]
-        # compute conditioning mel specs
+        if "codes_cached" in batch:
+            self.format_cached_features(batch)
+        else:
+            # compute conditioning mel specs
+            batch["cond_mels"] = self.compute_cond_mels(batch["conditioning"])
+            # compute codes using DVAE
+            batch["audio_codes"] = self.compute_dvae_codes(batch["wav"])
+        # delete useless batch tensors
+        del batch["padded_text"]
+        del batch["wav"]
+        del batch["conditioning"]
+        return batch
+
+    def compute_cond_mels(self, conditioning):
+        """Compute the conditioning mel specs `[B, num_cond_samples, n_mel, T_mel]` of the clips
+        `[B, num_cond_samples, 1, T]`."""
         # transform waves from torch.Size([B, num_cond_samples, 1, T] to torch.Size([B * num_cond_samples, 1, T] because if is faster than iterate the tensor
-        B, num_cond_samples, C, T = batch["conditioning"].size()
-        conditioning_reshaped = batch["conditioning"].view(B * num_cond_samples, C, T)
+        B, num_cond_samples, C, T = conditioning.size()
+        conditioning_reshaped = conditioning.view(B * num_cond_samples, C, T)
         paired_conditioning_mel = self.torch_mel_spectrogram_style_encoder(conditioning_reshaped)
         # transform torch.Size([B * num_cond_samples, n_mel, T_mel]) in torch.Size([B, num_cond_samples, n_mel, T_mel])
         n_mel = self.torch_mel_spectrogram_style_encoder.n_mel_channels  # paired_conditioning_mel.size(1)
         T_mel = paired_conditioning_mel.size(2)
         paired_conditioning_mel = paired_conditioning_mel.view(B, num_cond_samples, n_mel, T_mel)
-        # get the conditioning embeddings
-        batch["cond_mels"] = paired_conditioning_mel
-        # compute codes using DVAE
+        return paired_conditioning_mel
+
+    def compute_dvae_codes(self, wav):
+        """Compute the DVAE codes `[B, T_codes]` of the waveforms `[B, 1, T]` at `config.audio.sample_rate`."""
         if self.config.audio.sample_rate != self.config.audio.dvae_sample_rate:
             dvae_wav = torchaudio.functional.resample(
-                batch["wav"],
+                wav,
                 orig_freq=self.config.audio.sample_rate,
                 new_freq=self.config.audio.dvae_sample_rate,
                 lowpass_filter_width=64,
@@ -284,16 +312,121 @@ class GPTTrainer(BaseTTS):
                 beta=14.769656459379492,
             )
         else:
-            dvae_wav = batch["wav"]
+            dvae_wav = wav
         dvae_mel_spec = self.torch_mel_spectrogram_dvae(dvae_wav)
         codes = self.dvae.get_codebook_indices(dvae_mel_spec)
-
+        return codes
+
+    def num_dvae_codes(self, num_samples):
+        """Number of DVAE codes of a clip of `num_samples` samples at `config.audio.sample_rate`."""
+        num_samples = num_samples * self.config.audio.dvae_sample_rate // self.config.audio.sample_rate
+        num_frames = num_samples // self.torch_mel_spectrogram_dvae.hop_length + 1
+        # every DVAE encoder layer downsamples the mel frames by 2
+        return math.ceil(num_frames / 2**self.dvae.num_layers)
+
+    def format_cached_features(self, batch):
+        """Merge the cached DVAE codes and conditioning mel specs of a batch with the ones computed for the items
+        that are not cached yet, and write these through to the DVAE cache."""
+        codes_cached = batch.pop("codes_cached")
+        cond_cached = batch.pop("cond_cached")
+        cached_codes = batch.pop("cached_audio_codes")
+        cached_cond_mels = batch.pop("cached_cond_mels")
+        cached_cond_mel_lengths = batch.pop("cached_cond_mel_lengths")
+        wav_lengths = batch["wav_lengths"].tolist()
+
+        # the cached conditioning mels are padded with the mel of silence like the zero padded conditioning clips
+        B, num_cond_samples, _, T = batch["conditioning"].size()
+        hop_length = self.torch_mel_spectrogram_style_encoder.hop_length
+        silence = batch["conditioning"].new_zeros(1, 1, self.torch_mel_spectrogram_style_encoder.filter_length)
+        silence_mel = self.torch_mel_spectrogram_style_encoder(silence)
+        cond_mels = silence_mel[:, None, :, :1].repeat(B, num_cond_samples, 1, T // hop_length + 1)
+        if not cond_cached.all():
+            idxs = (~cond_cached).nonzero().squeeze(1)
+            cond_mels[idxs] = self.compute_cond_mels(batch["conditioning"][idxs])
+        for i in cond_cached.nonzero().squeeze(1).tolist():
+            num_frames = cached_cond_mel_lengths[i]
+            cond_mels[i, :, :, :num_frames] = cached_cond_mels[i, :, :, :num_frames]
+        batch["cond_mels"] = cond_mels
+
+        # the cached codes are padded with the code of silence like the codes of the zero padded waveforms
+        if self.dvae_silence_code is None:
+            silence = batch["wav"].new_zeros(1, 1, 4 * self.config.audio.sample_rate)
+            # the codes at the clip edges see the padding of the DVAE convolutions and may differ, so take the most
+            # frequent code of the silent clip
+            self.dvae_silence_code = int(torch.mode(self.compute_dvae_codes(silence)[0]).values)
+        num_codes = self.num_dvae_codes(max(wav_lengths))
+        codes = torch.full((B, num_codes), self.dvae_silence_code, device=cached_codes.device)
+        for i in codes_cached.nonzero().squeeze(1).tolist():
+            num_codes = min(self.num_dvae_codes(wav_lengths[i]), codes.shape[1])
+            codes[i, :num_codes] = cached_codes[i, :num_codes]
+        if not codes_cached.all():
+            idxs = (~codes_cached).nonzero().squeeze(1)
+            computed_codes = self.compute_dvae_codes(batch["wav"][idxs])
+            codes[idxs, : computed_codes.shape[1]] = computed_codes
+            if self.dvae_cache is not None:
+                for i, item_codes in zip(idxs.tolist(), computed_codes):
+                    wav = batch["wav"][i : i + 1, :, : wav_lengths[i]]
+                    self.dvae_cache.save(
+                        batch["filenames"][i],
+                        item_codes[: self.num_dvae_codes(wav_lengths[i])],
+                        self.torch_mel_spectrogram_style_encoder(wav)[0],
+                        wav_lengths[i],
+                    )
         batch["audio_codes"] = codes
-        # delete useless batch tensors
-        del batch["padded_text"]
-        del batch["wav"]
-        del batch["conditioning"]
-        return batch
+
+    def get_dvae_cache_settings(self):
+        """Settings the cached DVAE codes and conditioning mels depend on."""
+        if not self.args.dvae_checkpoint or not os.path.isfile(self.args.dvae_checkpoint):
+            raise RuntimeError(
+                "The DVAE cache (config.model_args.dvae_cache_path) needs a local config.model_args.dvae_checkpoint "
+                f"file, got {self.args.dvae_checkpoint!r}."
+            )
+        mel_norms = self.torch_mel_spectrogram_dvae.mel_norms
+        return {
+            "dvae_checkpoint": os.path.abspath(self.args.dvae_checkpoint),
+            "dvae_checkpoint_mtime": os.path.getmtime(self.args.dvae_checkpoint),
+            "mel_norm_file": self.args.mel_norm_file,
+            # the norms may be loaded from a URL, so their content is hashed instead of the file mtime
+            "mel_norms_hash": hash_tensors(mel_norms) if mel_norms is not None else None,
+            "sample_rate": self.config.audio.sample_rate,
+            "dvae_sample_rate": self.config.audio.dvae_sample_rate,
+            "gpt_num_audio_tokens": self.args.gpt_num_audio_tokens,
+            "cond_filter_length": self.torch_mel_spectrogram_style_encoder.filter_length,
+            "cond_hop_length": self.torch_mel_spectrogram_style_encoder.hop_length,
+            "cond_win_length": self.torch_mel_spectrogram_style_encoder.win_length,
+        }
+
+    @torch.no_grad()
+    def precompute_dvae_cache(self, samples, num_workers=0):
+        """Compute the DVAE codes and conditioning mels of the clips and reference clips of the samples that are not
+        in the DVAE cache yet, so the training skips the DVAE from the first epoch.
+
+        Args:
+            samples (List[Dict]): Training and eval samples.
+            num_workers (int, optional): Number of data loader workers loading the audio. Defaults to 0.
+        """
+        if self.dvae_cache is None:
+            raise RuntimeError(" [!] Set `config.model_args.dvae_cache_path` to precompute the DVAE cache.")
+        audio_paths = set()
+        for sample in samples:
+            audio_paths.add(sample["audio_file"])
+            if sample.get("reference_path") is not None:
+                audio_paths.add(sample["reference_path"])
+        audio_paths = sorted(path for path in audio_paths if os.path.exists(path) and path not in self.dvae_cache)
+        dataset = AudioFileDataset(audio_paths, self.config.audio.sample_rate)
+        loader = DataLoader(dataset, batch_size=1, num_workers=num_workers, collate_fn=dataset.collate_fn)
+        for batch in tqdm(loader, desc=" > Computing DVAE codes"):
+            for audio_path, wav in batch:
+                if wav is None:
+                    continue
+                wav = wav.unsqueeze(0).to(self.device)
+                self.dvae_cache.save(
+                    audio_path,
+                    self.compute_dvae_codes(wav)[0],
+                    self.torch_mel_spectrogram_style_encoder(wav)[0],
+                    wav.shape[-1],
+                )
+        print(f" > {len(audio_paths)} clips added to the DVAE cache {self.dvae_cache.cache_dir}")
 
     def train_step(self, batch, criterion):
         loss_dict = {}
@@ -364,7 +497,9 @@ class GPTTrainer(BaseTTS):
             loader = None
         else:
             # init dataloader
-            dataset = XTTSDataset(self.config, samples, self.xtts.tokenizer, config.audio.sample_rate, is_eval)
+            dataset = XTTSDataset(
+                self.config, samples, self.xtts.tokenizer, config.audio.sample_rate, is_eval, self.dvae_cache
+            )
 
             # wait all the DDP process to be ready
             if num_gpus > 1:
@@ -1,4 +1,7 @@
+import functools
 import os
+import time
+from collections import OrderedDict
 from dataclasses import dataclass
 
 import librosa
@@ -6,18 +9,46 @@ import torch
 import torch.nn.functional as F
 import torchaudio
 from coqpit import Coqpit
+from transformers import LogitsProcessorList
 
-from TTS.tts.layers.xtts.gpt import GPT
+from TTS.tts.layers.xtts.decode_scheduler import GPTDecodeScheduler
+from TTS.tts.layers.xtts.gpt import GPT, PerSequenceTemperatureLogitsWarper
 from TTS.tts.layers.xtts.hifigan_decoder import HifiDecoder
+from TTS.tts.layers.xtts.inference_optimizer import optimize_for_inference
+from TTS.tts.layers.xtts.quantization import quantize_gpt
 from TTS.tts.layers.xtts.stream_generator import init_stream_support
+from TTS.tts.layers.xtts.stream_vocoder import StreamingVocoder
 from TTS.tts.layers.xtts.tokenizer import VoiceBpeTokenizer, split_sentence
 from TTS.tts.layers.xtts.xtts_manager import SpeakerManager, LanguageManager
 from TTS.tts.models.base_tts import BaseTTS
 from TTS.utils.io import load_fsspec
+from TTS.utils.synthesis_cache import fixed_seed, hash_tensors
 
 init_stream_support()
 
 
+class InferenceCancelled(Exception):
+    """Raised by `Xtts.inference_variations()` when its `cancel_event` is set."""
+
+
+@functools.lru_cache(maxsize=None)
+def get_mel_transform(device, n_fft, hop_length, win_length, power, normalized, sample_rate, f_min, f_max, n_mels):
+    """Return the `MelSpectrogram` of the given device and parameters, so its window and filterbank are only
+    built once. The transform is stateless and can be shared between threads."""
+    return torchaudio.transforms.MelSpectrogram(
+        n_fft=n_fft,
+        hop_length=hop_length,
+        win_length=win_length,
+        power=power,
+        normalized=normalized,
+        sample_rate=sample_rate,
+        f_min=f_min,
+        f_max=f_max,
+        n_mels=n_mels,
+        norm="slaney",
+    ).to(device)
+
+
 def wav_to_mel_cloning(
     wav,
     mel_norms_file="../experiments/clips_mel_norms.pth",
@@ -45,18 +76,9 @@ def wav_to_mel_cloning(
     Returns:
         torch.Tensor: Mel-spectrogram tensor.
     """
-    mel_stft = torchaudio.transforms.MelSpectrogram(
-        n_fft=n_fft,
-        hop_length=hop_length,
-        win_length=win_length,
-        power=power,
-        normalized=normalized,
-        sample_rate=sample_rate,
-        f_min=f_min,
-        f_max=f_max,
-        n_mels=n_mels,
-        norm="slaney",
-    ).to(device)
+    mel_stft = get_mel_transform(
+        torch.device(device), n_fft, hop_length, win_length, power, normalized, sample_rate, f_min, f_max, n_mels
+    )
     wav = wav.to(device)
     mel = mel_stft(wav)
     mel = torch.log(torch.clamp(mel, min=1e-5))
@@ -129,6 +151,10 @@ class XttsArgs(Coqpit):
         gpt_batch_size (int): The size of the auto-regressive batch.
         enable_redaction (bool, optional): Whether to enable redaction. Defaults to True.
         kv_cache (bool, optional): Whether to use the kv_cache. Defaults to True.
+        static_kv_cache (bool, optional): Whether to keep the kv_cache in preallocated buffers written in place
+            instead of concatenated tensors. Defaults to False.
+        quantization (str, optional): Quantization of the GPT-2 blocks and mel head for CPU inference, None or
+            "dynamic_int8". Defaults to None.
         gpt_checkpoint (str, optional): The checkpoint for the autoregressive model. Defaults to None.
         clvp_checkpoint (str, optional): The checkpoint for the ConditionalLatentVariablePerseq model. Defaults to None.
         decoder_checkpoint (str, optional): The checkpoint for the DiffTTS model. Defaults to None.
@@ -153,6 +179,8 @@ class XttsArgs(Coqpit):
     gpt_batch_size: int = 1
     enable_redaction: bool = False
     kv_cache: bool = True
+    static_kv_cache: bool = False
+    quantization: str = None
     gpt_checkpoint: str = None
     clvp_checkpoint: str = None
     decoder_checkpoint: str = None
@@ -212,6 +240,11 @@ class Xtts(BaseTTS):
 
         self.tokenizer = VoiceBpeTokenizer()
         self.gpt = None
+        self.latent_cache = None  # optional `SpeakerLatentCache` used by `get_conditioning_latents()`
+        # optional `SynthesisResultCache` used by seeded `synthesize()` and `synthesize_variations()` calls
+        self.result_cache = None
+        self.stage_callback = None  # optional `callback(stage, seconds, **info)` to profile the inference stages
+        self.decode_scheduler = None  # optional `GPTDecodeScheduler` shared by concurrent `inference()` calls
         self.init_models()
         self.register_buffer("mel_stats", torch.ones(80))
 
@@ -270,17 +303,22 @@ class Xtts(BaseTTS):
         if length > 0:
             audio = audio[:, : 22050 * length]
         if self.args.gpt_use_perceiver_resampler:
-            style_embs = []
+            # the chunks of the same length, i.e. all of them but the last one, are encoded in one batch
+            chunks_by_length = {}
             for i in range(0, audio.shape[1], 22050 * chunk_length):
                 audio_chunk = audio[:, i : i + 22050 * chunk_length]
 
-                # if the chunk is too short ignore it 
+                # if the chunk is too short ignore it
                 if audio_chunk.size(-1) < 22050 * 0.33:
                     continue
+                chunks_by_length.setdefault(audio_chunk.size(-1), []).append(audio_chunk)
 
-                mel_chunk = wav_to_mel_cloning(
-                    audio_chunk,
-                    mel_norms=self.mel_stats.cpu(),
+            style_embs = []
+            for audio_chunks in chunks_by_length.values():
+                mel_chunks = wav_to_mel_cloning(
+                    torch.cat(audio_chunks, dim=0),
+                    mel_norms=self.mel_stats.to(self.device),
+                    device=self.device,
                     n_fft=2048,
                     hop_length=256,
                     win_length=1024,
@@ -291,15 +329,15 @@ class Xtts(BaseTTS):
                     f_max=8000,
                     n_mels=80,
                 )
-                style_emb = self.gpt.get_style_emb(mel_chunk.to(self.device), None)
-                style_embs.append(style_emb)
+                style_embs.append(self.gpt.get_style_emb(mel_chunks, None))
 
             # mean style embedding
-            cond_latent = torch.stack(style_embs).mean(dim=0)
+            cond_latent = torch.cat(style_embs).mean(dim=0, keepdim=True)
         else:
             mel = wav_to_mel_cloning(
                 audio,
-                mel_norms=self.mel_stats.cpu(),
+                mel_norms=self.mel_stats.to(self.device),
+                device=self.device,
                 n_fft=4096,
                 hop_length=1024,
                 win_length=4096,
@@ -322,6 +360,71 @@ class Xtts(BaseTTS):
             .to(self.device)
         )
 
+    def enable_decode_scheduler(self, max_batch_size=8):
+        """Decode the GPT codes of concurrent `inference()` and `inference_variations()` calls in one running batch.
+
+        The calls block until their codes are decoded by a `GPTDecodeScheduler` worker, then compute the GPT
+        latents and run the HiFi-GAN decoder in their own thread. So several threads can share one model
+        instead of holding a model replica each. Beam search and extra HuggingFace `generate` arguments are not
+        supported by the scheduler, such calls still use `GPT.generate`.
+
+        Args:
+            max_batch_size (int, optional): Maximum number of sequences decoded together. Defaults to 8.
+        """
+        if self.decode_scheduler is not None:
+            self.decode_scheduler.shutdown()
+        self.decode_scheduler = GPTDecodeScheduler(self.gpt, max_batch_size=max_batch_size).start()
+        return self.decode_scheduler
+
+    def optimize_for_inference(self, compile_backend=None, cache_dir=None):
+        """Fold the HiFi-GAN weight norm, fuse the speaker encoder batch norms and optionally compile the decoder.
+
+        Call it once the model is on its inference device. See `inference_optimizer.optimize_for_inference()`.
+
+        Args:
+            compile_backend (str, optional): None, "torchscript" or "compile". Defaults to None.
+            cache_dir (str, optional): Directory where the compiled artifacts are kept between startups.
+                Defaults to None.
+        """
+        return optimize_for_inference(self, compile_backend=compile_backend, cache_dir=cache_dir)
+
+    def quantize(self, mode="dynamic_int8"):
+        """Quantize the GPT-2 blocks and the mel head in place for CPU inference, see `quantize_gpt()`."""
+        quantize_gpt(self.gpt, mode=mode)
+        self.args.quantization = mode
+        self.gpt.init_gpt_for_inference(kv_cache=self.args.kv_cache, static_kv_cache=self.args.static_kv_cache)
+        self.gpt.eval()
+
+    def save_quantized_checkpoint(self, checkpoint_dir):
+        """Save the quantized GPT weights next to `model.pth`, so `load_checkpoint()` loads them without quantizing.
+
+        Only the GPT is saved, the other weights are loaded from `model.pth`. `optimize_for_inference()` changes
+        the weights of the HiFi-GAN decoder and the speaker encoder, so they could not be loaded into an
+        unoptimized model.
+        """
+        if self.args.quantization is None:
+            raise RuntimeError(" ❗ The model is not quantized.")
+        model_path = os.path.join(checkpoint_dir, f"model_{self.args.quantization}.pth")
+        # the state dict keeps the module versions in `_metadata`, the quantized layers need them to load
+        gpt_state = self.gpt.state_dict(prefix="gpt.")
+        if any("._orig_mod." in key for key in gpt_state):
+            # `torch.compile` wraps the conditioning perceiver when optimized with `compile_backend="compile"`
+            metadata = gpt_state._metadata  # pylint: disable=protected-access
+            gpt_state = OrderedDict((key.replace("._orig_mod.", "."), value) for key, value in gpt_state.items())
+            gpt_state._metadata = OrderedDict(  # pylint: disable=protected-access
+                (key.replace("._orig_mod", ""), value) for key, value in metadata.items()
+            )
+        torch.save({"gpt": gpt_state, "quantization": self.args.quantization}, model_path)
+        return model_path
+
+    def _report_stage(self, stage, start_time, **info):
+        """Report the duration of an inference stage to `self.stage_callback`, if any."""
+        if self.stage_callback is None:
+            return
+        if self.device.type == "cuda":
+            torch.cuda.synchronize(self.device)
+        self.stage_callback(stage, time.perf_counter() - start_time, **info)
+
     @torch.inference_mode()
     def get_conditioning_latents(
         self,
@@ -343,6 +446,9 @@ class Xtts(BaseTTS):
             librosa_trim_db (int, optional): Trim the audio using this value. If None, not trimming. Defaults to None.
             sound_norm_refs (bool, optional): Whether to normalize the audio. Defaults to False.
             load_sr (int, optional): Sample rate to load the audio. Defaults to 24000.
+
+        If `self.latent_cache` is set, the latents are looked up by the content hash of the reference audio and
+        the settings above, and are only computed on a cache miss.
         """
         # deal with multiples references
         if not isinstance(audio_path, list):
@@ -350,6 +456,23 @@ class Xtts(BaseTTS):
         else:
             audio_paths = audio_path
 
+        start_time = time.perf_counter()
+        cache_key = None
+        if self.latent_cache is not None:
+            cache_key = self.latent_cache.make_key(
+                audio_paths,
+                max_ref_length=max_ref_length,
+                gpt_cond_len=gpt_cond_len,
+                gpt_cond_chunk_len=gpt_cond_chunk_len,
+                librosa_trim_db=librosa_trim_db,
+                sound_norm_refs=sound_norm_refs,
+                load_sr=load_sr,
+            )
+            cached_latents = self.latent_cache.get(cache_key)
+            if cached_latents is not None:
+                self._report_stage("conditioning", start_time, cache_hit=True)
+                return cached_latents[0].to(self.device), cached_latents[1].to(self.device)
+
         speaker_embeddings = []
         audios = []
         speaker_embedding = None
@@ -377,9 +500,13 @@ class Xtts(BaseTTS):
             speaker_embedding = torch.stack(speaker_embeddings)
             speaker_embedding = speaker_embedding.mean(dim=0)
 
+        if cache_key is not None:
+            self.latent_cache.put(cache_key, gpt_cond_latents, speaker_embedding)
+
+        self._report_stage("conditioning", start_time, cache_hit=False)
         return gpt_cond_latents, speaker_embedding
 
-    def synthesize(self, text, config, speaker_wav, language, speaker_id=None, **kwargs):
+    def synthesize(self, text, config, speaker_wav, language, speaker_id=None, seed=None, **kwargs):
         """Synthesize speech with the given input text.
 
         Args:
@@ -387,12 +514,15 @@ class Xtts(BaseTTS):
             config (XttsConfig): Config with inference parameters.
             speaker_wav (list): List of paths to the speaker audio files to be used for cloning.
             language (str): Language ID of the speaker.
+            seed (int, optional): Seed of the sampling, so the same request gives the same waveform. If set and
+                `self.result_cache` is set, the waveform is looked up by the text, the hash of the speaker latents,
+                the language, the seed and the settings, and is only synthesized on a cache miss. Defaults to None.
             **kwargs: Inference settings. See `inference()`.
 
         Returns:
             A dictionary of the output values with `wav` as output waveform, `deterministic_seed` as seed used at inference,
             `text_input` as text token IDs after tokenizer, `voice_samples` as samples used for cloning, `conditioning_latents`
-            as latents used at inference.
+            as latents used at inference. On a result cache hit, only `wav` is returned, with `cache_hit` set to True.
 
         """
         assert (
@@ -407,6 +537,8 @@ class Xtts(BaseTTS):
             "top_p": config.top_p,
         }
         settings.update(kwargs)  # allow overriding of preset settings with kwargs
+        if seed is not None:
+            return self._synthesize_seeded(text, config, speaker_wav, language, speaker_id, seed, settings)
         if speaker_id is not None:
             gpt_cond_latent, speaker_embedding = self.speaker_manager.speakers[speaker_id].values()
             return self.inference(text, language, gpt_cond_latent, speaker_embedding, **settings)
@@ -418,6 +550,137 @@ class Xtts(BaseTTS):
         })
         return self.full_inference(text, speaker_wav, language, **settings)
 
+    def _synthesize_seeded(self, text, config, speaker_wav, language, speaker_id, seed, settings):
+        gpt_cond_latent, speaker_embedding = self._get_synthesis_conditioning(config, speaker_wav, speaker_id)
+        cache_key = None
+        if self.result_cache is not None:
+            start_time = time.perf_counter()
+            cache_key = self.result_cache.make_key(
+                text, hash_tensors(gpt_cond_latent, speaker_embedding), language, seed, **settings
+            )
+            cached = self.result_cache.get(cache_key)
+            self._report_stage("result_cache", start_time, cache_hit=cached is not None)
+            if cached is not None:
+                return {"wav": cached[0], "cache_hit": True}
+
+        with fixed_seed(seed, self.device):
+            outputs = self.inference(text, language, gpt_cond_latent, speaker_embedding, **settings)
+        if cache_key is not None:
+            self.result_cache.put(cache_key, outputs["wav"], self.args.output_sample_rate)
+        return outputs
+
+    def synthesize_variations(
+        self, text, config, speaker_wav, language, variations, speaker_id=None, seed=None, cancel_event=None, **kwargs
+    ):
+        """Synthesize several variations of the same text in a single batched pass.
+
+        Args:
+            text (str): Input text.
+            config (XttsConfig): Config with inference parameters.
+            speaker_wav (list): List of paths to the speaker audio files to be used for cloning.
+            language (str): Language ID of the speaker.
+            variations (List[dict]): Per variation `temperature` and `speed`. See `inference_variations()`.
+            seed (int, optional): Seed of the sampling, as in `synthesize()`. If set and `self.result_cache` is set,
+                every variation is cached under its own key, and the batch is only synthesized if one of the
+                variations is missing. Defaults to None.
+            cancel_event (threading.Event, optional): Stops the synthesis between text chunks. See
+                `inference_variations()`. Defaults to None.
+            **kwargs: Inference settings shared by all the variations. See `inference_variations()`.
+
+        Returns:
+            A list with one output dictionary per variation, in the format returned by `synthesize()`.
+        """
+        assert (
+            "zh-cn" if language == "zh" else language in self.config.languages
+        ), f" ❗ Language {language} is not supported. Supported languages are {self.config.languages}"
+        settings = {
+            "length_penalty": config.length_penalty,
+            "repetition_penalty": config.repetition_penalty,
+            "top_k": config.top_k,
+            "top_p": config.top_p,
+        }
+        settings.update(kwargs)
+        gpt_cond_latent, speaker_embedding = self._get_synthesis_conditioning(config, speaker_wav, speaker_id)
+        variations = [{"temperature": config.temperature, "speed": 1.0, **variation} for variation in variations]
+        if seed is not None:
+            return self._synthesize_variations_seeded(
+                text, language, gpt_cond_latent, speaker_embedding, variations, seed, settings, cancel_event
+            )
+        return self.inference_variations(
+            text, language, gpt_cond_latent, speaker_embedding, variations, cancel_event=cancel_event, **settings
+        )
+
+    def _synthesize_variations_seeded(
+        self, text, language, gpt_cond_latent, speaker_embedding, variations, seed, settings, cancel_event=None
+    ):
+        cache_keys = None
+        if self.result_cache is not None:
+            start_time = time.perf_counter()
+            speaker = hash_tensors(gpt_cond_latent, speaker_embedding)
+            # the variations are sampled as rows of one batch from the same seed, so the output of a variation
+            # depends on the whole batch, which is part of its key
+            batch = ";".join(f"{variation['temperature']},{variation['speed']}" for variation in variations)
+            cache_keys = [
+                self.result_cache.make_key(
+                    text, speaker, language, seed, **{**settings, **variation, "variation": idx, "batch": batch}
+                )
+                for idx, variation in enumerate(variations)
+            ]
+            cached = [self.result_cache.get(cache_key) for cache_key in cache_keys]
+            cache_hit = all(item is not None for item in cached)
+            self._report_stage("result_cache", start_time, cache_hit=cache_hit)
+            if cache_hit:
+                return [{"wav": item[0], "cache_hit": True} for item in cached]
+
+        with fixed_seed(seed, self.device):
+            outputs = self.inference_variations(
+                text, language, gpt_cond_latent, speaker_embedding, variations, cancel_event=cancel_event, **settings
+            )
+        if cache_keys is not None:
+            for cache_key, output in zip(cache_keys, outputs):
+                self.result_cache.put(cache_key, output["wav"], self.args.output_sample_rate)
+        return outputs
+
+    def synthesize_stream(self, text, config, speaker_wav, language, speaker_id=None, **kwargs):
+        """Synthesize speech with the given input text chunk by chunk.
+
+        Args:
+            text (str): Input text.
+            config (XttsConfig): Config with inference parameters.
+            speaker_wav (list): List of paths to the speaker audio files to be used for cloning.
+            language (str): Language ID of the speaker.
+            **kwargs: Inference settings. See `inference_stream()`.
+
+        Returns:
+            A generator of waveform chunks as returned by `inference_stream()`. Streaming is neither seeded nor
+            served from `self.result_cache`, since the chunks are delivered while they are generated.
+        """
+        assert (
+            "zh-cn" if language == "zh" else language in self.config.languages
+        ), f" ❗ Language {language} is not supported. Supported languages are {self.config.languages}"
+        settings = {
+            "temperature": config.temperature,
+            "length_penalty": config.length_penalty,
+            "repetition_penalty": config.repetition_penalty,
+            "top_k": config.top_k,
+            "top_p": config.top_p,
+        }
+        settings.update(kwargs)
+        gpt_cond_latent, speaker_embedding = self._get_synthesis_conditioning(config, speaker_wav, speaker_id)
+        return self.inference_stream(text, language, gpt_cond_latent, speaker_embedding, **settings)
+
+    def _get_synthesis_conditioning(self, config, speaker_wav, speaker_id=None):
+        if speaker_id is not None:
+            gpt_cond_latent, speaker_embedding = self.speaker_manager.speakers[speaker_id].values()
+            return gpt_cond_latent, speaker_embedding
+        return self.get_conditioning_latents(
+            audio_path=speaker_wav,
+            gpt_cond_len=config.gpt_cond_len,
+            gpt_cond_chunk_len=config.gpt_cond_chunk_len,
+            max_ref_length=config.max_ref_len,
+            sound_norm_refs=config.sound_norm_refs,
+        )
+
     @torch.inference_mode()
     def full_inference(
         self,
@@ -499,6 +762,91 @@ class Xtts(BaseTTS):
             **hf_generate_kwargs,
         )
 
+    def _encode_sentences(self, text, language, enable_text_splitting):
+        if enable_text_splitting:
+            text = split_sentence(text, language, self.tokenizer.char_limits[language])
+        else:
+            text = [text]
+
+        text_tokens_list = []
+        for sent in text:
+            sent = sent.strip().lower()
+            text_tokens = torch.IntTensor(self.tokenizer.encode(sent, lang=language)).to(self.device)
+
+            assert (
+                text_tokens.shape[-1] < self.args.gpt_max_text_tokens
+            ), " ❗ XTTS can only generate text with a maximum of 400 tokens."
+            text_tokens_list.append(text_tokens)
+        return text_tokens_list
+
+    def _pad_codes(self, codes_list):
+        """Right pad the `(1, T)` codes of several sequences with the stop token into one batch."""
+        max_codes_len = max(codes.shape[-1] for codes in codes_list)
+        padded_codes = [
+            F.pad(codes, (0, max_codes_len - codes.shape[-1]), value=self.gpt.stop_audio_token) for codes in codes_list
+        ]
+        return torch.cat(padded_codes, dim=0).to(self.device)
+
+    def _code_lengths(self, gpt_codes):
+        # finished rows are padded with the stop token, keep the first one as in the single row case
+        is_stop = gpt_codes == self.gpt.stop_audio_token
+        return torch.where(
+            is_stop.any(dim=1),
+            is_stop.int().argmax(dim=1) + 1,
+            torch.full_like(is_stop[:, 0], gpt_codes.shape[-1], dtype=torch.long),
+        )
+
+    def _decode_codes(
+        self, text_tokens, text_lens, gpt_codes, code_lens, gpt_cond_latent, speaker_embedding, length_scales
+    ):
+        """Compute the GPT latents of a batch of codes and vocode them in one HiFi-GAN pass.
+
+        Args:
+            text_tokens (Tensor): Right padded text tokens of shape `(B, T_text)`.
+            text_lens (Tensor): Text lengths of shape `(B,)`.
+            gpt_codes (Tensor): Codes padded with the stop token, of shape `(B, T_codes)`.
+            code_lens (Tensor): Code lengths of shape `(B,)`.
+            length_scales (List[float]): Latent length scale of each row.
+
+        Returns:
+            The `(1, T, C)` latents and the 1D wav of each row, both on the CPU.
+        """
+        batch_size = gpt_codes.shape[0]
+        start_time = time.perf_counter()
+        gpt_latents = self.gpt(
+            text_tokens,
+            text_lens,
+            gpt_codes,
+            code_lens * self.gpt.code_stride_len,
+            cond_latents=gpt_cond_latent.expand(batch_size, -1, -1),
+            return_attentions=False,
+            return_latent=True,
+        )
+
+        # the attention is causal, so the stop token padding does not change the latents of shorter rows
+        latents = []
+        for idx in range(batch_size):
+            latent = gpt_latents[idx : idx + 1, : code_lens[idx]]
+            if length_scales[idx] != 1.0:
+                latent = F.interpolate(
+                    latent.transpose(1, 2), scale_factor=length_scales[idx], mode="linear"
+                ).transpose(1, 2)
+            latents.append(latent)
+        self._report_stage("gpt_latents", start_time)
+
+        start_time = time.perf_counter()
+        latent_lens = [latent.shape[1] for latent in latents]
+        max_latent_len = max(latent_lens)
+        batch_latents = torch.cat(
+            [F.pad(latent, (0, 0, 0, max_latent_len - latent.shape[1])) for latent in latents], dim=0
+        )
+        batch_wavs = self.hifigan_decoder(batch_latents, g=speaker_embedding.expand(batch_size, -1, -1))
+        batch_wavs = batch_wavs.cpu().reshape(batch_size, -1)
+        samples_per_latent = batch_wavs.shape[-1] / max_latent_len
+        wavs = [batch_wavs[idx, : round(latent_lens[idx] * samples_per_latent)] for idx in range(batch_size)]
+        self._report_stage("vocoder", start_time)
+        return [latent.cpu() for latent in latents], wavs
+
     @torch.inference_mode()
     def inference(
         self,
@@ -516,65 +864,79 @@ class Xtts(BaseTTS):
         num_beams=1,
         speed=1.0,
         enable_text_splitting=False,
+        sentence_batch_size=8,
         **hf_generate_kwargs,
     ):
         language = language.split("-")[0]  # remove the country code
         length_scale = 1.0 / max(speed, 0.05)
         gpt_cond_latent = gpt_cond_latent.to(self.device)
         speaker_embedding = speaker_embedding.to(self.device)
-        if enable_text_splitting:
-            text = split_sentence(text, language, self.tokenizer.char_limits[language])
-        else:
-            text = [text]
-
+        text_tokens_list = self._encode_sentences(text, language, enable_text_splitting)
+
+        # the sentences of a split text are decoded in batches of `sentence_batch_size` and reassembled in order
+        batch_size = max(sentence_batch_size, 1) if self.gpt_batch_size == 1 else 1
+        use_scheduler = (
+            self.decode_scheduler is not None
+            and num_beams == 1
+            and self.gpt_batch_size == 1
+            and not hf_generate_kwargs
+        )
         wavs = []
         gpt_latents_list = []
-        for sent in text:
-            sent = sent.strip().lower()
-            text_tokens = torch.IntTensor(self.tokenizer.encode(sent, lang=language)).unsqueeze(0).to(self.device)
-
-            assert (
-                text_tokens.shape[-1] < self.args.gpt_max_text_tokens
-            ), " ❗ XTTS can only generate text with a maximum of 400 tokens."
+        for batch_start in range(0, len(text_tokens_list), batch_size):
+            batch_tokens = text_tokens_list[batch_start : batch_start + batch_size]
+            text_lens = torch.tensor([tokens.shape[-1] for tokens in batch_tokens], device=self.device)
+            max_text_len = int(text_lens.max())
+            text_tokens = torch.stack([F.pad(tokens, (0, max_text_len - tokens.shape[-1])) for tokens in batch_tokens])
 
             with torch.no_grad():
-                gpt_codes = self.gpt.generate(
-                    cond_latents=gpt_cond_latent,
-                    text_inputs=text_tokens,
-                    input_tokens=None,
-                    do_sample=do_sample,
-                    top_p=top_p,
-                    top_k=top_k,
-                    temperature=temperature,
-                    num_return_sequences=self.gpt_batch_size,
-                    num_beams=num_beams,
-                    length_penalty=length_penalty,
-                    repetition_penalty=repetition_penalty,
-                    output_attentions=False,
-                    **hf_generate_kwargs,
-                )
-                expected_output_len = torch.tensor(
-                    [gpt_codes.shape[-1] * self.gpt.code_stride_len], device=text_tokens.device
-                )
+                start_time = time.perf_counter()
+                if use_scheduler:
+                    # the sentences join the running batch as separate sequences
+                    futures = [
+                        self.decode_scheduler.submit(
+                            gpt_cond_latent,
+                            tokens.unsqueeze(0),
+                            temperature=temperature,
+                            top_k=top_k,
+                            top_p=top_p,
+                            repetition_penalty=repetition_penalty,
+                            do_sample=do_sample,
+                        )
+                        for tokens in batch_tokens
+                    ]
+                    gpt_codes = self._pad_codes([future.result() for future in futures])
+                else:
+                    gpt_codes = self.gpt.generate(
+                        cond_latents=gpt_cond_latent,
+                        text_inputs=text_tokens,
+                        text_lengths=text_lens if len(batch_tokens) > 1 else None,
+                        input_tokens=None,
+                        do_sample=do_sample,
+                        top_p=top_p,
+                        top_k=top_k,
+                        temperature=temperature,
+                        num_return_sequences=self.gpt_batch_size,
+                        num_beams=num_beams,
+                        length_penalty=length_penalty,
+                        repetition_penalty=repetition_penalty,
+                        output_attentions=False,
+                        **hf_generate_kwargs,
+                    )
+                code_lens = self._code_lengths(gpt_codes)
+                self._report_stage("gpt_generate", start_time, tokens=int(code_lens.sum()))
 
-                text_len = torch.tensor([text_tokens.shape[-1]], device=self.device)
-                gpt_latents = self.gpt(
+                latents, batch_wavs = self._decode_codes(
                     text_tokens,
-                    text_len,
+                    text_lens,
                     gpt_codes,
-                    expected_output_len,
-                    cond_latents=gpt_cond_latent,
-                    return_attentions=False,
-                    return_latent=True,
+                    code_lens,
+                    gpt_cond_latent,
+                    speaker_embedding,
+                    [length_scale] * len(batch_tokens),
                 )
-
-                if length_scale != 1.0:
-                    gpt_latents = F.interpolate(
-                        gpt_latents.transpose(1, 2), scale_factor=length_scale, mode="linear"
-                    ).transpose(1, 2)
-
-                gpt_latents_list.append(gpt_latents.cpu())
-                wavs.append(self.hifigan_decoder(gpt_latents, g=speaker_embedding).cpu().squeeze())
+                gpt_latents_list.extend(latents)
+                wavs.extend(batch_wavs)
 
         return {
             "wav": torch.cat(wavs, dim=0).numpy(),
@@ -582,6 +944,115 @@ class Xtts(BaseTTS):
             "speaker_embedding": speaker_embedding,
         }
 
+    @torch.inference_mode()
+    def inference_variations(
+        self,
+        text,
+        language,
+        gpt_cond_latent,
+        speaker_embedding,
+        variations,
+        # GPT inference
+        length_penalty=1.0,
+        repetition_penalty=10.0,
+        top_k=50,
+        top_p=0.85,
+        do_sample=True,
+        enable_text_splitting=False,
+        cancel_event=None,
+        **hf_generate_kwargs,
+    ):
+        """Generate several variations of the same text in one batched GPT and HiFi-GAN pass.
+
+        The text is tokenized once, the conditioning prefix is embedded once and shared by all the variations,
+        and the variations are sampled as rows of a single `GPT.generate` batch. So the cost of N variations is
+        close to the cost of one.
+
+        Args:
+            variations (List[dict]): One dict per variation with optional `temperature` (defaults to 0.75) and
+                `speed` (defaults to 1.0) keys. All the other inference settings are shared by the variations.
+            cancel_event (threading.Event, optional): Checked before every text chunk. Once it is set, the
+                synthesis stops with `InferenceCancelled` instead of generating the remaining chunks. Defaults to None.
+
+            Other arguments are the same as in `inference()`.
+
+        Returns:
+            A list with one dictionary per variation, in the format returned by `inference()`.
+        """
+        language = language.split("-")[0]  # remove the country code
+        num_variations = len(variations)
+        temperatures = [variation.get("temperature", 0.75) for variation in variations]
+        length_scales = [1.0 / max(variation.get("speed", 1.0), 0.05) for variation in variations]
+        gpt_cond_latent = gpt_cond_latent.to(self.device)
+        speaker_embedding = speaker_embedding.to(self.device)
+
+        wavs = [[] for _ in range(num_variations)]
+        gpt_latents_list = [[] for _ in range(num_variations)]
+        for text_tokens in self._encode_sentences(text, language, enable_text_splitting):
+            if cancel_event is not None and cancel_event.is_set():
+                raise InferenceCancelled()
+            text_tokens = text_tokens.unsqueeze(0)
+            with torch.no_grad():
+                start_time = time.perf_counter()
+                if self.decode_scheduler is not None and not hf_generate_kwargs:
+                    # the variations join the running batch as separate sequences
+                    futures = [
+                        self.decode_scheduler.submit(
+                            gpt_cond_latent,
+                            text_tokens,
+                            temperature=temperature,
+                            top_k=top_k,
+                            top_p=top_p,
+                            repetition_penalty=repetition_penalty,
+                            do_sample=do_sample,
+                        )
+                        for temperature in temperatures
+                    ]
+                    gpt_codes = self._pad_codes([future.result() for future in futures])
+                else:
+                    # the prefix embedding is computed for one row and expanded by `num_return_sequences`
+                    gpt_codes = self.gpt.generate(
+                        cond_latents=gpt_cond_latent,
+                        text_inputs=text_tokens,
+                        input_tokens=None,
+                        do_sample=do_sample,
+                        top_p=top_p,
+                        top_k=top_k,
+                        temperature=1.0,
+                        logits_processor=LogitsProcessorList([PerSequenceTemperatureLogitsWarper(temperatures)]),
+                        num_return_sequences=num_variations,
+                        num_beams=1,
+                        length_penalty=length_penalty,
+                        repetition_penalty=repetition_penalty,
+                        output_attentions=False,
+                        **hf_generate_kwargs,
+                    )
+                code_lens = self._code_lengths(gpt_codes)
+                self._report_stage("gpt_generate", start_time, tokens=int(code_lens.sum()))
+
+                text_lens = torch.tensor([text_tokens.shape[-1]] * num_variations, device=self.device)
+                latents, batch_wavs = self._decode_codes(
+                    text_tokens.repeat(num_variations, 1),
+                    text_lens,
+                    gpt_codes,
+                    code_lens,
+                    gpt_cond_latent,
+                    speaker_embedding,
+                    length_scales,
+                )
+                for idx in range(num_variations):
+                    gpt_latents_list[idx].append(latents[idx])
+                    wavs[idx].append(batch_wavs[idx])
+
+        return [
+            {
+                "wav": torch.cat(wavs[idx], dim=0).numpy(),
+                "gpt_latents": torch.cat(gpt_latents_list[idx], dim=1).numpy(),
+                "speaker_embedding": speaker_embedding,
+            }
+            for idx in range(num_variations)
+        ]
+
     def handle_chunks(self, wav_gen, wav_gen_prev, wav_overlap, overlap_len):
         """Handle chunk formatting in streaming mode"""
         wav_chunk = wav_gen[:-overlap_len]
@@ -617,6 +1088,7 @@ class Xtts(BaseTTS):
         # Streaming
         stream_chunk_size=20,
         overlap_wav_len=1024,
+        vocoder_context_frames=32,
         # GPT inference
         temperature=0.75,
         length_penalty=1.0,
@@ -666,8 +1138,12 @@ class Xtts(BaseTTS):
 
             last_tokens = []
             all_latents = []
-            wav_gen_prev = None
-            wav_overlap = None
+            vocoder = StreamingVocoder(
+                self.hifigan_decoder,
+                speaker_embedding,
+                overlap_len=overlap_wav_len,
+                context_frames=vocoder_context_frames,
+            )
             is_end = False
 
             while not is_end:
@@ -684,10 +1160,9 @@ class Xtts(BaseTTS):
                         gpt_latents = F.interpolate(
                             gpt_latents.transpose(1, 2), scale_factor=length_scale, mode="linear"
                         ).transpose(1, 2)
-                    wav_gen = self.hifigan_decoder(gpt_latents, g=speaker_embedding.to(self.device))
-                    wav_chunk, wav_gen_prev, wav_overlap = self.handle_chunks(
-                        wav_gen.squeeze(), wav_gen_prev, wav_overlap, overlap_wav_len
-                    )
+                    start_time = time.perf_counter()
+                    wav_chunk = vocoder(gpt_latents)
+                    self._report_stage("vocoder", start_time)
                     last_tokens = []
                     yield wav_chunk
 
@@ -707,7 +1182,7 @@ class Xtts(BaseTTS):
 
     def eval(self):  # pylint: disable=redefined-builtin
         """Sets the model to evaluation mode. Overrides the default eval() method to also set the GPT model to eval mode."""
-        self.gpt.init_gpt_for_inference()
+        self.gpt.init_gpt_for_inference(static_kv_cache=self.args.static_kv_cache)
         super().eval()
 
     def get_compatible_checkpoint_state_dict(self, model_path):
@@ -738,6 +1213,8 @@ class Xtts(BaseTTS):
         strict=True,
         use_deepspeed=False,
         speaker_file_path=None,
+        optimize=False,
+        quantization=None,
     ):
         """
         Loads a checkpoint from disk and initializes the model's state and tokenizer.
@@ -749,6 +1226,11 @@ class Xtts(BaseTTS):
             vocab_path (str, optional): The path to the vocabulary file. Defaults to None.
             eval (bool, optional): Whether to set the model to evaluation mode. Defaults to True.
             strict (bool, optional): Whether to strictly enforce that the keys in the checkpoint match the keys in the model. Defaults to True.
+            optimize (bool, optional): Whether to fold the weight norm and batch norms of the HiFi-GAN decoder and
+                speaker encoder for inference, see `optimize_for_inference()`. Requires `eval`. Defaults to False.
+            quantization (str, optional): Quantize the model for CPU inference, see `XttsArgs.quantization`. If
+                `checkpoint_dir` has a checkpoint saved by `save_quantized_checkpoint()`, its GPT weights replace the
+                ones of `model.pth`. Requires `eval`. Defaults to `self.args.quantization`.
 
         Returns:
             None
@@ -766,22 +1248,46 @@ class Xtts(BaseTTS):
         if os.path.exists(vocab_path):
             self.tokenizer = VoiceBpeTokenizer(vocab_file=vocab_path)
 
+        quantization = quantization or self.args.quantization
+        if quantization is not None and not eval:
+            raise ValueError(" ❗ Quantized models can only be loaded for inference.")
+        quantized_model_path = None
+        if quantization is not None and checkpoint_path is None:
+            quantized_model_path = os.path.join(checkpoint_dir, f"model_{quantization}.pth")
+            if not os.path.exists(quantized_model_path):
+                quantized_model_path = None
+
         self.init_models()
 
         checkpoint = self.get_compatible_checkpoint_state_dict(model_path)
+        if quantized_model_path is not None:
+            # the quantized layers must exist to load their weights
+            self.quantize(quantization)
+            # the quantized GPT replaces the float one of `model.pth`
+            gpt_state = load_fsspec(quantized_model_path, map_location=torch.device("cpu"))["gpt"]
+            gpt_state.update((key, value) for key, value in checkpoint.items() if not key.startswith("gpt."))
+            checkpoint = gpt_state
 
         # deal with v1 and v1.1. V1 has the init_gpt_for_inference keys, v1.1 do not
         try:
             self.load_state_dict(checkpoint, strict=strict)
         except:
             if eval:
-                self.gpt.init_gpt_for_inference(kv_cache=self.args.kv_cache)
+                self.gpt.init_gpt_for_inference(
+                    kv_cache=self.args.kv_cache, static_kv_cache=self.args.static_kv_cache
+                )
             self.load_state_dict(checkpoint, strict=strict)
 
         if eval:
             self.hifigan_decoder.eval()
-            self.gpt.init_gpt_for_inference(kv_cache=self.args.kv_cache, use_deepspeed=use_deepspeed)
+            self.gpt.init_gpt_for_inference(
+                kv_cache=self.args.kv_cache, use_deepspeed=use_deepspeed, static_kv_cache=self.args.static_kv_cache
+            )
             self.gpt.eval()
+            if quantization is not None and quantized_model_path is None:
+                self.quantize(quantization)
+            if optimize:
+                self.optimize_for_inference()
 
     def train_step(self):
         raise NotImplementedError(
@@ -0,0 +1,120 @@
+import io
+import struct
+
+import numpy as np
+import soundfile as sf
+
+# sample rates supported by the Opus encoder of libsndfile, Vorbis is used for the others
+OPUS_SAMPLE_RATES = (8000, 12000, 16000, 24000, 48000)
+STREAM_FORMATS = {"wav": "audio/wav", "ogg": "audio/ogg"}
+
+
+def wav_stream_header(sample_rate: int, num_channels: int = 1, bits_per_sample: int = 16) -> bytes:
+    """Return the header of a PCM WAV stream of unknown length.
+
+    The RIFF and data chunk sizes are set to `0xFFFFFFFF`, which browsers, ffmpeg and soundfile read as
+    "until the end of the stream".
+    """
+    block_align = num_channels * bits_per_sample // 8
+    return (
+        b"RIFF"
+        + struct.pack("<I", 0xFFFFFFFF)
+        + b"WAVEfmt "
+        + struct.pack(
+            "<IHHIIHH", 16, 1, num_channels, sample_rate, sample_rate * block_align, block_align, bits_per_sample
+        )
+        + b"data"
+        + struct.pack("<I", 0xFFFFFFFF)
+    )
+
+
+class _StreamSink(io.RawIOBase):
+    """Write-only, non-seekable file collecting the bytes soundfile writes until they are taken."""
+
+    def __init__(self):
+        super().__init__()
+        self._buffer = bytearray()
+        self._position = 0
+
+    def writable(self):
+        return True
+
+    def seekable(self):
+        return False
+
+    def write(self, b):
+        self._buffer.extend(b)
+        self._position += len(b)
+        return len(b)
+
+    def tell(self):
+        return self._position
+
+    def seek(self, offset, whence=io.SEEK_SET):
+        # libsndfile queries the length of the file with no-op seeks, there is nothing to rewrite in a stream
+        return self._position
+
+    def take(self) -> bytes:
+        data = bytes(self._buffer)
+        self._buffer.clear()
+        return data
+
+
+class StreamingAudioEncoder:
+    """Encode waveform chunks to the bytes of an audio stream, as soon as every chunk is available.
+
+    - `wav`: 16-bit PCM WAV with an unknown length header, see `wav_stream_header()`.
+    - `ogg`: Ogg/Opus, or Ogg/Vorbis if Opus does not support the sample rate, with the pages of every
+      chunk flushed after it.
+
+    Unlike `AudioProcessor.save_wav()`, the chunks are not peak normalized, since the peak of the whole
+    utterance is not known yet. They are clipped to [-1, 1].
+
+    Args:
+        sample_rate (int): Sample rate of the waveform.
+        audio_format (str, optional): One of `STREAM_FORMATS`. Defaults to "wav".
+
+    Example:
+        >>> encoder = StreamingAudioEncoder(24000, "ogg")
+        >>> data = encoder.header() + b"".join(encoder.encode(chunk) for chunk in chunks) + encoder.close()
+    """
+
+    def __init__(self, sample_rate: int, audio_format: str = "wav"):
+        if audio_format not in STREAM_FORMATS:
+            raise ValueError(f" ❗ Unknown audio format {audio_format}, use one of {list(STREAM_FORMATS)}.")
+        self.sample_rate = sample_rate
+        self.audio_format = audio_format
+        self._sink = None
+        self._file = None
+        if audio_format == "ogg":
+            subtype = "OPUS" if sample_rate in OPUS_SAMPLE_RATES else "VORBIS"
+            self._sink = _StreamSink()
+            self._file = sf.SoundFile(
+                self._sink, mode="w", samplerate=sample_rate, channels=1, format="OGG", subtype=subtype
+            )
+
+    @property
+    def mimetype(self) -> str:
+        return STREAM_FORMATS[self.audio_format]
+
+    def header(self) -> bytes:
+        """Bytes to send before the first chunk."""
+        if self.audio_format == "wav":
+            return wav_stream_header(self.sample_rate)
+        return self._sink.take()
+
+    def encode(self, chunk: np.ndarray) -> bytes:
+        """Encode a waveform chunk and return the new bytes of the stream."""
+        chunk = np.clip(np.asarray(chunk, dtype=np.float32), -1.0, 1.0)
+        if self.audio_format == "wav":
+            return (chunk * 32767).astype("<i2").tobytes()
+        self._file.write(chunk)
+        self._file.flush()
+        return self._sink.take()
+
+    def close(self) -> bytes:
+        """Finish the stream and return its last bytes."""
+        if self._file is None or self._file.closed:
+            return b""
+        self._file.close()
+        return self._sink.take()
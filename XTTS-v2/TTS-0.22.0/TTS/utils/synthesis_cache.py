@@ -0,0 +1,133 @@
+import contextlib
+import hashlib
+import os
+import threading
+import unicodedata
+
+import numpy as np
+import soundfile as sf
+import torch
+
+# container and subtype of the cached audio: `wav` keeps the float32 samples as they are, `flac` stores 16-bit PCM
+# and takes about 3 times less space
+AUDIO_FORMATS = {"wav": ("WAV", "FLOAT"), "flac": ("FLAC", "PCM_16")}
+
+
+def normalize_text(text):
+    """Normalize the input text for the cache key: Unicode NFC and collapsed whitespace."""
+    return " ".join(unicodedata.normalize("NFC", text).split())
+
+
+def hash_tensors(*tensors):
+    """Compute a content hash of the given tensors, e.g. the XTTS speaker latents."""
+    hash_func = hashlib.sha256()
+    for tensor in tensors:
+        tensor = torch.as_tensor(tensor).detach().to("cpu", torch.float32).contiguous()
+        hash_func.update(str(tuple(tensor.shape)).encode("utf-8"))
+        hash_func.update(tensor.numpy().tobytes())
+    return hash_func.hexdigest()
+
+
+@contextlib.contextmanager
+def fixed_seed(seed, device=None):
+    """Run the block with the torch random generators seeded with `seed` and restore their state afterwards.
+
+    The CUDA generator of `device` is forked too, so sampling on GPU is reproducible as well. The generators are
+    global, so the outputs are only reproducible if no other thread samples at the same time.
+    """
+    devices = []
+    if device is not None and torch.device(device).type == "cuda":
+        devices = [torch.device(device).index or 0]
+    with torch.random.fork_rng(devices=devices):
+        torch.manual_seed(seed)
+        yield
+
+
+class SynthesisResultCache:
+    """On-disk cache of synthesized waveforms for repeated requests.
+
+    Entries are keyed by the normalized text, the speaker (e.g. the hash of the speaker latents), the language,
+    the seed and the synthesis settings. The audio is stored as one file per entry in `cache_dir`, and the least
+    recently used files are removed once they take more than `max_bytes`. Only seeded syntheses should be cached,
+    so a cache hit returns what the model would generate again. The cache is thread safe.
+
+    Args:
+        cache_dir (str): Directory of the cached audio files.
+        max_bytes (int, optional): Maximum total size of the cached files. Defaults to 1 GiB.
+        namespace (str, optional): Extra string mixed in the keys, e.g. the checkpoint name, so outputs of
+            different models never collide. Defaults to "".
+        audio_format (str, optional): Format of the cached audio, one of `AUDIO_FORMATS`. Defaults to "wav".
+    """
+
+    def __init__(self, cache_dir, max_bytes=1 << 30, namespace="", audio_format="wav"):
+        if audio_format not in AUDIO_FORMATS:
+            raise ValueError(f" ❗ Unknown audio format {audio_format}, expected one of {tuple(AUDIO_FORMATS)}.")
+        self.cache_dir = cache_dir
+        self.max_bytes = max_bytes
+        self.namespace = namespace
+        self.audio_format = audio_format
+        self._lock = threading.Lock()
+        os.makedirs(self.cache_dir, exist_ok=True)
+
+    def make_key(self, text, speaker, language, seed, **settings):
+        """Build the cache key for the given text, speaker hash or name, language, seed and settings."""
+        settings_str = ",".join(f"{name}={settings[name]}" for name in sorted(settings))
+        key_str = f"{self.namespace}|{normalize_text(text)}|{speaker}|{language}|{seed}|{settings_str}"
+        return hashlib.sha256(key_str.encode("utf-8")).hexdigest()
+
+    def _path(self, key):
+        return os.path.join(self.cache_dir, f"{key}.{self.audio_format}")
+
+    def get(self, key):
+        """Return the cached `(wav, sample_rate)` with `wav` as a float32 array, or None."""
+        path = self._path(key)
+        try:
+            wav, sample_rate = sf.read(path, dtype="float32")
+            # refresh the access time used for the LRU eviction
+            os.utime(path)
+        except (FileNotFoundError, RuntimeError):
+            return None
+        return wav, sample_rate
+
+    def put(self, key, wav, sample_rate):
+        """Store the waveform and evict the least recently used entries over `max_bytes`."""
+        if torch.is_tensor(wav):
+            wav = wav.detach().cpu().numpy()
+        wav = np.asarray(wav, dtype=np.float32).squeeze()
+        file_format, subtype = AUDIO_FORMATS[self.audio_format]
+        path = self._path(key)
+        tmp_path = f"{path}.{threading.get_ident()}.tmp"
+        sf.write(tmp_path, wav, sample_rate, format=file_format, subtype=subtype)
+        os.replace(tmp_path, path)
+        self._evict()
+
+    def _evict(self):
+        with self._lock:
+            entries = []
+            total_bytes = 0
+            for name in os.listdir(self.cache_dir):
+                if not name.endswith(f".{self.audio_format}"):
+                    continue
+                path = os.path.join(self.cache_dir, name)
+                try:
+                    stat = os.stat(path)
+                except FileNotFoundError:
+                    continue
+                entries.append((stat.st_mtime, stat.st_size, path))
+                total_bytes += stat.st_size
+            entries.sort()
+            for _, size, path in entries:
+                if total_bytes <= self.max_bytes:
+                    break
+                try:
+                    os.remove(path)
+                except FileNotFoundError:
+                    pass
+                total_bytes -= size
+
+    def clear(self):
+        """Remove all the cached files."""
+        with self._lock:
+            for name in os.listdir(self.cache_dir):
+                if name.endswith(f".{self.audio_format}"):
+                    os.remove(os.path.join(self.cache_dir, name))
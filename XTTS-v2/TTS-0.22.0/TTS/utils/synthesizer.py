@@ -1,6 +1,6 @@
 import os
 import time
-from typing import List
+from typing import Iterator, List
 
 import numpy as np
 import pysbd
@@ -9,6 +9,7 @@ from torch import nn
 
 from TTS.config import load_config
 from TTS.tts.configs.vits_config import VitsConfig
+from TTS.tts.layers.xtts.latent_cache import hash_audio_files
 from TTS.tts.models import setup_model as setup_tts_model
 from TTS.tts.models.vits import Vits
 
@@ -17,10 +18,14 @@ from TTS.tts.models.vits import Vits
 from TTS.tts.utils.synthesis import synthesis, transfer_voice, trim_silence
 from TTS.utils.audio import AudioProcessor
 from TTS.utils.audio.numpy_transforms import save_wav
+from TTS.utils.synthesis_cache import SynthesisResultCache
 from TTS.vc.models import setup_model as setup_vc_model
 from TTS.vocoder.models import setup_model as setup_vocoder_model
 from TTS.vocoder.utils.generic_utils import interpolate_vocoder_input
 
+# samples of silence added after each sentence
+SENTENCE_SILENCE = 10000
+
 
 class Synthesizer(nn.Module):
     def __init__(
@@ -72,6 +77,7 @@ class Synthesizer(nn.Module):
         self.encoder_config = encoder_config
         self.vc_checkpoint = vc_checkpoint
         self.vc_config = vc_config
+        self.model_dir = model_dir
         self.use_cuda = use_cuda
 
         self.tts_model = None
@@ -86,6 +92,7 @@ class Synthesizer(nn.Module):
         self.seg = self._get_segmenter("en")
         self.use_cuda = use_cuda
         self.voice_dir = voice_dir
+        self.result_cache = None  # optional `SynthesisResultCache` used by seeded `tts()` calls
         if self.use_cuda:
             assert torch.cuda.is_available(), "CUDA is not availabe on this machine."
 
@@ -235,11 +242,11 @@ class Synthesizer(nn.Module):
         """
         return self.seg.segment(text)
 
-    def save_wav(self, wav: List[int], path: str, pipe_out=None) -> None:
+    def save_wav(self, wav: np.ndarray, path: str, pipe_out=None) -> None:
         """Save the waveform as a file.
 
         Args:
-            wav (List[int]): waveform as a list of values.
+            wav (np.ndarray): waveform as an array, a list of values or an iterator of chunks from `tts_chunks()`.
             path (str): output path to save the waveform.
             pipe_out (BytesIO, optional): Flag to stdout the generated TTS wav file for shell pipe.
         """
@@ -248,8 +255,31 @@ class Synthesizer(nn.Module):
             wav = wav.cpu().numpy()
         if isinstance(wav, list):
             wav = np.array(wav)
+        elif not isinstance(wav, np.ndarray):
+            wav = np.concatenate(list(wav))
         save_wav(wav=wav, path=path, sample_rate=self.output_sample_rate, pipe_out=pipe_out)
 
+    def enable_result_cache(self, cache_dir: str, max_bytes: int = 1 << 30, audio_format: str = "wav") -> None:
+        """Cache the outputs of seeded `tts()` calls on disk. See `SynthesisResultCache`.
+
+        Args:
+            cache_dir (str): directory of the cached audio files.
+            max_bytes (int, optional): maximum total size of the cached files. Defaults to 1 GiB.
+            audio_format (str, optional): format of the cached audio, "wav" or "flac". Defaults to "wav".
+        """
+        namespace = "|".join([self.tts_checkpoint, self.vocoder_checkpoint, self.vc_checkpoint, self.model_dir])
+        self.result_cache = SynthesisResultCache(
+            cache_dir, max_bytes=max_bytes, namespace=namespace, audio_format=audio_format
+        )
+
+    def _result_cache_key(self, text, speaker_name, speaker_wav, language_name, seed, **settings):
+        # the reference audio is identified by its content, not by its path
+        speaker = speaker_name or ""
+        if speaker_wav is not None:
+            speaker_wavs = speaker_wav if isinstance(speaker_wav, list) else [speaker_wav]
+            speaker += f"|{hash_audio_files(speaker_wavs)}"
+        return self.result_cache.make_key(text, speaker, language_name, seed, **settings)
+
     def voice_conversion(self, source_wav: str, target_wav: str) -> List[int]:
         output_wav = self.vc_model.voice_conversion(source_wav, target_wav)
         return output_wav
@@ -265,8 +295,9 @@ class Synthesizer(nn.Module):
         reference_wav=None,
         reference_speaker_name=None,
         split_sentences: bool = True,
+        seed: int = None,
         **kwargs,
-    ) -> List[int]:
+    ) -> np.ndarray:
         """🐸 TTS magic. Run all the models and generate speech.
 
         Args:
@@ -279,29 +310,149 @@ class Synthesizer(nn.Module):
             reference_wav ([type], optional): reference waveform for voice conversion. Defaults to None.
             reference_speaker_name ([type], optional): speaker id of reference waveform. Defaults to None.
             split_sentences (bool, optional): split the input text into sentences. Defaults to True.
+            seed (int, optional): seed of the random generators, so the same request gives the same waveform. If set
+                and `self.result_cache` is set, the waveform is only synthesized on a cache miss. Defaults to None.
             **kwargs: additional arguments to pass to the TTS model.
         Returns:
-            List[int]: [description]
+            np.ndarray: float32 waveform. The sentences are concatenated with `SENTENCE_SILENCE` samples of silence
+                after each of them.
         """
         start_time = time.time()
-        wavs = []
 
         if not text and not reference_wav:
             raise ValueError(
                 "You need to define either `text` (for sythesis) or a `reference_wav` (for voice conversion) to use the Coqui TTS API."
             )
 
-        if text:
-            sens = [text]
-            if split_sentences:
-                print(" > Text splitted to sentences.")
-                sens = self.split_into_sentences(text)
-            print(sens)
+        # look up the output of a seeded synthesis
+        cache_key = None
+        if seed is not None and not reference_wav:
+            if self.result_cache is not None:
+                cache_key = self._result_cache_key(
+                    text,
+                    speaker_name,
+                    speaker_wav,
+                    language_name,
+                    seed,
+                    split_sentences=split_sentences,
+                    style_wav=style_wav,
+                    style_text=style_text,
+                    voice_dir=kwargs.get("voice_dir", self.voice_dir),
+                    **{name: value for name, value in kwargs.items() if name != "voice_dir"},
+                )
+                cached = self.result_cache.get(cache_key)
+                if cached is not None:
+                    print(" > Using the cached output.")
+                    return cached[0]
+            torch.manual_seed(seed)
+            # Griffin-Lim starts from random phases
+            np.random.seed(seed)
+
+        if not reference_wav:  # not voice conversion
+            chunks = self.tts_chunks(
+                text,
+                speaker_name=speaker_name,
+                language_name=language_name,
+                speaker_wav=speaker_wav,
+                style_wav=style_wav,
+                style_text=style_text,
+                split_sentences=split_sentences,
+                **kwargs,
+            )
+            # a single copy of the chunks into the output buffer
+            wavs = np.concatenate(list(chunks))
+        else:
+            wavs = self._voice_conversion(
+                reference_wav, speaker_name, language_name, speaker_wav, reference_speaker_name, **kwargs
+            )
+
+        if cache_key is not None:
+            self.result_cache.put(cache_key, wavs, self.output_sample_rate)
+
+        # compute stats
+        process_time = time.time() - start_time
+        audio_time = len(wavs) / self.tts_config.audio["sample_rate"]
+        print(f" > Processing time: {process_time}")
+        print(f" > Real-time factor: {process_time / audio_time}")
+        return wavs
+
+    def tts_chunks(
+        self,
+        text: str,
+        speaker_name: str = "",
+        language_name: str = "",
+        speaker_wav=None,
+        style_wav=None,
+        style_text=None,
+        split_sentences: bool = True,
+        **kwargs,
+    ) -> Iterator[np.ndarray]:
+        """Synthesize the text sentence by sentence and yield the waveform as float32 chunks.
+
+        Every sentence is yielded as soon as it is synthesized, followed by `SENTENCE_SILENCE` samples of silence,
+        so the audio can be encoded or sent without waiting for the whole text. The arguments are the ones of
+        `tts()`. The silence chunk is shared between the sentences and must not be modified.
+
+        Yields:
+            np.ndarray: float32 waveform chunk.
+        """
+        sens = [text]
+        if split_sentences:
+            print(" > Text splitted to sentences.")
+            sens = self.split_into_sentences(text)
+        print(sens)
 
         # handle multi-speaker
         if "voice_dir" in kwargs:
             self.voice_dir = kwargs["voice_dir"]
             kwargs.pop("voice_dir")
+        speaker_id, speaker_embedding = self._get_speaker(speaker_name, speaker_wav)
+        language_id = self._get_language_id(language_name)
+        use_gl, vocoder_device = self._get_vocoder_device()
+
+        silence = np.zeros(SENTENCE_SILENCE, dtype=np.float32)
+        for sen in sens:
+            if hasattr(self.tts_model, "synthesize"):
+                outputs = self.tts_model.synthesize(
+                    text=sen,
+                    config=self.tts_config,
+                    speaker_id=speaker_name,
+                    voice_dirs=self.voice_dir,
+                    d_vector=speaker_embedding,
+                    speaker_wav=speaker_wav,
+                    language=language_name,
+                    **kwargs,
+                )
+            else:
+                # synthesize voice
+                outputs = synthesis(
+                    model=self.tts_model,
+                    text=sen,
+                    CONFIG=self.tts_config,
+                    use_cuda=self.use_cuda,
+                    speaker_id=speaker_id,
+                    style_wav=style_wav,
+                    style_text=style_text,
+                    use_griffin_lim=use_gl,
+                    d_vector=speaker_embedding,
+                    language_id=language_id,
+                )
+            waveform = outputs["wav"]
+            if not use_gl:
+                waveform = self._vocode(outputs["outputs"]["model_outputs"][0], vocoder_device)
+            if torch.is_tensor(waveform):
+                waveform = waveform.cpu().numpy()
+            waveform = np.asarray(waveform, dtype=np.float32).squeeze()
+
+            # trim silence
+            if "do_trim_silence" in self.tts_config.audio and self.tts_config.audio["do_trim_silence"]:
+                waveform = trim_silence(waveform, self.tts_model.ap)
+
+            yield waveform
+            yield silence
+
+    def _get_speaker(self, speaker_name, speaker_wav):
+        """Return the speaker id and the speaker embedding to synthesize with."""
         speaker_embedding = None
         speaker_id = None
         if self.tts_speakers_file or hasattr(self.tts_model.speaker_manager, "name_to_id"):
@@ -332,7 +483,18 @@ class Synthesizer(nn.Module):
                     "Define path for speaker.json if it is a multi-speaker model or remove defined speaker idx. "
                 )
 
-        # handle multi-lingual
+        # compute a new d_vector from the given clip.
+        if (
+            speaker_wav is not None
+            and self.tts_model.speaker_manager is not None
+            and hasattr(self.tts_model.speaker_manager, "encoder_ap")
+            and self.tts_model.speaker_manager.encoder_ap is not None
+        ):
+            speaker_embedding = self.tts_model.speaker_manager.compute_embedding_from_clip(speaker_wav)
+        return speaker_id, speaker_embedding
+
+    def _get_language_id(self, language_name):
+        """Return the language id to synthesize with."""
         language_id = None
         if self.tts_languages_file or (
             hasattr(self.tts_model, "language_manager") 
@@ -363,143 +525,84 @@ class Synthesizer(nn.Module):
                     f" [!] Missing language_ids.json file path for selecting language {language_name}."
                     "Define path for language_ids.json if it is a multi-lingual model or remove defined language idx. "
                 )
+        return language_id
 
-        # compute a new d_vector from the given clip.
-        if (
-            speaker_wav is not None
-            and self.tts_model.speaker_manager is not None
-            and hasattr(self.tts_model.speaker_manager, "encoder_ap")
-            and self.tts_model.speaker_manager.encoder_ap is not None
-        ):
-            speaker_embedding = self.tts_model.speaker_manager.compute_embedding_from_clip(speaker_wav)
-
+    def _get_vocoder_device(self):
+        """Return whether Griffin-Lim is used instead of a vocoder model and the device of the vocoder."""
         vocoder_device = "cpu"
         use_gl = self.vocoder_model is None
         if not use_gl:
             vocoder_device = next(self.vocoder_model.parameters()).device
         if self.use_cuda:
             vocoder_device = "cuda"
-
-        if not reference_wav:  # not voice conversion
-            for sen in sens:
-                if hasattr(self.tts_model, "synthesize"):
-                    outputs = self.tts_model.synthesize(
-                        text=sen,
-                        config=self.tts_config,
-                        speaker_id=speaker_name,
-                        voice_dirs=self.voice_dir,
-                        d_vector=speaker_embedding,
-                        speaker_wav=speaker_wav,
-                        language=language_name,
-                        **kwargs,
-                    )
-                else:
-                    # synthesize voice
-                    outputs = synthesis(
-                        model=self.tts_model,
-                        text=sen,
-                        CONFIG=self.tts_config,
-                        use_cuda=self.use_cuda,
-                        speaker_id=speaker_id,
-                        style_wav=style_wav,
-                        style_text=style_text,
-                        use_griffin_lim=use_gl,
-                        d_vector=speaker_embedding,
-                        language_id=language_id,
-                    )
-                waveform = outputs["wav"]
-                if not use_gl:
-                    mel_postnet_spec = outputs["outputs"]["model_outputs"][0].detach().cpu().numpy()
-                    # denormalize tts output based on tts audio config
-                    mel_postnet_spec = self.tts_model.ap.denormalize(mel_postnet_spec.T).T
-                    # renormalize spectrogram based on vocoder config
-                    vocoder_input = self.vocoder_ap.normalize(mel_postnet_spec.T)
-                    # compute scale factor for possible sample rate mismatch
-                    scale_factor = [
-                        1,
-                        self.vocoder_config["audio"]["sample_rate"] / self.tts_model.ap.sample_rate,
-                    ]
-                    if scale_factor[1] != 1:
-                        print(" > interpolating tts model output.")
-                        vocoder_input = interpolate_vocoder_input(scale_factor, vocoder_input)
-                    else:
-                        vocoder_input = torch.tensor(vocoder_input).unsqueeze(0)  # pylint: disable=not-callable
-                    # run vocoder model
-                    # [1, T, C]
-                    waveform = self.vocoder_model.inference(vocoder_input.to(vocoder_device))
-                if torch.is_tensor(waveform) and waveform.device != torch.device("cpu") and not use_gl:
-                    waveform = waveform.cpu()
-                if not use_gl:
-                    waveform = waveform.numpy()
-                waveform = waveform.squeeze()
-
-                # trim silence
-                if "do_trim_silence" in self.tts_config.audio and self.tts_config.audio["do_trim_silence"]:
-                    waveform = trim_silence(waveform, self.tts_model.ap)
-
-                wavs += list(waveform)
-                wavs += [0] * 10000
+        return use_gl, vocoder_device
+
+    def _vocode(self, model_outputs, vocoder_device):
+        """Run the vocoder model on the spectrogram of the TTS model and return the waveform as a numpy array."""
+        mel_postnet_spec = model_outputs.detach().cpu().numpy()
+        # denormalize tts output based on tts audio config
+        mel_postnet_spec = self.tts_model.ap.denormalize(mel_postnet_spec.T).T
+        # renormalize spectrogram based on vocoder config
+        vocoder_input = self.vocoder_ap.normalize(mel_postnet_spec.T)
+        # compute scale factor for possible sample rate mismatch
+        scale_factor = [
+            1,
+            self.vocoder_config["audio"]["sample_rate"] / self.tts_model.ap.sample_rate,
+        ]
+        if scale_factor[1] != 1:
+            print(" > interpolating tts model output.")
+            vocoder_input = interpolate_vocoder_input(scale_factor, vocoder_input)
         else:
-            # get the speaker embedding or speaker id for the reference wav file
-            reference_speaker_embedding = None
-            reference_speaker_id = None
-            if self.tts_speakers_file or hasattr(self.tts_model.speaker_manager, "name_to_id"):
-                if reference_speaker_name and isinstance(reference_speaker_name, str):
-                    if self.tts_config.use_d_vector_file:
-                        # get the speaker embedding from the saved d_vectors.
-                        reference_speaker_embedding = self.tts_model.speaker_manager.get_embeddings_by_name(
-                            reference_speaker_name
-                        )[0]
-                        reference_speaker_embedding = np.array(reference_speaker_embedding)[
-                            None, :
-                        ]  # [1 x embedding_dim]
-                    else:
-                        # get speaker idx from the speaker name
-                        reference_speaker_id = self.tts_model.speaker_manager.name_to_id[reference_speaker_name]
-                else:
-                    reference_speaker_embedding = self.tts_model.speaker_manager.compute_embedding_from_clip(
-                        reference_wav
-                    )
-            outputs = transfer_voice(
-                model=self.tts_model,
-                CONFIG=self.tts_config,
-                use_cuda=self.use_cuda,
-                reference_wav=reference_wav,
-                speaker_id=speaker_id,
-                d_vector=speaker_embedding,
-                use_griffin_lim=use_gl,
-                reference_speaker_id=reference_speaker_id,
-                reference_d_vector=reference_speaker_embedding,
-            )
-            waveform = outputs
-            if not use_gl:
-                mel_postnet_spec = outputs[0].detach().cpu().numpy()
-                # denormalize tts output based on tts audio config
-                mel_postnet_spec = self.tts_model.ap.denormalize(mel_postnet_spec.T).T
-                # renormalize spectrogram based on vocoder config
-                vocoder_input = self.vocoder_ap.normalize(mel_postnet_spec.T)
-                # compute scale factor for possible sample rate mismatch
-                scale_factor = [
-                    1,
-                    self.vocoder_config["audio"]["sample_rate"] / self.tts_model.ap.sample_rate,
-                ]
-                if scale_factor[1] != 1:
-                    print(" > interpolating tts model output.")
-                    vocoder_input = interpolate_vocoder_input(scale_factor, vocoder_input)
+            vocoder_input = torch.tensor(vocoder_input).unsqueeze(0)  # pylint: disable=not-callable
+        # run vocoder model
+        # [1, T, C]
+        waveform = self.vocoder_model.inference(vocoder_input.to(vocoder_device))
+        return waveform.cpu().numpy()
+
+    def _voice_conversion(
+        self, reference_wav, speaker_name, language_name, speaker_wav, reference_speaker_name, **kwargs
+    ):
+        if "voice_dir" in kwargs:
+            self.voice_dir = kwargs["voice_dir"]
+        speaker_id, speaker_embedding = self._get_speaker(speaker_name, speaker_wav)
+        # validates the language like for the synthesis
+        self._get_language_id(language_name)
+        use_gl, vocoder_device = self._get_vocoder_device()
+
+        # get the speaker embedding or speaker id for the reference wav file
+        reference_speaker_embedding = None
+        reference_speaker_id = None
+        if self.tts_speakers_file or hasattr(self.tts_model.speaker_manager, "name_to_id"):
+            if reference_speaker_name and isinstance(reference_speaker_name, str):
+                if self.tts_config.use_d_vector_file:
+                    # get the speaker embedding from the saved d_vectors.
+                    reference_speaker_embedding = self.tts_model.speaker_manager.get_embeddings_by_name(
+                        reference_speaker_name
+                    )[0]
+                    reference_speaker_embedding = np.array(reference_speaker_embedding)[
+                        None, :
+                    ]  # [1 x embedding_dim]
                 else:
-                    vocoder_input = torch.tensor(vocoder_input).unsqueeze(0)  # pylint: disable=not-callable
-                # run vocoder model
-                # [1, T, C]
-                waveform = self.vocoder_model.inference(vocoder_input.to(vocoder_device))
-            if torch.is_tensor(waveform) and waveform.device != torch.device("cpu"):
-                waveform = waveform.cpu()
-            if not use_gl:
-                waveform = waveform.numpy()
-            wavs = waveform.squeeze()
-
-        # compute stats
-        process_time = time.time() - start_time
-        audio_time = len(wavs) / self.tts_config.audio["sample_rate"]
-        print(f" > Processing time: {process_time}")
-        print(f" > Real-time factor: {process_time / audio_time}")
-        return wavs
+                    # get speaker idx from the speaker name
+                    reference_speaker_id = self.tts_model.speaker_manager.name_to_id[reference_speaker_name]
+            else:
+                reference_speaker_embedding = self.tts_model.speaker_manager.compute_embedding_from_clip(
+                    reference_wav
+                )
+        outputs = transfer_voice(
+            model=self.tts_model,
+            CONFIG=self.tts_config,
+            use_cuda=self.use_cuda,
+            reference_wav=reference_wav,
+            speaker_id=speaker_id,
+            d_vector=speaker_embedding,
+            use_griffin_lim=use_gl,
+            reference_speaker_id=reference_speaker_id,
+            reference_d_vector=reference_speaker_embedding,
+        )
+        waveform = outputs
+        if not use_gl:
+            waveform = self._vocode(outputs[0], vocoder_device)
+        if torch.is_tensor(waveform):
+            waveform = waveform.cpu().numpy()
+        return np.asarray(waveform, dtype=np.float32).squeeze()
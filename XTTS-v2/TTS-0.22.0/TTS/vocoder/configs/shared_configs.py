@@ -26,7 +26,8 @@ class BaseVocoderConfig(BaseTrainingConfig):
             Extra padding for the feature frames against convolution of the edge frames. Defaults to MISSING.
             Defaults to 0.
         use_cache (bool):
-            enable / disable in memory caching of the computed features. If the RAM is not enough, if may cause OOM.
+            enable / disable in memory caching of the computed features. The cache is a shared memory arena sized for
+            the whole dataset and shared by the data loader workers. If the RAM is not enough, if may cause OOM.
             Defaults to False.
         epochs (int):
             Number of training epochs to. Defaults to 10000.
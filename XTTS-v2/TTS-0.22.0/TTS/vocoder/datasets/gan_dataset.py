@@ -1,12 +1,13 @@
 import glob
 import os
 import random
-from multiprocessing import Manager
 
 import numpy as np
 import torch
 from torch.utils.data import Dataset
 
+from TTS.vocoder.datasets.shared_cache import SharedFeatureCache, estimate_cache_size
+
 
 class GANDataset(Dataset):
     """
@@ -57,9 +58,13 @@ class GANDataset(Dataset):
             self.create_feature_cache()
 
     def create_feature_cache(self):
-        self.manager = Manager()
-        self.cache = self.manager.list()
-        self.cache += [None for _ in range(len(self.item_list))]
+        wav_files = self.item_list if self.compute_feat else [wavpath for wavpath, _ in self.item_list]
+        cache_size = estimate_cache_size(
+            wav_files, self.ap.sample_rate, num_mels=self.ap.num_mels, hop_length=self.hop_len, pad_samples=self.seq_len
+        )
+        self.cache = SharedFeatureCache(len(self.item_list), cache_size, num_arrays=2)
+        if self.verbose:
+            print(f" > Feature cache of {cache_size / 2**20:.1f} MB")
 
     @staticmethod
     def find_wav_files(path):
@@ -106,27 +111,24 @@ class GANDataset(Dataset):
 
     def load_item(self, idx):
         """load (audio, feat) couple"""
-        if self.compute_feat:
+        cached = self.cache.get(idx) if self.use_cache else None
+        if cached is not None:
+            audio, mel = cached
+        elif self.compute_feat:
             # compute features from wav
             wavpath = self.item_list[idx]
-            # print(wavpath)
-
-            if self.use_cache and self.cache[idx] is not None:
-                audio, mel = self.cache[idx]
-            else:
-                audio = self.ap.load_wav(wavpath)
-                mel = self.ap.melspectrogram(audio)
-                audio, mel = self._pad_short_samples(audio, mel)
+            audio = self.ap.load_wav(wavpath)
+            mel = self.ap.melspectrogram(audio)
+            audio, mel = self._pad_short_samples(audio, mel)
         else:
             # load precomputed features
             wavpath, feat_path = self.item_list[idx]
+            audio = self.ap.load_wav(wavpath)
+            mel = np.load(feat_path)
+            audio, mel = self._pad_short_samples(audio, mel)
 
-            if self.use_cache and self.cache[idx] is not None:
-                audio, mel = self.cache[idx]
-            else:
-                audio = self.ap.load_wav(wavpath)
-                mel = np.load(feat_path)
-                audio, mel = self._pad_short_samples(audio, mel)
+        if cached is None and self.use_cache:
+            self.cache.put(idx, audio, mel)
 
         # correct the audio length wrt padding applied in stft
         audio = np.pad(audio, (0, self.hop_len), mode="edge")
@@ -0,0 +1,111 @@
+import multiprocessing
+import os
+from typing import List, Optional, Tuple
+
+import numpy as np
+import soundfile as sf
+import torch
+
+
+def estimate_cache_size(
+    wav_files: List[str], sample_rate: int, num_mels: int = 0, hop_length: int = 1, pad_samples: int = 0
+) -> int:
+    """Estimate the bytes to cache the float32 waveforms and, if `num_mels > 0`, the mel spectrograms of the files.
+
+    The length of a file is read from its header, or from its size assuming 16-bit samples if it cannot be read,
+    and scaled to `sample_rate`. `pad_samples` are added to every waveform for the padding of the dataset.
+    """
+    num_values = 0
+    for wav_file in wav_files:
+        try:
+            info = sf.info(wav_file)
+            num_samples = info.frames * sample_rate / info.samplerate
+        except RuntimeError:
+            num_samples = os.path.getsize(wav_file) / 2
+        num_samples += pad_samples + hop_length
+        num_values += num_samples
+        if num_mels > 0:
+            num_values += num_mels * (num_samples / hop_length + 1)
+    # margin for the frames added by the STFT padding and silence trimming differences
+    return int(num_values * 1.05 + 1024) * 4
+
+
+class SharedFeatureCache:
+    """Fixed size shared memory arena caching a tuple of float32 arrays per dataset item.
+
+    The arena and its index table of offsets and shapes are shared memory tensors, so the data loader worker
+    processes fill the cache lazily and read the cached arrays from it without copying them or sending them
+    through a manager process. The space of an item is reserved under a lock by the first process that puts it.
+    Once the arena is full, the next items are not cached.
+
+    The arrays returned by `get()` are views of the arena and must not be modified in place.
+
+    Args:
+        num_items (int): Number of dataset items.
+        capacity (int): Size of the arena in bytes.
+        num_arrays (int, optional): Number of arrays per item. Defaults to 2.
+        max_ndim (int, optional): Maximum number of dimensions of the arrays. Defaults to 3.
+    """
+
+    EMPTY = 0
+    WRITING = 1
+    READY = 2
+
+    def __init__(self, num_items: int, capacity: int, num_arrays: int = 2, max_ndim: int = 3):
+        self.num_arrays = num_arrays
+        self.max_ndim = max_ndim
+        self.arena = torch.empty(capacity // 4, dtype=torch.float32).share_memory_()
+        self.state = torch.zeros(num_items, dtype=torch.int8).share_memory_()
+        self.offsets = torch.zeros(num_items, num_arrays, dtype=torch.int64).share_memory_()
+        self.shapes = torch.zeros(num_items, num_arrays, max_ndim, dtype=torch.int64).share_memory_()
+        self.ndims = torch.zeros(num_items, num_arrays, dtype=torch.int64).share_memory_()
+        self.used = torch.zeros(1, dtype=torch.int64).share_memory_()
+        self.lock = multiprocessing.Lock()
+
+    def __len__(self):
+        return len(self.state)
+
+    @property
+    def capacity(self) -> int:
+        return self.arena.numel() * 4
+
+    @property
+    def used_bytes(self) -> int:
+        return int(self.used[0]) * 4
+
+    def get(self, idx: int) -> Optional[Tuple[np.ndarray, ...]]:
+        """Return the cached arrays of the item or None if it is not cached."""
+        if self.state[idx] != self.READY:
+            return None
+        arena = self.arena.numpy()
+        offsets = self.offsets[idx].tolist()
+        shapes = self.shapes[idx].tolist()
+        ndims = self.ndims[idx].tolist()
+        arrays = []
+        for offset, shape, ndim in zip(offsets, shapes, ndims):
+            shape = shape[:ndim]
+            arrays.append(arena[offset : offset + int(np.prod(shape))].reshape(shape))
+        return tuple(arrays)
+
+    def put(self, idx: int, *arrays: np.ndarray) -> bool:
+        """Cache the arrays of the item. Return False if it is already cached or does not fit in the arena."""
+        assert len(arrays) == self.num_arrays, f" [!] {len(arrays)} arrays vs {self.num_arrays}"
+        arrays = [np.asarray(array, dtype=np.float32) for array in arrays]
+        assert all(array.ndim <= self.max_ndim for array in arrays), f" [!] arrays with more than {self.max_ndim} dims"
+        size = sum(array.size for array in arrays)
+        with self.lock:
+            offset = int(self.used[0])
+            if self.state[idx] != self.EMPTY or offset + size > self.arena.numel():
+                return False
+            self.used[0] = offset + size
+            self.state[idx] = self.WRITING
+        arena = self.arena.numpy()
+        for i, array in enumerate(arrays):
+            arena[offset : offset + array.size] = array.ravel()
+            self.offsets[idx, i] = offset
+            self.ndims[idx, i] = array.ndim
+            self.shapes[idx, i, : array.ndim] = torch.tensor(array.shape, dtype=torch.int64)
+            offset += array.size
+        # the arrays are written before the item is marked ready for the other processes
+        self.state[idx] = self.READY
+        return True
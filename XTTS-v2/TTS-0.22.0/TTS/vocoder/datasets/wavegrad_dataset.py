@@ -1,13 +1,14 @@
 import glob
 import os
 import random
-from multiprocessing import Manager
 from typing import List, Tuple
 
 import numpy as np
 import torch
 from torch.utils.data import Dataset
 
+from TTS.vocoder.datasets.shared_cache import SharedFeatureCache, estimate_cache_size
+
 
 class WaveGradDataset(Dataset):
     """
@@ -52,9 +53,13 @@ class WaveGradDataset(Dataset):
             self.create_feature_cache()
 
     def create_feature_cache(self):
-        self.manager = Manager()
-        self.cache = self.manager.list()
-        self.cache += [None for _ in range(len(self.item_list))]
+        pad_samples = self.seq_len + self.pad_short if self.return_segments else 0
+        cache_size = estimate_cache_size(
+            self.item_list, self.ap.sample_rate, hop_length=self.hop_len, pad_samples=pad_samples
+        )
+        self.cache = SharedFeatureCache(len(self.item_list), cache_size, num_arrays=1)
+        if self.verbose:
+            print(f" > Feature cache of {cache_size / 2**20:.1f} MB")
 
     @staticmethod
     def find_wav_files(path):
@@ -94,8 +99,9 @@ class WaveGradDataset(Dataset):
         # compute features from wav
         wavpath = self.item_list[idx]
 
-        if self.use_cache and self.cache[idx] is not None:
-            audio = self.cache[idx]
+        cached = self.cache.get(idx) if self.use_cache else None
+        if cached is not None:
+            audio = cached[0]
         else:
             audio = self.ap.load_wav(wavpath)
 
@@ -114,7 +120,7 @@ class WaveGradDataset(Dataset):
             audio = np.pad(audio, (0, p), mode="constant", constant_values=0.0)
 
             if self.use_cache:
-                self.cache[idx] = audio
+                self.cache.put(idx, audio)
 
         if self.return_segments:
             max_start = len(audio) - self.seq_len
@@ -48,6 +48,9 @@ MEL_NORM_LINK = "https://coqui.gateway.scarf.sh/hf-coqui/XTTS-v2/main/mel_stats.
 DVAE_CHECKPOINT = os.path.join(CHECKPOINTS_OUT_PATH, os.path.basename(DVAE_CHECKPOINT_LINK))
 MEL_NORM_FILE = os.path.join(CHECKPOINTS_OUT_PATH, os.path.basename(MEL_NORM_LINK))
 
+# DVAE codes and conditioning mels of the training clips are cached here, so the epochs after the first skip the DVAE
+DVAE_CACHE_PATH = os.path.join(CHECKPOINTS_OUT_PATH, "dvae_cache")
+
 # download DVAE files if needed
 if not os.path.isfile(DVAE_CHECKPOINT) or not os.path.isfile(MEL_NORM_FILE):
     print(" > Downloading DVAE files!")
@@ -87,6 +90,7 @@ def main():
         max_text_length=200,
         mel_norm_file=MEL_NORM_FILE,
         dvae_checkpoint=DVAE_CHECKPOINT,
+        dvae_cache_path=DVAE_CACHE_PATH,
         xtts_checkpoint=XTTS_CHECKPOINT,  # checkpoint path of the model that you want to fine-tune
         tokenizer_file=TOKENIZER_FILE,
         gpt_num_audio_tokens=1026,
@@ -154,6 +158,8 @@ def main():
         eval_split_max_size=config.eval_split_max_size,
         eval_split_size=config.eval_split_size,
     )
+    # fill the DVAE cache before the training, otherwise the first epoch fills it
+    model.precompute_dvae_cache(train_samples + eval_samples, num_workers=config.num_loader_workers)
 
     # init the trainer and 🚀
     trainer = Trainer(
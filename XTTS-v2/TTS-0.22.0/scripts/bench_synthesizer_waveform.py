@@ -0,0 +1,81 @@
+"""Benchmark the waveform accumulation and encoding of `Synthesizer.tts()` on long-form outputs.
+
+The sentences of a text are synthesized once with `Synthesizer.tts_chunks()`, then repeated until the output
+reaches `--minutes` of audio, and the chunks are accumulated and saved as WAV in two ways:
+
+- `list`: the previous `Synthesizer.tts()`, which extended a Python list sample by sample (`wavs += list(waveform)`
+  and `wavs += [0] * 10000`) that `save_wav()` converted back with `np.array`;
+- `chunks`: the float32 chunks concatenated once into the output array, as `tts()` does now.
+
+It prints the time and the peak memory allocated by each of them (`tracemalloc`), which do not depend on the
+model. Pass a model to use real sentence lengths; the default is the random test model.
+
+Example:
+    python scripts/bench_synthesizer_waveform.py --minutes 5
+    python scripts/bench_synthesizer_waveform.py --model_path model.pth --config_path config.json --minutes 5
+"""
+
+import argparse
+import io
+import os
+import time
+import tracemalloc
+
+import numpy as np
+
+from TTS.utils.synthesizer import SENTENCE_SILENCE, Synthesizer
+
+TEXT = (
+    "It was the best of times, it was the worst of times. It was the age of wisdom, it was the age of foolishness. "
+    "It was the epoch of belief, it was the epoch of incredulity. It was the season of Light, it was the season of "
+    "Darkness. It was the spring of hope, it was the winter of despair."
+)
+
+
+def legacy_accumulation(synthesizer, chunks):
+    wavs = []
+    for waveform in chunks[::2]:
+        wavs += list(waveform)
+        wavs += [0] * SENTENCE_SILENCE
+    synthesizer.save_wav(wavs, io.BytesIO())
+
+
+def chunk_accumulation(synthesizer, chunks):
+    wavs = np.concatenate(chunks)
+    synthesizer.save_wav(wavs, io.BytesIO())
+
+
+def measure(func, *args):
+    tracemalloc.start()
+    start = time.perf_counter()
+    func(*args)
+    elapsed = time.perf_counter() - start
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return elapsed, peak
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--model_path", default="tests/inputs/checkpoint_10.pth")
+    parser.add_argument("--config_path", default="tests/inputs/dummy_model_config.json")
+    parser.add_argument("--minutes", type=float, default=5.0, help="Length of the accumulated output.")
+    args = parser.parse_args()
+
+    if not os.path.exists(args.model_path):
+        raise FileNotFoundError(f" ❗ {args.model_path} not found, run the synthesizer tests to create the test model.")
+    synthesizer = Synthesizer(args.model_path, args.config_path)
+    chunks = list(synthesizer.tts_chunks(TEXT))
+    text_samples = sum(len(chunk) for chunk in chunks)
+    num_samples = int(args.minutes * 60 * synthesizer.output_sample_rate)
+    chunks = chunks * max(1, num_samples // text_samples)
+    audio_seconds = sum(len(chunk) for chunk in chunks) / synthesizer.output_sample_rate
+
+    print(f"{len(chunks) // 2} sentences, {audio_seconds / 60:.1f} min of audio at {synthesizer.output_sample_rate} Hz")
+    for name, func in (("list", legacy_accumulation), ("chunks", chunk_accumulation)):
+        elapsed, peak = measure(func, synthesizer, chunks)
+        print(f"{name:>7}: {elapsed:7.3f}s  peak {peak / 2**20:8.1f} MiB")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""Benchmark the feature cache of the vocoder datasets: data loader samples/sec without cache, with the previous
+`multiprocessing.Manager().list()` cache and with the `SharedFeatureCache` arena.
+
+`GANDataset` (or `WaveGradDataset`) items are loaded through a `DataLoader` with `--num_workers` workers for
+`--epochs` epochs. The first epoch fills the cache, the next ones read from it, so the warm throughput is the
+mean of the epochs after the first. The wav files of `--data_path` are repeated to get `--num_items` items.
+
+Example:
+    python scripts/bench_vocoder_feature_cache.py --num_workers 4 --epochs 3
+    python scripts/bench_vocoder_feature_cache.py --dataset wavegrad --data_path /data/LJSpeech-1.1/wavs
+"""
+
+import argparse
+import glob
+import os
+import time
+from multiprocessing import Manager
+
+from torch.utils.data import DataLoader
+
+from TTS.utils.audio import AudioProcessor
+from TTS.vocoder.configs import BaseGANVocoderConfig
+from TTS.vocoder.datasets.gan_dataset import GANDataset
+from TTS.vocoder.datasets.wavegrad_dataset import WaveGradDataset
+
+
+class ManagerListCache:
+    """The previous cache: a `Manager().list()` of the cached arrays, read and written through the manager."""
+
+    def __init__(self, num_items):
+        self.manager = Manager()
+        self.items = self.manager.list([None] * num_items)
+
+    def get(self, idx):
+        return self.items[idx]
+
+    def put(self, idx, *arrays):
+        self.items[idx] = arrays
+        return True
+
+
+def run(dataset, args):
+    loader = DataLoader(dataset, batch_size=args.batch_size, shuffle=True, num_workers=args.num_workers)
+    throughputs = []
+    for _ in range(args.epochs):
+        start = time.perf_counter()
+        for _ in loader:
+            pass
+        throughputs.append(len(dataset) / (time.perf_counter() - start))
+    return throughputs
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--data_path", default="tests/data/ljspeech/wavs")
+    parser.add_argument("--dataset", default="gan", choices=["gan", "wavegrad"])
+    parser.add_argument("--num_items", type=int, default=512)
+    parser.add_argument("--batch_size", type=int, default=32)
+    parser.add_argument("--num_workers", type=int, default=4)
+    parser.add_argument("--epochs", type=int, default=3)
+    parser.add_argument("--seq_len_frames", type=int, default=32, help="Segment length in frames.")
+    args = parser.parse_args()
+
+    config = BaseGANVocoderConfig()
+    ap = AudioProcessor(**config.audio.to_dict())
+    wav_files = sorted(glob.glob(os.path.join(args.data_path, "**", "*.wav"), recursive=True))
+    items = [wav_files[idx % len(wav_files)] for idx in range(args.num_items)]
+    dataset_class = GANDataset if args.dataset == "gan" else WaveGradDataset
+    print(f"{dataset_class.__name__}: {len(items)} items, {args.num_workers} workers, batch size {args.batch_size}")
+
+    for name in ("no cache", "manager list", "shared arena"):
+        dataset = dataset_class(
+            ap,
+            items,
+            seq_len=args.seq_len_frames * ap.hop_length,
+            hop_len=ap.hop_length,
+            pad_short=2000,
+            use_cache=name != "no cache",
+        )
+        if name == "manager list":
+            dataset.cache = ManagerListCache(len(items))
+        throughputs = run(dataset, args)
+        warm = throughputs[1:] or throughputs
+        print(
+            f"{name:>13}: first epoch {throughputs[0]:8.1f} samples/s  "
+            f"next epochs {sum(warm) / len(warm):8.1f} samples/s"
+        )
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,146 @@
+"""Benchmark the XTTS GPT decoding with the HuggingFace KV cache and with the preallocated `StaticKVCache`.
+
+Each cache runs in a fresh process and generates `--tokens` mel tokens `--repeats` times. The script prints
+the decoding speed in tokens/sec and the peak memory: `torch.cuda.max_memory_allocated()` on GPU and the peak
+RSS growth over the loaded model on CPU.
+
+By default the GPT has the XTTS v2 size with random weights, which is enough to measure the decoding cost.
+Pass `--checkpoint_dir` with `config.json` and `model.pth` to benchmark a trained model.
+
+Example:
+    python scripts/bench_xtts_kv_cache.py --tokens 600 --repeats 3
+    python scripts/bench_xtts_kv_cache.py --device cuda --checkpoint_dir path/to/XTTS-v2
+"""
+
+import argparse
+import multiprocessing
+import os
+import resource
+import time
+
+import torch
+
+
+def current_rss():
+    with open("/proc/self/statm") as f:
+        return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE")
+
+
+def peak_rss():
+    # `ru_maxrss` is in kilobytes on Linux
+    return resource.getrusage(resource.RUSAGE_SELF).ru_maxrss * 1024
+
+
+def load_gpt(args):
+    if args.checkpoint_dir:
+        from TTS.tts.configs.xtts_config import XttsConfig
+        from TTS.tts.models.xtts import Xtts
+
+        config = XttsConfig()
+        config.load_json(os.path.join(args.checkpoint_dir, "config.json"))
+        model = Xtts.init_from_config(config)
+        model.load_checkpoint(config, checkpoint_dir=args.checkpoint_dir, eval=True)
+        gpt = model.gpt
+    else:
+        from TTS.tts.layers.xtts.gpt import GPT
+
+        gpt = GPT(
+            layers=args.layers,
+            model_dim=args.model_dim,
+            heads=args.heads,
+            max_text_tokens=402,
+            max_mel_tokens=605,
+            max_prompt_tokens=70,
+            number_text_tokens=6681,
+            start_text_token=261,
+            stop_text_token=0,
+            use_perceiver_resampler=True,
+        )
+        gpt.init_gpt_for_inference()
+        gpt.eval()
+    if args.tokens > gpt.max_gen_mel_tokens:
+        raise ValueError(f"--tokens can't exceed the {gpt.max_gen_mel_tokens} mel tokens supported by the model")
+    return gpt.to(args.device)
+
+
+def run(args, static_kv_cache, results):
+    torch.manual_seed(0)
+    torch.set_num_threads(args.threads)
+    gpt = load_gpt(args)
+    gpt.gpt_inference.static_kv_cache = static_kv_cache
+    cond_latents = torch.randn(1, 32, gpt.model_dim, device=args.device)
+    text_tokens = torch.randint(1, 200, (1, args.text_tokens), device=args.device)
+
+    def generate():
+        codes = gpt.generate(
+            cond_latents,
+            text_tokens,
+            do_sample=True,
+            top_k=50,
+            top_p=0.85,
+            temperature=0.75,
+            repetition_penalty=10.0,
+            # keep the length fixed, the random weights may also stop early
+            suppress_tokens=[gpt.stop_audio_token],
+        )
+        if args.device.startswith("cuda"):
+            torch.cuda.synchronize()
+        return codes.shape[-1]
+
+    with torch.inference_mode():
+        # the memory baseline is taken before the warm up, which allocates the static cache
+        base_rss = current_rss()
+        if args.device.startswith("cuda"):
+            torch.cuda.reset_peak_memory_stats()
+            base_cuda = torch.cuda.memory_allocated()
+        gpt.max_gen_mel_tokens = 8
+        generate()  # warm up
+        gpt.max_gen_mel_tokens = args.tokens
+
+        total_tokens = 0
+        start = time.perf_counter()
+        for _ in range(args.repeats):
+            total_tokens += generate()
+        elapsed = time.perf_counter() - start
+
+    result = {"tokens_per_sec": total_tokens / elapsed, "peak_rss_mb": (peak_rss() - base_rss) / 2**20}
+    if args.device.startswith("cuda"):
+        result["peak_cuda_mb"] = (torch.cuda.max_memory_allocated() - base_cuda) / 2**20
+    results[static_kv_cache] = result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--device", default="cuda" if torch.cuda.is_available() else "cpu")
+    parser.add_argument("--checkpoint_dir", default=None, help="XTTS checkpoint, random weights if not set.")
+    parser.add_argument("--layers", type=int, default=30)
+    parser.add_argument("--model_dim", type=int, default=1024)
+    parser.add_argument("--heads", type=int, default=16)
+    parser.add_argument("--tokens", type=int, default=600, help="Mel tokens generated per run.")
+    parser.add_argument("--text_tokens", type=int, default=60)
+    parser.add_argument("--repeats", type=int, default=3)
+    parser.add_argument("--threads", type=int, default=torch.get_num_threads())
+    args = parser.parse_args()
+
+    # a process per cache, so the peak memory of one run does not hide the other
+    context = multiprocessing.get_context("spawn")
+    results = context.Manager().dict()
+    for static_kv_cache in (False, True):
+        process = context.Process(target=run, args=(args, static_kv_cache, results))
+        process.start()
+        process.join()
+        if process.exitcode != 0:
+            raise RuntimeError(f"Benchmark process failed with exit code {process.exitcode}")
+
+    print(f"{args.tokens} tokens x {args.repeats} runs on {args.device}")
+    for static_kv_cache in (False, True):
+        result = results[static_kv_cache]
+        name = "static" if static_kv_cache else "dynamic"
+        line = f"{name:>8}: {result['tokens_per_sec']:8.1f} tokens/sec, peak RSS +{result['peak_rss_mb']:.0f} MB"
+        if "peak_cuda_mb" in result:
+            line += f", peak CUDA +{result['peak_cuda_mb']:.0f} MB"
+        print(line)
+
+
+if __name__ == "__main__":
+    main()
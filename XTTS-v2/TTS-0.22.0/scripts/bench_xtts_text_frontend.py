@@ -0,0 +1,76 @@
+"""Benchmark the XTTS text front-end: sentence splitting, cleaners and BPE, per sentence.
+
+Each text is split with `split_sentence` and its sentences are encoded with `VoiceBpeTokenizer.encode`, as
+`Xtts.inference` does, in three settings:
+
+- `uncached`: a new spaCy pipeline per split and no `encode()` cache, i.e. the front-end before the caches;
+- `pipelines`: the cached spaCy pipelines, with cleaners and BPE run for every sentence;
+- `cached`: the cached pipelines and `encode()` results, for repeated texts (greetings, fixed prompts, retries).
+
+Example:
+    python scripts/bench_xtts_text_frontend.py --vocab_file path/to/XTTS-v2/vocab.json --language ru
+"""
+
+import argparse
+import time
+
+from TTS.tts.layers.xtts.tokenizer import VoiceBpeTokenizer, get_sentencizer, split_sentence
+
+TEXTS = {
+    "en": [
+        "Hello! How are you doing today?",
+        "Mr. Smith paid $20.50 for 3 tickets on the 1st of May, that's 15% more than last year.",
+        "The meeting is scheduled for 10:30 at St. John's hall. Please bring your documents & your ID. "
+        "Dr. Brown will present the results of the study, which covered 1,200 patients over 5 years. "
+        "After the presentation there will be a short discussion, followed by lunch at 12:45.",
+        "Thank you.",
+    ],
+    "ru": [
+        "Привет! Как у тебя дела?",
+        "В 2023 году компания заработала 1 500 000 рублей, это на 12% больше, чем в прошлом году.",
+        "Встреча назначена на 10:30 в главном зале. Пожалуйста, возьмите с собой документы и паспорт. "
+        "Доктор Иванов представит результаты исследования, в котором участвовали 1200 пациентов за 5 лет. "
+        "После доклада будет короткое обсуждение, а затем обед в 12:45.",
+        "Спасибо.",
+    ],
+}
+
+
+def run(tokenizer, texts, language, repeats, clear_pipelines):
+    num_sentences = 0
+    start = time.perf_counter()
+    for _ in range(repeats):
+        for text in texts:
+            if clear_pipelines:
+                get_sentencizer.cache_clear()
+            for sentence in split_sentence(text, language, tokenizer.char_limits[language] // 2):
+                tokenizer.encode(sentence.strip().lower(), language)
+                num_sentences += 1
+    return (time.perf_counter() - start) / num_sentences
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--vocab_file", default="tests/inputs/xtts_vocab.json")
+    parser.add_argument("--language", default="en", choices=sorted(TEXTS))
+    parser.add_argument("--repeats", type=int, default=20)
+    args = parser.parse_args()
+
+    texts = TEXTS[args.language]
+    uncached = VoiceBpeTokenizer(vocab_file=args.vocab_file, cache_size=0)
+    cached = VoiceBpeTokenizer(vocab_file=args.vocab_file)
+    # warm up the imports and the cached pipeline
+    run(uncached, texts, args.language, 1, clear_pipelines=False)
+
+    results = {
+        "uncached": run(uncached, texts, args.language, args.repeats, clear_pipelines=True),
+        "pipelines": run(uncached, texts, args.language, args.repeats, clear_pipelines=False),
+        "cached": run(cached, texts, args.language, args.repeats, clear_pipelines=False),
+    }
+    print(f"{args.language}: {len(texts)} texts x {args.repeats} runs, time per sentence")
+    for name, seconds in results.items():
+        print(f"{name:>10}: {seconds * 1000:8.3f} ms  (x{results['uncached'] / seconds:.1f})")
+
+
+if __name__ == "__main__":
+    main()
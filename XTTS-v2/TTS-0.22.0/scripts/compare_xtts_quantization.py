@@ -0,0 +1,129 @@
+"""Compare the quality and latency of a dynamic int8 quantized XTTS model with the float32 one on CPU.
+
+Both models synthesize a fixed set of sentences with greedy decoding, so the differences only come from the
+quantization. For each sentence the script prints the synthesis time of both models and:
+
+- `latents`: the mean cosine similarity of the GPT latents to the float32 ones, over the shortest sequence;
+- `len`: the length of the int8 waveform relative to the float32 one;
+- `mel`: the mean absolute difference of the log mel spectrograms of both waveforms, over the shortest one.
+
+The int8 model is loaded from `model_dynamic_int8.pth` if it exists in the checkpoint directory, otherwise it
+is quantized at load time. Pass `--save_quantized` to save it for the next loads.
+
+Example:
+    python scripts/compare_xtts_quantization.py --checkpoint_dir path/to/XTTS-v2 --speaker_wav speaker.wav
+"""
+
+import argparse
+import os
+import time
+
+import torch
+import torchaudio
+
+from TTS.tts.configs.xtts_config import XttsConfig
+from TTS.tts.models.xtts import Xtts
+
+SENTENCES = {
+    "en": [
+        "The quick brown fox jumps over the lazy dog.",
+        "Please call Stella and ask her to bring these things with her from the store.",
+        "It was the best of times, it was the worst of times, it was the age of wisdom.",
+        "Twelve thousand four hundred and six people attended the concert last night.",
+        "Hello?",
+    ],
+    "ru": [
+        "Съешь же ещё этих мягких французских булок, да выпей чаю.",
+        "Привет! Как у тебя дела?",
+        "В четверг четвёртого числа в четыре с четвертью часа лигурийский регулировщик регулировал в Лигурии.",
+        "Завтра будет солнечно, температура воздуха около двадцати градусов.",
+        "Спасибо.",
+    ],
+}
+
+
+def load_model(args, quantization=None):
+    config = XttsConfig()
+    config.load_json(os.path.join(args.checkpoint_dir, "config.json"))
+    model = Xtts.init_from_config(config)
+    start = time.perf_counter()
+    model.load_checkpoint(config, checkpoint_dir=args.checkpoint_dir, eval=True, quantization=quantization)
+    return model, time.perf_counter() - start
+
+
+def synthesize(model, text, language, gpt_cond_latent, speaker_embedding):
+    start = time.perf_counter()
+    output = model.inference(
+        text,
+        language,
+        gpt_cond_latent,
+        speaker_embedding,
+        do_sample=False,
+        repetition_penalty=10.0,
+        enable_text_splitting=True,
+    )
+    elapsed = time.perf_counter() - start
+    return torch.as_tensor(output["wav"]), torch.as_tensor(output["gpt_latents"]), elapsed
+
+
+def log_mel(wav, sample_rate):
+    mel = torchaudio.transforms.MelSpectrogram(sample_rate=sample_rate, n_fft=1024, hop_length=256, n_mels=80)
+    return torch.log(mel(wav).clamp(min=1e-5))
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--checkpoint_dir", required=True, help="XTTS checkpoint directory.")
+    parser.add_argument("--speaker_wav", required=True, help="Reference audio of the speaker.")
+    parser.add_argument("--language", default="en", choices=sorted(SENTENCES))
+    parser.add_argument("--threads", type=int, default=torch.get_num_threads())
+    parser.add_argument("--save_quantized", action="store_true", help="Save the quantized checkpoint.")
+    args = parser.parse_args()
+    torch.set_num_threads(args.threads)
+
+    fp32_model, fp32_load_time = load_model(args)
+    int8_model, int8_load_time = load_model(args, quantization="dynamic_int8")
+    if args.save_quantized:
+        print(f"Saved {int8_model.save_quantized_checkpoint(args.checkpoint_dir)}")
+    print(f"load: fp32 {fp32_load_time:.1f}s, int8 {int8_load_time:.1f}s")
+
+    # the conditioning encoders are not quantized, both models share the latents
+    gpt_cond_latent, speaker_embedding = fp32_model.get_conditioning_latents(audio_path=[args.speaker_wav])
+    sample_rate = fp32_model.args.output_sample_rate
+    with torch.inference_mode():
+        # warm up
+        synthesize(fp32_model, SENTENCES[args.language][0], args.language, gpt_cond_latent, speaker_embedding)
+        synthesize(int8_model, SENTENCES[args.language][0], args.language, gpt_cond_latent, speaker_embedding)
+
+        totals = {"fp32": 0.0, "int8": 0.0, "audio": 0.0}
+        for text in SENTENCES[args.language]:
+            fp32_wav, fp32_latents, fp32_time = synthesize(
+                fp32_model, text, args.language, gpt_cond_latent, speaker_embedding
+            )
+            int8_wav, int8_latents, int8_time = synthesize(
+                int8_model, text, args.language, gpt_cond_latent, speaker_embedding
+            )
+            totals["fp32"] += fp32_time
+            totals["int8"] += int8_time
+            totals["audio"] += fp32_wav.shape[0] / sample_rate
+
+            num_latents = min(fp32_latents.shape[1], int8_latents.shape[1])
+            similarity = torch.cosine_similarity(
+                fp32_latents[:, :num_latents], int8_latents[:, :num_latents], dim=-1
+            ).mean()
+            num_samples = min(fp32_wav.shape[0], int8_wav.shape[0])
+            mel_diff = log_mel(fp32_wav[:num_samples], sample_rate) - log_mel(int8_wav[:num_samples], sample_rate)
+            print(
+                f"fp32 {fp32_time:6.2f}s  int8 {int8_time:6.2f}s  latents {similarity.item():.3f}  "
+                f"len {int8_wav.shape[0] / fp32_wav.shape[0]:5.2f}  mel {mel_diff.abs().mean().item():.3f}  {text}"
+            )
+
+    print(
+        f"total: fp32 {totals['fp32']:.1f}s (RTF {totals['fp32'] / totals['audio']:.2f}), "
+        f"int8 {totals['int8']:.1f}s (RTF {totals['int8'] / totals['audio']:.2f}), "
+        f"speedup x{totals['fp32'] / totals['int8']:.2f}"
+    )
+
+
+if __name__ == "__main__":
+    main()
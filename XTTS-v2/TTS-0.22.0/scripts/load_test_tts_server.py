@@ -0,0 +1,118 @@
+"""Load test of the TTS HTTP servers: latency percentiles and throughput of `/api/tts` under concurrent clients.
+
+Every server in `--urls` gets the same `--requests` requests from `--concurrency` concurrent clients, one server
+after the other. The script reports for each server the p50/p90/p99 latency of the full response, the time to
+the first response byte, the throughput in requests and audio seconds per second and the number of errors.
+Run the Flask server (`TTS/server/server.py`) and the asyncio batching server (`TTS/server/async_server.py`)
+with the same model on different ports to compare them. `--stream` requests the sentence by sentence responses
+of `server.py` in `--format` wav or ogg.
+
+Example:
+    python TTS/server/server.py --model_name tts_models/en/ljspeech/tacotron2-DDC --port 5002 &
+    python TTS/server/async_server.py --model_name tts_models/en/ljspeech/tacotron2-DDC --port 5003 \\
+        --num_replicas 2 &
+    python scripts/load_test_tts_server.py --urls http://localhost:5002 http://localhost:5003 --concurrency 8
+"""
+
+import argparse
+import asyncio
+import io
+import time
+
+import aiohttp
+import numpy as np
+import soundfile as sf
+
+TEXTS = [
+    "Hello, how are you doing today?",
+    "The quick brown fox jumps over the lazy dog.",
+    "Please call Stella and ask her to bring these things with her from the store.",
+    "It was the best of times, it was the worst of times.",
+    "Thank you for calling, please hold the line.",
+]
+
+
+async def send_request(session, url, text, timeout, params=None):
+    start = time.perf_counter()
+    first_byte = None
+    data = bytearray()
+    headers = {"timeout": str(timeout)} if timeout else {}
+    params = {"text": text, **(params or {})}
+    async with session.get(f"{url}/api/tts", params=params, headers=headers) as response:
+        async for chunk in response.content.iter_any():
+            if first_byte is None:
+                first_byte = time.perf_counter() - start
+            data.extend(chunk)
+        status = response.status
+    latency = time.perf_counter() - start
+    audio_seconds = 0.0
+    if status == 200:
+        info = sf.info(io.BytesIO(bytes(data)))
+        audio_seconds = info.frames / info.samplerate
+    return status, latency, first_byte or latency, audio_seconds
+
+
+async def run_load(url, num_requests, concurrency, timeout, params=None):
+    queue = asyncio.Queue()
+    for idx in range(num_requests):
+        queue.put_nowait(TEXTS[idx % len(TEXTS)])
+    results = []
+
+    async def client(session):
+        while not queue.empty():
+            text = queue.get_nowait()
+            try:
+                results.append(await send_request(session, url, text, timeout, params))
+            except aiohttp.ClientError:
+                results.append((None, 0.0, 0.0, 0.0))
+
+    async with aiohttp.ClientSession(timeout=aiohttp.ClientTimeout(total=None)) as session:
+        # warm up
+        await send_request(session, url, TEXTS[0], None, params)
+        start = time.perf_counter()
+        await asyncio.gather(*[client(session) for _ in range(concurrency)])
+        elapsed = time.perf_counter() - start
+    return results, elapsed
+
+
+def report(url, results, elapsed):
+    ok = [result for result in results if result[0] == 200]
+    latencies = np.array([result[1] for result in ok])
+    first_bytes = np.array([result[2] for result in ok])
+    audio_seconds = sum(result[3] for result in ok)
+    print(f"{url}: {len(ok)}/{len(results)} ok in {elapsed:.1f}s")
+    if ok:
+        p50, p90, p99 = np.percentile(latencies, [50, 90, 99])
+        print(f"  latency     p50 {p50:6.2f}s  p90 {p90:6.2f}s  p99 {p99:6.2f}s")
+        print(f"  first byte  p50 {np.percentile(first_bytes, 50):6.2f}s  p99 {np.percentile(first_bytes, 99):6.2f}s")
+    print(f"  throughput  {len(ok) / elapsed:6.2f} req/s  {audio_seconds / elapsed:6.2f} audio s/s")
+    errors = {}
+    for result in results:
+        if result[0] != 200:
+            errors[result[0]] = errors.get(result[0], 0) + 1
+    if errors:
+        print(f"  errors      {errors}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--urls", nargs="+", default=["http://localhost:5002"], help="Base URLs of the servers.")
+    parser.add_argument("--requests", type=int, default=64, help="Number of requests per server.")
+    parser.add_argument("--concurrency", type=int, default=8, help="Number of concurrent clients.")
+    parser.add_argument("--timeout", type=float, default=0, help="Request deadline in seconds, 0 for none.")
+    parser.add_argument("--stream", action="store_true", help="Request streamed responses.")
+    parser.add_argument("--format", default="wav", choices=["wav", "ogg"], help="Audio format of the responses.")
+    args = parser.parse_args()
+
+    params = {"format": args.format}
+    if args.stream:
+        params["stream"] = "true"
+    for url in args.urls:
+        results, elapsed = asyncio.run(
+            run_load(url.rstrip("/"), args.requests, args.concurrency, args.timeout, params)
+        )
+        report(url, results, elapsed)
+
+
+if __name__ == "__main__":
+    main()
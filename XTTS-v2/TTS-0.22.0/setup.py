@@ -118,7 +118,13 @@ setup(
         "ja": requirements_ja,
     },
     python_requires=">=3.9.0, <3.12",
-    entry_points={"console_scripts": ["tts=TTS.bin.synthesize:main", "tts-server = TTS.server.server:main"]},
+    entry_points={
+        "console_scripts": [
+            "tts=TTS.bin.synthesize:main",
+            "tts-server = TTS.server.server:main",
+            "tts-async-server = TTS.server.async_server:main",
+        ]
+    },
     classifiers=[
         "Programming Language :: Python",
         "Programming Language :: Python :: 3",
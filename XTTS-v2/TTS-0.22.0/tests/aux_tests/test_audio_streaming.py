@@ -0,0 +1,47 @@
+import io
+import unittest
+
+import numpy as np
+import soundfile as sf
+
+from TTS.utils.audio.streaming import StreamingAudioEncoder
+
+
+class TestStreamingAudioEncoder(unittest.TestCase):
+    def setUp(self):
+        self.chunks = [
+            0.5 * np.sin(np.arange(8000, dtype=np.float32) / 10),
+            np.zeros(2000, dtype=np.float32),
+            1.5 * np.ones(100, dtype=np.float32),
+        ]
+
+    def encode(self, encoder):
+        parts = [encoder.header()] + [encoder.encode(chunk) for chunk in self.chunks] + [encoder.close()]
+        return parts, b"".join(parts)
+
+    def test_wav(self):
+        encoder = StreamingAudioEncoder(22050, "wav")
+        parts, data = self.encode(encoder)
+        self.assertEqual(encoder.mimetype, "audio/wav")
+        # every chunk is encoded on its own
+        self.assertEqual([len(part) for part in parts[1:-1]], [2 * len(chunk) for chunk in self.chunks])
+        wav, sample_rate = sf.read(io.BytesIO(data), dtype="float32")
+        self.assertEqual(sample_rate, 22050)
+        expected = np.clip(np.concatenate(self.chunks), -1, 1)
+        np.testing.assert_allclose(wav, expected, atol=1e-4)
+
+    def test_ogg(self):
+        for sample_rate, subtype in ((24000, "OPUS"), (22050, "VORBIS")):
+            encoder = StreamingAudioEncoder(sample_rate, "ogg")
+            parts, data = self.encode(encoder)
+            self.assertEqual(encoder.mimetype, "audio/ogg")
+            # the first chunk is flushed before the next one is encoded
+            self.assertGreater(len(parts[0] + parts[1]), 0)
+            info = sf.info(io.BytesIO(data))
+            self.assertEqual(info.subtype, subtype)
+            self.assertEqual(info.samplerate, sample_rate)
+            self.assertEqual(info.frames, sum(len(chunk) for chunk in self.chunks))
+
+    def test_unknown_format(self):
+        with self.assertRaises(ValueError):
+            StreamingAudioEncoder(22050, "mp3")
@@ -0,0 +1,113 @@
+import os
+import shutil
+import unittest
+
+import numpy as np
+import torch
+
+from tests import get_tests_data_path, get_tests_output_path, run_cli
+from TTS.tts.configs.fast_pitch_config import FastPitchConfig
+from TTS.tts.configs.shared_configs import BaseDatasetConfig
+from TTS.tts.datasets import TTSDataset, load_tts_samples
+from TTS.tts.datasets.dataset import EnergyDataset, F0Dataset
+from TTS.tts.datasets.feature_store import FeatureStore, FeatureStoreWriter
+from TTS.tts.utils.text.tokenizer import TTSTokenizer
+from TTS.utils.audio import AudioProcessor
+
+OUTPATH = os.path.join(get_tests_output_path(), "feature_store_tests/")
+
+c = FastPitchConfig(text_cleaner="english_cleaners", compute_f0=False, compute_energy=True, eval_split_size=0.2)
+c.datasets = [
+    BaseDatasetConfig(
+        formatter="ljspeech_test",
+        meta_file_train="metadata.csv",
+        path=os.path.join(get_tests_data_path(), "ljspeech/"),
+        language="en",
+    )
+]
+
+
+class TestFeatureStore(unittest.TestCase):
+    def setUp(self):
+        shutil.rmtree(OUTPATH, ignore_errors=True)
+        os.makedirs(OUTPATH)
+
+    def test_writer_and_reader(self):
+        arrays = {f"sample_{idx}": np.random.rand(80, 10 + idx).astype(np.float32) for idx in range(10)}
+        # shards of about 3 arrays
+        with FeatureStoreWriter(os.path.join(OUTPATH, "store"), shard_size=3 * 80 * 12 * 4) as writer:
+            for key, array in arrays.items():
+                writer.add(key, mel=array, token_ids=np.arange(len(key), dtype=np.int32))
+            writer.add("no_mel", token_ids=np.arange(3, dtype=np.int32))
+
+        store = FeatureStore(os.path.join(OUTPATH, "store"))
+        self.assertEqual(len(store), 11)
+        self.assertGreater(len(store._features["mel"]["shards"]), 1)  # pylint: disable=protected-access
+        for key, array in arrays.items():
+            mel = store.get("mel", key)
+            self.assertFalse(mel.flags.writeable)
+            np.testing.assert_array_equal(mel, array)
+            np.testing.assert_array_equal(store.get("token_ids", key), np.arange(len(key)))
+        self.assertFalse(store.has("mel", "no_mel"))
+        self.assertFalse(store.has("mel", "unknown"))
+        with self.assertRaises(KeyError):
+            store.get("mel", "no_mel")
+
+    def test_dataset(self):
+        config_path = os.path.join(OUTPATH, "config.json")
+        store_path = os.path.join(OUTPATH, "store")
+        c.save_json(config_path)
+        run_cli(f"python TTS/bin/pack_feature_store.py {config_path} {store_path} --shard_size_mb 1")
+
+        ap = AudioProcessor(**c.audio)
+        tokenizer, _ = TTSTokenizer.init_from_config(c)
+        train_samples, eval_samples = load_tts_samples(c.datasets, eval_split=True, eval_split_size=0.2)
+        samples = train_samples + eval_samples
+
+        def load_batch(feature_store_path):
+            dataset = TTSDataset(
+                outputs_per_step=1,
+                return_wav=True,
+                compute_energy=True,
+                energy_cache_path=os.path.join(OUTPATH, "energy"),
+                tokenizer=tokenizer,
+                ap=ap,
+                samples=samples,
+                feature_store_path=feature_store_path,
+            )
+            return dataset.collate_fn([dataset[idx] for idx in range(4)])
+
+        batch = load_batch(None)
+        stored_batch = load_batch(store_path)
+        for name in ("token_id", "mel", "mel_lengths", "waveform"):
+            self.assertTrue(torch.equal(batch[name], stored_batch[name]), name)
+        self.assertEqual(batch["energy"].shape, stored_batch["energy"].shape)
+
+        # the store is rejected with different audio settings
+        c.audio.num_mels = 40
+        with self.assertRaises(ValueError):
+            TTSDataset(tokenizer=tokenizer, ap=AudioProcessor(**c.audio), samples=samples, feature_store_path=store_path)
+
+    def test_samples_missing_from_store(self):
+        # the store holds the first sample only, as if the second one was added to the metadata after packing
+        ap = AudioProcessor(**{**c.audio, "pitch_fmin": 65.0})
+        samples = load_tts_samples(c.datasets, eval_split=False)[0][:2]
+        store_path = os.path.join(OUTPATH, "store")
+        with FeatureStoreWriter(store_path) as writer:
+            writer.add(
+                samples[0]["audio_unique_name"],
+                pitch=np.full(5, 100.0, dtype=np.float32),
+                energy=np.full(5, 0.5, dtype=np.float32),
+            )
+        store = FeatureStore(store_path)
+
+        for dataset_class, name, feature, compute, kwargs in (
+            (F0Dataset, "f0", "pitch", F0Dataset._compute_and_save_pitch, {"normalize_f0": False}),
+            (EnergyDataset, "energy", "energy", EnergyDataset._compute_and_save_energy, {"normalize_energy": False}),
+        ):
+            cache_path = os.path.join(OUTPATH, f"{name}_cache")
+            dataset = dataset_class(samples, ap, cache_path=cache_path, feature_store=store, **kwargs)
+            np.testing.assert_array_equal(dataset[0][name], store.get(feature, samples[0]["audio_unique_name"]))
+            np.testing.assert_array_equal(dataset[1][name], compute(ap, samples[1]["audio_file"]).astype(np.float32))
+            # only the missing sample is computed and cached
+            self.assertEqual(len(os.listdir(cache_path)), 1)
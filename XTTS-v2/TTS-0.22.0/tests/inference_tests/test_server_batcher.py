@@ -0,0 +1,96 @@
+import asyncio
+import os
+import time
+import unittest
+from types import SimpleNamespace
+
+from trainer.io import save_checkpoint
+
+from tests import get_tests_input_path
+from TTS.config import load_config
+from TTS.server.batcher import DynamicBatcher, RequestExpired, SynthesizerReplica
+from TTS.tts.models import setup_model
+from TTS.utils.synthesizer import Synthesizer
+
+TEXT = "Better this test works!!"
+LONG_TEXT = " ".join([TEXT] * 20)
+
+
+class SlowSynthesizer:
+    """Stands in for a synthesizer of a model with a decode scheduler, whose synthesis time grows with the text."""
+
+    output_sample_rate = 22050
+    tts_model = SimpleNamespace(decode_scheduler=object())
+
+    def tts(self, text, **kwargs):  # pylint: disable=unused-argument
+        time.sleep(0.002 * len(text))
+        return [0.0] * len(text)
+
+
+class DynamicBatcherTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        config = load_config(os.path.join(get_tests_input_path(), "dummy_model_config.json"))
+        save_checkpoint(config, setup_model(config), None, None, 10, 1, get_tests_input_path())
+        cls.synthesizer = Synthesizer(
+            os.path.join(get_tests_input_path(), "checkpoint_10.pth"),
+            os.path.join(get_tests_input_path(), "dummy_model_config.json"),
+        )
+
+    def test_batches(self):
+        async def run():
+            batcher = await DynamicBatcher(
+                [SynthesizerReplica(self.synthesizer)], max_batch_size=4, max_wait=0.5
+            ).start()
+            wavs = await asyncio.gather(*[batcher.synthesize(TEXT) for _ in range(4)])
+            await batcher.shutdown()
+            return wavs, batcher.stats()
+
+        wavs, stats = asyncio.run(run())
+        self.assertTrue(all(len(wav) > 0 for wav in wavs))
+        self.assertEqual(stats["batches"], 1)
+        self.assertEqual(stats["mean_batch_size"], 4)
+
+    def test_deadline_and_cancellation(self):
+        async def run():
+            batcher = await DynamicBatcher(
+                [SynthesizerReplica(self.synthesizer)], max_batch_size=1, max_wait=0
+            ).start()
+            first = asyncio.ensure_future(batcher.synthesize(TEXT))
+            # both wait in the queue while the first request is synthesized
+            expired = asyncio.ensure_future(batcher.synthesize(TEXT, timeout=1e-3))
+            cancelled = asyncio.ensure_future(batcher.synthesize(TEXT))
+            await asyncio.sleep(0)
+            cancelled.cancel()
+            results = await asyncio.gather(first, expired, cancelled, return_exceptions=True)
+            await batcher.shutdown()
+            return results, batcher.stats()
+
+        (wav, expired, cancelled), stats = asyncio.run(run())
+        self.assertGreater(len(wav), 0)
+        self.assertIsInstance(expired, RequestExpired)
+        self.assertIsInstance(cancelled, asyncio.CancelledError)
+        self.assertEqual(stats["batches"], 1)
+        self.assertEqual(stats["expired"], 1)
+        self.assertEqual(stats["cancelled"], 1)
+
+    def test_concurrent_results_in_completion_order(self):
+        # a replica of a model with a decode scheduler synthesizes the requests of a batch concurrently
+        replica = SynthesizerReplica(SlowSynthesizer(), max_batch_size=2)
+
+        async def run():
+            batcher = await DynamicBatcher([replica], max_batch_size=2, max_wait=0.5).start()
+            completed = []
+            tasks = {}
+            for name, text in [("long", LONG_TEXT), ("short", "Hi.")]:
+                tasks[name] = asyncio.ensure_future(batcher.synthesize(text))
+                tasks[name].add_done_callback(lambda _, name=name: completed.append(name))
+            wavs = await asyncio.gather(*tasks.values())
+            await batcher.shutdown()
+            return completed, wavs, batcher.stats()
+
+        completed, (long_wav, short_wav), stats = asyncio.run(run())
+        self.assertEqual(stats["batches"], 1)
+        self.assertGreater(len(long_wav), 10 * len(short_wav))
+        # the short request is answered without waiting for the long one submitted before it
+        self.assertEqual(completed, ["short", "long"])
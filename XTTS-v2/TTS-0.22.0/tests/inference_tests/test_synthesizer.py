@@ -1,9 +1,13 @@
 import os
+import shutil
 import unittest
 
+import numpy as np
+import soundfile as sf
+import torch
 from trainer.io import save_checkpoint
 
-from tests import get_tests_input_path
+from tests import get_tests_input_path, get_tests_output_path
 from TTS.config import load_config
 from TTS.tts.models import setup_model
 from TTS.utils.synthesizer import Synthesizer
@@ -26,6 +30,48 @@ class SynthesizerTest(unittest.TestCase):
         synthesizer = Synthesizer(tts_checkpoint, tts_config, None, None)
         synthesizer.tts("Better this test works!!")
 
+    def test_result_cache(self):
+        self._create_random_model()
+        tts_root_path = get_tests_input_path()
+        tts_checkpoint = os.path.join(tts_root_path, "checkpoint_10.pth")
+        tts_config = os.path.join(tts_root_path, "dummy_model_config.json")
+        cache_dir = os.path.join(get_tests_output_path(), "synthesizer_result_cache")
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        synthesizer = Synthesizer(tts_checkpoint, tts_config, None, None)
+        synthesizer.enable_result_cache(cache_dir)
+        wav = synthesizer.tts("Better this test works!!", seed=1)
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+        # the cached waveform is stored as float32
+        np.testing.assert_allclose(synthesizer.tts("Better this test works!!", seed=1), wav, atol=1e-6)
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+        # unseeded calls are not cached
+        synthesizer.tts("Better this test works!!")
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+
+    def test_tts_chunks(self):
+        self._create_random_model()
+        tts_root_path = get_tests_input_path()
+        tts_checkpoint = os.path.join(tts_root_path, "checkpoint_10.pth")
+        tts_config = os.path.join(tts_root_path, "dummy_model_config.json")
+        synthesizer = Synthesizer(tts_checkpoint, tts_config, None, None)
+        text = "Better this test works. This is the second sentence!"
+        wav = synthesizer.tts(text, seed=1)
+        self.assertEqual(wav.dtype, np.float32)
+
+        torch.manual_seed(1)
+        np.random.seed(1)
+        chunks = list(synthesizer.tts_chunks(text))
+        # one chunk per sentence, each one followed by silence
+        self.assertEqual(len(chunks), 4)
+        self.assertFalse(chunks[1].any())
+        np.testing.assert_array_equal(np.concatenate(chunks), wav)
+
+        torch.manual_seed(1)
+        np.random.seed(1)
+        output_path = os.path.join(get_tests_output_path(), "synthesizer_chunks.wav")
+        synthesizer.save_wav(synthesizer.tts_chunks(text), output_path)
+        self.assertEqual(sf.info(output_path).frames, len(wav))
+
     def test_split_into_sentences(self):
         """Check demo server sentences split as expected"""
         print("\n > Testing demo server sentence splitting")
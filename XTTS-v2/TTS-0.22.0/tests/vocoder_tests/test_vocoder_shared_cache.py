@@ -0,0 +1,57 @@
+import os
+
+import numpy as np
+import torch
+from torch.utils.data import DataLoader
+
+from tests import get_tests_path
+from TTS.utils.audio import AudioProcessor
+from TTS.vocoder.configs import BaseGANVocoderConfig
+from TTS.vocoder.datasets.gan_dataset import GANDataset
+from TTS.vocoder.datasets.preprocess import load_wav_data
+from TTS.vocoder.datasets.shared_cache import SharedFeatureCache
+from TTS.vocoder.datasets.wavegrad_dataset import WaveGradDataset
+
+C = BaseGANVocoderConfig()
+
+test_data_path = os.path.join(get_tests_path(), "data/ljspeech/")
+
+
+def test_shared_feature_cache():
+    cache = SharedFeatureCache(3, capacity=4 * 100, num_arrays=2)
+    audio = np.random.rand(40).astype(np.float32)
+    mel = np.random.rand(4, 10)
+    assert cache.get(0) is None
+    assert cache.put(0, audio, mel)
+    assert not cache.put(0, audio, mel)  # already cached
+    cached_audio, cached_mel = cache.get(0)
+    np.testing.assert_array_equal(cached_audio, audio)
+    np.testing.assert_allclose(cached_mel, mel.astype(np.float32))
+    assert cache.used_bytes == 4 * 80
+    # does not fit in the remaining space
+    assert not cache.put(1, audio, mel)
+    assert cache.get(1) is None
+
+
+def test_cache_filled_by_workers():
+    """The data loader workers fill the cache of the main process."""
+    ap = AudioProcessor(**C.audio)
+    _, train_items = load_wav_data(test_data_path, 10)
+    for dataset in (
+        GANDataset(ap, train_items, seq_len=ap.hop_length * 10, hop_len=ap.hop_length, pad_short=2000, use_cache=True),
+        WaveGradDataset(
+            ap, train_items, seq_len=ap.hop_length * 10, hop_len=ap.hop_length, pad_short=2000, use_cache=True
+        ),
+    ):
+        loader = DataLoader(dataset, batch_size=2, num_workers=2)
+        for _ in loader:
+            pass
+        assert all(state == SharedFeatureCache.READY for state in dataset.cache.state.tolist())
+        # the cached items give the same features as the computed ones
+        dataset.return_segments = False
+        for idx in range(len(dataset)):
+            mel, audio = dataset.load_item(idx)
+            dataset.use_cache = False
+            mel_computed, audio_computed = dataset.load_item(idx)
+            dataset.use_cache = True
+            assert torch.allclose(audio, audio_computed) and torch.allclose(mel, mel_computed, atol=1e-5)
@@ -0,0 +1,141 @@
+import threading
+import unittest
+from unittest import mock
+
+import numpy as np
+import torch
+
+from tests.xtts_tests.test_xtts_inference import TEXT, create_random_model
+from TTS.tts.layers.xtts.decode_scheduler import GPTDecodeScheduler
+
+torch.manual_seed(1)
+
+TEXTS = ["This is a test sentence.", "And this is another, slightly longer one.", "Short."]
+
+
+class GPTDecodeSchedulerTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.model = create_random_model()
+        cls.cond_latents = []
+        for seconds in [2, 3, 1]:
+            wav = torch.rand(1, 22050 * seconds) * 2 - 1
+            cls.cond_latents.append(cls.model.get_gpt_cond_latents(wav, 22050))
+        cls.text_tokens = [
+            torch.IntTensor(cls.model.tokenizer.encode(text.lower(), lang="en")).unsqueeze(0) for text in TEXTS
+        ]
+
+    def _generate_greedy(self, cond_latents, text_tokens):
+        with torch.inference_mode():
+            return self.model.gpt.generate(
+                cond_latents=cond_latents,
+                text_inputs=text_tokens,
+                do_sample=False,
+                num_beams=1,
+                repetition_penalty=2.0,
+            )
+
+    def test_greedy_matches_generate(self):
+        scheduler = GPTDecodeScheduler(self.model.gpt)
+        future = scheduler.submit(self.cond_latents[0], self.text_tokens[0], do_sample=False, repetition_penalty=2.0)
+        scheduler.run_until_complete()
+        expected = self._generate_greedy(self.cond_latents[0], self.text_tokens[0])
+        self.assertTrue(torch.equal(future.result(), expected))
+
+    def test_running_batch_matches_generate(self):
+        # requests with different prefix lengths, some of them admitted while the others are decoding
+        scheduler = GPTDecodeScheduler(self.model.gpt, max_batch_size=2)
+        futures = [
+            scheduler.submit(self.cond_latents[idx], self.text_tokens[idx], do_sample=False, repetition_penalty=2.0)
+            for idx in range(2)
+        ]
+        with torch.inference_mode():
+            for _ in range(3):
+                scheduler.step()
+        self.assertEqual(scheduler.stats()["active"], 2)
+        futures.append(
+            scheduler.submit(self.cond_latents[2], self.text_tokens[2], do_sample=False, repetition_penalty=2.0)
+        )
+        scheduler.run_until_complete()
+        self.assertEqual(scheduler.stats()["active"], 0)
+        for idx, future in enumerate(futures):
+            expected = self._generate_greedy(self.cond_latents[idx], self.text_tokens[idx])
+            self.assertTrue(torch.equal(future.result(), expected))
+
+    def test_sampling_settings_per_sequence(self):
+        scheduler = GPTDecodeScheduler(self.model.gpt)
+        settings = [
+            {"temperature": 0.5, "top_k": 1},
+            {"temperature": 1.2, "top_p": 0.5, "repetition_penalty": 1.0},
+            {"do_sample": False, "max_new_tokens": 5},
+        ]
+        futures = [
+            scheduler.submit(self.cond_latents[idx], self.text_tokens[idx], **kwargs)
+            for idx, kwargs in enumerate(settings)
+        ]
+        scheduler.run_until_complete()
+        for future in futures:
+            codes = future.result()
+            self.assertEqual(codes.ndim, 2)
+            self.assertLessEqual(codes.shape[1], self.model.gpt.max_gen_mel_tokens)
+        self.assertLessEqual(futures[2].result().shape[1], 5)
+        with self.assertRaises(ValueError):
+            scheduler.submit(self.cond_latents[0], self.text_tokens[0], temperature=0)
+
+    def test_failed_admission(self):
+        scheduler = GPTDecodeScheduler(self.model.gpt, max_batch_size=2)
+        kwargs = {"do_sample": False, "repetition_penalty": 2.0}
+        running = scheduler.submit(self.cond_latents[0], self.text_tokens[0], **kwargs)
+        with torch.inference_mode():
+            for _ in range(3):
+                scheduler.step()
+        with mock.patch.object(scheduler, "_merge", side_effect=RuntimeError("out of memory")):
+            failed = scheduler.submit(self.cond_latents[1], self.text_tokens[1], **kwargs)
+            with torch.inference_mode():
+                scheduler.step()
+        self.assertIsInstance(failed.exception(timeout=0), RuntimeError)
+        # the running sequence is not affected
+        scheduler.run_until_complete()
+        self.assertTrue(torch.equal(running.result(), self._generate_greedy(self.cond_latents[0], self.text_tokens[0])))
+
+        # the worker thread survives a failed admission while idle
+        scheduler.start()
+        try:
+            with mock.patch.object(scheduler, "_merge", side_effect=RuntimeError("out of memory")):
+                failed = scheduler.submit(self.cond_latents[1], self.text_tokens[1], **kwargs)
+                self.assertIsInstance(failed.exception(timeout=60), RuntimeError)
+            future = scheduler.submit(self.cond_latents[2], self.text_tokens[2], **kwargs)
+            expected = self._generate_greedy(self.cond_latents[2], self.text_tokens[2])
+            self.assertTrue(torch.equal(future.result(timeout=60), expected))
+        finally:
+            scheduler.shutdown()
+
+    def test_xtts_inference_with_scheduler(self):
+        speaker_embedding = self.model.get_speaker_embedding(torch.rand(1, 22050 * 2) * 2 - 1, 22050)
+        kwargs = {"do_sample": False, "repetition_penalty": 2.0}
+        expected = self.model.inference(TEXT, "en", self.cond_latents[0], speaker_embedding, **kwargs)
+
+        self.model.enable_decode_scheduler(max_batch_size=4)
+        try:
+            outputs = [None] * 3
+
+            def run(idx):
+                outputs[idx] = self.model.inference(TEXT, "en", self.cond_latents[0], speaker_embedding, **kwargs)
+
+            threads = [threading.Thread(target=run, args=(idx,)) for idx in range(len(outputs))]
+            for thread in threads:
+                thread.start()
+            for thread in threads:
+                thread.join()
+            variations = self.model.inference_variations(
+                TEXT, "en", self.cond_latents[0], speaker_embedding, [{"temperature": 0.7}, {"temperature": 0.8}]
+            )
+        finally:
+            self.model.decode_scheduler.shutdown()
+            self.model.decode_scheduler = None
+
+        for output in outputs:
+            np.testing.assert_allclose(output["wav"], expected["wav"], atol=1e-5)
+        self.assertEqual(len(variations), 2)
+        for variation in variations:
+            self.assertGreater(variation["wav"].shape[0], 0)
@@ -0,0 +1,141 @@
+import os
+import shutil
+import unittest
+
+import torch
+
+from tests import get_tests_data_path, get_tests_output_path
+from TTS.config.shared_configs import BaseDatasetConfig
+from TTS.tts.datasets import load_tts_samples
+from TTS.tts.layers.xtts.dvae import DiscreteVAE
+from TTS.tts.layers.xtts.trainer.dataset import XTTSDataset
+from TTS.tts.layers.xtts.trainer.gpt_trainer import GPTArgs, GPTTrainer, GPTTrainerConfig, XttsAudioConfig
+
+OUT_PATH = os.path.join(get_tests_output_path(), "xtts_dvae_cache")
+CACHE_DIR = os.path.join(OUT_PATH, "dvae_cache")
+DVAE_CHECKPOINT = os.path.join(OUT_PATH, "dvae.pth")
+MEL_NORM_FILE = os.path.join(OUT_PATH, "mel_stats.pth")
+
+
+def create_model(sample_rate=22050):
+    os.makedirs(OUT_PATH, exist_ok=True)
+    if not os.path.exists(DVAE_CHECKPOINT):
+        torch.manual_seed(0)
+        dvae = DiscreteVAE(
+            channels=80,
+            normalization=None,
+            positional_dims=1,
+            num_tokens=8192,
+            codebook_dim=512,
+            hidden_dim=512,
+            num_resnet_blocks=3,
+            kernel_size=3,
+            num_layers=2,
+            use_transposed_convs=False,
+        )
+        torch.save(dvae.state_dict(), DVAE_CHECKPOINT)
+        torch.save(torch.ones(80), MEL_NORM_FILE)
+    model_args = GPTArgs(
+        max_conditioning_length=66150,
+        min_conditioning_length=44100,
+        max_wav_length=255995,
+        max_text_length=200,
+        mel_norm_file=MEL_NORM_FILE,
+        dvae_checkpoint=DVAE_CHECKPOINT,
+        dvae_cache_path=CACHE_DIR,
+        tokenizer_file="tests/inputs/xtts_vocab.json",
+        gpt_layers=1,
+        gpt_n_model_channels=64,
+        gpt_n_heads=2,
+        gpt_num_audio_tokens=8194,
+        gpt_start_audio_token=8192,
+        gpt_stop_audio_token=8193,
+        gpt_use_perceiver_resampler=True,
+    )
+    audio_config = XttsAudioConfig(sample_rate=sample_rate, dvae_sample_rate=22050, output_sample_rate=24000)
+    config = GPTTrainerConfig(model_args=model_args, audio=audio_config, batch_size=2, output_path=OUT_PATH)
+    return GPTTrainer.init_from_config(config)
+
+
+def load_samples(num_samples):
+    dataset_config = BaseDatasetConfig(
+        formatter="ljspeech",
+        path=os.path.join(get_tests_data_path(), "ljspeech"),
+        meta_file_train="metadata.csv",
+        language="en",
+    )
+    samples, _ = load_tts_samples(dataset_config, eval_split=False)
+    return samples[:num_samples]
+
+
+def get_batch(model, samples):
+    dataset = XTTSDataset(
+        model.config, samples, model.xtts.tokenizer, model.config.audio.sample_rate, True, model.dvae_cache
+    )
+    batch = dataset.collate_fn([dataset[idx] for idx in range(len(samples))])
+    return model.format_batch_on_device(batch)
+
+
+class DVAECodeCacheTest(unittest.TestCase):
+    def setUp(self):
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+    def test_num_dvae_codes(self):
+        model = create_model(sample_rate=24000)
+        for num_samples in (24000, 24001, 30720, 31744):
+            codes = model.compute_dvae_codes(torch.rand(1, 1, num_samples) - 0.5)
+            self.assertEqual(codes.shape[1], model.num_dvae_codes(num_samples))
+
+    def test_write_through(self):
+        model = create_model()
+        samples = load_samples(2)
+        batch = get_batch(model, [dict(sample) for sample in samples])
+        for sample in samples:
+            self.assertIn(sample["audio_file"], model.dvae_cache)
+
+        # the second epoch reads the codes and the conditioning mels from the cache
+        cached_batch = get_batch(model, [dict(sample) for sample in samples])
+        self.assertEqual(cached_batch["audio_codes"].shape, batch["audio_codes"].shape)
+        self.assertEqual(cached_batch["cond_mels"].shape, batch["cond_mels"].shape)
+        # the cached conditioning slices are rounded to the mel frames
+        hop_length = model.torch_mel_spectrogram_style_encoder.hop_length
+        self.assertTrue(torch.all((cached_batch["cond_idxs"] - batch["cond_idxs"]).abs() < hop_length))
+        for i, num_samples in enumerate(batch["wav_lengths"].tolist()):
+            num_codes = model.num_dvae_codes(num_samples)
+            cached_codes = cached_batch["audio_codes"][i, :num_codes]
+            self.assertTrue(torch.equal(cached_codes, batch["audio_codes"][i, :num_codes]))
+            # the frames away from the slice end match, these overlap the zero padding of the conditioning clip
+            num_frames = int(batch["cond_idxs"][i, 1]) // hop_length
+            torch.testing.assert_close(
+                cached_batch["cond_mels"][i, :, :, 2 : num_frames - 4],
+                batch["cond_mels"][i, :, :, 2 : num_frames - 4],
+                atol=1e-3,
+                rtol=1e-3,
+            )
+            # and the padding frames are the mel of silence
+            torch.testing.assert_close(cached_batch["cond_mels"][i, :, :, -1], batch["cond_mels"][i, :, :, -1])
+
+    def test_precompute_and_mixed_batch(self):
+        model = create_model()
+        samples = load_samples(2)
+        model.precompute_dvae_cache(samples[:1])
+        self.assertIn(samples[0]["audio_file"], model.dvae_cache)
+        self.assertNotIn(samples[1]["audio_file"], model.dvae_cache)
+
+        batch = get_batch(model, [dict(sample) for sample in samples])
+        self.assertIn(samples[1]["audio_file"], model.dvae_cache)
+        entry = model.dvae_cache.load(samples[0]["audio_file"])
+        num_codes = model.num_dvae_codes(entry["num_samples"])
+        self.assertEqual(entry["codes"].shape[0], num_codes)
+        self.assertTrue(torch.equal(batch["audio_codes"][0, :num_codes], entry["codes"].long()))
+        self.assertNotIn("cached_audio_codes", batch)
+
+    def test_settings(self):
+        model = create_model()
+        settings = model.get_dvae_cache_settings()
+        # other mel norms give other codes
+        model.torch_mel_spectrogram_dvae.mel_norms = torch.full((80,), 2.0)
+        self.assertNotEqual(model.get_dvae_cache_settings()["mel_norms_hash"], settings["mel_norms_hash"])
+        model.args.dvae_checkpoint = ""
+        with self.assertRaises(RuntimeError):
+            model.get_dvae_cache_settings()
@@ -0,0 +1,178 @@
+import os
+import shutil
+import threading
+import unittest
+
+import numpy as np
+import torch
+
+from tests import get_tests_data_path, get_tests_input_path, get_tests_output_path
+from TTS.tts.configs.xtts_config import XttsConfig
+from TTS.tts.layers.xtts.latent_cache import SpeakerLatentCache
+from TTS.tts.layers.xtts.tokenizer import VoiceBpeTokenizer
+from TTS.tts.models.xtts import InferenceCancelled, Xtts, XttsArgs, get_mel_transform, wav_to_mel_cloning
+
+torch.manual_seed(1)
+
+TOKENIZER_FILE = f"{get_tests_input_path()}/xtts_vocab.json"
+TEXT = "This is a test sentence. And this is another one."
+# long enough to be split into several chunks by `split_sentence`
+LONG_TEXT = " ".join(
+    f"This is test sentence number {idx}, it is written to make the text splitter cut the paragraph into chunks."
+    + " And a few more words." * idx
+    for idx in range(4)
+)
+WAV_FILE = os.path.join(get_tests_data_path(), "ljspeech", "wavs", "LJ001-0001.wav")
+
+
+def create_random_model():
+    model_args = XttsArgs(
+        gpt_layers=2,
+        gpt_n_model_channels=64,
+        gpt_n_heads=2,
+        gpt_max_audio_tokens=40,
+        gpt_use_perceiver_resampler=True,
+        decoder_input_dim=64,
+    )
+    model = Xtts(XttsConfig(model_args=model_args))
+    model.tokenizer = VoiceBpeTokenizer(vocab_file=TOKENIZER_FILE)
+    model.init_models()
+    model.eval()
+    return model
+
+
+class XttsInferenceTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.model = create_random_model()
+        wav = torch.rand(1, 22050 * 2) * 2 - 1
+        cls.gpt_cond_latent = cls.model.get_gpt_cond_latents(wav, 22050)
+        cls.speaker_embedding = cls.model.get_speaker_embedding(wav, 22050)
+
+    def test_inference_variations_matches_inference(self):
+        torch.manual_seed(0)
+        output = self.model.inference(
+            TEXT, "en", self.gpt_cond_latent, self.speaker_embedding, temperature=0.7, speed=1.2
+        )
+        torch.manual_seed(0)
+        variations = self.model.inference_variations(
+            TEXT, "en", self.gpt_cond_latent, self.speaker_embedding, [{"temperature": 0.7, "speed": 1.2}]
+        )
+        self.assertEqual(len(variations), 1)
+        np.testing.assert_allclose(variations[0]["wav"], output["wav"])
+        np.testing.assert_allclose(variations[0]["gpt_latents"], output["gpt_latents"])
+
+    def test_inference_variations(self):
+        variations = [{"temperature": 0.7}, {"temperature": 0.75, "speed": 1.1}, {"temperature": 0.65, "speed": 0.9}]
+        outputs = self.model.inference_variations(
+            TEXT, "en", self.gpt_cond_latent, self.speaker_embedding, variations, enable_text_splitting=True
+        )
+        self.assertEqual(len(outputs), len(variations))
+        for output in outputs:
+            self.assertEqual(output["wav"].ndim, 1)
+            self.assertGreater(output["wav"].shape[0], 0)
+            self.assertEqual(output["gpt_latents"].shape[-1], 64)
+
+    def test_inference_variations_cancelled(self):
+        cancel_event = threading.Event()
+        stages = []
+
+        def cancel(stage, seconds, **info):
+            stages.append(stage)
+            # cancelled while the first text chunk is decoded
+            cancel_event.set()
+
+        self.model.stage_callback = cancel
+        try:
+            with self.assertRaises(InferenceCancelled):
+                self.model.inference_variations(
+                    LONG_TEXT,
+                    "en",
+                    self.gpt_cond_latent,
+                    self.speaker_embedding,
+                    [{"temperature": 0.7}, {"temperature": 0.75}],
+                    enable_text_splitting=True,
+                    cancel_event=cancel_event,
+                )
+        finally:
+            self.model.stage_callback = None
+        self.assertEqual(stages.count("gpt_generate"), 1)
+
+    def test_inference_sentence_batching(self):
+        kwargs = {"do_sample": False, "repetition_penalty": 2.0, "enable_text_splitting": True}
+        sequential = self.model.inference(
+            LONG_TEXT, "en", self.gpt_cond_latent, self.speaker_embedding, sentence_batch_size=1, **kwargs
+        )
+        batched = self.model.inference(LONG_TEXT, "en", self.gpt_cond_latent, self.speaker_embedding, **kwargs)
+        self.assertGreater(sequential["gpt_latents"].shape[1], self.model.gpt.max_gen_mel_tokens)
+        np.testing.assert_allclose(batched["gpt_latents"], sequential["gpt_latents"], atol=1e-4)
+        np.testing.assert_allclose(batched["wav"], sequential["wav"], atol=1e-4)
+
+    def test_gpt_cond_latents_batched_chunks(self):
+        # 2 chunks of 6 s and a shorter last one
+        wav = torch.rand(1, int(22050 * 14.5)) * 2 - 1
+        mel_kwargs = {"n_fft": 2048, "hop_length": 256, "win_length": 1024, "f_min": 0, "f_max": 8000, "n_mels": 80}
+        style_embs = []
+        for idx in range(0, wav.shape[1], 22050 * 6):
+            mel = wav_to_mel_cloning(wav[:, idx : idx + 22050 * 6], mel_norms=self.model.mel_stats, **mel_kwargs)
+            style_embs.append(self.model.gpt.get_style_emb(mel))
+        expected = torch.stack(style_embs).mean(dim=0).transpose(1, 2)
+
+        cond_latent = self.model.get_gpt_cond_latents(wav, 22050)
+        torch.testing.assert_close(cond_latent, expected, rtol=1e-4, atol=1e-5)
+        transform_args = (torch.device("cpu"), 2048, 256, 1024, 2, False, 22050, 0, 8000, 80)
+        self.assertIs(get_mel_transform(*transform_args), get_mel_transform(*transform_args))
+
+    def test_conditioning_latents_cache(self):
+        cache_dir = os.path.join(get_tests_output_path(), "xtts_latent_cache")
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        self.model.latent_cache = SpeakerLatentCache(cache_dir=cache_dir)
+        try:
+            gpt_cond_latent, speaker_embedding = self.model.get_conditioning_latents(WAV_FILE)
+            self.assertEqual(len(os.listdir(cache_dir)), 1)
+            cached_gpt_cond_latent, cached_speaker_embedding = self.model.get_conditioning_latents(WAV_FILE)
+            self.assertTrue(torch.equal(gpt_cond_latent, cached_gpt_cond_latent))
+            self.assertTrue(torch.equal(speaker_embedding, cached_speaker_embedding))
+            self.model.get_conditioning_latents(WAV_FILE, gpt_cond_len=3)
+            self.assertEqual(len(os.listdir(cache_dir)), 2)
+        finally:
+            self.model.latent_cache = None
+
+    def test_synthesize_stream(self):
+        config = XttsConfig(model_args=self.model.args)
+        chunks = list(self.model.synthesize_stream(TEXT, config, WAV_FILE, "en", stream_chunk_size=10))
+        self.assertGreater(len(chunks), 1)
+        for chunk in chunks:
+            self.assertEqual(chunk.ndim, 1)
+
+    def test_inference_stream_vocodes_new_latents(self):
+        def stream(**kwargs):
+            chunks = self.model.inference_stream(
+                TEXT,
+                "en",
+                self.gpt_cond_latent,
+                self.speaker_embedding,
+                stream_chunk_size=5,
+                # the stream generator only samples, `top_k=1` makes it greedy
+                top_k=1,
+                repetition_penalty=2.0,
+                **kwargs,
+            )
+            return [chunk.cpu().numpy() for chunk in chunks]
+
+        # `vocoder_context_frames=None` vocodes all the latents for every chunk
+        expected = stream(vocoder_context_frames=None)
+        chunks = stream()
+        self.assertGreater(len(expected), 2)
+        self.assertEqual([len(chunk) for chunk in chunks], [len(chunk) for chunk in expected])
+        np.testing.assert_allclose(np.concatenate(chunks), np.concatenate(expected), atol=1e-4)
+
+    def test_stage_callback(self):
+        stages = []
+        self.model.stage_callback = lambda stage, seconds, **info: stages.append((stage, info))
+        try:
+            self.model.inference(TEXT, "en", self.gpt_cond_latent, self.speaker_embedding)
+        finally:
+            self.model.stage_callback = None
+        self.assertEqual([stage for stage, _ in stages], ["gpt_generate", "gpt_latents", "vocoder"])
+        self.assertGreater(stages[0][1]["tokens"], 0)
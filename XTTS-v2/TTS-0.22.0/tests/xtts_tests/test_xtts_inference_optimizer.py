@@ -0,0 +1,71 @@
+import os
+import shutil
+import unittest
+
+import numpy as np
+import torch
+from torch.nn.utils import parametrize
+
+from tests import get_tests_output_path
+from tests.xtts_tests.test_xtts_inference import TEXT, create_random_model
+
+torch.manual_seed(1)
+
+
+class XttsInferenceOptimizerTest(unittest.TestCase):
+    def setUp(self):
+        self.model = create_random_model()
+        # random running statistics, so the fused batch norms are not identities
+        for module in self.model.hifigan_decoder.speaker_encoder.modules():
+            if isinstance(module, torch.nn.modules.batchnorm._BatchNorm):  # pylint: disable=protected-access
+                module.running_mean.uniform_(-0.5, 0.5)
+                module.running_var.uniform_(0.5, 1.5)
+        self.wav = torch.rand(1, 22050 * 2) * 2 - 1
+        self.gpt_cond_latent = self.model.get_gpt_cond_latents(self.wav, 22050)
+
+    def _synthesize(self):
+        speaker_embedding = self.model.get_speaker_embedding(self.wav, 22050)
+        output = self.model.inference(
+            TEXT, "en", self.gpt_cond_latent, speaker_embedding, do_sample=False, repetition_penalty=2.0
+        )
+        return speaker_embedding, output["wav"]
+
+    def test_fold_weight_norm_and_batch_norms(self):
+        expected_embedding, expected_wav = self._synthesize()
+        self.model.optimize_for_inference()
+        # applying it twice is a no-op
+        self.model.optimize_for_inference()
+
+        waveform_decoder = self.model.hifigan_decoder.waveform_decoder
+        self.assertFalse(any(parametrize.is_parametrized(module) for module in waveform_decoder.modules()))
+        num_batch_norms = sum(
+            isinstance(module, torch.nn.modules.batchnorm._BatchNorm)  # pylint: disable=protected-access
+            for module in self.model.hifigan_decoder.speaker_encoder.modules()
+        )
+        # the batch norms after the first convolution of each block are kept
+        self.assertEqual(num_batch_norms, 1 + 16)
+
+        speaker_embedding, wav = self._synthesize()
+        torch.testing.assert_close(speaker_embedding, expected_embedding, rtol=1e-4, atol=1e-4)
+        np.testing.assert_allclose(wav, expected_wav, atol=1e-4)
+
+    def test_torchscript_cache(self):
+        cache_dir = os.path.join(get_tests_output_path(), "xtts_compile_cache")
+        shutil.rmtree(cache_dir, ignore_errors=True)
+        state_dict = {name: tensor.clone() for name, tensor in self.model.state_dict().items()}
+        _, expected_wav = self._synthesize()
+        self.model.optimize_for_inference(compile_backend="torchscript", cache_dir=cache_dir)
+        self.assertIsInstance(self.model.hifigan_decoder.waveform_decoder, torch.jit.ScriptModule)
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+        _, wav = self._synthesize()
+        np.testing.assert_allclose(wav, expected_wav, atol=1e-4)
+
+        # the next startup loads the traced decoder
+        model = create_random_model()
+        model.load_state_dict(state_dict)
+        model.optimize_for_inference(compile_backend="torchscript", cache_dir=cache_dir)
+        self.assertEqual(len(os.listdir(cache_dir)), 1)
+        self.assertIsInstance(model.hifigan_decoder.waveform_decoder, torch.jit.ScriptModule)
+
+        with self.assertRaises(ValueError):
+            self.model.optimize_for_inference(compile_backend="tensorrt")
@@ -0,0 +1,52 @@
+import os
+import shutil
+import unittest
+
+import torch
+
+from tests import get_tests_data_path, get_tests_output_path
+from TTS.tts.layers.xtts.latent_cache import SpeakerLatentCache
+
+WAV_FILE_1 = os.path.join(get_tests_data_path(), "ljspeech", "wavs", "LJ001-0001.wav")
+WAV_FILE_2 = os.path.join(get_tests_data_path(), "ljspeech", "wavs", "LJ001-0002.wav")
+CACHE_DIR = os.path.join(get_tests_output_path(), "latent_cache")
+
+
+class SpeakerLatentCacheTest(unittest.TestCase):
+    def setUp(self):
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+    def test_key(self):
+        cache = SpeakerLatentCache()
+        key = cache.make_key([WAV_FILE_1], gpt_cond_len=6)
+        # the key depends on the content of the files, not on their paths
+        copy_path = os.path.join(get_tests_output_path(), "latent_cache_ref_copy.wav")
+        shutil.copy(WAV_FILE_1, copy_path)
+        self.assertEqual(key, cache.make_key([copy_path], gpt_cond_len=6))
+        self.assertNotEqual(key, cache.make_key([WAV_FILE_2], gpt_cond_len=6))
+        self.assertNotEqual(key, cache.make_key([WAV_FILE_1], gpt_cond_len=12))
+        self.assertNotEqual(key, SpeakerLatentCache(namespace="other").make_key([WAV_FILE_1], gpt_cond_len=6))
+
+    def test_memory_and_disk_tiers(self):
+        cache = SpeakerLatentCache(cache_dir=CACHE_DIR, max_memory_items=1, max_disk_items=2)
+        latents = [(torch.rand(1, 32, 8), torch.rand(1, 512, 1)) for _ in range(3)]
+        for idx, (gpt_cond_latent, speaker_embedding) in enumerate(latents):
+            cache.put(str(idx), gpt_cond_latent, speaker_embedding)
+            os.utime(os.path.join(CACHE_DIR, f"{idx}.pt"), (idx, idx))
+
+        self.assertEqual(len(cache._memory), 1)
+        self.assertEqual(sorted(os.listdir(CACHE_DIR)), ["1.pt", "2.pt"])
+        self.assertIsNone(cache.get("0"))
+
+        # a memory miss is served by the disk tier
+        gpt_cond_latent, speaker_embedding = cache.get("1")
+        self.assertTrue(torch.equal(gpt_cond_latent, latents[1][0]))
+        self.assertTrue(torch.equal(speaker_embedding, latents[1][1]))
+        self.assertIn("1", cache._memory)
+
+        # a new cache instance reuses the disk tier
+        self.assertIsNotNone(SpeakerLatentCache(cache_dir=CACHE_DIR).get("2"))
+
+        cache.clear()
+        self.assertIsNone(cache.get("2"))
+        self.assertEqual(os.listdir(CACHE_DIR), [])
@@ -0,0 +1,88 @@
+import os
+import shutil
+import unittest
+
+import numpy as np
+import torch
+import torch.ao.nn.quantized.dynamic as nnqd
+
+from tests import get_tests_output_path
+from tests.xtts_tests.test_xtts_inference import TEXT, TOKENIZER_FILE, create_random_model
+from TTS.tts.configs.xtts_config import XttsConfig
+from TTS.tts.layers.xtts.tokenizer import VoiceBpeTokenizer
+from TTS.tts.models.xtts import Xtts
+
+torch.manual_seed(1)
+
+
+class XttsQuantizationTest(unittest.TestCase):
+    def setUp(self):
+        self.model = create_random_model()
+        wav = torch.rand(1, 22050 * 2) * 2 - 1
+        self.gpt_cond_latent = self.model.get_gpt_cond_latents(wav, 22050)
+        self.speaker_embedding = self.model.get_speaker_embedding(wav, 22050)
+
+    def _synthesize(self, model):
+        return model.inference(
+            TEXT, "en", self.gpt_cond_latent, self.speaker_embedding, do_sample=False, repetition_penalty=2.0
+        )
+
+    def _logits(self, inputs):
+        gpt = self.model.gpt
+        with torch.inference_mode():
+            return gpt.mel_head(gpt.final_norm(gpt.gpt(inputs_embeds=inputs).last_hidden_state))
+
+    def test_quantize_gpt(self):
+        inputs = torch.randn(1, 20, self.model.gpt.model_dim)
+        expected = self._logits(inputs)
+        self.model.quantize()
+
+        self.assertIsInstance(self.model.gpt.gpt.h[0].attn.c_attn, nnqd.Linear)
+        self.assertIsInstance(self.model.gpt.gpt.h[0].mlp.c_proj, nnqd.Linear)
+        self.assertIsInstance(self.model.gpt.mel_head, nnqd.Linear)
+        self.assertIs(self.model.gpt.gpt_inference.lm_head[1], self.model.gpt.mel_head)
+        logits = self._logits(inputs)
+        self.assertLess(((logits - expected).norm() / expected.norm()).item(), 0.1)
+        self.assertGreater(self._synthesize(self.model)["wav"].shape[0], 0)
+
+    def _checkpoint_dir(self):
+        checkpoint_dir = os.path.join(get_tests_output_path(), "xtts_quantized")
+        shutil.rmtree(checkpoint_dir, ignore_errors=True)
+        os.makedirs(checkpoint_dir)
+        torch.save({"model": self.model.state_dict()}, os.path.join(checkpoint_dir, "model.pth"))
+        return checkpoint_dir
+
+    def _load_model(self, checkpoint_dir, **kwargs):
+        config = XttsConfig(model_args=self.model.args)
+        model = Xtts.init_from_config(config)
+        model.tokenizer = VoiceBpeTokenizer(vocab_file=TOKENIZER_FILE)
+        model.load_checkpoint(config, checkpoint_dir=checkpoint_dir, quantization="dynamic_int8", **kwargs)
+        return model
+
+    def test_save_and_load_quantized_checkpoint(self):
+        checkpoint_dir = self._checkpoint_dir()
+        self.model.quantize()
+        model_path = self.model.save_quantized_checkpoint(checkpoint_dir)
+        self.assertEqual(os.path.basename(model_path), "model_dynamic_int8.pth")
+
+        # the quantized GPT weights replace the float ones of `model.pth`
+        model = self._load_model(checkpoint_dir)
+        self.assertIsInstance(model.gpt.mel_head, nnqd.Linear)
+        np.testing.assert_allclose(self._synthesize(model)["wav"], self._synthesize(self.model)["wav"], atol=1e-5)
+
+        with self.assertRaises(ValueError):
+            model.quantize("int4")
+
+    def test_save_optimized_quantized_checkpoint(self):
+        checkpoint_dir = self._checkpoint_dir()
+        # quantized at load time, the HiFi-GAN weight norm and the speaker encoder batch norms are folded
+        optimized_model = self._load_model(checkpoint_dir, optimize=True)
+        optimized_model.save_quantized_checkpoint(checkpoint_dir)
+        expected = self._synthesize(optimized_model)["wav"]
+
+        # the quantized checkpoint loads into an unoptimized model as well as into an optimized one
+        model = self._load_model(checkpoint_dir)
+        self.assertIsInstance(model.gpt.mel_head, nnqd.Linear)
+        np.testing.assert_allclose(self._synthesize(model)["wav"], expected, atol=1e-4)
+        model = self._load_model(checkpoint_dir, optimize=True)
+        np.testing.assert_allclose(self._synthesize(model)["wav"], expected, atol=1e-5)
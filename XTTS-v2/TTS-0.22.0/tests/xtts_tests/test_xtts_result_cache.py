@@ -0,0 +1,122 @@
+import os
+import shutil
+import unittest
+
+import numpy as np
+import torch
+
+from tests import get_tests_data_path, get_tests_output_path
+from tests.xtts_tests.test_xtts_inference import TEXT, create_random_model
+from TTS.utils.synthesis_cache import SynthesisResultCache
+
+WAV_FILE = os.path.join(get_tests_data_path(), "ljspeech", "wavs", "LJ001-0001.wav")
+CACHE_DIR = os.path.join(get_tests_output_path(), "synthesis_cache")
+
+
+class SynthesisResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+
+    def test_key(self):
+        cache = SynthesisResultCache(CACHE_DIR)
+        key = cache.make_key("Hello  world.", "speaker", "en", 0, temperature=0.7, speed=1.0)
+        # whitespace is normalized and the settings order does not matter
+        self.assertEqual(key, cache.make_key(" Hello world. ", "speaker", "en", 0, speed=1.0, temperature=0.7))
+        self.assertNotEqual(key, cache.make_key("Hello world!", "speaker", "en", 0, temperature=0.7, speed=1.0))
+        self.assertNotEqual(key, cache.make_key("Hello world.", "other", "en", 0, temperature=0.7, speed=1.0))
+        self.assertNotEqual(key, cache.make_key("Hello world.", "speaker", "en", 1, temperature=0.7, speed=1.0))
+        self.assertNotEqual(key, cache.make_key("Hello world.", "speaker", "en", 0, temperature=0.8, speed=1.0))
+        self.assertNotEqual(
+            key, SynthesisResultCache(CACHE_DIR, namespace="other").make_key("Hello world.", "speaker", "en", 0)
+        )
+
+    def test_put_get_and_size_eviction(self):
+        wavs = [np.random.uniform(-1, 1, 8000).astype(np.float32) for _ in range(3)]
+        file_size = 8000 * 4 + 100
+        cache = SynthesisResultCache(CACHE_DIR, max_bytes=2 * file_size)
+        for idx, wav in enumerate(wavs):
+            cache.put(str(idx), wav, 24000)
+            os.utime(os.path.join(CACHE_DIR, f"{idx}.wav"), (idx, idx))
+
+        self.assertIsNone(cache.get("0"))
+        self.assertEqual(sorted(os.listdir(CACHE_DIR)), ["1.wav", "2.wav"])
+        wav, sample_rate = cache.get("1")
+        self.assertEqual(sample_rate, 24000)
+        np.testing.assert_array_equal(wav, wavs[1])
+
+        # "1" was used last, so "2" is evicted first
+        cache.put("3", wavs[0], 24000)
+        self.assertEqual(sorted(os.listdir(CACHE_DIR)), ["1.wav", "3.wav"])
+
+        flac_cache = SynthesisResultCache(CACHE_DIR, audio_format="flac")
+        flac_cache.put("4", wavs[2], 24000)
+        np.testing.assert_allclose(flac_cache.get("4")[0], wavs[2], atol=1e-4)
+
+        cache.clear()
+        self.assertIsNone(cache.get("1"))
+        self.assertEqual(os.listdir(CACHE_DIR), ["4.flac"])
+
+        with self.assertRaises(ValueError):
+            SynthesisResultCache(CACHE_DIR, audio_format="mp3")
+
+
+class XttsResultCacheTest(unittest.TestCase):
+    def setUp(self):
+        shutil.rmtree(CACHE_DIR, ignore_errors=True)
+        self.model = create_random_model()
+
+    def _synthesize(self, **kwargs):
+        return self.model.synthesize(TEXT, self.model.config, WAV_FILE, "en", temperature=1.0, **kwargs)
+
+    def test_seeded_synthesis(self):
+        expected = self._synthesize(seed=1)["wav"]
+        rng_state = torch.get_rng_state()
+        np.testing.assert_array_equal(self._synthesize(seed=1)["wav"], expected)
+        # the global generator is restored after the seeded synthesis
+        self.assertTrue(torch.equal(torch.get_rng_state(), rng_state))
+
+        self.model.result_cache = SynthesisResultCache(CACHE_DIR)
+        stages = []
+        self.model.stage_callback = lambda stage, seconds, **info: stages.append((stage, info.get("cache_hit")))
+        outputs = self._synthesize(seed=1)
+        self.assertNotIn("cache_hit", outputs)
+        np.testing.assert_array_equal(outputs["wav"], expected)
+        self.assertEqual(len(os.listdir(CACHE_DIR)), 1)
+
+        outputs = self._synthesize(seed=1)
+        self.assertTrue(outputs["cache_hit"])
+        np.testing.assert_array_equal(outputs["wav"], expected)
+        self.assertEqual([stage for stage in stages if stage[0] == "result_cache"], [
+            ("result_cache", False),
+            ("result_cache", True),
+        ])
+
+        # other seeds and settings are synthesized, unseeded calls are never cached
+        self.assertNotIn("cache_hit", self._synthesize(seed=2))
+        self.assertNotIn("cache_hit", self._synthesize(seed=1, speed=1.5))
+        self.assertNotIn("cache_hit", self._synthesize())
+        self.assertEqual(len(os.listdir(CACHE_DIR)), 3)
+
+    def test_seeded_variations(self):
+        variations = [{"temperature": 1.0, "speed": 1.0}, {"temperature": 0.9, "speed": 1.2}]
+
+        def synthesize(variations, **kwargs):
+            return self.model.synthesize_variations(TEXT, self.model.config, WAV_FILE, "en", variations, **kwargs)
+
+        expected = [output["wav"] for output in synthesize(variations, seed=1)]
+        self.model.result_cache = SynthesisResultCache(CACHE_DIR)
+        outputs = synthesize(variations, seed=1)
+        self.assertTrue(all("cache_hit" not in output for output in outputs))
+        # one entry per variation
+        self.assertEqual(len(os.listdir(CACHE_DIR)), 2)
+
+        outputs = synthesize(variations, seed=1)
+        self.assertTrue(all(output["cache_hit"] for output in outputs))
+        for output, wav in zip(outputs, expected):
+            np.testing.assert_array_equal(output["wav"], wav)
+
+        # a variation sampled in another batch or with another seed is not served from the cache
+        self.assertNotIn("cache_hit", synthesize(variations[:1], seed=1)[0])
+        self.assertNotIn("cache_hit", synthesize(variations, seed=2)[0])
+        self.assertNotIn("cache_hit", synthesize(variations)[0])
+        self.assertEqual(len(os.listdir(CACHE_DIR)), 5)
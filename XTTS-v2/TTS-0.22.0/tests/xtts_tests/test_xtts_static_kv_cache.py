@@ -0,0 +1,57 @@
+import unittest
+
+import torch
+
+from tests.xtts_tests.test_xtts_inference import create_random_model
+from TTS.tts.layers.xtts.static_kv_cache import StaticKVCache, gpt2_forward_with_static_cache
+
+torch.manual_seed(1)
+
+
+class StaticKVCacheTest(unittest.TestCase):
+    @classmethod
+    def setUpClass(cls):
+        cls.model = create_random_model()
+        cls.gpt = cls.model.gpt
+        wav = torch.rand(1, 22050 * 2) * 2 - 1
+        cls.cond_latents = cls.model.get_gpt_cond_latents(wav, 22050)
+        text_tokens = cls.model.tokenizer.encode("this is a test sentence.", lang="en")
+        cls.text_tokens = torch.IntTensor(text_tokens).unsqueeze(0)
+
+    def _generate(self, static_kv_cache, **kwargs):
+        self.gpt.gpt_inference.static_kv_cache = static_kv_cache
+        try:
+            with torch.inference_mode():
+                return self.gpt.generate(self.cond_latents, self.text_tokens, repetition_penalty=2.0, **kwargs)
+        finally:
+            self.gpt.gpt_inference.static_kv_cache = False
+
+    def test_generate_matches_dynamic_cache(self):
+        for kwargs in [{"do_sample": False}, {"do_sample": False, "num_beams": 2}]:
+            expected = self._generate(False, **kwargs)
+            self.assertTrue(torch.equal(self._generate(True, **kwargs), expected))
+            # the buffers are reused by the next request
+            cache = self.gpt.gpt_inference.static_cache
+            self.assertTrue(torch.equal(self._generate(True, **kwargs), expected))
+            self.assertIs(self.gpt.gpt_inference.static_cache, cache)
+
+    def test_per_slot_lengths(self):
+        transformer = self.gpt.gpt
+        inputs = torch.randn(2, 10, self.gpt.model_dim)
+        cache = StaticKVCache.for_transformer(transformer, max_length=16, max_batch_size=2)
+        with torch.inference_mode():
+            cache.reset(2)
+            gpt2_forward_with_static_cache(transformer, inputs, cache)
+            # the second slot drops its 3 last positions, so the next step writes at different positions
+            cache.lengths[1] = 7
+            new_inputs = torch.randn(2, 1, self.gpt.model_dim)
+            outputs = gpt2_forward_with_static_cache(transformer, new_inputs, cache)
+            self.assertEqual(cache.lengths[:2].tolist(), [11, 8])
+
+            for idx, length in enumerate([10, 7]):
+                sequence = torch.cat([inputs[idx : idx + 1, :length], new_inputs[idx : idx + 1]], dim=1)
+                expected = transformer(inputs_embeds=sequence).last_hidden_state[:, -1]
+                torch.testing.assert_close(outputs[idx : idx + 1, -1], expected, rtol=1e-4, atol=1e-5)
+
+            with self.assertRaises(ValueError):
+                gpt2_forward_with_static_cache(transformer, torch.randn(2, 6, self.gpt.model_dim), cache)
@@ -0,0 +1,71 @@
+import pickle
+import re
+import unittest
+
+from tests.xtts_tests.test_xtts_inference import LONG_TEXT, TOKENIZER_FILE
+from TTS.tts.layers.xtts import tokenizer as xtts_tokenizer
+from TTS.tts.layers.xtts.tokenizer import VoiceBpeTokenizer, get_sentencizer, split_sentence
+
+TEXTS = [
+    "Hello Mr. Smith, it's 5 o'clock.",
+    "I have 14% battery & 2 chargers @ home.",
+    "No   symbols,    only   spaces here",
+    "Dr. Jones and St. John met at 3.5 km from the $20 shop.",
+    "Привет, как дела? У меня 100,5 рублей и 20%.",
+    "Le Dr. Martin a 12,5 € et 30 %.",
+]
+
+
+def reference_abbreviations(text, lang):
+    for regex, replacement in xtts_tokenizer._abbreviations[lang]:  # pylint: disable=protected-access
+        text = re.sub(regex, replacement, text)
+    return text
+
+
+def reference_symbols(text, lang):
+    for regex, replacement in xtts_tokenizer._symbols_multilingual[lang]:  # pylint: disable=protected-access
+        text = re.sub(regex, replacement, text)
+        text = text.replace("  ", " ")
+    return text.strip()
+
+
+class XttsTokenizerTest(unittest.TestCase):
+    def test_cleaners_match_the_regex_chains(self):
+        for lang in xtts_tokenizer._abbreviations:  # pylint: disable=protected-access
+            for text in TEXTS:
+                for case_text in [text, text.lower()]:
+                    self.assertEqual(
+                        xtts_tokenizer.expand_abbreviations_multilingual(case_text, lang),
+                        reference_abbreviations(case_text, lang),
+                    )
+                    self.assertEqual(
+                        xtts_tokenizer.expand_symbols_multilingual(case_text, lang), reference_symbols(case_text, lang)
+                    )
+
+    def test_encode_cache(self):
+        tokenizer = VoiceBpeTokenizer(vocab_file=TOKENIZER_FILE, cache_size=2)
+        uncached = VoiceBpeTokenizer(vocab_file=TOKENIZER_FILE, cache_size=0)
+        for text in TEXTS[:4]:
+            self.assertEqual(tokenizer.encode(text, "en"), uncached.encode(text, "en"))
+        self.assertEqual(len(tokenizer._encode_cache), 2)  # pylint: disable=protected-access
+        self.assertEqual(len(uncached._encode_cache), 0)  # pylint: disable=protected-access
+
+        # the cached results are not shared with the callers
+        ids = tokenizer.encode(TEXTS[3], "en")
+        ids.append(0)
+        self.assertEqual(tokenizer.encode(TEXTS[3], "en"), uncached.encode(TEXTS[3], "en"))
+        # the region is not part of the key
+        self.assertEqual(tokenizer.encode(TEXTS[3], "en-us"), tokenizer.encode(TEXTS[3], "en"))
+
+        restored = pickle.loads(pickle.dumps(tokenizer))
+        self.assertEqual(restored.encode(TEXTS[0], "en"), uncached.encode(TEXTS[0], "en"))
+        tokenizer.clear_cache()
+        self.assertEqual(len(tokenizer._encode_cache), 0)  # pylint: disable=protected-access
+
+    def test_split_sentence_reuses_the_pipeline(self):
+        nlp, _ = get_sentencizer("en")
+        splits = split_sentence(LONG_TEXT, "en", 250)
+        self.assertGreater(len(splits), 1)
+        self.assertTrue(all(len(split) <= 250 for split in splits))
+        self.assertEqual(split_sentence(LONG_TEXT, "en", 250), splits)
+        self.assertIs(get_sentencizer("en")[0], nlp)
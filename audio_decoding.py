@@ -0,0 +1,37 @@
+# audio_decoding.py
+
+import logging
+
+from pydub import AudioSegment
+
+logger = logging.getLogger(__name__)
+
+# Формат, который ожидают модели Vosk
+ASR_SAMPLE_RATE = 16000
+ASR_SAMPLE_WIDTH = 2
+# Размер порции, которой аудио подаётся в KaldiRecognizer
+ASR_CHUNK_FRAMES = 4000
+
+
+def decode_for_asr(audio_path):
+    """
+    Декодирует аудиофайл (OGG/Opus, MP3, WAV и т.д.) один раз в памяти в 16 кГц mono int16 PCM.
+    Результат (bytes) можно отдавать обеим моделям Vosk без промежуточного WAV-файла на диске.
+    """
+    audio = AudioSegment.from_file(audio_path)
+    audio = audio.set_channels(1).set_frame_rate(ASR_SAMPLE_RATE).set_sample_width(ASR_SAMPLE_WIDTH)
+    pcm = audio.raw_data
+    logger.info(
+        f"Аудио декодировано в память: {len(pcm) // ASR_SAMPLE_WIDTH / ASR_SAMPLE_RATE:.2f} с, "
+        f"{ASR_SAMPLE_RATE} Гц, {ASR_SAMPLE_WIDTH * 8} бит, mono"
+    )
+    return pcm
+
+
+def iter_pcm_chunks(pcm, chunk_frames=ASR_CHUNK_FRAMES, sample_width=ASR_SAMPLE_WIDTH):
+    """
+    Нарезает PCM-буфер на порции по chunk_frames кадров, как wave.readframes(chunk_frames).
+    """
+    chunk_size = chunk_frames * sample_width
+    for start in range(0, len(pcm), chunk_size):
+        yield pcm[start:start + chunk_size]
@@ -0,0 +1,109 @@
+# benchmarks/bench_asr_decode.py
+#
+# Сравнивает подготовку аудио для двух проходов Vosk:
+# - старый путь: два раза OGG -> временный WAV в WORKING_DIR -> wave.readframes(4000)
+# - новый путь: одно декодирование в память (audio_decoding.decode_for_asr) и нарезка буфера
+#
+# Пример:
+#   python benchmarks/bench_asr_decode.py voice.ogg --repeats 20
+#   python benchmarks/bench_asr_decode.py voice.ogg --vosk-model model/vosk-model-small-ru-0.22
+
+import argparse
+import json
+import os
+import statistics
+import sys
+import tempfile
+import time
+import uuid
+import wave
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from pydub import AudioSegment
+
+from audio_decoding import ASR_CHUNK_FRAMES, ASR_SAMPLE_RATE, decode_for_asr, iter_pcm_chunks
+
+
+def feed(chunks, recognizer):
+    total = 0
+    for data in chunks:
+        total += len(data)
+        if recognizer is not None:
+            recognizer.AcceptWaveform(data)
+    if recognizer is not None:
+        json.loads(recognizer.FinalResult())
+    return total
+
+
+def wav_chunks(wav_path):
+    with wave.open(wav_path, "rb") as wf:
+        while True:
+            data = wf.readframes(ASR_CHUNK_FRAMES)
+            if len(data) == 0:
+                break
+            yield data
+
+
+def legacy_path(audio_path, tmp_dir, make_recognizer):
+    # Как раньше: конвертация и чтение выполняются отдельно для каждой модели
+    for _ in range(2):
+        wav_path = os.path.join(tmp_dir, f"voice_{uuid.uuid4()}.wav")
+        audio = AudioSegment.from_file(audio_path)
+        audio = audio.set_channels(1).set_frame_rate(ASR_SAMPLE_RATE).set_sample_width(2)
+        audio.export(wav_path, format="wav")
+        with wave.open(wav_path, "rb") as wf:
+            wf.getnchannels(), wf.getframerate(), wf.getsampwidth()
+        feed(wav_chunks(wav_path), make_recognizer())
+        os.remove(wav_path)
+
+
+def in_memory_path(audio_path, tmp_dir, make_recognizer):
+    pcm = decode_for_asr(audio_path)
+    for _ in range(2):
+        feed(iter_pcm_chunks(pcm), make_recognizer())
+
+
+def measure(func, repeats, *args):
+    timings = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        func(*args)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Бенчмарк декодирования аудио для распознавания речи")
+    parser.add_argument("audio_path", help="Голосовое сообщение (OGG/Opus) или другой аудиофайл")
+    parser.add_argument("--repeats", type=int, default=10)
+    parser.add_argument("--vosk-model", default=None, help="Путь к модели Vosk, чтобы учитывать и распознавание")
+    args = parser.parse_args()
+
+    make_recognizer = lambda: None
+    if args.vosk_model:
+        from vosk import KaldiRecognizer, Model, SetLogLevel
+
+        SetLogLevel(-1)
+        model = Model(args.vosk_model)
+        make_recognizer = lambda: KaldiRecognizer(model, ASR_SAMPLE_RATE)
+
+    with tempfile.TemporaryDirectory() as tmp_dir:
+        # Прогрев (ffmpeg, файловый кэш)
+        in_memory_path(args.audio_path, tmp_dir, make_recognizer)
+        results = {
+            "temp WAV x2": measure(legacy_path, args.repeats, args.audio_path, tmp_dir, make_recognizer),
+            "in-memory x1": measure(in_memory_path, args.repeats, args.audio_path, tmp_dir, make_recognizer),
+        }
+
+    baseline = statistics.median(results["temp WAV x2"])
+    for name, timings in results.items():
+        median = statistics.median(timings)
+        print(
+            f"{name:>14}: median {median * 1000:8.1f} ms, min {min(timings) * 1000:8.1f} ms, "
+            f"speedup x{baseline / median:.2f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
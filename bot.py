@@ -2,6 +2,7 @@
 
 import os
 import asyncio
+import time
 import uuid
 from telegram.ext import (
     ApplicationBuilder, MessageHandler, filters, ContextTypes,
@@ -11,13 +12,20 @@ from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputFi
 import logging
 
 from processing import (
-    process_audio_initial, process_audio_improved,
-    process_reference_audio, synthesize_speech,
-    process_text_transcription
+    process_reference_audio,
+    process_text_transcription,
+    model_registry, warm_up_models
 )
-from config import TELEGRAM_TOKEN, WORKING_DIR
+from model_registry import current_rss, format_bytes
+from config import (
+    TELEGRAM_TOKEN, WORKING_DIR, SYNTHESIS_QUEUE_MAXSIZE, SYNTHESIS_STREAMING,
+    METRICS_PORT, METRICS_JSON_PATH, METRICS_DUMP_INTERVAL
+)
+from synthesis_executor import synthesis_executor, SynthesisCancelled
+from metrics import metrics
+from recognition_pipeline import recognition_pipeline
 
-from asyncio import Queue
+from asyncio import Queue, QueueFull
 
 # Настройка логирования
 logging.basicConfig(
@@ -29,8 +37,8 @@ logger = logging.getLogger(__name__)
 # Определяем этапы разговора
 EDIT_TEXT, SET_PARAMETER = range(2)
 
-# Инициализируем очередь для синтеза
-synthesis_queue = Queue()
+# Инициализируем очередь для синтеза (ограниченную, чтобы не копить бесконечный бэклог)
+synthesis_queue = Queue(maxsize=SYNTHESIS_QUEUE_MAXSIZE)
 
 async def voice_or_audio_message_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
     if context.user_data.get('awaiting_reference_audio'):
@@ -50,30 +58,44 @@ async def voice_message_handler(update: Update, context: ContextTypes.DEFAULT_TY
             return
 
         # Скачиваем файл голосового сообщения
+        download_start = time.perf_counter()
         file = await context.bot.get_file(voice.file_id)
         file_extension = file.file_path.split('.')[-1]
         unique_id = uuid.uuid4()
         file_path = os.path.join(WORKING_DIR, f'voice_{update.effective_user.id}_{unique_id}.{file_extension}')
         await file.download_to_drive(custom_path=file_path)
+        metrics.observe('download_seconds', time.perf_counter() - download_start)
         logger.info(f"Скачан файл: {file_path}")
 
-        # Обрабатываем аудио файл с маленькой моделью
-        initial_output = process_audio_initial(file_path)
-
-        if initial_output is None:
+        # Распознаём маленькой и большой моделями параллельно; промежуточный и первичный текст
+        # маленькой модели показываем, не дожидаясь большой
+        sent_message = None
+
+        async def show_text(text):
+            nonlocal sent_message
+            if sent_message is None:
+                sent_message = await update.message.reply_text(text)
+                # Сохраняем идентификаторы сообщения и чата в контексте пользователя
+                context.user_data['chat_id'] = update.effective_chat.id
+                context.user_data['message_id'] = sent_message.message_id
+            elif text != sent_message.text:
+                sent_message = await context.bot.edit_message_text(
+                    chat_id=sent_message.chat_id,
+                    message_id=sent_message.message_id,
+                    text=text
+                )
+
+        async def show_initial(text):
+            await show_text(text)
+            logger.info("Первичная транскрипция отправлена пользователю.")
+
+        result = await recognition_pipeline.run(file_path, on_partial=show_text, on_initial=show_initial)
+
+        if result.initial_text is None or sent_message is None:
             await update.message.reply_text("Произошла ошибка при обработке аудио.")
             return
 
-        # Отправляем первичную транскрипцию пользователю
-        sent_message = await update.message.reply_text(initial_output)
-        logger.info("Первичная транскрипция отправлена пользователю.")
-
-        # Сохраняем идентификаторы сообщения и чата в контексте пользователя
-        context.user_data['chat_id'] = update.effective_chat.id
-        context.user_data['message_id'] = sent_message.message_id
-
-        # Обрабатываем аудио файл с большой моделью
-        improved_output = process_audio_improved(file_path)
+        improved_output = result.improved_text
 
         if improved_output is None:
             await context.bot.edit_message_text(
@@ -137,14 +159,25 @@ async def button_handler(update: Update, context: ContextTypes.DEFAULT_TYPE):
         request_id = uuid.uuid4()
 
         # Добавляем запрос в очередь
-        await synthesis_queue.put({
+        request = {
             'request_id': str(request_id),
             'user_id': user_id,
             'chat_id': chat_id,
             'transcription': transcription,
             'reference_audio': reference_audio,
-            'tts_settings': context.user_data.get('tts_settings', {})
-        })
+            'tts_settings': context.user_data.get('tts_settings', {}),
+            'enqueued_at': time.perf_counter()
+        }
+        try:
+            synthesis_queue.put_nowait(request)
+        except QueueFull:
+            await query.message.reply_text("Очередь на синтез речи переполнена, попробуйте позже.")
+            logger.warning(f"Очередь синтеза переполнена, запрос пользователя {user_id} отклонён.")
+            metrics.inc('synthesis_rejected_total')
+            return
+        synthesis_executor.create_job(request)
+        metrics.inc('synthesis_requests_total')
+        metrics.set_gauge('synthesis_queue_depth', synthesis_queue.qsize())
 
         position_in_queue = synthesis_queue.qsize()
         await query.message.reply_text(f"Ваш запрос добавлен в очередь на синтез речи. Позиция в очереди: {position_in_queue}")
@@ -334,8 +367,9 @@ async def text_message_handler(update: Update, context: ContextTypes.DEFAULT_TYP
                 await update.message.reply_text("Пожалуйста, отправьте непустое текстовое сообщение.")
                 return
 
-            # Предобработка текста: добавление пунктуации и капитализация
-            punctuated_text = process_text_transcription(new_text)
+            # Предобработка текста: добавление пунктуации и капитализация (вне цикла событий,
+            # чтобы тексты разных пользователей попадали в один батч пунктуации)
+            punctuated_text = await asyncio.to_thread(process_text_transcription, new_text)
 
             # Отправляем обработанный текст пользователю
             sent_message = await update.message.reply_text(punctuated_text)
@@ -384,7 +418,7 @@ async def receive_new_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     # Предобработка нового текста: добавление пунктуации и капитализация
-    punctuated_text = process_text_transcription(new_text)
+    punctuated_text = await asyncio.to_thread(process_text_transcription, new_text)
 
     # Обновляем сообщение с новым текстом и кнопками
     keyboard = [
@@ -462,22 +496,78 @@ async def receive_reference_audio(update: Update, context: ContextTypes.DEFAULT_
         context.user_data['awaiting_reference_audio'] = False
 
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
-    await update.message.reply_text("Действие отменено.")
+    # Отменяем также запросы пользователя в очереди и в работе
+    cancelled = synthesis_executor.cancel_user_jobs(update.effective_user.id)
+    if cancelled:
+        await update.message.reply_text(f"Действие отменено. Отменено запросов на синтез: {cancelled}.")
+    else:
+        await update.message.reply_text("Действие отменено.")
     context.user_data.clear()
 
+async def status(update: Update, context: ContextTypes.DEFAULT_TYPE):
+    # Готовность моделей: состояние, время загрузки и прирост памяти процесса
+    state_names = {
+        'not_loaded': 'не загружена',
+        'loading': 'загружается',
+        'ready': 'готова',
+        'failed': 'ошибка загрузки',
+    }
+    lines = []
+    for name, info in model_registry.status().items():
+        line = f"{name}: {state_names.get(info['state'], info['state'])}"
+        if info['load_time'] is not None:
+            line += f", загрузка {info['load_time']:.1f} с, память {format_bytes(info['rss_delta'])}"
+        lines.append(line)
+    lines.append(f"Память процесса: {format_bytes(current_rss())}")
+    await update.message.reply_text("\n".join(lines))
+
+async def start_model_warmup(application):
+    # Модели прогреваются в фоне, бот начинает принимать сообщения сразу
+    warm_up_models()
+
 async def process_synthesis_queue(context: ContextTypes.DEFAULT_TYPE):
+    # Раздаём запросы потокам пула синтеза; новый запрос забирается из очереди, только когда освободился поток
     while not synthesis_queue.empty():
-        request = await synthesis_queue.get()
-        user_id = request['user_id']
-        chat_id = request['chat_id']
-        transcription = request['transcription']
-        reference_audio = request['reference_audio']
-        tts_settings = request['tts_settings']
+        await synthesis_executor.acquire_slot()
+        try:
+            request = synthesis_queue.get_nowait()
+        except asyncio.QueueEmpty:
+            synthesis_executor.release_slot()
+            break
+        metrics.set_gauge('synthesis_queue_depth', synthesis_queue.qsize())
+        metrics.observe('synthesis_queue_wait_seconds', time.perf_counter() - request['enqueued_at'])
+        asyncio.create_task(run_synthesis_request(context, request))
+
+    context.bot_data['synthesis_queue_running'] = False
+
+async def run_synthesis_request(context: ContextTypes.DEFAULT_TYPE, request):
+    user_id = request['user_id']
+    chat_id = request['chat_id']
+    transcription = request['transcription']
+    reference_audio = request['reference_audio']
+    tts_settings = request['tts_settings']
+    job = synthesis_executor.get_job(request['request_id']) or synthesis_executor.create_job(request)
+    audio_paths = []
+    start_time = time.perf_counter()
+
+    try:
+        if job.cancelled:
+            logger.info(f"Запрос {job.request_id} пользователя {user_id} отменён до начала синтеза.")
+            return
 
         # Информируем пользователя о начале синтеза
         await context.bot.send_message(chat_id=chat_id, text="Синтез речи начался, пожалуйста, подождите...")
 
-        audio_paths = []
+        # Обновляем позиции в очереди для остальных пользователей
+        await update_queue_positions(context)
+
+        if SYNTHESIS_STREAMING:
+            # Потоковый режим: один вариант, который отправляется частями по мере синтеза
+            if not await send_streamed_reply(context, job, request, audio_paths):
+                await context.bot.send_message(chat_id=chat_id, text="Произошла ошибка при синтезе речи.")
+                logger.error(f"Ошибка потокового синтеза речи для пользователя {user_id}.")
+            return
+
         variations = [
             {
                 'speed': tts_settings.get('speed', 1.0),
@@ -499,41 +589,83 @@ async def process_synthesis_queue(context: ContextTypes.DEFAULT_TYPE):
             },
         ]
 
-        for idx, variation in enumerate(variations, start=1):
-            audio_path = synthesize_speech(transcription, reference_audio, variation)
-            if audio_path:
-                audio_paths.append((audio_path, idx))
-            else:
-                await context.bot.send_message(chat_id=chat_id, text=f"Произошла ошибка при синтезе речи варианта {idx}.")
-                logger.error(f"Ошибка синтеза речи для пользователя {user_id}, вариант {idx}.")
+        # Все варианты синтезируются одним батчем
+        paths = await synthesis_executor.synthesize_variations(job, transcription, reference_audio, variations)
+        audio_paths = [(path, idx) for idx, path in enumerate(paths or [], start=1)]
+        if job.cancelled:
+            raise SynthesisCancelled(job.request_id)
 
         if audio_paths:
             try:
                 for path, idx in audio_paths:
-                    with open(path, 'rb') as audio_file:
+                    with open(path, 'rb') as audio_file, metrics.timer('upload_seconds'):
                         await context.bot.send_audio(chat_id=chat_id, audio=InputFile(audio_file), caption=f"Вариант {idx}")
                     logger.info(f"Аудиофайл варианта {idx} для пользователя {user_id} отправлен.")
-
-                    # Удаляем синтезированный аудиофайл
-                    os.remove(path)
-                    logger.info(f"Синтезированный аудиофайл {path} удален.")
             except Exception as e:
                 logger.error(f"Ошибка отправки аудио пользователю {user_id}: {str(e)}")
                 await context.bot.send_message(chat_id=chat_id, text="Произошла ошибка при отправке синтезированных аудио.")
         else:
             await context.bot.send_message(chat_id=chat_id, text="Произошла ошибка при синтезе речи.")
             logger.error(f"Ошибка синтеза речи для пользователя {user_id}.")
-
+    except SynthesisCancelled:
+        logger.info(f"Синтез запроса {job.request_id} пользователя {user_id} отменён.")
+        await context.bot.send_message(chat_id=chat_id, text="Синтез речи отменён.")
+    except Exception as e:
+        logger.error(f"Ошибка обработки запроса на синтез пользователя {user_id}: {str(e)}")
+        await context.bot.send_message(chat_id=chat_id, text="Произошла ошибка при синтезе речи.")
+    finally:
+        # Удаляем синтезированные аудиофайлы
+        for path, _ in audio_paths:
+            try:
+                os.remove(path)
+                logger.info(f"Синтезированный аудиофайл {path} удален.")
+            except OSError as e:
+                logger.error(f"Ошибка удаления файла {path}: {str(e)}")
+        metrics.observe('synthesis_request_seconds', time.perf_counter() - start_time)
+        synthesis_executor.finish_job(job)
+        synthesis_executor.release_slot()
         synthesis_queue.task_done()
 
-        # Обновляем позиции в очереди для остальных пользователей
-        await update_queue_positions(context)
+async def send_streamed_reply(context: ContextTypes.DEFAULT_TYPE, job, request, audio_paths):
+    # Отправляет ответ голосовыми сообщениями (OGG/Opus) по мере синтеза.
+    # Пути сегментов добавляются в audio_paths, чтобы вызывающий удалил их в любом случае.
+    user_id = request['user_id']
+    chat_id = request['chat_id']
+    start_time = time.perf_counter()
+    stream = synthesis_executor.synthesize_stream(
+        job, request['transcription'], request['reference_audio'], request['tts_settings']
+    )
+    try:
+        async for path in stream:
+            idx = len(audio_paths) + 1
+            audio_paths.append((path, idx))
+            if job.cancelled:
+                raise SynthesisCancelled(job.request_id)
+            with open(path, 'rb') as voice_file, metrics.timer('upload_seconds'):
+                await context.bot.send_voice(chat_id=chat_id, voice=InputFile(voice_file))
+            if idx == 1:
+                metrics.observe('synthesis_first_segment_sent_seconds', time.perf_counter() - start_time)
+                logger.info(
+                    f"Первый сегмент ответа пользователю {user_id} отправлен через "
+                    f"{time.perf_counter() - start_time:.2f} с."
+                )
+    finally:
+        await stream.aclose()
 
-    context.bot_data['synthesis_queue_running'] = False
+    if job.cancelled:
+        raise SynthesisCancelled(job.request_id)
+    logger.info(
+        f"Потоковый ответ пользователю {user_id} отправлен: сегментов {len(audio_paths)}, "
+        f"всего {time.perf_counter() - start_time:.2f} с."
+    )
+    return bool(audio_paths)
 
 async def update_queue_positions(context: ContextTypes.DEFAULT_TYPE):
-    # Обновление позиций в очереди для пользователей
-    queue_list = list(synthesis_queue._queue)
+    # Обновление позиций в очереди для пользователей (отменённые запросы не учитываются)
+    queue_list = [
+        request for request in synthesis_queue._queue
+        if not getattr(synthesis_executor.get_job(request['request_id']), 'cancelled', False)
+    ]
     for idx, request in enumerate(queue_list):
         user_id = request['user_id']
         chat_id = request['chat_id']
@@ -545,7 +677,7 @@ async def update_queue_positions(context: ContextTypes.DEFAULT_TYPE):
 
 def main():
     # Создаём приложение бота
-    application = ApplicationBuilder().token(TELEGRAM_TOKEN).build()
+    application = ApplicationBuilder().token(TELEGRAM_TOKEN).post_init(start_model_warmup).build()
 
     # Обработчик кнопок
     application.add_handler(CallbackQueryHandler(button_handler))
@@ -559,9 +691,22 @@ def main():
     # Обработчик для отмены
     application.add_handler(CommandHandler('cancel', cancel))
 
+    # Состояние моделей
+    application.add_handler(CommandHandler('status', status))
+
+    # Метрики этапов: HTTP-эндпоинт в формате Prometheus и/или периодический JSON-снимок
+    if METRICS_PORT:
+        metrics.start_http_server(METRICS_PORT)
+    if METRICS_DUMP_INTERVAL:
+        metrics.start_json_dump(METRICS_JSON_PATH, METRICS_DUMP_INTERVAL)
+
     # Запускаем бота
     logger.info("Бот запущен и ожидает сообщений...")
-    application.run_polling()
+    try:
+        application.run_polling()
+    finally:
+        synthesis_executor.shutdown()
+        recognition_pipeline.shutdown()
 
 if __name__ == '__main__':
     main()
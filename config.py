@@ -12,6 +12,10 @@ WORKING_DIR = r'D:\prdja'
 VOSK_MODEL_PATH = os.path.join(WORKING_DIR, 'model', 'vosk-model-ru-0.42')
 SMALL_VOSK_MODEL_PATH = os.path.join(WORKING_DIR, 'model', 'vosk-model-small-ru-0.22')
 
+# Модели загружаются при первом обращении; перечисленные здесь прогреваются в фоне после старта бота.
+# Пустой список — только ленивая загрузка (редко используемые модели не занимают память)
+MODEL_WARMUP = ['vosk_small', 'vosk_large', 'punctuation', 'tts']
+
 # Пути к моделям синтеза речи XTTS
 CONFIG_PATH = os.path.join(WORKING_DIR, 'XTTS-v2', 'config.json')
 CHECKPOINT_PATH = os.path.join(WORKING_DIR, 'XTTS-v2')
@@ -26,9 +30,57 @@ DEFAULT_TTS_SETTINGS = {
     'temperature': 0.7,
 }
 
+# Распознавание речи
+RECOGNIZER_POOL_SIZE = 2  # Заранее созданных распознавателей на каждую модель Vosk (одновременных сообщений)
+ASR_WORKERS = 4  # Потоки распознавания: маленькая и большая модели работают параллельно
+ASR_PARTIAL_UPDATE_INTERVAL = 1.0  # Как часто (с) обновлять сообщение промежуточным текстом
+PUNCTUATION_MAX_BATCH_SIZE = 16  # Максимум текстов в одном батче восстановления пунктуации
+PUNCTUATION_MAX_LATENCY = 0.01  # Сколько (с) ждать других текстов, прежде чем запускать батч
+
+# Пул синтеза речи
+SYNTHESIS_WORKERS = 1  # Количество потоков синтеза, каждый держит свою копию модели XTTS
+SYNTHESIS_DEVICES = []  # Например ['cuda:0', 'cuda:1']; пустой список — все доступные GPU или CPU
+SYNTHESIS_QUEUE_MAXSIZE = 20  # Максимальное число запросов в очереди, новые запросы отклоняются
+# Непрерывный батчинг декодирования GPT: запросы всех потоков синтеза на устройстве основной модели
+# декодируются одним батчем до указанного размера, потоки используют одну модель; 0 — отключить
+GPT_DECODE_BATCH_SIZE = 0
+# Оптимизация XTTS для инференса при загрузке: снятие weight norm вокодера, слияние conv/batchnorm энкодера голоса
+TTS_OPTIMIZE = False
+TTS_COMPILE_BACKEND = None  # None, 'torchscript' (трассировка вокодера) или 'compile' (torch.compile); нужен TTS_OPTIMIZE
+TTS_COMPILE_CACHE_DIR = os.path.join(WORKING_DIR, 'compile_cache')  # Скомпилированные модули для следующих запусков
+# Квантование GPT XTTS в int8 для моделей на CPU (на GPU не применяется): None или 'dynamic_int8'.
+# Квантованные веса берутся из model_dynamic_int8.pth в CHECKPOINT_PATH, если он сохранён (Xtts.save_quantized_checkpoint)
+TTS_QUANTIZATION = None
+
+# Потоковый синтез: ответ отправляется голосовыми сообщениями по мере синтеза вместо трёх вариантов целиком
+SYNTHESIS_STREAMING = False
+STREAM_CHUNK_TOKENS = 20  # Количество GPT-токенов на один шаг вокодера
+STREAM_FIRST_SEGMENT_SECONDS = 1.0  # Минимальная длительность первого сегмента, он отправляется как можно раньше
+STREAM_SEGMENT_SECONDS = 5.0  # Минимальная длительность остальных сегментов
+
+# Кэш латентов голоса (по хэшу эталонного аудио)
+LATENT_CACHE_DIR = os.path.join(WORKING_DIR, 'latent_cache')
+LATENT_CACHE_MEMORY_ITEMS = 32  # Количество латентов в памяти
+LATENT_CACHE_DISK_ITEMS = 500  # Количество латентов на диске, самые старые удаляются
+
+# Кэш результатов синтеза: повторный запрос с тем же текстом, голосом (хэш латентов), языком, настройками и seed
+# отдаётся с диска без запуска XTTS. С включённым кэшем синтез идёт с фиксированным seed, чтобы результат был
+# воспроизводим (при нескольких потоках синтеза или GPT_DECODE_BATCH_SIZE > 0 генераторы случайных чисел общие).
+# Каждый вариант ответа хранится отдельной записью. Потоковый синтез (SYNTHESIS_STREAMING) кэш не использует:
+# сегменты отправляются по мере генерации
+SYNTHESIS_CACHE_ENABLED = False
+SYNTHESIS_CACHE_DIR = os.path.join(WORKING_DIR, 'synthesis_cache')
+SYNTHESIS_CACHE_MAX_MB = 1024  # Размер кэша на диске, давно не использованные результаты удаляются
+SYNTHESIS_SEED = 0  # Seed синтеза при включённом кэше, если в настройках запроса нет своего 'seed'
+
 # Путь к логам
 LOGGING_PATH = os.path.join(WORKING_DIR, 'logs', 'bot.log')
 
+# Метрики этапов обработки (распознавание, пунктуация, синтез, очередь)
+METRICS_PORT = 9100  # Порт HTTP-эндпоинта /metrics (формат Prometheus) и /metrics.json; 0 — отключить
+METRICS_JSON_PATH = os.path.join(WORKING_DIR, 'logs', 'metrics.json')
+METRICS_DUMP_INTERVAL = 60  # Период (с) записи снимка метрик в METRICS_JSON_PATH; 0 — отключить
+
 # Конфигурация API-сервера
 API_SERVER_URL = 'http://<IP-устройства>:8000/receive_data/'  # Замените <IP-устройства> на IP вашего API-сервера
 API_SERVER_TOKEN = 'your_api_server_token'  # Добавьте токен для аутентификации, если требуется
\ No newline at end of file
@@ -3,13 +3,19 @@
 from telegram import Update
 from telegram.ext import ContextTypes
 from utils.logger import get_logger
+from synthesis_executor import synthesis_executor
 
 logger = get_logger()
 
 async def cancel(update: Update, context: ContextTypes.DEFAULT_TYPE):
     """
-    Обработчик команды /cancel, отменяющий текущие действия пользователя.
+    Обработчик команды /cancel, отменяющий текущие действия пользователя,
+    включая его запросы на синтез речи в очереди и в работе.
     """
-    await update.message.reply_text("Действие отменено.")
+    cancelled = synthesis_executor.cancel_user_jobs(update.effective_user.id)
+    if cancelled:
+        await update.message.reply_text(f"Действие отменено. Отменено запросов на синтез: {cancelled}.")
+    else:
+        await update.message.reply_text("Действие отменено.")
     context.user_data.clear()
     logger.info(f"Пользователь {update.effective_user.id} отменил действие.")
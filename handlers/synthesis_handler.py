@@ -2,32 +2,47 @@
 
 import asyncio
 import os
+import time
+import uuid
 from utils.logger import get_logger
-from processing import synthesize_speech
+from synthesis_executor import synthesis_executor, SynthesisCancelled
+from metrics import metrics
 from telegram import InputFile
-from config import WORKING_DIR
+from config import WORKING_DIR, SYNTHESIS_QUEUE_MAXSIZE, SYNTHESIS_STREAMING
 
 logger = get_logger()
 
-# Инициализируем очередь для синтеза
-synthesis_queue = asyncio.Queue()
+# Инициализируем очередь для синтеза (ограниченную, чтобы не копить бесконечный бэклог)
+synthesis_queue = asyncio.Queue(maxsize=SYNTHESIS_QUEUE_MAXSIZE)
 
 async def add_synthesis_request(context, query, transcription, reference_audio):
     """
     Добавляет запрос на синтез речи в очередь и информирует пользователя о позиции в очереди.
+    Если очередь заполнена, запрос отклоняется.
     """
     user_id = query.from_user.id
     chat_id = query.message.chat_id
     request_id = uuid.uuid4()
 
-    await synthesis_queue.put({
+    request = {
         'request_id': str(request_id),
         'user_id': user_id,
         'chat_id': chat_id,
         'transcription': transcription,
         'reference_audio': reference_audio,
-        'tts_settings': context.user_data.get('tts_settings', {})
-    })
+        'tts_settings': context.user_data.get('tts_settings', {}),
+        'enqueued_at': time.perf_counter()
+    }
+    try:
+        synthesis_queue.put_nowait(request)
+    except asyncio.QueueFull:
+        await query.message.reply_text("Очередь на синтез речи переполнена, попробуйте позже.")
+        logger.warning(f"Очередь синтеза переполнена, запрос пользователя {user_id} отклонён.")
+        metrics.inc('synthesis_rejected_total')
+        return
+    synthesis_executor.create_job(request)
+    metrics.inc('synthesis_requests_total')
+    metrics.set_gauge('synthesis_queue_depth', synthesis_queue.qsize())
 
     position_in_queue = synthesis_queue.qsize()
     await query.message.reply_text(f"Ваш запрос добавлен в очередь на синтез речи. Позиция в очереди: {position_in_queue}")
@@ -40,20 +55,53 @@ async def add_synthesis_request(context, query, transcription, reference_audio):
 
 async def process_synthesis_queue(context):
     """
-    Обрабатывает очередь запросов на синтез речи.
+    Раздаёт запросы из очереди потокам пула синтеза.
+    Новый запрос забирается из очереди, только когда освободился поток.
     """
     while not synthesis_queue.empty():
-        request = await synthesis_queue.get()
-        user_id = request['user_id']
-        chat_id = request['chat_id']
-        transcription = request['transcription']
-        reference_audio = request['reference_audio']
-        tts_settings = request['tts_settings']
+        await synthesis_executor.acquire_slot()
+        try:
+            request = synthesis_queue.get_nowait()
+        except asyncio.QueueEmpty:
+            synthesis_executor.release_slot()
+            break
+        metrics.set_gauge('synthesis_queue_depth', synthesis_queue.qsize())
+        metrics.observe('synthesis_queue_wait_seconds', time.perf_counter() - request['enqueued_at'])
+        asyncio.create_task(run_synthesis_request(context, request))
+
+    context.bot_data['synthesis_queue_running'] = False
+
+async def run_synthesis_request(context, request):
+    """
+    Синтезирует варианты речи для одного запроса в пуле потоков и отправляет их пользователю.
+    """
+    user_id = request['user_id']
+    chat_id = request['chat_id']
+    transcription = request['transcription']
+    reference_audio = request['reference_audio']
+    tts_settings = request['tts_settings']
+    job = synthesis_executor.get_job(request['request_id']) or synthesis_executor.create_job(request)
+    audio_paths = []
+    start_time = time.perf_counter()
+
+    try:
+        if job.cancelled:
+            logger.info(f"Запрос {job.request_id} пользователя {user_id} отменён до начала синтеза.")
+            return
 
         # Информируем пользователя о начале синтеза
         await context.bot.send_message(chat_id=chat_id, text="Синтез речи начался, пожалуйста, подождите...")
 
-        audio_paths = []
+        # Обновляем позиции в очереди для остальных пользователей
+        await update_queue_positions(context)
+
+        if SYNTHESIS_STREAMING:
+            # Потоковый режим: один вариант, который отправляется частями по мере синтеза
+            if not await send_streamed_reply(context, job, request, audio_paths):
+                await context.bot.send_message(chat_id=chat_id, text="Произошла ошибка при синтезе речи.")
+                logger.error(f"Ошибка потокового синтеза речи для пользователя {user_id}.")
+            return
+
         variations = [
             {
                 'speed': tts_settings.get('speed', 1.0),
@@ -75,43 +123,88 @@ async def process_synthesis_queue(context):
             },
         ]
 
-        for idx, variation in enumerate(variations, start=1):
-            audio_path = synthesize_speech(transcription, reference_audio, variation)
-            if audio_path:
-                audio_paths.append((audio_path, idx))
-            else:
-                await context.bot.send_message(chat_id=chat_id, text=f"Произошла ошибка при синтезе речи варианта {idx}.")
-                logger.error(f"Ошибка синтеза речи для пользователя {user_id}, вариант {idx}.")
+        # Все варианты синтезируются одним батчем
+        paths = await synthesis_executor.synthesize_variations(job, transcription, reference_audio, variations)
+        audio_paths = [(path, idx) for idx, path in enumerate(paths or [], start=1)]
+        if job.cancelled:
+            raise SynthesisCancelled(job.request_id)
 
         if audio_paths:
             try:
                 for path, idx in audio_paths:
-                    with open(path, 'rb') as audio_file:
+                    with open(path, 'rb') as audio_file, metrics.timer('upload_seconds'):
                         await context.bot.send_audio(chat_id=chat_id, audio=InputFile(audio_file), caption=f"Вариант {idx}")
                     logger.info(f"Аудиофайл варианта {idx} для пользователя {user_id} отправлен.")
-
-                    # Удаляем синтезированный аудиофайл
-                    os.remove(path)
-                    logger.info(f"Синтезированный аудиофайл {path} удален.")
             except Exception as e:
                 logger.error(f"Ошибка отправки аудио пользователю {user_id}: {str(e)}")
                 await context.bot.send_message(chat_id=chat_id, text="Произошла ошибка при отправке синтезированных аудио.")
         else:
             await context.bot.send_message(chat_id=chat_id, text="Произошла ошибка при синтезе речи.")
             logger.error(f"Ошибка синтеза речи для пользователя {user_id}.")
-
+    except SynthesisCancelled:
+        logger.info(f"Синтез запроса {job.request_id} пользователя {user_id} отменён.")
+        await context.bot.send_message(chat_id=chat_id, text="Синтез речи отменён.")
+    except Exception as e:
+        logger.error(f"Ошибка обработки запроса на синтез пользователя {user_id}: {str(e)}")
+        await context.bot.send_message(chat_id=chat_id, text="Произошла ошибка при синтезе речи.")
+    finally:
+        # Удаляем синтезированные аудиофайлы
+        for path, _ in audio_paths:
+            try:
+                os.remove(path)
+                logger.info(f"Синтезированный аудиофайл {path} удален.")
+            except OSError as e:
+                logger.error(f"Ошибка удаления файла {path}: {str(e)}")
+        metrics.observe('synthesis_request_seconds', time.perf_counter() - start_time)
+        synthesis_executor.finish_job(job)
+        synthesis_executor.release_slot()
         synthesis_queue.task_done()
 
-        # Обновляем позиции в очереди для остальных пользователей
-        await update_queue_positions(context)
-
-    context.bot_data['synthesis_queue_running'] = False
+async def send_streamed_reply(context, job, request, audio_paths):
+    """
+    Отправляет ответ голосовыми сообщениями (OGG/Opus) по мере синтеза.
+    Пути сегментов добавляются в audio_paths, чтобы вызывающий удалил их в любом случае.
+    Возвращает True, если был отправлен хотя бы один сегмент.
+    """
+    user_id = request['user_id']
+    chat_id = request['chat_id']
+    start_time = time.perf_counter()
+    stream = synthesis_executor.synthesize_stream(
+        job, request['transcription'], request['reference_audio'], request['tts_settings']
+    )
+    try:
+        async for path in stream:
+            idx = len(audio_paths) + 1
+            audio_paths.append((path, idx))
+            if job.cancelled:
+                raise SynthesisCancelled(job.request_id)
+            with open(path, 'rb') as voice_file, metrics.timer('upload_seconds'):
+                await context.bot.send_voice(chat_id=chat_id, voice=InputFile(voice_file))
+            if idx == 1:
+                metrics.observe('synthesis_first_segment_sent_seconds', time.perf_counter() - start_time)
+                logger.info(
+                    f"Первый сегмент ответа пользователю {user_id} отправлен через "
+                    f"{time.perf_counter() - start_time:.2f} с."
+                )
+    finally:
+        await stream.aclose()
+
+    if job.cancelled:
+        raise SynthesisCancelled(job.request_id)
+    logger.info(
+        f"Потоковый ответ пользователю {user_id} отправлен: сегментов {len(audio_paths)}, "
+        f"всего {time.perf_counter() - start_time:.2f} с."
+    )
+    return bool(audio_paths)
 
 async def update_queue_positions(context):
     """
-    Обновляет позиции в очереди для всех пользователей.
+    Обновляет позиции в очереди для всех пользователей. Отменённые запросы не учитываются.
     """
-    queue_list = list(synthesis_queue._queue)
+    queue_list = [
+        request for request in synthesis_queue._queue
+        if not getattr(synthesis_executor.get_job(request['request_id']), 'cancelled', False)
+    ]
     for idx, request in enumerate(queue_list):
         user_id = request['user_id']
         chat_id = request['chat_id']
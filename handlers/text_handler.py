@@ -1,5 +1,6 @@
 # handlers/text_handler.py
 
+import asyncio
 from telegram import Update
 from telegram.ext import ContextTypes
 from utils.logger import get_logger
@@ -25,8 +26,9 @@ async def handle_text_message(update: Update, context: ContextTypes.DEFAULT_TYPE
                 await update.message.reply_text("Пожалуйста, отправьте непустое текстовое сообщение.")
                 return
 
-            # Предобработка текста: добавление пунктуации и капитализация
-            punctuated_text = process_text_transcription(new_text)
+            # Предобработка текста: добавление пунктуации и капитализация (вне цикла событий,
+            # чтобы тексты разных пользователей попадали в один батч пунктуации)
+            punctuated_text = await asyncio.to_thread(process_text_transcription, new_text)
 
             # Отправляем обработанный текст пользователю
             sent_message = await update.message.reply_text(punctuated_text)
@@ -78,7 +80,7 @@ async def receive_new_text(update: Update, context: ContextTypes.DEFAULT_TYPE):
         return
 
     # Предобработка нового текста: добавление пунктуации и капитализация
-    punctuated_text = process_text_transcription(new_text)
+    punctuated_text = await asyncio.to_thread(process_text_transcription, new_text)
 
     # Обновляем сообщение с новым текстом и кнопками
     keyboard = [
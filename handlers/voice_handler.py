@@ -1,11 +1,13 @@
 # handlers/voice_handler.py
 
 import os
+import time
 import uuid
 from telegram import Update
 from telegram.ext import ContextTypes
 from utils.logger import get_logger
-from processing import process_audio_initial, process_audio_improved
+from recognition_pipeline import recognition_pipeline
+from metrics import metrics
 from config import WORKING_DIR
 from handlers.reference_handler import receive_reference_audio  # Импортируем обработчик референсного аудио
 
@@ -27,9 +29,8 @@ async def handle_voice_message(update: Update, context: ContextTypes.DEFAULT_TYP
     """
     Обрабатывает голосовые или аудио сообщения:
     - Скачивает аудиофайл
-    - Распознаёт речь с помощью маленькой модели
-    - Отправляет транскрипцию пользователю
-    - Распознаёт речь с помощью большой модели
+    - Распознаёт речь маленькой и большой моделями параллельно
+    - Показывает промежуточный и первичный текст маленькой модели, не дожидаясь большой
     - Обновляет сообщение с улучшенной транскрипцией и добавляет кнопки
     """
     try:
@@ -41,30 +42,44 @@ async def handle_voice_message(update: Update, context: ContextTypes.DEFAULT_TYP
             return
 
         # Скачиваем файл голосового сообщения
+        download_start = time.perf_counter()
         file = await context.bot.get_file(voice.file_id)
         file_extension = file.file_path.split('.')[-1]
         unique_id = uuid.uuid4()
         file_path = os.path.join(WORKING_DIR, f'voice_{update.effective_user.id}_{unique_id}.{file_extension}')
         await file.download_to_drive(custom_path=file_path)
+        metrics.observe('download_seconds', time.perf_counter() - download_start)
         logger.info(f"Скачан файл: {file_path}")
 
-        # Обрабатываем аудио файл с маленькой моделью
-        initial_output = process_audio_initial(file_path)
-
-        if initial_output is None:
+        # Распознаём маленькой и большой моделями параллельно; промежуточный и первичный текст
+        # маленькой модели показываем, не дожидаясь большой
+        sent_message = None
+
+        async def show_text(text):
+            nonlocal sent_message
+            if sent_message is None:
+                sent_message = await update.message.reply_text(text)
+                # Сохраняем идентификаторы сообщения и чата в контексте пользователя
+                context.user_data['chat_id'] = update.effective_chat.id
+                context.user_data['message_id'] = sent_message.message_id
+            elif text != sent_message.text:
+                sent_message = await context.bot.edit_message_text(
+                    chat_id=sent_message.chat_id,
+                    message_id=sent_message.message_id,
+                    text=text
+                )
+
+        async def show_initial(text):
+            await show_text(text)
+            logger.info("Первичная транскрипция отправлена пользователю.")
+
+        result = await recognition_pipeline.run(file_path, on_partial=show_text, on_initial=show_initial)
+
+        if result.initial_text is None or sent_message is None:
             await update.message.reply_text("Произошла ошибка при обработке аудио.")
             return
 
-        # Отправляем первичную транскрипцию пользователю
-        sent_message = await update.message.reply_text(initial_output)
-        logger.info("Первичная транскрипция отправлена пользователю.")
-
-        # Сохраняем идентификаторы сообщения и чата в контексте пользователя
-        context.user_data['chat_id'] = update.effective_chat.id
-        context.user_data['message_id'] = sent_message.message_id
-
-        # Обрабатываем аудио файл с большой моделью
-        improved_output = process_audio_improved(file_path)
+        improved_output = result.improved_text
 
         if improved_output is None:
             await context.bot.edit_message_text(
@@ -0,0 +1,180 @@
+# metrics.py
+
+import json
+import logging
+import os
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+logger = logging.getLogger(__name__)
+
+METRICS_PREFIX = 'ahr_'
+
+
+def _quantile(sorted_values, q):
+    if not sorted_values:
+        return 0.0
+    idx = min(len(sorted_values) - 1, int(round(q * (len(sorted_values) - 1))))
+    return sorted_values[idx]
+
+
+class Metrics:
+    """
+    Потокобезопасный сбор метрик пайплайна голос → текст → речь.
+    - observe: распределения (длительности этапов, токены/с); квантили считаются по последним window значениям
+    - inc: счётчики
+    - set_gauge и коллекторы: текущие значения (глубина очереди, занятость пулов)
+    Метрики отдаются в текстовом формате Prometheus по HTTP и/или периодически сбрасываются в JSON.
+    """
+
+    def __init__(self, window=1000):
+        self.window = window
+        self._lock = threading.Lock()
+        self._summaries = {}
+        self._counters = {}
+        self._gauges = {}
+        self._collectors = []
+        self._started_at = time.time()
+
+    def observe(self, name, value):
+        with self._lock:
+            summary = self._summaries.get(name)
+            if summary is None:
+                summary = self._summaries[name] = {'count': 0, 'sum': 0.0, 'values': deque(maxlen=self.window)}
+            summary['count'] += 1
+            summary['sum'] += value
+            summary['values'].append(value)
+
+    def inc(self, name, value=1):
+        with self._lock:
+            self._counters[name] = self._counters.get(name, 0) + value
+
+    def set_gauge(self, name, value):
+        with self._lock:
+            self._gauges[name] = value
+
+    @contextmanager
+    def timer(self, name):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, time.perf_counter() - start)
+
+    def add_collector(self, collector):
+        """
+        collector() возвращает словарь {имя: значение}, который добавляется к gauge при каждом снимке.
+        """
+        with self._lock:
+            self._collectors.append(collector)
+
+    def snapshot(self):
+        with self._lock:
+            summaries = {name: (s['count'], s['sum'], sorted(s['values'])) for name, s in self._summaries.items()}
+            counters = dict(self._counters)
+            gauges = dict(self._gauges)
+            collectors = list(self._collectors)
+
+        for collector in collectors:
+            try:
+                gauges.update(collector())
+            except Exception as e:
+                logger.warning(f"Ошибка сбора метрик: {str(e)}")
+
+        return {
+            'uptime': time.time() - self._started_at,
+            'counters': counters,
+            'gauges': gauges,
+            'summaries': {
+                name: {
+                    'count': count,
+                    'sum': total,
+                    'avg': total / count if count else 0.0,
+                    'p50': _quantile(values, 0.5),
+                    'p95': _quantile(values, 0.95),
+                    'p99': _quantile(values, 0.99),
+                    'max': values[-1] if values else 0.0,
+                }
+                for name, (count, total, values) in summaries.items()
+            },
+        }
+
+    def render_prometheus(self):
+        snapshot = self.snapshot()
+        lines = [f"{METRICS_PREFIX}uptime_seconds {snapshot['uptime']:.3f}"]
+        for name, value in sorted(snapshot['counters'].items()):
+            lines.append(f"# TYPE {METRICS_PREFIX}{name} counter")
+            lines.append(f"{METRICS_PREFIX}{name} {value}")
+        for name, value in sorted(snapshot['gauges'].items()):
+            lines.append(f"# TYPE {METRICS_PREFIX}{name} gauge")
+            lines.append(f"{METRICS_PREFIX}{name} {value}")
+        for name, summary in sorted(snapshot['summaries'].items()):
+            lines.append(f"# TYPE {METRICS_PREFIX}{name} summary")
+            for quantile, key in (('0.5', 'p50'), ('0.95', 'p95'), ('0.99', 'p99')):
+                value = summary[key]
+                lines.append(f'{METRICS_PREFIX}{name}{{quantile="{quantile}"}} {value:.6f}')
+            lines.append(f"{METRICS_PREFIX}{name}_sum {summary['sum']:.6f}")
+            lines.append(f"{METRICS_PREFIX}{name}_count {summary['count']}")
+        return "\n".join(lines) + "\n"
+
+    def dump_json(self, path):
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.snapshot(), f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, path)
+
+    def start_json_dump(self, path, interval):
+        """
+        Периодически записывает снимок метрик в JSON-файл в фоновом потоке.
+        """
+        os.makedirs(os.path.dirname(path) or '.', exist_ok=True)
+
+        def run():
+            while True:
+                time.sleep(interval)
+                try:
+                    self.dump_json(path)
+                except OSError as e:
+                    logger.warning(f"Ошибка записи метрик в {path}: {str(e)}")
+
+        thread = threading.Thread(target=run, name='metrics-dump', daemon=True)
+        thread.start()
+        return thread
+
+    def start_http_server(self, port, host='0.0.0.0'):
+        """
+        Отдаёт /metrics (формат Prometheus) и /metrics.json в фоновом потоке.
+        """
+        metrics = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path == '/metrics':
+                    body = metrics.render_prometheus().encode('utf-8')
+                    content_type = 'text/plain; version=0.0.4; charset=utf-8'
+                elif self.path == '/metrics.json':
+                    body = json.dumps(metrics.snapshot(), ensure_ascii=False).encode('utf-8')
+                    content_type = 'application/json'
+                else:
+                    self.send_error(404)
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', content_type)
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        server = ThreadingHTTPServer((host, port), Handler)
+        thread = threading.Thread(target=server.serve_forever, name='metrics-http', daemon=True)
+        thread.start()
+        logger.info(f"Метрики доступны на http://{host}:{port}/metrics")
+        return server
+
+
+metrics = Metrics()
@@ -0,0 +1,138 @@
+# model_registry.py
+
+import logging
+import os
+import threading
+import time
+
+try:
+    import psutil
+except ImportError:  # psutil необязателен: без него RSS берётся из /proc (только Linux)
+    psutil = None
+
+logger = logging.getLogger(__name__)
+
+NOT_LOADED = 'not_loaded'
+LOADING = 'loading'
+READY = 'ready'
+FAILED = 'failed'
+
+
+class ModelUnavailable(Exception):
+    """
+    Модель не удалось загрузить.
+    """
+
+
+def current_rss():
+    """
+    Резидентная память процесса в байтах или None, если её не удалось определить.
+    """
+    if psutil is not None:
+        return psutil.Process().memory_info().rss
+    try:
+        with open('/proc/self/statm') as f:
+            return int(f.read().split()[1]) * os.sysconf('SC_PAGE_SIZE')
+    except (OSError, ValueError, AttributeError):
+        return None
+
+
+class ModelEntry:
+    """
+    Модель в реестре: функция загрузки, состояние и статистика загрузки.
+    """
+
+    def __init__(self, name, loader):
+        self.name = name
+        self.loader = loader
+        self.state = NOT_LOADED
+        self.value = None
+        self.error = None
+        self.load_time = None
+        self.rss_delta = None
+        self.lock = threading.Lock()
+
+
+class ModelRegistry:
+    """
+    Реестр моделей с ленивой загрузкой.
+    - Модель загружается при первом обращении (get) или фоновым прогревом (warm_up)
+    - Одновременные обращения к незагруженной модели ждут одну загрузку
+    - Для каждой модели хранится состояние, время загрузки и прирост RSS процесса
+      (прирост приблизительный, если несколько моделей загружаются одновременно)
+    - Неудачная загрузка не завершает процесс: get выбрасывает ModelUnavailable,
+      а следующее обращение пробует загрузить модель снова
+    """
+
+    def __init__(self):
+        self._entries = {}
+
+    def register(self, name, loader):
+        self._entries[name] = ModelEntry(name, loader)
+
+    def get(self, name):
+        entry = self._entries[name]
+        if entry.state == READY:
+            return entry.value
+        with entry.lock:
+            if entry.state == READY:
+                return entry.value
+            entry.state = LOADING
+            rss_before = current_rss()
+            start = time.perf_counter()
+            try:
+                value = entry.loader()
+            except Exception as e:
+                entry.state = FAILED
+                entry.error = str(e)
+                logger.error(f"Ошибка загрузки модели {name}: {str(e)}")
+                raise ModelUnavailable(name) from e
+            entry.load_time = time.perf_counter() - start
+            rss_after = current_rss()
+            if rss_before is not None and rss_after is not None:
+                entry.rss_delta = rss_after - rss_before
+            entry.value = value
+            entry.error = None
+            entry.state = READY
+            rss_info = f", RSS +{entry.rss_delta / 2 ** 20:.0f} МБ" if entry.rss_delta is not None else ""
+            logger.info(f"Модель {name} загружена за {entry.load_time:.1f} с{rss_info}.")
+            return value
+
+    def is_ready(self, name):
+        return self._entries[name].state == READY
+
+    def status(self):
+        """
+        Состояние всех моделей: {имя: {state, load_time, rss_delta, error}}.
+        """
+        return {
+            name: {
+                'state': entry.state,
+                'load_time': entry.load_time,
+                'rss_delta': entry.rss_delta,
+                'error': entry.error,
+            }
+            for name, entry in self._entries.items()
+        }
+
+    def warm_up(self, names):
+        """
+        Загружает модели по порядку в фоновом потоке и сразу возвращает управление.
+        """
+        def run():
+            for name in names:
+                try:
+                    self.get(name)
+                except ModelUnavailable:
+                    continue
+            logger.info(f"Прогрев моделей завершён, RSS процесса: {format_bytes(current_rss())}.")
+
+        thread = threading.Thread(target=run, name='model-warmup', daemon=True)
+        thread.start()
+        return thread
+
+
+def format_bytes(value):
+    if value is None:
+        return 'н/д'
+    return f"{value / 2 ** 20:.0f} МБ"
@@ -1,22 +1,36 @@
 # processing.py
 
-import sys
 import os
-import wave
 import json
 import uuid
-from vosk import Model, KaldiRecognizer, SetLogLevel
+import time
+import numpy as np
+from vosk import Model, SetLogLevel
 from pydub import AudioSegment
 import logging
 from deepmultilingualpunctuation import PunctuationModel
 from razdel import sentenize
 import torch
 from TTS.tts.configs.xtts_config import XttsConfig
-from TTS.tts.models.xtts import Xtts
+from TTS.tts.models.xtts import Xtts, InferenceCancelled
+from TTS.tts.layers.xtts.latent_cache import SpeakerLatentCache
+from TTS.utils.synthesis_cache import SynthesisResultCache
 from scipy.io.wavfile import write
 import re
 
-from config import WORKING_DIR, VOSK_MODEL_PATH, SMALL_VOSK_MODEL_PATH, CONFIG_PATH, CHECKPOINT_PATH
+from audio_decoding import decode_for_asr, iter_pcm_chunks
+from recognizer_pool import RecognizerPool
+from punctuation_batcher import PunctuationBatcher
+from model_registry import ModelRegistry, ModelUnavailable
+from metrics import metrics
+from config import (
+    WORKING_DIR, VOSK_MODEL_PATH, SMALL_VOSK_MODEL_PATH, CONFIG_PATH, CHECKPOINT_PATH,
+    RECOGNIZER_POOL_SIZE, PUNCTUATION_MAX_BATCH_SIZE, PUNCTUATION_MAX_LATENCY,
+    LATENT_CACHE_DIR, LATENT_CACHE_MEMORY_ITEMS, LATENT_CACHE_DISK_ITEMS,
+    STREAM_CHUNK_TOKENS, STREAM_FIRST_SEGMENT_SECONDS, STREAM_SEGMENT_SECONDS, MODEL_WARMUP,
+    GPT_DECODE_BATCH_SIZE, TTS_OPTIMIZE, TTS_COMPILE_BACKEND, TTS_COMPILE_CACHE_DIR,
+    TTS_QUANTIZATION, SYNTHESIS_CACHE_ENABLED, SYNTHESIS_CACHE_DIR, SYNTHESIS_CACHE_MAX_MB, SYNTHESIS_SEED
+)
 
 # Настройка логирования
 logging.basicConfig(
@@ -28,104 +42,183 @@ logger = logging.getLogger(__name__)
 # Уровень логирования Vosk
 SetLogLevel(0)
 
-# Глобальные переменные для моделей
-small_model = None
-large_model = None
-punctuation_model = None
-tts_model = None
+# Модели загружаются лениво через реестр: при первом обращении или фоновым прогревом (warm_up_models)
 tts_config = None
-device = None
-
-def load_models():
-    global small_model, large_model, punctuation_model, tts_model, tts_config, device
-    # Загружаем модели Vosk
-    try:
-        small_model = Model(SMALL_VOSK_MODEL_PATH)
-        large_model = Model(VOSK_MODEL_PATH)
-        logger.info("Обе модели Vosk загружены.")
-    except Exception as e:
-        logger.error(f"Ошибка загрузки моделей Vosk: {str(e)}")
-        sys.exit(1)
-
-    # Инициализируем модель для восстановления пунктуации
-    try:
-        punctuation_model = PunctuationModel()
-        logger.info("PunctuationModel загружена.")
-    except Exception as e:
-        logger.error(f"Ошибка загрузки PunctuationModel: {str(e)}")
-        punctuation_model = None  # Если модель не загрузилась, устанавливаем None
+# Устройство основной модели XTTS
+device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
+
+# Общий для всех копий XTTS кэш латентов голоса: эталонное аудио обрабатывается один раз
+speaker_latent_cache = SpeakerLatentCache(
+    cache_dir=LATENT_CACHE_DIR,
+    max_memory_items=LATENT_CACHE_MEMORY_ITEMS,
+    max_disk_items=LATENT_CACHE_DISK_ITEMS,
+    namespace=CHECKPOINT_PATH
+)
 
-    # Загружаем модель синтеза речи
-    try:
+# Общий кэш готовых результатов синтеза для повторных запросов, если он включён
+synthesis_result_cache = SynthesisResultCache(
+    cache_dir=SYNTHESIS_CACHE_DIR,
+    max_bytes=SYNTHESIS_CACHE_MAX_MB * 1024 * 1024,
+    namespace=CHECKPOINT_PATH
+) if SYNTHESIS_CACHE_ENABLED else None
+
+# Параметры синтеза, если пользователь ничего не задал
+DEFAULT_SYNTHESIS_SETTINGS = {
+    'language': 'ru',
+    'speed': 1.0,
+    'repetition_penalty': 2.0,
+    'length_penalty': 1.0,
+    'temperature': 0.7,
+    'enable_text_splitting': True
+}
+
+# Модель Vosk вместе с пулом заранее созданных распознавателей
+def load_vosk_recognizers(model_path, name):
+    return RecognizerPool(Model(model_path), RECOGNIZER_POOL_SIZE, name=name)
+
+# PunctuationModel за батчером, который объединяет тексты из всех потоков
+def load_punctuation():
+    return PunctuationBatcher(
+        PunctuationModel(),
+        max_batch_size=PUNCTUATION_MAX_BATCH_SIZE,
+        max_latency=PUNCTUATION_MAX_LATENCY
+    )
+
+# Загружает отдельный экземпляр XTTS на указанное устройство.
+# У каждого потока пула синтеза своя копия: Xtts хранит состояние генерации и не разделяется между потоками.
+def load_tts_model(device):
+    global tts_config
+    if tts_config is None:
         tts_config = XttsConfig()
         tts_config.load_json(CONFIG_PATH)
 
-        tts_model = Xtts.init_from_config(tts_config)
-        tts_model.load_checkpoint(tts_config, checkpoint_dir=CHECKPOINT_PATH, eval=True)
-
-        device = torch.device("cuda" if torch.cuda.is_available() else "cpu")
-        tts_model = tts_model.to(device)
-        logger.info("Модель синтеза речи загружена.")
-    except Exception as e:
-        logger.error(f"Ошибка загрузки модели синтеза речи: {str(e)}")
-        tts_model = None
-
-def convert_ogg_to_wav(ogg_path, wav_path):
+    model = Xtts.init_from_config(tts_config)
+    # динамическое квантование работает только на CPU
+    quantization = TTS_QUANTIZATION if torch.device(device).type == 'cpu' else None
+    model.load_checkpoint(tts_config, checkpoint_dir=CHECKPOINT_PATH, eval=True, quantization=quantization)
+    model.latent_cache = speaker_latent_cache
+    model.result_cache = synthesis_result_cache
+    model.stage_callback = record_tts_stage
+    model = model.to(torch.device(device))
+    if TTS_OPTIMIZE:
+        # после переноса на устройство: трассировка и компиляция привязаны к нему
+        model.optimize_for_inference(compile_backend=TTS_COMPILE_BACKEND, cache_dir=TTS_COMPILE_CACHE_DIR)
+    if GPT_DECODE_BATCH_SIZE > 0:
+        model.enable_decode_scheduler(max_batch_size=GPT_DECODE_BATCH_SIZE)
+    return model
+
+# Этапы синтеза XTTS (Xtts.stage_callback) в метрики: длительность, скорость генерации GPT,
+# попадания в кэш латентов и в кэш результатов
+def record_tts_stage(stage, seconds, tokens=None, cache_hit=None):
+    metrics.observe(f'tts_{stage}_seconds', seconds)
+    if tokens and seconds > 0:
+        metrics.observe('tts_gpt_tokens_per_second', tokens / seconds)
+    if cache_hit is not None:
+        cache = 'result_cache' if stage == 'result_cache' else 'latent_cache'
+        metrics.inc(f'tts_{cache}_hits_total' if cache_hit else f'tts_{cache}_misses_total')
+
+model_registry = ModelRegistry()
+model_registry.register('vosk_small', lambda: load_vosk_recognizers(SMALL_VOSK_MODEL_PATH, 'small'))
+model_registry.register('vosk_large', lambda: load_vosk_recognizers(VOSK_MODEL_PATH, 'large'))
+model_registry.register('punctuation', load_punctuation)
+model_registry.register('tts', lambda: load_tts_model(device))
+
+def get_small_recognizer_pool():
+    return model_registry.get('vosk_small')
+
+def get_large_recognizer_pool():
+    return model_registry.get('vosk_large')
+
+# Основная модель XTTS или None, если её не удалось загрузить
+def get_tts_model():
     try:
-        audio = AudioSegment.from_file(ogg_path)
-        audio = audio.set_channels(1).set_frame_rate(16000).set_sample_width(2)
-        audio.export(wav_path, format="wav")
-        logger.info(f"Конвертировано в WAV: {wav_path}")
-
-        # Проверка свойств WAV-файла
-        with wave.open(wav_path, "rb") as wf:
-            channels = wf.getnchannels()
-            framerate = wf.getframerate()
-            sampwidth = wf.getsampwidth()
-            logger.info(f"Свойства WAV-файла - Каналы: {channels}, Частота: {framerate} Гц, Глубина бит: {sampwidth * 8} бит")
-    except Exception as e:
-        logger.error(f"Ошибка конвертации аудио: {str(e)}")
-        sys.exit(1)
+        return model_registry.get('tts')
+    except ModelUnavailable:
+        return None
+
+# Фоновая загрузка моделей после старта бота, чтобы первый запрос не ждал загрузки
+def warm_up_models(names=MODEL_WARMUP):
+    return model_registry.warm_up(names)
 
-def transcribe_audio(wav_path, model):
+# Немедленная загрузка всех моделей (для скриптов, которым не нужен быстрый старт)
+def load_models():
+    for name in model_registry.status():
+        try:
+            model_registry.get(name)
+        except ModelUnavailable:
+            continue
+
+# Состояние моделей и занятость пулов распознавателей для метрик
+def collect_model_metrics():
+    values = {}
+    for name, info in model_registry.status().items():
+        values[f'model_{name}_ready'] = int(info['state'] == 'ready')
+        if info['load_time'] is not None:
+            values[f'model_{name}_load_seconds'] = round(info['load_time'], 3)
+    for name in ('vosk_small', 'vosk_large'):
+        if model_registry.is_ready(name):
+            for key, value in model_registry.get(name).stats().items():
+                suffix = f'{key}_seconds' if key.endswith('wait') else key
+                values[f'recognizer_pool_{name}_{suffix}'] = round(value, 4)
+    if model_registry.is_ready('tts'):
+        tts_model = model_registry.get('tts')
+        if tts_model.decode_scheduler is not None:
+            for key, value in tts_model.decode_scheduler.stats().items():
+                values[f'gpt_decode_{key}'] = round(value, 4)
+    return values
+
+metrics.add_collector(collect_model_metrics)
+
+# Устройства для потоков синтеза: все доступные GPU или CPU
+def get_synthesis_devices():
+    if torch.cuda.is_available():
+        return [f"cuda:{idx}" for idx in range(torch.cuda.device_count())]
+    return ["cpu"]
+
+# Декодирует голосовое сообщение один раз в 16 кГц mono int16 PCM в памяти.
+# Один и тот же буфер передаётся и маленькой, и большой модели, без временных WAV-файлов.
+def decode_voice_message(audio_path):
+    if not os.path.isfile(audio_path):
+        logger.error(f"Файл {audio_path} не найден.")
+        return None
     try:
-        wf = wave.open(wav_path, "rb")
+        return decode_for_asr(audio_path)
     except Exception as e:
-        logger.error(f"Не удалось открыть WAV-файл: {str(e)}")
-        sys.exit(1)
-
-    if wf.getnchannels() != 1 or wf.getsampwidth() != 2 or wf.getframerate() != 16000:
-        logger.error("Аудио должно быть в формате mono WAV с частотой 16000 Гц.")
-        wf.close()
-        sys.exit(1)
+        logger.error(f"Ошибка декодирования аудио: {str(e)}")
+        return None
 
-    rec = KaldiRecognizer(model, wf.getframerate())
-    rec.SetWords(True)
+# Распознаватель берётся из пула модели (get_small_recognizer_pool / get_large_recognizer_pool).
+# on_partial(text) вызывается с промежуточной гипотезой (уже распознанное + PartialResult)
+def transcribe_pcm(pcm, recognizer_pool, on_partial=None):
     transcript = ""
 
-    while True:
-        data = wf.readframes(4000)
-        if len(data) == 0:
-            break
-        if rec.AcceptWaveform(data):
-            result = rec.Result()
-            result_dict = json.loads(result)
-            transcript += result_dict.get("text", "") + " "
-
-    # Последний фрагмент
-    final_result = rec.FinalResult()
-    final_dict = json.loads(final_result)
-    transcript += final_dict.get("text", "")
-    wf.close()
+    with recognizer_pool.recognizer() as rec:
+        for data in iter_pcm_chunks(pcm):
+            if rec.AcceptWaveform(data):
+                result = rec.Result()
+                result_dict = json.loads(result)
+                transcript += result_dict.get("text", "") + " "
+            elif on_partial is not None:
+                partial = json.loads(rec.PartialResult()).get("partial", "")
+                if partial:
+                    on_partial((transcript + partial).strip())
+
+        # Последний фрагмент
+        final_result = rec.FinalResult()
+        final_dict = json.loads(final_result)
+        transcript += final_dict.get("text", "")
     logger.info("Распознавание речи завершено.")
     return transcript.strip()
 
 def recase_punctuate(text):
-    if punctuation_model is None:
+    try:
+        punctuation_batcher = model_registry.get('punctuation')
+    except ModelUnavailable:
         logger.error("PunctuationModel не загружена.")
         return text  # Возвращаем исходный текст без изменений
     try:
-        punctuated_text = punctuation_model.restore_punctuation(text)
+        # Тексты из всех потоков объединяются в батчи одним рабочим потоком
+        punctuated_text = punctuation_batcher.restore_punctuation(text)
         logger.info("Пунктуация и регистр добавлены.")
         return punctuated_text
     except Exception as e:
@@ -154,54 +247,35 @@ def process_text_transcription(text):
         logger.error(f"Ошибка при обработке текстовой транскрипции: {str(e)}")
         return text  # Возвращаем исходный текст в случае ошибки
 
-def process_audio_initial(ogg_path):
-    if not os.path.isfile(ogg_path):
-        logger.error(f"Файл {ogg_path} не найден.")
-        return None
-
-    # Конвертируем OGG в WAV
-    wav_path = os.path.join(WORKING_DIR, f'voice_initial_{uuid.uuid4()}.wav')  # Уникальное имя файла
-    convert_ogg_to_wav(ogg_path, wav_path)
+def process_audio_initial(ogg_path, pcm=None):
+    # pcm — уже декодированное аудио (decode_voice_message), чтобы не декодировать файл повторно
+    if pcm is None:
+        pcm = decode_voice_message(ogg_path)
+        if pcm is None:
+            return None
 
     # Распознаём речь с помощью маленькой модели
-    initial_transcript = transcribe_audio(wav_path, small_model)
+    initial_transcript = transcribe_pcm(pcm, get_small_recognizer_pool())
     logger.info(f"Первичный распознанный текст: {initial_transcript}")
 
     # Добавляем пунктуацию и корректируем регистр с помощью PunctuationModel
     punctuated_initial_text = process_text_transcription(initial_transcript)
 
-    # Удаляем временный файл
-    try:
-        os.remove(wav_path)
-        logger.info(f"Временный файл {wav_path} удален.")
-    except Exception as e:
-        logger.error(f"Ошибка удаления временного файла {wav_path}: {str(e)}")
-
     return punctuated_initial_text
 
-def process_audio_improved(ogg_path):
-    if not os.path.isfile(ogg_path):
-        logger.error(f"Файл {ogg_path} не найден.")
-        return None
-
-    # Конвертируем OGG в WAV
-    wav_path = os.path.join(WORKING_DIR, f'voice_improved_{uuid.uuid4()}.wav')  # Уникальное имя файла
-    convert_ogg_to_wav(ogg_path, wav_path)
+def process_audio_improved(ogg_path, pcm=None):
+    if pcm is None:
+        pcm = decode_voice_message(ogg_path)
+        if pcm is None:
+            return None
 
     # Распознаём речь с помощью большой модели
-    improved_transcript = transcribe_audio(wav_path, large_model)
+    improved_transcript = transcribe_pcm(pcm, get_large_recognizer_pool())
     logger.info(f"Улучшенный распознанный текст: {improved_transcript}")
 
     # Добавляем пунктуацию и корректируем регистр с помощью PunctuationModel
     punctuated_improved_text = process_text_transcription(improved_transcript)
 
-    # Удаляем временный файл
-    try:
-        os.remove(wav_path)
-        logger.info(f"Временный файл {wav_path} удален.")
-    except Exception as e:
-        logger.error(f"Ошибка удаления временного файла {wav_path}: {str(e)}")
-
     return punctuated_improved_text
 
 def process_reference_audio(audio_path):
@@ -236,27 +310,25 @@ def preprocess_text(text):
         logger.error(f"Ошибка при обработке текста для синтеза: {str(e)}")
         return text
 
-def synthesize_speech(text, reference_audio=None, tts_settings=None):
-    if tts_model is None:
+def synthesize_speech(text, reference_audio=None, tts_settings=None, model=None):
+    # Потоки пула синтеза передают собственный экземпляр модели
+    model = model if model is not None else get_tts_model()
+    if model is None:
         logger.error("Модель синтеза речи не загружена.")
         return None
 
     if tts_settings is None:
-        tts_settings = {
-            'language': 'ru',
-            'speed': 1.0,
-            'repetition_penalty': 2.0,
-            'length_penalty': 1.0,
-            'temperature': 0.7,
-            'enable_text_splitting': True
-        }
+        tts_settings = DEFAULT_SYNTHESIS_SETTINGS
 
     # Предобработка текста
     processed_text = preprocess_text(text)
 
+    # С кэшем результатов синтез идёт с фиксированным seed, и повторный запрос берётся из кэша
+    seed = tts_settings.get('seed', SYNTHESIS_SEED if synthesis_result_cache is not None else None)
+
     try:
         # Если reference_audio равен None, передаем None или пропускаем параметр speaker_wav
-        outputs = tts_model.synthesize(
+        outputs = model.synthesize(
             text=processed_text,
             config=tts_config,
             speaker_wav=reference_audio if reference_audio else None,
@@ -265,8 +337,11 @@ def synthesize_speech(text, reference_audio=None, tts_settings=None):
             repetition_penalty=tts_settings.get('repetition_penalty', 2.0),
             length_penalty=tts_settings.get('length_penalty', 1.0),
             temperature=tts_settings.get('temperature', 0.7),
-            enable_text_splitting=tts_settings.get('enable_text_splitting', True)
+            enable_text_splitting=tts_settings.get('enable_text_splitting', True),
+            seed=seed
         )
+        if outputs.get("cache_hit"):
+            logger.info("Результат синтеза взят из кэша.")
 
         # Извлекаем аудио
         audio = outputs["wav"]
@@ -275,12 +350,161 @@ def synthesize_speech(text, reference_audio=None, tts_settings=None):
 
         # Сохраняем аудио с уникальным именем
         output_path = os.path.join(WORKING_DIR, f'output_{uuid.uuid4()}.wav')
-        write(output_path, 24000, audio)
+        with metrics.timer('tts_encode_seconds'):
+            write(output_path, 24000, audio)
         logger.info(f"Аудиофайл синтезирован и сохранён: {output_path}")
         return output_path
     except Exception as e:
         logger.error(f"Ошибка синтеза речи: {str(e)}")
         return None
 
-# Загружаем модели при импорте модуля
-load_models()
+# Синтезирует несколько вариантов (скорость/температура) одним батчем: текст, префикс и
+# кондиционирование считаются один раз, а GPT и HiFi-GAN прогоняются по всем вариантам сразу.
+# С кэшем результатов батч идёт с фиксированным seed, и повторный запрос с теми же вариантами берётся из кэша
+# cancel_event проверяется между фрагментами текста: после отмены выбрасывается InferenceCancelled
+def synthesize_variations(text, reference_audio=None, variations=None, model=None, cancel_event=None):
+    model = model if model is not None else get_tts_model()
+    if model is None:
+        logger.error("Модель синтеза речи не загружена.")
+        return None
+
+    if not variations:
+        variations = [DEFAULT_SYNTHESIS_SETTINGS]
+
+    # Параметры, общие для всего батча, берём из первого варианта
+    shared_settings = variations[0]
+
+    # Предобработка текста
+    processed_text = preprocess_text(text)
+
+    seed = shared_settings.get('seed', SYNTHESIS_SEED if synthesis_result_cache is not None else None)
+
+    try:
+        outputs = model.synthesize_variations(
+            text=processed_text,
+            config=tts_config,
+            speaker_wav=reference_audio if reference_audio else None,
+            language=shared_settings.get('language', 'ru'),
+            variations=[
+                {
+                    'speed': variation.get('speed', 1.0),
+                    'temperature': variation.get('temperature', 0.7)
+                }
+                for variation in variations
+            ],
+            repetition_penalty=shared_settings.get('repetition_penalty', 2.0),
+            length_penalty=shared_settings.get('length_penalty', 1.0),
+            enable_text_splitting=shared_settings.get('enable_text_splitting', True),
+            seed=seed,
+            cancel_event=cancel_event
+        )
+        if outputs and all(output.get("cache_hit") for output in outputs):
+            logger.info("Варианты синтеза взяты из кэша.")
+
+        output_paths = []
+        for idx, output in enumerate(outputs, start=1):
+            audio = output["wav"]
+            if isinstance(audio, torch.Tensor):
+                audio = audio.cpu().numpy()
+
+            # Сохраняем аудио с уникальным именем
+            output_path = os.path.join(WORKING_DIR, f'output_{uuid.uuid4()}.wav')
+            with metrics.timer('tts_encode_seconds'):
+                write(output_path, 24000, audio)
+            output_paths.append(output_path)
+            logger.info(f"Вариант {idx} синтезирован и сохранён: {output_path}")
+        return output_paths
+    except InferenceCancelled:
+        # Отмена — не ошибка синтеза, её обрабатывает вызывающий код
+        raise
+    except Exception as e:
+        logger.error(f"Ошибка синтеза вариантов речи: {str(e)}")
+        return None
+
+# Сохраняет фрагмент волны как OGG/Opus, который Telegram принимает как голосовое сообщение
+def save_opus_segment(audio, output_path, sample_rate=24000):
+    pcm = (np.clip(audio, -1.0, 1.0) * 32767).astype(np.int16)
+    segment = AudioSegment(pcm.tobytes(), frame_rate=sample_rate, sample_width=2, channels=1)
+    segment.export(output_path, format='ogg', codec='libopus')
+    return output_path
+
+# Потоковый синтез: генератор путей к OGG/Opus-сегментам, которые можно отправлять по мере готовности.
+# Фрагменты Xtts.inference_stream (уже склеенные с перекрытием) копятся до нужной длительности;
+# первый сегмент короче, чтобы пользователь услышал начало ответа как можно раньше.
+def synthesize_speech_stream(text, reference_audio=None, tts_settings=None, model=None,
+                             first_segment_seconds=STREAM_FIRST_SEGMENT_SECONDS,
+                             segment_seconds=STREAM_SEGMENT_SECONDS):
+    model = model if model is not None else get_tts_model()
+    if model is None:
+        logger.error("Модель синтеза речи не загружена.")
+        return
+
+    if tts_settings is None:
+        tts_settings = DEFAULT_SYNTHESIS_SETTINGS
+
+    sample_rate = 24000
+    processed_text = preprocess_text(text)
+    start_time = time.perf_counter()
+    first_chunk_time = None
+    first_segment_time = None
+    segments = 0
+    total_samples = 0
+    pending = []
+    pending_samples = 0
+
+    def flush():
+        nonlocal first_segment_time, segments, pending, pending_samples
+        output_path = os.path.join(WORKING_DIR, f'output_{uuid.uuid4()}.ogg')
+        with metrics.timer('tts_encode_seconds'):
+            save_opus_segment(np.concatenate(pending), output_path, sample_rate)
+        if first_segment_time is None:
+            first_segment_time = time.perf_counter() - start_time
+        segments += 1
+        pending = []
+        pending_samples = 0
+        return output_path
+
+    try:
+        chunks = model.synthesize_stream(
+            text=processed_text,
+            config=tts_config,
+            speaker_wav=reference_audio if reference_audio else None,
+            language=tts_settings.get('language', 'ru'),
+            speed=tts_settings.get('speed', 1.0),
+            repetition_penalty=tts_settings.get('repetition_penalty', 2.0),
+            length_penalty=tts_settings.get('length_penalty', 1.0),
+            temperature=tts_settings.get('temperature', 0.7),
+            enable_text_splitting=tts_settings.get('enable_text_splitting', True),
+            stream_chunk_size=STREAM_CHUNK_TOKENS
+        )
+        for chunk in chunks:
+            if first_chunk_time is None:
+                first_chunk_time = time.perf_counter() - start_time
+                logger.info(f"Первый фрагмент потокового синтеза получен за {first_chunk_time:.2f} с.")
+            if isinstance(chunk, torch.Tensor):
+                chunk = chunk.cpu().numpy()
+            pending.append(chunk)
+            pending_samples += chunk.shape[0]
+            total_samples += chunk.shape[0]
+
+            min_seconds = first_segment_seconds if segments == 0 else segment_seconds
+            if pending_samples >= min_seconds * sample_rate:
+                yield flush()
+
+        if pending_samples:
+            yield flush()
+    except Exception as e:
+        logger.error(f"Ошибка потокового синтеза речи: {str(e)}")
+        return
+
+    total_time = time.perf_counter() - start_time
+    audio_seconds = total_samples / sample_rate
+    if first_chunk_time is not None:
+        metrics.observe('tts_stream_first_chunk_seconds', first_chunk_time)
+    if first_segment_time is not None:
+        metrics.observe('tts_stream_first_segment_seconds', first_segment_time)
+    logger.info(
+        f"Потоковый синтез завершён: первый фрагмент {first_chunk_time or 0:.2f} с, "
+        f"первый сегмент {first_segment_time or 0:.2f} с, всего {total_time:.2f} с, "
+        f"аудио {audio_seconds:.2f} с (RTF {total_time / max(audio_seconds, 1e-6):.2f}), сегментов {segments}."
+    )
@@ -0,0 +1,136 @@
+# punctuation_batcher.py
+
+import logging
+import queue
+import threading
+import time
+from concurrent.futures import Future
+
+logger = logging.getLogger(__name__)
+
+# Параметры разбиения длинных текстов, как в PunctuationModel.predict
+CHUNK_WORDS = 230
+CHUNK_OVERLAP = 5
+
+
+class PunctuationBatcher:
+    """
+    Микробатчинг восстановления пунктуации для PunctuationModel (deepmultilingualpunctuation).
+    - Тексты от всех потоков попадают в общую очередь
+    - Рабочий поток ждёт до max_latency секунд, набирая до max_batch_size текстов,
+      и прогоняет все их фрагменты через трансформер одним батчем с паддингом
+    - Каждый запрос получает свой Future с результатом
+    Модель вызывается только из рабочего потока, поэтому дополнительная синхронизация не нужна.
+    """
+
+    def __init__(self, model, max_batch_size=16, max_latency=0.01):
+        self.model = model
+        self.max_batch_size = max(1, max_batch_size)
+        self.max_latency = max_latency
+        self._requests = queue.Queue()
+        self._stopped = threading.Event()
+        self._worker = threading.Thread(target=self._run, name='punctuation', daemon=True)
+        self._worker.start()
+
+    def submit(self, text):
+        """
+        Ставит текст в очередь и возвращает concurrent.futures.Future с текстом с пунктуацией.
+        """
+        future = Future()
+        self._requests.put((text, future))
+        return future
+
+    def restore_punctuation(self, text, timeout=None):
+        """
+        Блокирующий аналог PunctuationModel.restore_punctuation.
+        """
+        return self.submit(text).result(timeout=timeout)
+
+    def _collect_batch(self):
+        batch = [self._requests.get()]
+        deadline = time.perf_counter() + self.max_latency
+        while len(batch) < self.max_batch_size:
+            remaining = deadline - time.perf_counter()
+            if remaining <= 0:
+                break
+            try:
+                batch.append(self._requests.get(timeout=remaining))
+            except queue.Empty:
+                break
+        return batch
+
+    def _run(self):
+        while not self._stopped.is_set():
+            batch = self._collect_batch()
+            batch = [(text, future) for text, future in batch if future.set_running_or_notify_cancel()]
+            if not batch:
+                continue
+            texts = [text for text, _ in batch]
+            start = time.perf_counter()
+            try:
+                results = self._restore_batch(texts)
+            except Exception as e:
+                # Не даём одному плохому тексту уронить весь батч: повторяем по одному
+                logger.error(f"Ошибка батча пунктуации ({len(texts)} текстов): {str(e)}")
+                for text, future in batch:
+                    try:
+                        future.set_result(self.model.restore_punctuation(text))
+                    except Exception as text_error:
+                        future.set_exception(text_error)
+                continue
+            for (_, future), result in zip(batch, results):
+                future.set_result(result)
+            logger.debug(f"Пунктуация восстановлена для {len(texts)} текстов за {time.perf_counter() - start:.3f} с.")
+
+    def _split(self, words):
+        # Повторяет разбиение PunctuationModel.predict на перекрывающиеся фрагменты
+        overlap = CHUNK_OVERLAP if len(words) > CHUNK_WORDS else 0
+        chunks = list(self.model.overlap_chunks(words, CHUNK_WORDS, overlap))
+        if chunks and len(chunks[-1]) <= overlap:
+            chunks.pop()
+        # Последний фрагмент используется целиком
+        return [(chunk, overlap if idx < len(chunks) - 1 else 0) for idx, chunk in enumerate(chunks)]
+
+    @staticmethod
+    def _tag_words(chunk, result, overlap):
+        tagged_words = []
+        char_index = 0
+        result_index = 0
+        for word in chunk[:len(chunk) - overlap]:
+            char_index += len(word) + 1
+            # Если любой подтокен слова помечен знаком, помечаем им всё слово
+            label = "0"
+            score = 0.0
+            while result_index < len(result) and char_index > result[result_index]["end"]:
+                label = result[result_index]["entity"]
+                score = result[result_index]["score"]
+                result_index += 1
+            tagged_words.append([word, label, score])
+        return tagged_words
+
+    def _restore_batch(self, texts):
+        words_per_text = [self.model.preprocess(text) for text in texts]
+        chunks_per_text = [self._split(words) for words in words_per_text]
+        chunk_texts = [" ".join(chunk) for chunks in chunks_per_text for chunk, _ in chunks]
+
+        pipe_results = []
+        if chunk_texts:
+            pipe_results = self.model.pipe(chunk_texts, batch_size=len(chunk_texts))
+            if len(chunk_texts) == 1 and pipe_results and isinstance(pipe_results[0], dict):
+                pipe_results = [pipe_results]
+
+        results = []
+        result_idx = 0
+        for words, chunks in zip(words_per_text, chunks_per_text):
+            tagged_words = []
+            for chunk, overlap in chunks:
+                tagged_words += self._tag_words(chunk, pipe_results[result_idx], overlap)
+                result_idx += 1
+            assert len(tagged_words) == len(words)
+            results.append(self.model.prediction_to_text(tagged_words))
+        return results
+
+    def shutdown(self):
+        self._stopped.set()
+        # Будим рабочий поток, если он ждёт запросов
+        self._requests.put(("", Future()))
@@ -0,0 +1,138 @@
+# recognition_pipeline.py
+
+import asyncio
+import logging
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+import processing
+from metrics import metrics
+from config import ASR_WORKERS, ASR_PARTIAL_UPDATE_INTERVAL
+
+logger = logging.getLogger(__name__)
+
+
+class RecognitionResult:
+    """
+    Результат двухпроходного распознавания: первичный текст (маленькая модель),
+    улучшенный текст (большая модель) и длительность этапов в секундах.
+    """
+
+    def __init__(self, initial_text=None, improved_text=None, timings=None):
+        self.initial_text = initial_text
+        self.improved_text = improved_text
+        self.timings = timings or {}
+
+
+class RecognitionPipeline:
+    """
+    Двухпроходное распознавание голосового сообщения вне цикла событий бота.
+    - Аудио декодируется один раз, один и тот же PCM-буфер получают обе модели
+    - Маленькая и большая модели Vosk работают одновременно в потоках (Vosk отпускает GIL)
+    - Промежуточные гипотезы маленькой модели передаются в on_partial не чаще раза в partial_interval секунд
+    """
+
+    def __init__(self, num_workers=ASR_WORKERS, partial_interval=ASR_PARTIAL_UPDATE_INTERVAL):
+        self.partial_interval = partial_interval
+        self._executor = ThreadPoolExecutor(max_workers=max(2, num_workers), thread_name_prefix='asr')
+
+    def _timed(self, timings, stage, func, *args, **kwargs):
+        start = time.perf_counter()
+        try:
+            return func(*args, **kwargs)
+        finally:
+            timings[stage] = time.perf_counter() - start
+
+    def _punctuate(self, text):
+        # Пунктуация обоих проходов и текстовых сообщений объединяется в батчи (PunctuationBatcher)
+        return processing.process_text_transcription(text)
+
+    def _recognize(self, pcm, get_recognizer_pool, timings, prefix, on_partial=None):
+        # Модель запрашивается в потоке распознавания: если она ещё не загружена, ждёт поток, а не цикл событий
+        recognizer_pool = self._timed(timings, f'{prefix}_model', get_recognizer_pool)
+        transcript = self._timed(
+            timings, f'{prefix}_asr', processing.transcribe_pcm, pcm, recognizer_pool, on_partial
+        )
+        logger.info(f"Распознанный текст ({prefix}): {transcript}")
+        return self._timed(timings, f'{prefix}_punctuation', self._punctuate, transcript)
+
+    def _make_partial_callback(self, loop, on_partial, timings, start_time):
+        # Вызывается из потока распознавания; обновления прореживаются, а новое не отправляется,
+        # пока предыдущее ещё не доставлено
+        state = {'last_time': 0.0, 'future': None}
+
+        def callback(text):
+            now = time.perf_counter()
+            if now - state['last_time'] < self.partial_interval:
+                return
+            if state['future'] is not None and not state['future'].done():
+                return
+            timings.setdefault('first_partial', now - start_time)
+            state['last_time'] = now
+            state['future'] = asyncio.run_coroutine_threadsafe(on_partial(text), loop)
+
+        return callback, state
+
+    async def run(self, audio_path, on_partial=None, on_initial=None):
+        """
+        Распознаёт аудиофайл. on_partial(text) и on_initial(text) — корутины, которые вызываются
+        с промежуточной гипотезой и с первичным текстом маленькой модели.
+        Возвращает RecognitionResult; тексты равны None, если соответствующий этап не удался.
+        """
+        loop = asyncio.get_running_loop()
+        timings = {}
+        start_time = time.perf_counter()
+        result = RecognitionResult(timings=timings)
+
+        pcm = await loop.run_in_executor(
+            self._executor, self._timed, timings, 'decode', processing.decode_voice_message, audio_path
+        )
+        if pcm is None:
+            metrics.inc('voice_decode_errors_total')
+            return result
+
+        # Большая модель стартует сразу, не дожидаясь маленькой
+        improved_future = loop.run_in_executor(
+            self._executor, self._recognize, pcm, processing.get_large_recognizer_pool, timings, 'large'
+        )
+
+        partial_callback, partial_state = None, None
+        if on_partial is not None:
+            partial_callback, partial_state = self._make_partial_callback(loop, on_partial, timings, start_time)
+        try:
+            result.initial_text = await loop.run_in_executor(
+                self._executor, self._recognize,
+                pcm, processing.get_small_recognizer_pool, timings, 'small', partial_callback
+            )
+            timings['initial'] = time.perf_counter() - start_time
+        except Exception as e:
+            logger.error(f"Ошибка первичного распознавания: {str(e)}")
+
+        # Промежуточное обновление не должно перезаписать первичный текст
+        if partial_state is not None and partial_state['future'] is not None:
+            try:
+                await asyncio.wrap_future(partial_state['future'])
+            except Exception as e:
+                logger.warning(f"Ошибка отправки промежуточного текста: {str(e)}")
+        if result.initial_text is not None and on_initial is not None:
+            await on_initial(result.initial_text)
+
+        try:
+            result.improved_text = await improved_future
+        except Exception as e:
+            logger.error(f"Ошибка улучшенного распознавания: {str(e)}")
+        timings['total'] = time.perf_counter() - start_time
+
+        metrics.inc('voice_messages_total')
+        for stage, value in timings.items():
+            metrics.observe(f'asr_{stage}_seconds', value)
+        logger.info(
+            "Этапы распознавания (с): " + ", ".join(f"{stage}={value:.2f}" for stage, value in timings.items())
+        )
+        return result
+
+    def shutdown(self):
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+recognition_pipeline = RecognitionPipeline()
@@ -0,0 +1,77 @@
+# recognizer_pool.py
+
+import logging
+import queue
+import threading
+import time
+from contextlib import contextmanager
+
+from vosk import KaldiRecognizer
+
+from audio_decoding import ASR_SAMPLE_RATE
+
+logger = logging.getLogger(__name__)
+
+# Ожидание свободного распознавателя дольше этого порога (с) попадает в лог
+SLOW_CHECKOUT_SECONDS = 0.1
+
+
+class RecognizerPool:
+    """
+    Ограниченный пул заранее созданных KaldiRecognizer для одной модели Vosk.
+    - Распознаватели создаются один раз при старте, а не на каждое сообщение
+    - Один распознаватель одновременно используется только одним потоком
+    - После возврата в пул распознаватель сбрасывается (Reset)
+    - Время ожидания свободного распознавателя накапливается в статистике
+    """
+
+    def __init__(self, model, size, sample_rate=ASR_SAMPLE_RATE, name='vosk'):
+        self.name = name
+        self.size = max(1, size)
+        self.sample_rate = sample_rate
+        self._idle = queue.LifoQueue()
+        self._stats_lock = threading.Lock()
+        self._checkouts = 0
+        self._total_wait = 0.0
+        self._max_wait = 0.0
+        self._in_use = 0
+        for _ in range(self.size):
+            recognizer = KaldiRecognizer(model, sample_rate)
+            recognizer.SetWords(True)
+            self._idle.put(recognizer)
+        logger.info(f"Пул распознавателей '{name}' создан: {self.size} шт.")
+
+    @contextmanager
+    def recognizer(self, timeout=None):
+        """
+        Выдаёт свободный распознаватель на время блока with; блокирует поток, пока такого нет.
+        При истечении timeout выбрасывает queue.Empty.
+        """
+        start = time.perf_counter()
+        recognizer = self._idle.get(timeout=timeout)
+        wait = time.perf_counter() - start
+        with self._stats_lock:
+            self._checkouts += 1
+            self._total_wait += wait
+            self._max_wait = max(self._max_wait, wait)
+            self._in_use += 1
+        if wait > SLOW_CHECKOUT_SECONDS:
+            logger.info(f"Ожидание распознавателя '{self.name}': {wait:.2f} с.")
+        try:
+            yield recognizer
+        finally:
+            # Сбрасываем состояние, даже если распознавание прервалось на середине
+            recognizer.Reset()
+            with self._stats_lock:
+                self._in_use -= 1
+            self._idle.put(recognizer)
+
+    def stats(self):
+        with self._stats_lock:
+            return {
+                'size': self.size,
+                'in_use': self._in_use,
+                'checkouts': self._checkouts,
+                'avg_wait': self._total_wait / self._checkouts if self._checkouts else 0.0,
+                'max_wait': self._max_wait,
+            }
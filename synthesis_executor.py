@@ -0,0 +1,211 @@
+# synthesis_executor.py
+
+import asyncio
+import functools
+import itertools
+import logging
+import os
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import torch
+
+import processing
+from TTS.tts.models.xtts import InferenceCancelled
+from config import SYNTHESIS_WORKERS, SYNTHESIS_DEVICES, SYNTHESIS_STREAMING, GPT_DECODE_BATCH_SIZE
+
+logger = logging.getLogger(__name__)
+
+
+def _remove_quietly(path):
+    try:
+        os.remove(path)
+    except OSError:
+        pass
+
+
+class SynthesisCancelled(Exception):
+    """
+    Задание на синтез отменено пользователем.
+    """
+
+
+class SynthesisJob:
+    """
+    Запрос на синтез из очереди вместе с флагом отмены.
+    Флаг проверяется потоком синтеза перед началом работы, а при синтезе вариантов — ещё и
+    между фрагментами текста. Потоковый синтез останавливается после текущего сегмента.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.request_id = request['request_id']
+        self.user_id = request['user_id']
+        self.cancel_event = threading.Event()
+
+    @property
+    def cancelled(self):
+        return self.cancel_event.is_set()
+
+    def cancel(self):
+        self.cancel_event.set()
+
+
+class SynthesisExecutor:
+    """
+    Пул потоков для синтеза речи вне цикла событий бота.
+    - Каждый поток владеет собственным экземпляром Xtts на своём устройстве
+      (при GPT_DECODE_BATCH_SIZE > 0 без потокового синтеза потоки на устройстве основной модели делят её)
+    - Число одновременно обрабатываемых запросов ограничено числом потоков
+    - Запросы можно отменять по пользователю
+    """
+
+    def __init__(self, num_workers=1, devices=None):
+        self.num_workers = max(1, num_workers)
+        self.devices = devices or processing.get_synthesis_devices()
+        self._device_cycle = itertools.cycle(self.devices)
+        self._init_lock = threading.Lock()
+        self._shared_model_taken = False
+        self._local = threading.local()
+        self._slots = asyncio.Semaphore(self.num_workers)
+        self._jobs = {}
+        self._executor = ThreadPoolExecutor(
+            max_workers=self.num_workers,
+            thread_name_prefix='synthesis',
+            initializer=self._init_worker
+        )
+
+    def _init_worker(self):
+        with self._init_lock:
+            self._local.device = next(self._device_cycle)
+            # Первый поток на устройстве основной модели использует её, чтобы не держать лишнюю копию.
+            # При непрерывном батчинге GPT основную модель используют все потоки на её устройстве:
+            # их запросы декодируются одним батчем. Потоковый синтез идёт мимо планировщика
+            # и хранит префикс в модели, поэтому с ним модель по-прежнему не делится
+            on_main_device = str(torch.device(self._local.device)) == str(torch.device(processing.device))
+            share_all = GPT_DECODE_BATCH_SIZE > 0 and not SYNTHESIS_STREAMING
+            self._local.shared = on_main_device and (share_all or not self._shared_model_taken)
+            if self._local.shared:
+                self._shared_model_taken = True
+        self._local.model = None
+
+    def _get_model(self):
+        # Модель загружается лениво в самом потоке при первом задании; после неудачи — повторная попытка
+        if self._local.model is not None:
+            return self._local.model
+        device = self._local.device
+        thread_name = threading.current_thread().name
+        if self._local.shared:
+            self._local.model = processing.get_tts_model()
+            if self._local.model is not None:
+                logger.info(f"Поток синтеза {thread_name} использует основную модель на {device}.")
+            return self._local.model
+        try:
+            self._local.model = processing.load_tts_model(device)
+            logger.info(f"Поток синтеза {thread_name} загрузил модель на {device}.")
+        except Exception as e:
+            logger.error(f"Ошибка загрузки модели в потоке синтеза на {device}: {str(e)}")
+        return self._local.model
+
+    def _run_in_worker(self, job, func, *args, **kwargs):
+        if job.cancelled:
+            raise SynthesisCancelled(job.request_id)
+        model = self._get_model()
+        if model is None:
+            return None
+        try:
+            return func(*args, model=model, **kwargs)
+        except InferenceCancelled:
+            raise SynthesisCancelled(job.request_id) from None
+
+    def create_job(self, request):
+        job = SynthesisJob(request)
+        self._jobs[job.request_id] = job
+        return job
+
+    def get_job(self, request_id):
+        return self._jobs.get(request_id)
+
+    def finish_job(self, job):
+        self._jobs.pop(job.request_id, None)
+
+    def cancel_user_jobs(self, user_id):
+        """
+        Отменяет все ожидающие и выполняющиеся запросы пользователя.
+        Возвращает количество отменённых запросов.
+        """
+        cancelled = 0
+        for job in list(self._jobs.values()):
+            if job.user_id == user_id and not job.cancelled:
+                job.cancel()
+                cancelled += 1
+        if cancelled:
+            logger.info(f"Отменено запросов на синтез пользователя {user_id}: {cancelled}.")
+        return cancelled
+
+    async def acquire_slot(self):
+        await self._slots.acquire()
+
+    def release_slot(self):
+        self._slots.release()
+
+    async def synthesize_variations(self, job, text, reference_audio, variations):
+        """
+        Синтезирует все варианты запроса одним батчем в потоке пула.
+        Возвращает список путей к аудиофайлам или None; при отмене (в том числе между фрагментами текста)
+        выбрасывает SynthesisCancelled.
+        """
+        loop = asyncio.get_running_loop()
+        return await loop.run_in_executor(
+            self._executor, functools.partial(
+                self._run_in_worker, job, processing.synthesize_variations, text, reference_audio, variations,
+                cancel_event=job.cancel_event
+            )
+        )
+
+    async def synthesize_stream(self, job, text, reference_audio, tts_settings):
+        """
+        Потоковый синтез в потоке пула: асинхронно выдаёт пути к OGG/Opus-сегментам по мере их готовности.
+        При отмене задания синтез останавливается после текущего сегмента.
+        """
+        loop = asyncio.get_running_loop()
+        segments = asyncio.Queue()
+        stopped = threading.Event()
+
+        def deliver(path):
+            # Выполняется в цикле событий; если получатель уже не ждёт сегментов, файл никто не удалит
+            if stopped.is_set():
+                _remove_quietly(path)
+            else:
+                segments.put_nowait(path)
+
+        def produce(model=None):
+            for path in processing.synthesize_speech_stream(text, reference_audio, tts_settings, model=model):
+                loop.call_soon_threadsafe(deliver, path)
+                if stopped.is_set() or job.cancelled:
+                    break
+
+        future = loop.run_in_executor(self._executor, self._run_in_worker, job, produce)
+        future.add_done_callback(lambda _: segments.put_nowait(None))
+        try:
+            while True:
+                path = await segments.get()
+                if path is None:
+                    break
+                yield path
+            # Пробрасываем SynthesisCancelled и ошибки потока
+            await future
+        finally:
+            stopped.set()
+            while not segments.empty():
+                path = segments.get_nowait()
+                if path is not None:
+                    _remove_quietly(path)
+
+    def shutdown(self):
+        for job in list(self._jobs.values()):
+            job.cancel()
+        self._executor.shutdown(wait=False, cancel_futures=True)
+
+
+synthesis_executor = SynthesisExecutor(SYNTHESIS_WORKERS, SYNTHESIS_DEVICES)
@@ -0,0 +1,129 @@
+import asyncio
+import os
+import shutil
+import tempfile
+import unittest
+from unittest import mock
+
+import numpy as np
+from scipy.io import wavfile
+
+import processing
+from metrics import metrics
+from synthesis_executor import SynthesisCancelled, SynthesisExecutor
+from TTS.tts.configs.xtts_config import XttsConfig
+from TTS.tts.layers.xtts.tokenizer import VoiceBpeTokenizer
+from TTS.tts.models.xtts import Xtts, XttsArgs
+from TTS.utils.synthesis_cache import SynthesisResultCache
+
+TTS_TESTS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'XTTS-v2', 'TTS-0.22.0', 'tests')
+TOKENIZER_FILE = os.path.join(TTS_TESTS_DIR, 'inputs', 'xtts_vocab.json')
+WAV_FILE = os.path.join(TTS_TESTS_DIR, 'data', 'ljspeech', 'wavs', 'LJ001-0001.wav')
+TEXT = "This is a test sentence. And this is another one."
+# длиннее предела в 250 символов, поэтому синтезируется двумя фрагментами
+LONG_TEXT = " ".join([TEXT] * 6)
+VARIATIONS = [
+    {'language': 'en', 'speed': 1.0, 'temperature': 0.7},
+    {'language': 'en', 'speed': 1.1, 'temperature': 0.75},
+]
+
+
+def create_random_model():
+    # Маленькая XTTS со случайными весами, как в тестах TTS
+    model_args = XttsArgs(
+        gpt_layers=2,
+        gpt_n_model_channels=64,
+        gpt_n_heads=2,
+        gpt_max_audio_tokens=40,
+        gpt_use_perceiver_resampler=True,
+        decoder_input_dim=64,
+    )
+    model = Xtts(XttsConfig(model_args=model_args))
+    model.tokenizer = VoiceBpeTokenizer(vocab_file=TOKENIZER_FILE)
+    model.init_models()
+    model.eval()
+    return model
+
+
+class SynthesisExecutorTest(unittest.TestCase):
+    """
+    Запросы проходят через пул синтеза и processing так же, как из бота, но с маленькой случайной моделью.
+    """
+
+    @classmethod
+    def setUpClass(cls):
+        cls.model = create_random_model()
+
+    def setUp(self):
+        self.work_dir = tempfile.mkdtemp()
+        self.model.result_cache = SynthesisResultCache(os.path.join(self.work_dir, 'synthesis_cache'))
+        self.model.stage_callback = processing.record_tts_stage
+        patches = [
+            mock.patch.object(processing, 'WORKING_DIR', self.work_dir),
+            mock.patch.object(processing, 'tts_config', self.model.config),
+            mock.patch.object(processing, 'synthesis_result_cache', self.model.result_cache),
+            mock.patch.object(processing, 'get_tts_model', return_value=self.model),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+        # Поток на устройстве основной модели использует её, то есть модель теста
+        self.executor = SynthesisExecutor(num_workers=1, devices=[str(processing.device)])
+        self.addCleanup(self.executor.shutdown)
+        self.addCleanup(shutil.rmtree, self.work_dir, ignore_errors=True)
+
+    def _synthesize_variations(self, request_id, text=TEXT):
+        async def run():
+            job = self.executor.create_job({'request_id': request_id, 'user_id': 1})
+            try:
+                return await self.executor.synthesize_variations(job, text, WAV_FILE, VARIATIONS)
+            finally:
+                self.executor.finish_job(job)
+
+        return asyncio.run(run())
+
+    def test_retry_is_served_from_result_cache(self):
+        counters = metrics.snapshot()['counters']
+        hits = counters.get('tts_result_cache_hits_total', 0)
+        misses = counters.get('tts_result_cache_misses_total', 0)
+
+        first_paths = self._synthesize_variations('request-1')
+        # повтор «Синтезировать речь» с тем же текстом, голосом и настройками
+        retry_paths = self._synthesize_variations('request-2')
+
+        counters = metrics.snapshot()['counters']
+        self.assertEqual(counters.get('tts_result_cache_misses_total', 0), misses + 1)
+        self.assertEqual(counters.get('tts_result_cache_hits_total', 0), hits + 1)
+        self.assertEqual(len(first_paths), len(VARIATIONS))
+        self.assertEqual(len(retry_paths), len(VARIATIONS))
+        for first_path, retry_path in zip(first_paths, retry_paths):
+            np.testing.assert_array_equal(wavfile.read(first_path)[1], wavfile.read(retry_path)[1])
+
+    def test_cancel_between_text_chunks(self):
+        job = self.executor.create_job({'request_id': 'request-1', 'user_id': 1})
+        self.addCleanup(self.executor.finish_job, job)
+        generated_chunks = []
+        report_stage = self.model._report_stage
+
+        def cancel_after_first_chunk(stage, start_time, **fields):
+            report_stage(stage, start_time, **fields)
+            if stage == 'gpt_generate':
+                generated_chunks.append(fields['tokens'])
+                # пользователь отменил запрос, пока синтезировался первый фрагмент
+                self.executor.cancel_user_jobs(job.user_id)
+
+        with mock.patch.object(self.model, '_report_stage', side_effect=cancel_after_first_chunk):
+            with self.assertRaises(SynthesisCancelled):
+                asyncio.run(self.executor.synthesize_variations(job, LONG_TEXT, WAV_FILE, VARIATIONS))
+
+        # второй фрагмент текста уже не синтезируется, а в кэш и рабочую папку ничего не попадает
+        self.assertEqual(len(generated_chunks), 1)
+        self.assertEqual([name for name in os.listdir(self.work_dir) if name.endswith('.wav')], [])
+        counters = metrics.snapshot()['counters']
+        misses = counters.get('tts_result_cache_misses_total', 0)
+        self.assertEqual(len(self._synthesize_variations('request-2', LONG_TEXT)), len(VARIATIONS))
+        self.assertEqual(metrics.snapshot()['counters'].get('tts_result_cache_misses_total', 0), misses + 1)
+
+
+if __name__ == '__main__':
+    unittest.main()